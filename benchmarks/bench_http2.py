@@ -0,0 +1,84 @@
+"""Compares STK push burst throughput over the HTTP/2 multiplexed transport and the pooled HTTP/1.1 transport.
+
+Both paths run against local stub servers that answer after a fixed delay standing in for network latency. Run it
+from the repository root:
+
+    python -m benchmarks.bench_http2 --requests 2000 --delay 0.02
+"""
+
+# standard imports
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# local imports
+from mpesa_sdk.daraja.auth import AccessTokenCache
+from mpesa_sdk.daraja.stk import StkPushPaymentRequest
+from mpesa_sdk.transport import Http2Transport, RequestsTransport
+
+# test imports
+from tests.helpers.h2 import h2_stub_server
+from tests.helpers.http import stub_server
+
+RESPONSES = {
+    "GET": ({"access_token": "FF6C9WiPk46ShjYk2QqWajV95VaN", "expires_in": "3599"}, 200),
+    "POST": ({"MerchantRequestID": "29115-34620561-1", "CheckoutRequestID": "ws_CO_191220191020363925",
+              "ResponseCode": 0, "ResponseDescription": "Success. Request accepted for processing"}, 200),
+}
+
+
+def use_stub(url):
+    os.environ["OAUTH_URL"] = f"{url}/oauth"
+    os.environ["STK_PUSH_INITIATION_URL"] = f"{url}/stkpush"
+
+
+def http2_burst(count, delay, connections):
+    async def burst():
+        transport = Http2Transport(max_connections=connections, prior_knowledge=True)
+        request = StkPushPaymentRequest("key", "secret", "passkey", "174379", async_transport=transport,
+                                        token_cache=AccessTokenCache("key", "secret", async_transport=transport))
+        try:
+            await asyncio.gather(*(request.execute_async("ref", "1", "254712345678", "Flash sale")
+                                   for _ in range(count)))
+        finally:
+            await transport.close()
+
+    with h2_stub_server(RESPONSES, delay=delay) as (server, url):
+        use_stub(url)
+        started = time.perf_counter()
+        asyncio.run(burst())
+        return time.perf_counter() - started, server.connections
+
+
+def http1_burst(count, delay, connections):
+    transport = RequestsTransport(pool_maxsize=connections)
+    request = StkPushPaymentRequest("key", "secret", "passkey", "174379", transport=transport,
+                                    token_cache=AccessTokenCache("key", "secret", transport=transport))
+    with stub_server(RESPONSES, delay=delay) as (_, url):
+        use_stub(url)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            list(executor.map(lambda _: request.execute("ref", "1", "254712345678", "Flash sale"), range(count)))
+        elapsed = time.perf_counter() - started
+    transport.close()
+    return elapsed, connections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--delay", type=float, default=0.02, help="simulated server latency in seconds")
+    parser.add_argument("--http1-connections", type=int, default=10)
+    parser.add_argument("--http2-connections", type=int, default=2)
+    arguments = parser.parse_args()
+
+    for name, run, connections in (("HTTP/1.1 pooled", http1_burst, arguments.http1_connections),
+                                   ("HTTP/2 multiplexed", http2_burst, arguments.http2_connections)):
+        elapsed, used = run(arguments.requests, arguments.delay, connections)
+        print(f"{name:<20} {arguments.requests / elapsed:>10.1f} req/s  {elapsed:>7.2f}s  connections: {used}")
+
+
+if __name__ == "__main__":
+    main()
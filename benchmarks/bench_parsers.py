@@ -0,0 +1,109 @@
+"""Compares the single-pass response parsers with the previous try/except KeyError field lookups.
+
+The previous parsers tried each key in turn and caught the KeyError, so an error-shaped body raised and caught three
+exceptions, and every key was converted to snake case with two regular expressions. Both versions parse the same
+success and error bodies, already decoded, so only the parsing is measured. Run it from the repository root:
+
+    python -m benchmarks.bench_parsers --number 200000
+"""
+
+# standard imports
+import argparse
+import logging
+import re
+import timeit
+
+# local imports
+from mpesa_sdk.daraja.b2c import B2CPaymentResponseParser
+from mpesa_sdk.daraja.errors import classify_payload
+from mpesa_sdk.daraja.responses import extract_response_fields
+from mpesa_sdk.daraja.stk import StkPushPaymentResponseParser
+
+# test imports
+from tests.helpers.http import build_response
+
+BODIES = {
+    "B2C": (
+        B2CPaymentResponseParser,
+        ({"ConversationID": "AG_20191219_00005797af5d7d75f652", "OriginatorConversationID": "16740-34861180-1",
+          "ResponseCode": 0, "ResponseDescription": "Accept the service request successfully."}, 200),
+        ({"requestId": "11728-2929992-1", "errorCode": "401.002.01",
+          "errorMessage": "Error Occurred - Invalid Access Token - BJGFGOXv5aZnw90KkA4TDtu4Xdyf"}, 401),
+    ),
+    "STK push": (
+        StkPushPaymentResponseParser,
+        ({"MerchantRequestID": "29115-34620561-1", "CheckoutRequestID": "ws_CO_191220191020363925",
+          "ResponseCode": 0, "ResponseDescription": "Success. Request accepted for processing",
+          "CustomerMessage": "Success. Request accepted for processing"}, 200),
+        ({"requestId": "1494-250373-3", "errorCode": "500.001.1001",
+          "errorMessage": "[MerchantValidate] - Wrong credentials"}, 500),
+    ),
+}
+
+
+def legacy_camel_to_snake(value):
+    value = re.sub("(.)([A-Z][a-z]+)", r"\1_\2", value)
+    return re.sub("([a-z0-9])([A-Z])", r"\1_\2", value).lower()
+
+
+def legacy_parse(parser_class, body, status_code):
+    """Parses a body the way the parsers did before, with a KeyError caught for each missing key."""
+    stk = issubclass(parser_class, StkPushPaymentResponseParser)
+    try:
+        description = body["ResultDesc" if stk else "ResponseDescription"]
+    except KeyError:
+        description = body.get("ResponseDescription") or body["errorMessage"]
+    try:
+        request_id = body["MerchantRequestID" if stk else "OriginatorConversationID"]
+    except KeyError:
+        request_id = body["requestId"]
+    try:
+        code = body["ResultCode" if stk else "ResponseCode"]
+    except KeyError:
+        code = body.get("ResponseCode", body.get("errorCode"))
+    error = classify_payload(body, status_code)
+    parsed_response = {legacy_camel_to_snake(key): value for key, value in body.items()}
+    if error is not None:
+        parsed_response["error"] = error.as_dict()
+    return code, description, request_id, parsed_response
+
+
+def current_parse(parser_class, body, status_code):
+    """Parses a body with the current parser, skipping the JSON decoding the legacy version does not measure."""
+    parser = parser_class.__new__(parser_class)
+    parser.response = body
+    parser.fields = fields = extract_response_fields(body, parser_class.SHAPE, status_code)
+    parser.description, parser.request_id, parser.error = fields.description, fields.request_id, fields.error
+    return parser.parse()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=200000, help="bodies parsed per measurement")
+    parser.add_argument("--repeat", type=int, default=5)
+    arguments = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    for name, (parser_class, success, error) in BODIES.items():
+        for shape, (body, status_code) in (("success", success), ("error", error)):
+            # the parsed output must not change, only the time it takes.
+            assert current_parse(parser_class, body, status_code) == legacy_parse(parser_class, body, status_code)[3]
+            timings = {}
+            for version, parse in (("legacy", legacy_parse), ("single-pass", current_parse)):
+                timings[version] = min(timeit.repeat(lambda: parse(parser_class, body, status_code),
+                                                     number=arguments.number, repeat=arguments.repeat))
+            per_body = {version: elapsed / arguments.number * 1e6 for version, elapsed in timings.items()}
+            print(f"{name:<9} {shape:<8} legacy {per_body['legacy']:>6.2f} us  "
+                  f"single-pass {per_body['single-pass']:>6.2f} us  "
+                  f"speedup {timings['legacy'] / timings['single-pass']:>4.2f}x")
+
+    # end to end, including decoding the JSON body of the transport response.
+    for name, (parser_class, success, error) in BODIES.items():
+        responses = [build_response(body, "utf-8", "", status_code) for body, status_code in (success, error)]
+        elapsed = min(timeit.repeat(lambda: [parser_class(response).parse() for response in responses],
+                                    number=arguments.number // 10, repeat=arguments.repeat))
+        print(f"{name:<9} end to end {elapsed / (arguments.number // 10) / 2 * 1e6:>6.2f} us per response")
+
+
+if __name__ == "__main__":
+    main()
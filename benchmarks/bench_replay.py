@@ -0,0 +1,126 @@
+"""Replays a recorded Daraja trace through the SDK and compares the measurements with a baseline.
+
+Without a trace, a synthetic one is recorded first: a mix of STK pushes, B2C payouts and their callbacks, answered
+by an in-memory transport. Store the report of one SDK version with --save and compare another against it with
+--baseline. Run it from the repository root:
+
+    python -m benchmarks.bench_replay --events 5000 --speed 0 --save baseline.json
+    python -m benchmarks.bench_replay --trace trace.jsonl.gz --speed 10 --baseline baseline.json
+"""
+
+# standard imports
+import argparse
+import json
+import logging
+import os
+import random
+import tempfile
+
+# local imports
+from mpesa_sdk.daraja.auth import AccessTokenCache
+from mpesa_sdk.daraja.b2c import B2CPaymentRequest
+from mpesa_sdk.daraja.enums import CommandID
+from mpesa_sdk.daraja.replay import ReplayRunner, TraceRecorder
+from mpesa_sdk.daraja.stk import StkPushPaymentRequest
+from mpesa_sdk.transport import InMemoryTransport
+
+URLS = {
+    "OAUTH_URL": "https://sandbox.safaricom.co.ke/oauth/v1/generate?grant_type=client_credentials",
+    "STK_PUSH_INITIATION_URL": "https://sandbox.safaricom.co.ke/mpesa/stkpush/v1/processrequest",
+    "B2C_URL": "https://sandbox.safaricom.co.ke/mpesa/b2c/v1/paymentrequest",
+    "STK_PUSH_CALLBACK_URL": "https://example.com/stk-push-callback",
+    "B2C_CALLBACK_URL": "https://example.com/b2c-callback",
+}
+STK_RESPONSE = {"MerchantRequestID": "29115-34620561-1", "CheckoutRequestID": "ws_CO_191220191020363925",
+                "ResponseCode": "0", "ResponseDescription": "Success. Request accepted for processing",
+                "CustomerMessage": "Success. Request accepted for processing"}
+B2C_RESPONSE = {"ConversationID": "AG_20191219_00005797af5d7d75f652", "OriginatorConversationID": "16740-34861180-1",
+                "ResponseCode": "0", "ResponseDescription": "Accept the service request successfully."}
+
+
+def stk_callback(phone):
+    items = [{"Name": "Amount", "Value": 1.0}, {"Name": "MpesaReceiptNumber", "Value": "NLJ7RT61SV"},
+             {"Name": "TransactionDate", "Value": 20191219102115}, {"Name": "PhoneNumber", "Value": int(phone)}]
+    return {"Body": {"stkCallback": {"MerchantRequestID": "29115-34620561-1", "ResultCode": 0,
+                                     "CheckoutRequestID": "ws_CO_191220191020363925",
+                                     "ResultDesc": "The service request is processed successfully.",
+                                     "CallbackMetadata": {"Item": items}}}}
+
+
+def b2c_callback(phone):
+    parameters = [{"Key": "TransactionAmount", "Value": 10}, {"Key": "TransactionReceipt", "Value": "NLJ41HAY6Q"},
+                  {"Key": "ReceiverPartyPublicName", "Value": f"{phone} - Jane Doe"},
+                  {"Key": "TransactionCompletedDateTime", "Value": "19.12.2019 11:45:50"}]
+    return {"Result": {"ResultType": 0, "ResultCode": 0, "ResultDesc": "The service request is processed successfully.",
+                       "OriginatorConversationID": "16740-34861180-1", "TransactionID": "NLJ41HAY6Q",
+                       "ConversationID": "AG_20191219_00005797af5d7d75f652",
+                       "ResultParameters": {"ResultParameter": parameters}}}
+
+
+def record_synthetic_trace(path, events):
+    """Records a mix of STK pushes, B2C payouts and their callbacks, three pushes for each payout."""
+    os.environ.update(URLS)
+    transport = InMemoryTransport()
+    transport.register("GET", URLS["OAUTH_URL"], json={"access_token": "token", "expires_in": "3599"})
+    transport.register("POST", URLS["STK_PUSH_INITIATION_URL"], json=STK_RESPONSE)
+    transport.register("POST", URLS["B2C_URL"], json=B2C_RESPONSE)
+    randomness = random.Random(0)
+    with TraceRecorder(path) as recorder:
+        recording = recorder.transport(transport)
+        token_cache = AccessTokenCache("key", "secret", transport=recording)
+        stk = StkPushPaymentRequest("key", "secret", "passkey", "174379", transport=recording, token_cache=token_cache)
+        b2c = B2CPaymentRequest("key", "secret", "600000", transport=recording, token_cache=token_cache)
+        for index in range(events // 2):
+            phone = f"2547{randomness.randrange(10 ** 8):08d}"
+            if index % 4:
+                stk.execute(f"ref-{index}", "10", phone, "Airtime")
+                recorder.record_callback("/stk-push-callback", json.dumps(stk_callback(phone)).encode())
+            else:
+                b2c.execute("10", CommandID.SALARY_PAYMENT, "test-api", "", "600000", phone, "Salary")
+                recorder.record_callback("/b2c-callback", json.dumps(b2c_callback(phone)).encode())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trace", help="the trace to replay, a synthetic trace is recorded when omitted")
+    parser.add_argument("--events", type=int, default=5000, help="events in the synthetic trace")
+    parser.add_argument("--speed", type=float, default=0, help="speed-up of the recorded pace, 0 for unpaced")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--allocations", action="store_true", help="trace memory allocations")
+    parser.add_argument("--save", help="write the report as JSON to this path")
+    parser.add_argument("--baseline", help="a report saved with --save to compare against")
+    arguments = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as directory:
+        trace = arguments.trace
+        if trace is None:
+            trace = os.path.join(directory, "trace.jsonl.gz")
+            record_synthetic_trace(trace, arguments.events)
+        runner = ReplayRunner(speed=arguments.speed or None, concurrency=arguments.concurrency,
+                              trace_allocations=arguments.allocations)
+        report = runner.run(trace).as_dict()
+
+    baseline = None
+    if arguments.baseline:
+        with open(arguments.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+    print(f"SDK {report['sdk_version']}: {report['events']} events, {report['errors']} errors, "
+          f"{report['throughput']:.0f} events/s"
+          + (f" (baseline {baseline['throughput']:.0f} events/s)" if baseline else ""))
+    for endpoint, latency in report["latency"].items():
+        line = (f"{endpoint:<26} p50 {latency['p50'] * 1e3:>7.3f} ms  p90 {latency['p90'] * 1e3:>7.3f} ms  "
+                f"p99 {latency['p99'] * 1e3:>7.3f} ms")
+        if baseline and endpoint in baseline["latency"]:
+            line += f"  p99 change {latency['p99'] / baseline['latency'][endpoint]['p99'] - 1:>+7.1%}"
+        print(line)
+    if report["peak_memory"] is not None:
+        print(f"peak traced memory {report['peak_memory'] / 1024:.0f} KiB, "
+              f"{report['retained_blocks']} blocks retained by the SDK")
+    if arguments.save:
+        with open(arguments.save, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
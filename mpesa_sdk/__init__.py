@@ -0,0 +1,93 @@
+"""This package is a Python SDK for Safaricom's Daraja API.
+
+Public classes are importable from the package itself, e.g. `from mpesa_sdk import StkPushPaymentRequest`, and are
+loaded on first access so that importing the package, or a single module such as a callback parser, does not pull
+in the HTTP clients and other dependencies the rest of the SDK needs.
+"""
+
+# standard imports
+import importlib
+from typing import Any
+
+_LAZY_ATTRIBUTES = {
+    "AccessTokenCache": "mpesa_sdk.daraja.auth",
+    "daraja_access_token": "mpesa_sdk.daraja.auth",
+    "B2CCallbackParser": "mpesa_sdk.daraja.b2c",
+    "B2CPaymentRequest": "mpesa_sdk.daraja.b2c",
+    "B2CPaymentResponseParser": "mpesa_sdk.daraja.b2c",
+    "B2CPayoutLoader": "mpesa_sdk.daraja.bulk",
+    "ShardedPayoutExecutor": "mpesa_sdk.daraja.bulk",
+    "C2BConfirmationParser": "mpesa_sdk.daraja.c2b",
+    "C2BRegisterUrlRequest": "mpesa_sdk.daraja.c2b",
+    "C2BRegisterUrlResponseParser": "mpesa_sdk.daraja.c2b",
+    "C2BTransaction": "mpesa_sdk.daraja.c2b",
+    "C2BValidationParser": "mpesa_sdk.daraja.c2b",
+    "C2BValidator": "mpesa_sdk.daraja.c2b",
+    "SecurityCredentialCache": "mpesa_sdk.daraja.credentials",
+    "C2BRejectionCode": "mpesa_sdk.daraja.enums",
+    "CommandID": "mpesa_sdk.daraja.enums",
+    "ErrorCategory": "mpesa_sdk.daraja.enums",
+    "IdentifierType": "mpesa_sdk.daraja.enums",
+    "RequestPriority": "mpesa_sdk.daraja.enums",
+    "ResponseType": "mpesa_sdk.daraja.enums",
+    "TransactionType": "mpesa_sdk.daraja.enums",
+    "ArrowExportSink": "mpesa_sdk.daraja.export",
+    "CallbackPipeline": "mpesa_sdk.daraja.pipeline",
+    "CallbackReceiver": "mpesa_sdk.daraja.receiver",
+    "Reconciler": "mpesa_sdk.daraja.reconciliation",
+    "ReferenceIndex": "mpesa_sdk.daraja.references",
+    "Redactor": "mpesa_sdk.daraja.replay",
+    "ReplayRunner": "mpesa_sdk.daraja.replay",
+    "TraceRecorder": "mpesa_sdk.daraja.replay",
+    "ReversalRequest": "mpesa_sdk.daraja.reverse",
+    "ReversalRequestCallbackParser": "mpesa_sdk.daraja.reverse",
+    "ReversalResponseParser": "mpesa_sdk.daraja.reverse",
+    "CsvResultSink": "mpesa_sdk.daraja.sinks",
+    "JsonlResultSink": "mpesa_sdk.daraja.sinks",
+    "ParquetResultSink": "mpesa_sdk.daraja.sinks",
+    "SQLiteResultSink": "mpesa_sdk.daraja.sinks",
+    "MemoryStatusStore": "mpesa_sdk.daraja.status_cache",
+    "SQLiteStatusStore": "mpesa_sdk.daraja.status_cache",
+    "TransactionStatusCache": "mpesa_sdk.daraja.status_cache",
+    "StkPushCallbackRequestParser": "mpesa_sdk.daraja.stk",
+    "StkPushPaymentRequest": "mpesa_sdk.daraja.stk",
+    "StkPushPaymentResponseParser": "mpesa_sdk.daraja.stk",
+    "StkPushStatusQueryRequest": "mpesa_sdk.daraja.stk",
+    "StkPushStatusQueryResponseParser": "mpesa_sdk.daraja.stk",
+    "TransactionStatusCallbackParser": "mpesa_sdk.daraja.transaction_status",
+    "TransactionStatusQueryRequest": "mpesa_sdk.daraja.transaction_status",
+    "TransactionStatusResponseParser": "mpesa_sdk.daraja.transaction_status",
+    "Deadline": "mpesa_sdk.deadline",
+    "HedgingPolicy": "mpesa_sdk.hedging",
+    "RateLimiter": "mpesa_sdk.ratelimit",
+    "RetryPolicy": "mpesa_sdk.retry",
+    "RequestScheduler": "mpesa_sdk.scheduler",
+    "SingleFlight": "mpesa_sdk.singleflight",
+    "Http2Transport": "mpesa_sdk.transport",
+    "HttpxTransport": "mpesa_sdk.transport",
+    "InMemoryTransport": "mpesa_sdk.transport",
+    "RequestsTransport": "mpesa_sdk.transport",
+    "Urllib3Transport": "mpesa_sdk.transport",
+    "set_default_transport": "mpesa_sdk.transport",
+}
+
+__all__ = sorted(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str) -> Any:
+    """This function imports a public attribute of the SDK on first access.
+    :param name: the attribute name.
+    :type name: str
+    :return: the attribute.
+    :rtype: Any
+    """
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,161 @@
+"""This module validates and serializes the amounts sent to the Daraja API.
+
+M-Pesa only moves whole shillings, so amounts are held as ints and accepted as int, Decimal or str, never rounded:
+a value with a fractional part is rejected rather than truncated. Each command has its own per-transaction limits,
+and every amount is serialized the same way, as a string of digits.
+"""
+
+# standard imports
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from typing import Iterable, Optional, Union
+
+# local imports
+from mpesa_sdk.daraja.enums import CommandID, TransactionType
+from mpesa_sdk.exceptions import InvalidAmountError
+
+Amount = Union[int, float, Decimal, str]
+Command = Union[CommandID, TransactionType]
+
+
+@dataclass(frozen=True, slots=True)
+class AmountLimit:
+    """This class holds the smallest and largest amount a single transaction may carry."""
+
+    minimum: int
+    maximum: int
+
+    def __contains__(self, amount: int) -> bool:
+        return self.minimum <= amount <= self.maximum
+
+
+DEFAULT_AMOUNT_LIMIT = AmountLimit(1, 250_000)
+
+AMOUNT_LIMITS: dict[Command, AmountLimit] = {
+    CommandID.BUSINESS_PAYMENT: AmountLimit(10, 250_000),
+    CommandID.PROMOTION_PAYMENT: AmountLimit(10, 250_000),
+    CommandID.SALARY_PAYMENT: AmountLimit(10, 250_000),
+    CommandID.TRANSACTION_REVERSAL: AmountLimit(1, 250_000),
+    TransactionType.CUSTOMER_BUY_GOODS_ONLINE: AmountLimit(1, 250_000),
+    TransactionType.CUSTOMER_PAY_BILL_ONLINE: AmountLimit(1, 250_000),
+}
+
+
+def amount_limit(command: Optional[Command] = None) -> AmountLimit:
+    """This function returns the per-transaction limits of a command.
+    :param command: the command id or transaction type, the default limits are used when omitted.
+    :type command: CommandID
+    :return: the limits.
+    :rtype: AmountLimit
+    """
+    if command is None:
+        return DEFAULT_AMOUNT_LIMIT
+    return AMOUNT_LIMITS.get(command, DEFAULT_AMOUNT_LIMIT)
+
+
+def _whole_shillings(value: Amount) -> Optional[int]:
+    """This function converts an amount to whole shillings without the integer fast paths.
+    :param value: the amount.
+    :type value: Amount
+    :return: the amount in shillings, or None if it is not a whole number.
+    :rtype: int
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else None
+    if isinstance(value, Decimal):
+        amount = value
+    else:
+        text = str(value).strip()
+        if not text.isascii():
+            return None
+        try:
+            amount = Decimal(text)
+        except InvalidOperation:
+            return None
+    if not amount.is_finite() or amount != amount.to_integral_value():
+        return None
+    return int(amount)
+
+
+def try_parse_amount(value: Amount, command: Optional[Command] = None) -> Optional[int]:
+    """This function parses an amount, returning None instead of raising when it is invalid.
+    :param value: the amount.
+    :type value: Amount
+    :param command: the command the amount is sent with.
+    :type command: CommandID
+    :return: the amount in shillings, or None if it is invalid or outside the command's limits.
+    :rtype: int
+    """
+    kind = type(value)
+    if kind is int:
+        amount: Optional[int] = value  # type: ignore[assignment]
+    elif kind is str and value.isascii() and value.isdigit():  # type: ignore[union-attr]
+        amount = int(value)
+    else:
+        amount = _whole_shillings(value)
+    if amount is None or amount not in amount_limit(command):
+        return None
+    return amount
+
+
+def parse_amount(value: Amount, command: Optional[Command] = None) -> int:
+    """This function parses an amount and checks it against the command's per-transaction limits.
+    :param value: the amount.
+    :type value: Amount
+    :param command: the command the amount is sent with.
+    :type command: CommandID
+    :return: the amount in shillings.
+    :rtype: int
+    :raises InvalidAmountError: if the amount is not a whole number of shillings or is outside the limits.
+    """
+    amount = try_parse_amount(value, command)
+    if amount is None:
+        limit = amount_limit(command)
+        raise InvalidAmountError(
+            f"Invalid amount: {value!r}, expected whole shillings between {limit.minimum} and {limit.maximum}."
+        )
+    return amount
+
+
+def format_amount(value: Amount, command: Optional[Command] = None) -> str:
+    """This function validates an amount and serializes it for a request payload.
+    :param value: the amount.
+    :type value: Amount
+    :param command: the command the amount is sent with.
+    :type command: CommandID
+    :return: the amount as a string of digits.
+    :rtype: str
+    :raises InvalidAmountError: if the amount is not a whole number of shillings or is outside the limits.
+    """
+    return str(parse_amount(value, command))
+
+
+def validate_amounts(
+    values: Iterable[Amount], command: Optional[Command] = None
+) -> list[Optional[int]]:
+    """This function validates a batch of amounts, such as the rows of a bulk payout file.
+
+    Ints and plain digit strings, which make up almost every row, are checked without building a Decimal.
+    :param values: the amounts.
+    :type values: Iterable
+    :param command: the command the amounts are sent with.
+    :type command: CommandID
+    :return: the amounts in shillings, None for each invalid value.
+    :rtype: list
+    """
+    limit = amount_limit(command)
+    minimum, maximum = limit.minimum, limit.maximum
+    amounts: list[Optional[int]] = []
+    append = amounts.append
+    for value in values:
+        kind = type(value)
+        if kind is int:
+            amount: Optional[int] = value  # type: ignore[assignment]
+        elif kind is str and value.isascii() and value.isdigit():  # type: ignore[union-attr]
+            amount = int(value)
+        else:
+            amount = _whole_shillings(value)
+        append(amount if amount is not None and minimum <= amount <= maximum else None)
+    return amounts
@@ -3,35 +3,113 @@
 # standard imports
 import base64
 import os
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
 
-# external imports
-from requests.exceptions import HTTPError
-from requests.auth import HTTPBasicAuth
+if TYPE_CHECKING:
+    import asyncio
 
 # local imports
-from mpesa_sdk.exceptions import AuthenticationError
+from mpesa_sdk.deadline import Deadline
+from mpesa_sdk.exceptions import AuthenticationError, DeadlineExceededError
+from mpesa_sdk.transport import AsyncTransport, Transport, TransportResponse
 from mpesa_sdk.utils import timestamp
-from mpesa_sdk.utils import make_request
+from mpesa_sdk.utils import make_request, make_request_async
 
+DEFAULT_OAUTH_URL = (
+    "https://sandbox.safaricom.co.ke/oauth/v1/generate?grant_type=client_credentials"
+)
 
-def daraja_access_token(consumer_key: str, consumer_secret: str):
+
+def basic_auth_header(consumer_key: str, consumer_secret: str) -> dict[str, str]:
+    """This method builds the basic authentication header used to request an access token.
+    :param consumer_key: the consumer key.
+    :type consumer_key: str
+    :param consumer_secret: the consumer secret.
+    :type consumer_secret: str
+    :return: the authorization header.
+    :rtype: dict
+    """
+    credentials = f"{consumer_key}:{consumer_secret}".encode("latin1")
+    return {"Authorization": f"Basic {base64.b64encode(credentials).decode('ascii')}"}
+
+
+def daraja_access_token(
+    consumer_key: str,
+    consumer_secret: str,
+    transport: Optional[Transport] = None,
+    timeout: float = 2,
+    deadline: Optional[Deadline] = None,
+):
     """This method retrieves the access token from the Daraja API.
     :param consumer_key: the consumer key.
     :type consumer_key: str
     :param consumer_secret: the consumer secret.
     :type consumer_secret: str
+    :param transport: the transport to make the request with.
+    :type transport: Transport
+    :param timeout: the timeout in seconds.
+    :type timeout: float
+    :param deadline: the deadline the token must be retrieved by, the timeout is capped to the time left.
+    :type deadline: Deadline
     :return: the access token.
     :rtype: str
     """
     response = make_request(
-        auth=HTTPBasicAuth(consumer_key, consumer_secret),
+        headers=basic_auth_header(consumer_key, consumer_secret),
+        method="GET",
+        transport=transport,
+        url=os.getenv("OAUTH_URL", DEFAULT_OAUTH_URL),
+        timeout=timeout,
+        deadline=deadline,
+    )
+    return access_token_from_response(response)
+
+
+async def daraja_access_token_async(
+    consumer_key: str,
+    consumer_secret: str,
+    transport: AsyncTransport,
+    timeout: float = 2,
+    deadline: Optional[Deadline] = None,
+):
+    """This method retrieves the access token from the Daraja API through an asynchronous transport.
+    :param consumer_key: the consumer key.
+    :type consumer_key: str
+    :param consumer_secret: the consumer secret.
+    :type consumer_secret: str
+    :param transport: the asynchronous transport to make the request with.
+    :type transport: AsyncTransport
+    :param timeout: the timeout in seconds.
+    :type timeout: float
+    :param deadline: the deadline the token must be retrieved by, the request is cancelled once it passes.
+    :type deadline: Deadline
+    :return: the access token.
+    :rtype: str
+    """
+    response = await make_request_async(
+        headers=basic_auth_header(consumer_key, consumer_secret),
         method="GET",
-        url=os.getenv(
-            "OAUTH_URL",
-            "https://sandbox.safaricom.co.ke/oauth/v1/generate?grant_type=client_credentials",
-        ),
+        transport=transport,
+        url=os.getenv("OAUTH_URL", DEFAULT_OAUTH_URL),
+        timeout=timeout,
+        deadline=deadline,
     )
+    return access_token_from_response(response)
+
+
+def access_token_from_response(response: Optional[TransportResponse]) -> str:
+    """This method extracts the access token from the Daraja API's token response.
+    :param response: the token response.
+    :type response: TransportResponse
+    :return: the access token.
+    :rtype: str
+    """
     if response is None:
+        # pylint: disable=import-outside-toplevel
+        from requests.exceptions import HTTPError
+
         raise HTTPError("Could not retrieve access token.")
 
     if response.status_code == 200:
@@ -41,6 +119,104 @@ def daraja_access_token(consumer_key: str, consumer_secret: str):
     raise AuthenticationError(error_message)
 
 
+class AccessTokenCache:
+    """This class caches a Daraja access token until shortly before it expires."""
+
+    def __init__(
+        self,
+        consumer_key: str,
+        consumer_secret: str,
+        transport: Optional[Transport] = None,
+        ttl: float = 3599,
+        leeway: float = 60,
+        async_transport: Optional[AsyncTransport] = None,
+    ):
+        """This method initializes the access token cache.
+        :param consumer_key: the consumer key.
+        :type consumer_key: str
+        :param consumer_secret: the consumer secret.
+        :type consumer_secret: str
+        :param transport: the transport to retrieve tokens with.
+        :type transport: Transport
+        :param ttl: the lifetime of a token in seconds.
+        :type ttl: float
+        :param leeway: the number of seconds before expiry at which a token is refreshed.
+        :type leeway: float
+        :param async_transport: the asynchronous transport to retrieve tokens with.
+        :type async_transport: AsyncTransport
+        """
+        self.consumer_key = consumer_key
+        self.consumer_secret = consumer_secret
+        self.transport = transport
+        self.ttl = ttl
+        self.leeway = leeway
+        self.async_transport = async_transport
+        self._lock = threading.Lock()
+        self._async_lock: Optional["asyncio.Lock"] = None
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+
+    def get(self, deadline: Optional[Deadline] = None) -> str:
+        """This method returns the cached access token, retrieving a new one if it is missing or about to expire.
+        :param deadline: the deadline the token must be returned by, including the wait for a retrieval already in
+        progress in another thread.
+        :type deadline: Deadline
+        :return: the access token.
+        :rtype: str
+        :raises DeadlineExceededError: if the token cannot be returned before the deadline.
+        """
+        if not self._lock.acquire(
+            timeout=-1 if deadline is None else deadline.remaining()
+        ):
+            raise DeadlineExceededError("The access token was not retrieved in time.")
+        try:
+            if self._token is None or time.monotonic() >= self._expires_at:
+                self._token = daraja_access_token(
+                    self.consumer_key,
+                    self.consumer_secret,
+                    transport=self.transport,
+                    deadline=deadline,
+                )
+                self._expires_at = time.monotonic() + self.ttl - self.leeway
+            return self._token
+        finally:
+            self._lock.release()
+
+    async def get_async(self, deadline: Optional[Deadline] = None) -> str:
+        """This method returns the cached access token, retrieving a new one through the asynchronous transport
+        if it is missing or about to expire. Concurrent callers share a single retrieval.
+        :param deadline: the deadline the token must be retrieved by.
+        :type deadline: Deadline
+        :return: the access token.
+        :rtype: str
+        """
+        if self.async_transport is None:
+            raise ValueError(
+                "An async transport is required to retrieve tokens asynchronously."
+            )
+        lock = self._async_lock
+        if lock is None:
+            # pylint: disable=import-outside-toplevel
+            import asyncio
+
+            lock = self._async_lock = asyncio.Lock()
+        async with lock:
+            if self._token is None or time.monotonic() >= self._expires_at:
+                self._token = await daraja_access_token_async(
+                    self.consumer_key,
+                    self.consumer_secret,
+                    self.async_transport,
+                    deadline=deadline,
+                )
+                self._expires_at = time.monotonic() + self.ttl - self.leeway
+            return self._token
+
+    def invalidate(self):
+        """This method discards the cached access token."""
+        with self._lock:
+            self._token = None
+
+
 def stk_push_password(passkey: str, shortcode: str):
     """This method generates the password for the STK push request.
     :param passkey: the passkey.
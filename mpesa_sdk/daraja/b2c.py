@@ -5,13 +5,21 @@ import logging
 import os
 from typing import Union
 
-# external imports
-from mpesa_sdk.daraja.enums import CommandID
+# local imports
+from mpesa_sdk.daraja.amounts import Amount, format_amount
+from mpesa_sdk.daraja.enums import CommandID, RequestPriority
 from mpesa_sdk.daraja.interfaces import (
     BaseCallbackParser,
     BaseRequestBuilder,
     BaseResponseParser,
 )
+from mpesa_sdk.daraja.validation import (
+    AMOUNT_PATTERN,
+    MSISDN_PATTERN,
+    SHORTCODE_PATTERN,
+    URL_PATTERN,
+    Field,
+)
 
 logg = logging.getLogger()
 
@@ -20,10 +28,31 @@ class B2CPaymentRequest(BaseRequestBuilder):
     """This class implements the B2C payment request builder interface."""
 
     URL_ENV = "B2C_URL"
+    PRIORITY = RequestPriority.BULK
+    MSISDN_FIELDS = ("PartyB",)
+    PAYLOAD_FIELDS = (
+        Field("InitiatorName", max_length=100),
+        Field("SecurityCredential"),
+        Field(
+            "CommandID",
+            choices=(
+                CommandID.BUSINESS_PAYMENT.value,
+                CommandID.PROMOTION_PAYMENT.value,
+                CommandID.SALARY_PAYMENT.value,
+            ),
+        ),
+        Field("Amount", pattern=AMOUNT_PATTERN),
+        Field("PartyA", pattern=SHORTCODE_PATTERN),
+        Field("PartyB", pattern=MSISDN_PATTERN),
+        Field("QueueTimeOutURL", pattern=URL_PATTERN),
+        Field("ResultURL", pattern=URL_PATTERN),
+        Field("Remarks", max_length=100),
+        Field("Occasion", min_length=0, max_length=100),
+    )
 
     def build(
         self,
-        amount: str,
+        amount: Amount,
         command_id: CommandID,
         initiator: str,
         occasion: str,
@@ -32,8 +61,8 @@ class B2CPaymentRequest(BaseRequestBuilder):
         remarks: str,
     ) -> dict[str, Union[str, int]]:
         """This method builds the B2C payment request.
-        :param amount: the amount.
-        :type amount: str
+        :param amount: the amount in whole shillings.
+        :type amount: Amount
         :param command_id: the command id.
         :type command_id: CommandID
         :param initiator: the initiator.
@@ -48,14 +77,13 @@ class B2CPaymentRequest(BaseRequestBuilder):
         :type remarks: str
         :return: the B2C payment request.
         :rtype: dict
+        :raises InvalidAmountError: if the amount is not valid for the command.
         """
         return {
             "InitiatorName": initiator,
-            "SecurityCredential": os.getenv(
-                "SECURITY_CREDENTIAL", "your-security-credential"
-            ),
+            "SecurityCredential": self.security_credential(initiator),
             "CommandID": command_id.value,
-            "Amount": amount,
+            "Amount": format_amount(amount, command_id),
             "PartyA": party_a,
             "PartyB": party_b,
             "Remarks": remarks,
@@ -0,0 +1,627 @@
+"""This module implements streaming loaders for bulk B2C payout files."""
+
+# standard imports
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import zlib
+from dataclasses import dataclass, field
+from typing import IO, Any, Iterable, Iterator, Optional, Union
+
+# local imports
+from mpesa_sdk.daraja.amounts import try_parse_amount
+from mpesa_sdk.daraja.auth import AccessTokenCache
+from mpesa_sdk.daraja.b2c import B2CPaymentRequest
+from mpesa_sdk.daraja.enums import CommandID, RequestPriority
+from mpesa_sdk.daraja.files import open_payout_file
+from mpesa_sdk.daraja.msisdn import is_safaricom, normalize_msisdn
+from mpesa_sdk.daraja.sinks import JsonlResultSink, PayoutResult, ResultSink
+from mpesa_sdk.deadline import resolve_deadline
+from mpesa_sdk.exceptions import PayloadValidationError
+from mpesa_sdk.ratelimit import RateLimiter
+from mpesa_sdk.retry import RetryPolicy
+from mpesa_sdk.transport import RequestsTransport
+
+logg = logging.getLogger()
+
+B2C_COMMAND_IDS = {
+    key: command_id
+    for command_id in (
+        CommandID.BUSINESS_PAYMENT,
+        CommandID.PROMOTION_PAYMENT,
+        CommandID.SALARY_PAYMENT,
+    )
+    for key in (command_id.value, command_id.name)
+}
+
+CSV_FORMAT = "csv"
+JSONL_FORMAT = "jsonl"
+
+# the number of invalid rows a run report keeps as a sample, the others are only counted.
+REJECTED_SAMPLE_SIZE = 100
+
+
+@dataclass
+class PayoutRow:
+    """This class holds the outcome of loading a single row from a payout file."""
+
+    line_number: int
+    row: dict
+    payload: Optional[dict] = None
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def valid(self) -> bool:
+        """This property indicates whether the row produced a payload.
+        :return: whether the row is valid.
+        :rtype: bool
+        """
+        return not self.errors
+
+
+def detect_format(path: str) -> str:
+    """This function infers the payout file format from its extension.
+    :param path: the path to the payout file.
+    :type path: str
+    :return: the file format, either csv or jsonl.
+    :rtype: str
+    """
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith(".csv"):
+        return CSV_FORMAT
+    if name.endswith((".jsonl", ".ndjson")):
+        return JSONL_FORMAT
+    raise ValueError(f"Cannot infer payout file format from: {path}.")
+
+
+class B2CPayoutLoader:
+    """This class streams rows from a CSV or JSONL payout file into B2C payment request payloads.
+
+    Rows are read lazily, so memory use does not depend on the size of the file. Each row must provide the
+    amount, command_id and party_b fields and may provide remarks and occasion which otherwise fall back to
+    the loader's defaults. When a checkpoint path is configured, the last consumed line is persisted so that a
+    new loader resumes after it.
+    """
+
+    def __init__(
+        self,
+        request: B2CPaymentRequest,
+        path: str,
+        initiator: str,
+        file_format: Optional[str] = None,
+        checkpoint_path: Optional[str] = None,
+        checkpoint_interval: int = 100,
+        occasion: str = "",
+        remarks: str = "Bulk payment",
+    ):
+        """This method initializes the payout loader.
+        :param request: the B2C payment request builder used to build payloads.
+        :type request: B2CPaymentRequest
+        :param path: the path to the payout file.
+        :type path: str
+        :param initiator: the initiator.
+        :type initiator: str
+        :param file_format: the file format, inferred from the path when omitted.
+        :type file_format: str
+        :param checkpoint_path: the path to the checkpoint file.
+        :type checkpoint_path: str
+        :param checkpoint_interval: the number of rows consumed between checkpoint writes.
+        :type checkpoint_interval: int
+        :param occasion: the default occasion.
+        :type occasion: str
+        :param remarks: the default remarks.
+        :type remarks: str
+        """
+        self.request = request
+        self.path = path
+        self.initiator = initiator
+        self.file_format = file_format or detect_format(path)
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        self.occasion = occasion
+        self.remarks = remarks
+
+    def read_checkpoint(self) -> int:
+        """This method reads the last consumed line number from the checkpoint file.
+        :return: the last consumed line number, 0 if there is no checkpoint.
+        :rtype: int
+        """
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return 0
+        with open(self.checkpoint_path, "r", encoding="utf-8") as file:
+            return int(file.read().strip() or 0)
+
+    def write_checkpoint(self, line_number: int):
+        """This method atomically persists the last consumed line number.
+        :param line_number: the last consumed line number.
+        :type line_number: int
+        """
+        if not self.checkpoint_path:
+            return
+        temporary_path = f"{self.checkpoint_path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            file.write(str(line_number))
+        os.replace(temporary_path, self.checkpoint_path)
+
+    def rows(self, stream: IO[str]) -> Iterator[tuple[int, Union[dict, str]]]:
+        """This method yields the raw rows in the stream along with their line numbers.
+        :param stream: the text stream.
+        :type stream: IO[str]
+        :return: an iterator of line numbers and rows.
+        :rtype: Iterator[tuple[int, dict]]
+        """
+        if self.file_format == CSV_FORMAT:
+            reader = csv.DictReader(stream)
+            for record in reader:
+                yield reader.line_num, record
+        elif self.file_format == JSONL_FORMAT:
+            for line_number, line in enumerate(stream, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    row = line
+                yield line_number, row
+        else:
+            raise ValueError(f"Unsupported payout file format: {self.file_format}.")
+
+    def load_row(self, line_number: int, row: Union[dict, str]) -> PayoutRow:
+        """This method validates a raw row and builds its payload.
+        :param line_number: the line number of the row.
+        :type line_number: int
+        :param row: the raw row.
+        :type row: dict
+        :return: the loaded row.
+        :rtype: PayoutRow
+        """
+        if not isinstance(row, dict):
+            return PayoutRow(line_number, {"raw": row}, errors=["Malformed row."])
+
+        errors = []
+        command_id = B2C_COMMAND_IDS.get(str(row.get("command_id") or "").strip())
+        if command_id is None:
+            errors.append(f"Invalid command id: {row.get('command_id')!r}.")
+
+        amount = try_parse_amount(row.get("amount") or "", command_id)
+        if amount is None:
+            errors.append(f"Invalid amount: {row.get('amount')!r}.")
+
+        party_b = normalize_msisdn(row.get("party_b") or "")
+        if party_b is None or not is_safaricom(party_b):
+            errors.append(f"Invalid phone number: {row.get('party_b')!r}.")
+
+        if errors or amount is None or command_id is None or party_b is None:
+            return PayoutRow(line_number, row, errors=errors)
+
+        payload = self.request.build(
+            amount,
+            command_id,
+            self.initiator,
+            row.get("occasion") or self.occasion,
+            self.request.shortcode,
+            party_b,
+            row.get("remarks") or self.remarks,
+        )
+        try:
+            payload = self.request.prepare(payload)
+        except PayloadValidationError as error:
+            return PayoutRow(line_number, row, errors=error.errors)
+        return PayoutRow(line_number, row, payload=payload)
+
+    def __iter__(self) -> Iterator[PayoutRow]:
+        """This method streams loaded rows, skipping rows consumed by a previous run.
+        :return: an iterator of loaded rows.
+        :rtype: Iterator[PayoutRow]
+        """
+        checkpoint = self.read_checkpoint()
+        if checkpoint:
+            logg.info("Resuming payout file: %s after line: %s.", self.path, checkpoint)
+
+        consumed = checkpoint
+        pending = 0
+        try:
+            with open_payout_file(self.path) as stream:
+                for line_number, row in self.rows(stream):
+                    if line_number <= checkpoint:
+                        continue
+                    yield self.load_row(line_number, row)
+                    consumed = line_number
+                    pending += 1
+                    if pending >= self.checkpoint_interval:
+                        self.write_checkpoint(consumed)
+                        pending = 0
+        finally:
+            if pending:
+                self.write_checkpoint(consumed)
+
+
+@dataclass
+class PayoutRunReport:
+    """This class aggregates the outcome of a sharded payout run.
+
+    The results themselves are only kept when the run has no result sink, or is asked to keep them; the counts
+    cover every result either way. Invalid rows are counted, and the first REJECTED_SAMPLE_SIZE of them kept. Valid
+    rows that were never sent, because their worker died or the run was cancelled with them queued, are listed by
+    line number in unsent; they remain pending for a resumed run.
+    """
+
+    results: list[PayoutResult] = field(default_factory=list)
+    rejected_rows: list[PayoutRow] = field(default_factory=list)
+    rejected: int = 0
+    unsent: list[int] = field(default_factory=list)
+    skipped: int = 0
+    cancelled: bool = False
+    sent: int = 0
+    accepted: int = 0
+
+    def add(self, result: PayoutResult, keep: bool = True):
+        """This method counts the result of a payout.
+        :param result: the result.
+        :type result: PayoutResult
+        :param keep: whether the result is kept in results.
+        :type keep: bool
+        """
+        self.sent += 1
+        self.accepted += result.success
+        if keep:
+            self.results.append(result)
+
+    def reject(self, row: PayoutRow):
+        """This method counts an invalid row, keeping it if the sample of rejected rows is not full.
+        :param row: the row.
+        :type row: PayoutRow
+        """
+        self.rejected += 1
+        if len(self.rejected_rows) < REJECTED_SAMPLE_SIZE:
+            self.rejected_rows.append(row)
+
+    @property
+    def succeeded(self) -> int:
+        """This property counts the payouts accepted by Daraja.
+        :return: the number of accepted payouts.
+        :rtype: int
+        """
+        return self.accepted
+
+    @property
+    def failed(self) -> int:
+        """This property counts the payouts that were sent but not accepted.
+        :return: the number of failed payouts.
+        :rtype: int
+        """
+        return self.sent - self.accepted
+
+
+@dataclass
+class _ShardConfig:
+    """This class holds the picklable configuration a shard worker builds its request builder from."""
+
+    consumer_key: str
+    consumer_secret: str
+    shortcode: str
+    rate_limiter: Optional[RateLimiter]
+    shortcode_rate_limiters: dict[str, RateLimiter]
+    retry: Optional[RetryPolicy] = None
+    validate_msisdns: bool = False
+    validate_payloads: Optional[bool] = None
+    priority: Optional[RequestPriority] = None
+    tenant: Optional[str] = None
+    timeout: Optional[float] = None
+
+    def request(self, transport: RequestsTransport) -> B2CPaymentRequest:
+        """This method builds a shard's request builder, with its own transport and access token cache.
+        :param transport: the shard's transport.
+        :type transport: RequestsTransport
+        :return: the request builder.
+        :rtype: B2CPaymentRequest
+        """
+        return B2CPaymentRequest(
+            self.consumer_key,
+            self.consumer_secret,
+            self.shortcode,
+            transport=transport,
+            token_cache=AccessTokenCache(
+                self.consumer_key, self.consumer_secret, transport=transport
+            ),
+            validate_msisdns=self.validate_msisdns,
+            validate_payloads=self.validate_payloads,
+            retry=self.retry,
+            priority=self.priority,
+            tenant=self.tenant,
+        )
+
+
+def _send_payout(
+    request: B2CPaymentRequest,
+    config: _ShardConfig,
+    shard: int,
+    line_number: int,
+    payload: dict,
+) -> PayoutResult:
+    """This function sends a single payout while honouring the global and per-shortcode rate limits.
+    :param request: the shard's request builder.
+    :type request: B2CPaymentRequest
+    :param config: the shard configuration.
+    :type config: _ShardConfig
+    :param shard: the shard index.
+    :type shard: int
+    :param line_number: the payout file line the payload was built from.
+    :type line_number: int
+    :param payload: the payload.
+    :type payload: dict
+    :return: the payout result.
+    :rtype: PayoutResult
+    """
+    if config.rate_limiter is not None:
+        config.rate_limiter.acquire()
+    shortcode_rate_limiter = config.shortcode_rate_limiters.get(
+        str(payload.get("PartyA"))
+    )
+    if shortcode_rate_limiter is not None:
+        shortcode_rate_limiter.acquire()
+
+    try:
+        response = request.send(payload, resolve_deadline(config.timeout))
+    except Exception as error:  # pylint: disable=broad-except
+        logg.error("Payout on line: %s failed with: %s.", line_number, error)
+        return PayoutResult(line_number, shard, error=str(error))
+
+    try:
+        body = response.json()
+    except ValueError:
+        body = None
+    return PayoutResult(
+        line_number, shard, status_code=response.status_code, response=body
+    )
+
+
+def _run_shard(
+    shard: int,
+    config: _ShardConfig,
+    tasks: multiprocessing.Queue,
+    results: multiprocessing.Queue,
+    cancelled,
+):
+    """This function is the entry point of a shard worker process.
+
+    Each worker owns its HTTP connection pool and access token cache and sends the payouts routed to it until it
+    receives a sentinel. Tasks still queued after cancellation are dropped so they remain pending for a resumed run.
+    :param shard: the shard index.
+    :type shard: int
+    :param config: the shard configuration.
+    :type config: _ShardConfig
+    :param tasks: the queue of (line number, payload) tasks routed to this shard.
+    :type tasks: multiprocessing.Queue
+    :param results: the queue results are reported on.
+    :type results: multiprocessing.Queue
+    :param cancelled: the event set when the run is cancelled.
+    :type cancelled: multiprocessing.Event
+    """
+    transport = RequestsTransport()
+    request = config.request(transport)
+    try:
+        while (task := tasks.get()) is not None:
+            if not cancelled.is_set():
+                results.put(_send_payout(request, config, shard, *task))
+    finally:
+        transport.close()
+        results.put(shard)
+
+
+class ShardedPayoutExecutor:
+    """This class sends a stream of payouts through a pool of worker processes.
+
+    Payouts are partitioned by recipient so that all payouts to one recipient are sent in order by the same worker.
+    Every worker shares the configured global and per-shortcode rate limiters, so quotas hold across processes.
+    Completed payouts are streamed to an optional result sink, e.g. a JSONL journal, and skipped when a run is
+    resumed, unless Daraja definitely rejected them without processing them; since rows are consumed before their
+    payouts complete, the sink rather than a loader checkpoint should drive resumption. The sink is closed when a
+    run ends.
+    """
+
+    def __init__(
+        self,
+        request: B2CPaymentRequest,
+        workers: Optional[int] = None,
+        rate_limit: Optional[float] = None,
+        shortcode_rate_limits: Optional[dict[str, float]] = None,
+        journal_path: Optional[str] = None,
+        queue_size: int = 100,
+        context: Optional[multiprocessing.context.BaseContext] = None,
+        sink: Optional[ResultSink] = None,
+        keep_results: Optional[bool] = None,
+        timeout: Optional[float] = None,
+    ):
+        """This method initializes the sharded payout executor.
+
+        Each worker builds its own request builder from the given one's credentials, retry policy, validation
+        settings, priority and tenant. Its transport, token and credential caches, scheduler and single-flight group
+        hold connections, locks or threads that cannot be pickled, so they do not cross the process boundary: every
+        worker opens its own pooled transport and token cache, and uses the shared credential cache of its process.
+        :param request: the B2C payment request builder whose settings the workers use.
+        :type request: B2CPaymentRequest
+        :param workers: the number of worker processes, defaults to the number of CPUs.
+        :type workers: int
+        :param rate_limit: the maximum number of requests per second across all workers.
+        :type rate_limit: float
+        :param shortcode_rate_limits: the maximum number of requests per second per initiating shortcode.
+        :type shortcode_rate_limits: dict
+        :param journal_path: the path to the JSONL journal of completed payouts, written a result at a time.
+        :type journal_path: str
+        :param queue_size: the maximum number of payouts queued per worker.
+        :type queue_size: int
+        :param context: the multiprocessing context used to start workers.
+        :type context: multiprocessing.context.BaseContext
+        :param sink: the sink completed payouts are streamed to, in place of a journal.
+        :type sink: ResultSink
+        :param keep_results: whether the report of a run holds its results, by default unless a sink is given.
+        :type keep_results: bool
+        :param timeout: the budget in seconds for each payout, including its token fetch and retries.
+        :type timeout: float
+        """
+        if sink is not None and journal_path:
+            raise ValueError("A payout run takes either a journal path or a sink.")
+        # typeshed declares Process on each concrete context, not on BaseContext.
+        self.context: Any = context or multiprocessing.get_context()
+        self.workers = workers or os.cpu_count() or 1
+        self.journal_path = journal_path
+        self.keep_results = sink is None if keep_results is None else keep_results
+        if journal_path:
+            # a result at a time, so a crash cannot make a resumed run repeat a completed payout.
+            sink = JsonlResultSink(journal_path, batch_size=1)
+        self.sink = sink
+        self.queue_size = queue_size
+        self.config = _ShardConfig(
+            request.consumer_key,
+            request.consumer_secret,
+            request.shortcode,
+            RateLimiter(rate_limit, context=self.context) if rate_limit else None,
+            {
+                shortcode: RateLimiter(limit, context=self.context)
+                for shortcode, limit in (shortcode_rate_limits or {}).items()
+            },
+            retry=request.retry,
+            validate_msisdns=request.validate_msisdns,
+            validate_payloads=request.validate_payloads,
+            priority=request.priority,
+            tenant=request.tenant,
+            timeout=timeout,
+        )
+        self._cancelled = self.context.Event()
+
+    def cancel(self):
+        """This method gracefully cancels a run: in-flight payouts complete, queued ones are left pending."""
+        self._cancelled.set()
+
+    def completed(self) -> set[int]:
+        """This method reads the line numbers of the payouts recorded in the result sink that a resumed run skips.
+        :return: the completed line numbers.
+        :rtype: set
+        """
+        if self.sink is None:
+            return set()
+        return self.sink.completed()
+
+    def shard_for(self, payload: dict) -> int:
+        """This method selects the worker a payload is routed to.
+        :param payload: the payload.
+        :type payload: dict
+        :return: the shard index.
+        :rtype: int
+        """
+        return zlib.crc32(str(payload.get("PartyB")).encode()) % self.workers
+
+    def run(self, rows: Iterable[PayoutRow]) -> PayoutRunReport:
+        """This method sends the valid payouts in a stream of loaded rows and waits for them to complete.
+
+        A KeyboardInterrupt cancels the run gracefully, recording the in-flight payouts, and is then re-raised.
+        :param rows: the loaded rows, e.g. a B2CPayoutLoader.
+        :type rows: Iterable[PayoutRow]
+        :return: the run report.
+        :rtype: PayoutRunReport
+        """
+        self._cancelled.clear()
+        report = PayoutRunReport()
+        completed = self.completed()
+        tasks = [self.context.Queue(self.queue_size) for _ in range(self.workers)]
+        results = self.context.Queue()
+        processes = [
+            self.context.Process(
+                target=_run_shard,
+                args=(shard, self.config, tasks[shard], results, self._cancelled),
+                daemon=True,
+            )
+            for shard in range(self.workers)
+        ]
+        for process in processes:
+            process.start()
+
+        running = set(range(self.workers))
+        # the line numbers dispatched to each shard whose result has not been collected.
+        in_flight: list[set[int]] = [set() for _ in range(self.workers)]
+        sink = self.sink
+
+        def finish(shard: int):
+            running.discard(shard)
+            report.unsent.extend(in_flight[shard])
+            in_flight[shard].clear()
+
+        def collect(timeout: float):
+            try:
+                item = results.get(timeout=timeout)
+            except queue.Empty:
+                for shard in list(running):
+                    if not processes[shard].is_alive():
+                        logg.error(
+                            "Payout shard: %s exited unexpectedly, losing %s queued payouts.",
+                            shard,
+                            len(in_flight[shard]),
+                        )
+                        finish(shard)
+                return
+            if isinstance(item, int):
+                finish(item)
+                return
+            in_flight[item.shard].discard(item.line_number)
+            report.add(item, self.keep_results)
+            if sink is not None:
+                sink.write(item)
+
+        def dispatch(shard: int, task: Optional[tuple[int, dict]]):
+            while shard in running:
+                try:
+                    tasks[shard].put(task, timeout=0.05)
+                    if task is not None:
+                        in_flight[shard].add(task[0])
+                    return
+                except queue.Full:
+                    collect(timeout=0)
+            if task is not None:
+                report.unsent.append(task[0])
+
+        try:
+            for row in rows:
+                if self._cancelled.is_set():
+                    break
+                if not row.valid or row.payload is None:
+                    report.reject(row)
+                elif row.line_number in completed:
+                    report.skipped += 1
+                else:
+                    dispatch(
+                        self.shard_for(row.payload), (row.line_number, row.payload)
+                    )
+        except KeyboardInterrupt:
+            self.cancel()
+            raise
+        finally:
+            for shard in range(self.workers):
+                dispatch(shard, None)
+            while running:
+                collect(timeout=0.1)
+            for process in processes:
+                process.join()
+            if sink is not None:
+                sink.close()
+
+        report.cancelled = self._cancelled.is_set()
+        report.unsent.sort()
+        logg.info(
+            "Payout run finished: %s succeeded, %s failed, %s rejected, %s skipped, %s unsent.",
+            report.succeeded,
+            report.failed,
+            report.rejected,
+            report.skipped,
+            len(report.unsent),
+        )
+        if report.unsent and not report.cancelled:
+            logg.error(
+                "Payout run left %s payouts unsent, on lines: %s.",
+                len(report.unsent),
+                report.unsent,
+            )
+        return report
@@ -1,20 +1,309 @@
-"""This module contains the C2B class that is used to make C2B requests to the Daraja API."""
+"""This module contains classes for registering C2B URLs and for validating and parsing C2B payments."""
 
 # standard imports
 import json
 import logging
-from typing import Dict, Union
+import os
+from dataclasses import asdict, dataclass
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Container, Iterable, Optional, Union
 
+# local imports
+from .enums import C2BRejectionCode, ResponseType
+from .interfaces import (
+    BaseRequestBuilder,
+    BaseResponseParser,
+    CallbackParserInterface,
+)
+from .responses import ResponseShape
+from .validation import SHORTCODE_PATTERN, URL_PATTERN, Field
 
-class C2BCallbackParser:
-    """This class is used to parse the callback request sent by Safaricom to the callback url."""
+logg = logging.getLogger()
 
-    def __init__(self, request: Dict[str, Union[str, int]]):
+C2BRule = Callable[["C2BTransaction"], Optional[C2BRejectionCode]]
+
+_ACCEPTED = {"ResultCode": "0", "ResultDesc": "Accepted"}
+_VALIDATION_RESPONSES: dict[Optional[C2BRejectionCode], bytes] = {
+    None: json.dumps(_ACCEPTED).encode(),
+    **{
+        code: json.dumps({"ResultCode": code.value, "ResultDesc": "Rejected"}).encode()
+        for code in C2BRejectionCode
+    },
+}
+_VALIDATION_HEADERS = {
+    code: [("Content-Type", "application/json"), ("Content-Length", str(len(body)))]
+    for code, body in _VALIDATION_RESPONSES.items()
+}
+
+
+class C2BRegisterUrlRequest(BaseRequestBuilder):
+    """This class implements the C2B register URL request builder interface."""
+
+    URL_ENV = "C2B_REGISTER_URL"
+    PAYLOAD_FIELDS = (
+        Field("ShortCode", pattern=SHORTCODE_PATTERN),
+        Field("ResponseType", choices=ResponseType),
+        Field("ConfirmationURL", pattern=URL_PATTERN),
+        Field("ValidationURL", pattern=URL_PATTERN),
+    )
+
+    def build(
+        self, response_type: ResponseType = ResponseType.COMPLETED
+    ) -> dict[str, str]:
+        """This method builds the C2B register URL request.
+        :param response_type: the action taken on payments when the validation URL is unreachable.
+        :type response_type: ResponseType
+        :return: the C2B register URL request.
+        :rtype: dict
+        """
+        return {
+            "ShortCode": self.shortcode,
+            "ResponseType": response_type.value,
+            "ConfirmationURL": os.getenv(
+                "C2B_CONFIRMATION_URL", "https://mydomain.ext/c2b-confirmation-url"
+            ),
+            "ValidationURL": os.getenv(
+                "C2B_VALIDATION_URL", "https://mydomain.ext/c2b-validation-url"
+            ),
+        }
+
+
+class C2BRegisterUrlResponseParser(BaseResponseParser):
+    """This class implements the C2B register URL response parser interface."""
+
+    # the register URL response spells the conversation id key as OriginatorCoversationID.
+    SHAPE = ResponseShape(
+        request_id=("OriginatorCoversationID", "OriginatorConversationID")
+    )
+
+    def get_error_log_message(self):
+        return f"C2B URL registration: {self.request_id}, failed with description: {self.description}."
+
+    def get_success_log_message(self):
+        return f"C2B URLs registered: {self.request_id}, with description: {self.description}."
+
+
+@dataclass(frozen=True, slots=True)
+class C2BTransaction:
+    """This class holds the fields of a C2B payment sent to the validation and confirmation URLs."""
+
+    transaction_type: str
+    transaction_id: str
+    transaction_time: str
+    amount: Decimal
+    business_short_code: str
+    bill_reference_number: str
+    invoice_number: str
+    org_account_balance: str
+    third_party_transaction_id: str
+    msisdn: str
+    first_name: str
+    middle_name: str
+    last_name: str
+
+    @classmethod
+    def from_request(cls, request: dict[str, Any]) -> "C2BTransaction":
+        """This method creates a C2B transaction from the request sent by Safaricom.
+        :param request: the request.
+        :type request: dict
+        :return: the C2B transaction.
+        :rtype: C2BTransaction
+        """
+        try:
+            amount = Decimal(str(request.get("TransAmount", "")))
+        except InvalidOperation:
+            amount = Decimal("NaN")
+        return cls(
+            transaction_type=str(request.get("TransactionType", "")),
+            transaction_id=str(request.get("TransID", "")),
+            transaction_time=str(request.get("TransTime", "")),
+            amount=amount,
+            business_short_code=str(request.get("BusinessShortCode", "")),
+            bill_reference_number=str(request.get("BillRefNumber", "")),
+            invoice_number=str(request.get("InvoiceNumber", "")),
+            org_account_balance=str(request.get("OrgAccountBalance", "")),
+            third_party_transaction_id=str(request.get("ThirdPartyTransID", "")),
+            msisdn=str(request.get("MSISDN", "")),
+            first_name=str(request.get("FirstName", "")),
+            middle_name=str(request.get("MiddleName", "")),
+            last_name=str(request.get("LastName", "")),
+        )
+
+
+class C2BCallbackParser(CallbackParserInterface):
+    """This class is used to parse the C2B requests sent by Safaricom to the validation and confirmation URLs."""
+
+    def __init__(self, request: dict[str, Union[str, int]]):
+        """This method initializes the C2B callback parser.
+        :param request: the request.
+        :type request: dict
+        """
         self.request = request
+        self.transaction = C2BTransaction.from_request(request)
+        self.transaction_id = self.transaction.transaction_id
 
-    def parse(self):
-        """This method parses the callback request.
-        :return: parsed callback request.
+    def parse(self) -> dict[str, Any]:
+        """This method parses the C2B request.
+        :return: the parsed C2B request.
         :rtype: dict
         """
-        logging.info("Callback request: %s", json.dumps(self.request))
+        logg.info(self.get_log_message())
+        return asdict(self.transaction)
+
+    def get_log_message(self) -> str:
+        """Get log message."""
+        return f"C2B payment: {self.transaction_id} received."
+
+
+class C2BValidationParser(C2BCallbackParser):
+    """This class parses the C2B requests sent by Safaricom to the validation URL."""
+
+    def get_log_message(self) -> str:
+        return f"C2B payment: {self.transaction_id} received for validation."
+
+
+class C2BConfirmationParser(C2BCallbackParser):
+    """This class parses the C2B requests sent by Safaricom to the confirmation URL."""
+
+    def get_log_message(self) -> str:
+        return f"C2B payment: {self.transaction_id} confirmed."
+
+
+def validation_response(rejection: Optional[C2BRejectionCode] = None) -> bytes:
+    """This function returns the body answering a C2B validation request.
+    :param rejection: the reason the payment is rejected, the payment is accepted when omitted.
+    :type rejection: C2BRejectionCode
+    :return: the precomputed JSON response body.
+    :rtype: bytes
+    """
+    return _VALIDATION_RESPONSES[rejection]
+
+
+def account_rule(references: Container[str]) -> C2BRule:
+    """This function creates a rule rejecting payments whose bill reference number is not a known account.
+    :param references: the known account references, e.g. a set or a ReferenceIndex.
+    :type references: Container
+    :return: the rule.
+    :rtype: Callable
+    """
+
+    def rule(transaction: C2BTransaction) -> Optional[C2BRejectionCode]:
+        if transaction.bill_reference_number in references:
+            return None
+        return C2BRejectionCode.INVALID_ACCOUNT_NUMBER
+
+    return rule
+
+
+def amount_rule(
+    minimum: Union[int, Decimal] = 1, maximum: Optional[Union[int, Decimal]] = None
+) -> C2BRule:
+    """This function creates a rule rejecting payments outside an amount range.
+    :param minimum: the smallest accepted amount.
+    :type minimum: int
+    :param maximum: the largest accepted amount, unbounded when omitted.
+    :type maximum: int
+    :return: the rule.
+    :rtype: Callable
+    """
+
+    def rule(transaction: C2BTransaction) -> Optional[C2BRejectionCode]:
+        amount = transaction.amount
+        if amount.is_nan() or amount < minimum:
+            return C2BRejectionCode.INVALID_AMOUNT
+        if maximum is not None and amount > maximum:
+            return C2BRejectionCode.INVALID_AMOUNT
+        return None
+
+    return rule
+
+
+def shortcode_rule(shortcodes: Iterable[str]) -> C2BRule:
+    """This function creates a rule rejecting payments made to other shortcodes.
+    :param shortcodes: the accepted shortcodes.
+    :type shortcodes: Iterable
+    :return: the rule.
+    :rtype: Callable
+    """
+    accepted = frozenset(shortcodes)
+
+    def rule(transaction: C2BTransaction) -> Optional[C2BRejectionCode]:
+        if transaction.business_short_code in accepted:
+            return None
+        return C2BRejectionCode.INVALID_SHORTCODE
+
+    return rule
+
+
+class C2BValidator:
+    """This class answers C2B validation requests by running a chain of synchronous rules.
+
+    Safaricom waits only a few seconds for the validation response, so rules are expected to answer from memory,
+    e.g. from a precomputed account reference index, rather than from a database. Rules run in order and the first
+    rejection wins; a rule that raises rejects the payment. Response bodies are precomputed for every outcome.
+    """
+
+    def __init__(self, rules: Iterable[C2BRule] = ()):
+        """This method initializes the C2B validator.
+        :param rules: the rules each payment is checked against.
+        :type rules: Iterable
+        """
+        self.rules = list(rules)
+
+    def add_rule(self, rule: C2BRule):
+        """This method appends a rule to the chain.
+        :param rule: the rule.
+        :type rule: Callable
+        """
+        self.rules.append(rule)
+
+    def validate(self, request: dict[str, Any]) -> Optional[C2BRejectionCode]:
+        """This method checks a C2B validation request against the rules.
+        :param request: the request sent by Safaricom to the validation URL.
+        :type request: dict
+        :return: the reason the payment is rejected, None if it is accepted.
+        :rtype: C2BRejectionCode
+        """
+        transaction = C2BTransaction.from_request(request)
+        for rule in self.rules:
+            try:
+                rejection = rule(transaction)
+            except Exception:  # pylint: disable=broad-except
+                logg.exception(
+                    "C2B validation rule failed for payment: %s.",
+                    transaction.transaction_id,
+                )
+                return C2BRejectionCode.OTHER_ERROR
+            if rejection is not None:
+                return rejection
+        return None
+
+    def respond(self, body: bytes) -> tuple[Optional[C2BRejectionCode], bytes]:
+        """This method validates a raw C2B validation request body.
+        :param body: the raw request body.
+        :type body: bytes
+        :return: the reason the payment is rejected, if any, and the response body.
+        :rtype: tuple
+        """
+        try:
+            request = json.loads(body)
+        except ValueError:
+            logg.error("Received malformed C2B validation request.")
+            rejection: Optional[C2BRejectionCode] = C2BRejectionCode.OTHER_ERROR
+        else:
+            rejection = self.validate(request)
+        return rejection, _VALIDATION_RESPONSES[rejection]
+
+    def wsgi(self, environ: dict, start_response: Callable) -> list[bytes]:
+        """This method is a WSGI application answering C2B validation requests.
+        :param environ: the WSGI environment.
+        :type environ: dict
+        :param start_response: the WSGI start_response callable.
+        :type start_response: Callable
+        :return: the response body.
+        :rtype: list
+        """
+        length = int(environ.get("CONTENT_LENGTH") or 0)
+        rejection, body = self.respond(environ["wsgi.input"].read(length))
+        start_response("200 OK", _VALIDATION_HEADERS[rejection])
+        return [body]
@@ -0,0 +1,172 @@
+"""This module generates the SecurityCredential sent with B2C, reversal and transaction status requests.
+
+The credential is the initiator password encrypted with the public key in Safaricom's certificate. Loading the
+certificate and the RSA encryption are far more expensive than building a request, so both the public key and the
+encrypted credential are cached until they are explicitly invalidated, e.g. when the certificate is rotated.
+"""
+
+# standard imports
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import threading
+from typing import Any, Optional
+
+logg = logging.getLogger()
+
+DEFAULT_SECURITY_CREDENTIAL = "your-security-credential"
+
+
+def _import_cryptography():
+    """This function imports the optional cryptography dependency.
+    :return: the x509 and padding modules.
+    :rtype: tuple
+    """
+    try:
+        # pylint: disable=import-outside-toplevel
+        from cryptography import x509
+        from cryptography.hazmat.primitives.asymmetric import padding
+    except ImportError as error:
+        raise ImportError(
+            "Generating security credentials requires the security extra: pip install python-mpesa-sdk[security]."
+        ) from error
+    return x509, padding
+
+
+def load_public_key(certificate_path: str) -> Any:
+    """This function loads the public key from a PEM or DER encoded certificate.
+    :param certificate_path: the path to the certificate.
+    :type certificate_path: str
+    :return: the public key.
+    :rtype: RSAPublicKey
+    """
+    x509, _ = _import_cryptography()
+    with open(certificate_path, "rb") as file:
+        data = file.read()
+    if data.lstrip().startswith(b"-----BEGIN"):
+        certificate = x509.load_pem_x509_certificate(data)
+    else:
+        certificate = x509.load_der_x509_certificate(data)
+    return certificate.public_key()
+
+
+def encrypt_credential(password: str, public_key: Any) -> str:
+    """This function encrypts an initiator password into a security credential.
+    :param password: the initiator password.
+    :type password: str
+    :param public_key: the public key from Safaricom's certificate.
+    :type public_key: RSAPublicKey
+    :return: the base64 encoded security credential.
+    :rtype: str
+    """
+    _, padding = _import_cryptography()
+    encrypted = public_key.encrypt(password.encode("utf-8"), padding.PKCS1v15())
+    return base64.b64encode(encrypted).decode("ascii")
+
+
+class SecurityCredentialCache:
+    """This class caches public keys per certificate and security credentials per initiator and certificate."""
+
+    def __init__(self):
+        """This method initializes the security credential cache."""
+        self._lock = threading.Lock()
+        self._public_keys: dict[str, Any] = {}
+        self._credentials: dict[tuple[str, str], tuple[bytes, str]] = {}
+
+    def public_key(self, certificate_path: str) -> Any:
+        """This method returns the public key of a certificate, loading it on first use.
+        :param certificate_path: the path to the certificate.
+        :type certificate_path: str
+        :return: the public key.
+        :rtype: RSAPublicKey
+        """
+        with self._lock:
+            public_key = self._public_keys.get(certificate_path)
+            if public_key is None:
+                public_key = load_public_key(certificate_path)
+                self._public_keys[certificate_path] = public_key
+            return public_key
+
+    def get(self, initiator: str, password: str, certificate_path: str) -> str:
+        """This method returns the security credential of an initiator, encrypting the password on first use.
+
+        A credential is also regenerated when the password differs from the one it was encrypted from.
+        :param initiator: the initiator name.
+        :type initiator: str
+        :param password: the initiator password.
+        :type password: str
+        :param certificate_path: the path to the certificate.
+        :type certificate_path: str
+        :return: the security credential.
+        :rtype: str
+        """
+        key = (initiator, certificate_path)
+        digest = hashlib.sha256(password.encode("utf-8")).digest()
+        cached = self._credentials.get(key)
+        if cached is not None and hmac.compare_digest(cached[0], digest):
+            return cached[1]
+
+        credential = encrypt_credential(password, self.public_key(certificate_path))
+        with self._lock:
+            self._credentials[key] = (digest, credential)
+        logg.debug("Generated security credential for initiator: %s.", initiator)
+        return credential
+
+    def invalidate(
+        self, initiator: Optional[str] = None, certificate_path: Optional[str] = None
+    ):
+        """This method discards cached credentials, all of them when no filter is given. Public keys are only
+        discarded when no initiator is given, i.e. when a certificate is rotated.
+        :param initiator: the initiator whose credentials are discarded.
+        :type initiator: str
+        :param certificate_path: the certificate whose credentials, and public key, are discarded.
+        :type certificate_path: str
+        """
+        with self._lock:
+            if initiator is None:
+                if certificate_path is None:
+                    self._public_keys.clear()
+                else:
+                    self._public_keys.pop(certificate_path, None)
+            self._credentials = {
+                key: value
+                for key, value in self._credentials.items()
+                if not (
+                    (initiator is None or key[0] == initiator)
+                    and (certificate_path is None or key[1] == certificate_path)
+                )
+            }
+
+
+default_credential_cache = SecurityCredentialCache()
+
+
+def security_credential(
+    initiator: str,
+    password: Optional[str] = None,
+    certificate_path: Optional[str] = None,
+    cache: Optional[SecurityCredentialCache] = None,
+) -> str:
+    """This function returns the security credential for an initiator.
+
+    The credential is generated from the INITIATOR_PASSWORD and DARAJA_CERTIFICATE_PATH environment variables when
+    they are set, and otherwise falls back to a pre-computed SECURITY_CREDENTIAL.
+    :param initiator: the initiator name.
+    :type initiator: str
+    :param password: the initiator password, read from INITIATOR_PASSWORD when omitted.
+    :type password: str
+    :param certificate_path: the path to the certificate, read from DARAJA_CERTIFICATE_PATH when omitted.
+    :type certificate_path: str
+    :param cache: the cache to retrieve the credential from, defaults to the shared cache.
+    :type cache: SecurityCredentialCache
+    :return: the security credential.
+    :rtype: str
+    """
+    password = password or os.getenv("INITIATOR_PASSWORD")
+    certificate_path = certificate_path or os.getenv("DARAJA_CERTIFICATE_PATH")
+    if password and certificate_path:
+        cache = cache or default_credential_cache
+        return cache.get(initiator, password, certificate_path)
+    return os.getenv("SECURITY_CREDENTIAL", DEFAULT_SECURITY_CREDENTIAL)
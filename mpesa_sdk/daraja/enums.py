@@ -27,3 +27,47 @@ class IdentifierType(enum.Enum):
     MSISDN = "1"
     TILL_NUMBER = "2"
     ORGANIZATION_SHORT_CODE = "4"
+
+
+class ResponseType(enum.Enum):
+    """This class contains enums for the action taken on C2B payments when the validation URL is unreachable."""
+
+    CANCELLED = "Cancelled"
+    COMPLETED = "Completed"
+
+
+class C2BRejectionCode(enum.Enum):
+    """This class contains enums for the result codes used to reject C2B payments during validation."""
+
+    INVALID_MSISDN = "C2B00011"
+    INVALID_ACCOUNT_NUMBER = "C2B00012"
+    INVALID_AMOUNT = "C2B00013"
+    INVALID_KYC_DETAILS = "C2B00014"
+    INVALID_SHORTCODE = "C2B00015"
+    OTHER_ERROR = "C2B00016"
+
+
+class ErrorCategory(enum.Enum):
+    """This class contains enums for the categories Daraja error and result codes are grouped into."""
+
+    AUTHENTICATION = "authentication"
+    CANCELLED = "cancelled"
+    DUPLICATE = "duplicate"
+    INSUFFICIENT_FUNDS = "insufficient_funds"
+    INVALID_CREDENTIALS = "invalid_credentials"
+    INVALID_REQUEST = "invalid_request"
+    IN_PROGRESS = "in_progress"
+    LIMIT_EXCEEDED = "limit_exceeded"
+    SERVER_ERROR = "server_error"
+    THROTTLED = "throttled"
+    TIMEOUT = "timeout"
+    UNKNOWN = "unknown"
+
+
+class RequestPriority(enum.IntEnum):
+    """This class contains enums for the priority classes outbound requests are scheduled in, most urgent first."""
+
+    INTERACTIVE = 0
+    REVERSAL = 1
+    STATUS_QUERY = 2
+    BULK = 3
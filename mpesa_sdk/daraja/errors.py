@@ -0,0 +1,259 @@
+"""This module classifies Daraja error codes and result codes as retryable or terminal.
+
+Daraja reports failures either as an errorCode on the HTTP response, e.g. 500.001.1001, or as a ResultCode on the
+response or callback, e.g. 1032. Both are looked up in a table built once at import, so a failure is classified with
+a dict lookup instead of by matching its description, and the retry policy never retries a failure that cannot
+succeed.
+"""
+
+# standard imports
+from dataclasses import dataclass
+from typing import Any, Optional
+
+# local imports
+from mpesa_sdk.daraja.enums import ErrorCategory
+from mpesa_sdk.exceptions import (
+    DarajaError,
+    DarajaServerError,
+    DuplicateTransactionError,
+    InsufficientFundsError,
+    InvalidAccessTokenError,
+    InvalidCredentialsError,
+    InvalidRequestError,
+    LimitExceededError,
+    SubscriberTimeoutError,
+    TerminalDarajaError,
+    ThrottledError,
+    TransactionCancelledError,
+    TransactionInProgressError,
+)
+
+CATEGORY_EXCEPTIONS: dict[ErrorCategory, type[DarajaError]] = {
+    ErrorCategory.AUTHENTICATION: InvalidAccessTokenError,
+    ErrorCategory.CANCELLED: TransactionCancelledError,
+    ErrorCategory.DUPLICATE: DuplicateTransactionError,
+    ErrorCategory.INSUFFICIENT_FUNDS: InsufficientFundsError,
+    ErrorCategory.INVALID_CREDENTIALS: InvalidCredentialsError,
+    ErrorCategory.INVALID_REQUEST: InvalidRequestError,
+    ErrorCategory.IN_PROGRESS: TransactionInProgressError,
+    ErrorCategory.LIMIT_EXCEEDED: LimitExceededError,
+    ErrorCategory.SERVER_ERROR: DarajaServerError,
+    ErrorCategory.THROTTLED: ThrottledError,
+    ErrorCategory.TIMEOUT: SubscriberTimeoutError,
+    ErrorCategory.UNKNOWN: TerminalDarajaError,
+}
+
+
+@dataclass(frozen=True, slots=True)
+class DarajaErrorCode:
+    """This class describes a Daraja error or result code."""
+
+    code: str
+    category: ErrorCategory
+    description: str
+    resend_safe: bool = False
+
+    @property
+    def retryable(self) -> bool:
+        """This property indicates whether a request failing with this code may succeed when retried.
+        :return: whether the failure is retryable.
+        :rtype: bool
+        """
+        return self.exception.retryable
+
+    @property
+    def exception(self) -> type[DarajaError]:
+        """This property returns the exception raised for this code.
+        :return: the exception class.
+        :rtype: type
+        """
+        return CATEGORY_EXCEPTIONS[self.category]
+
+    def as_dict(self) -> dict[str, Any]:
+        """This method returns the classification in the form exposed on parsed responses.
+        :return: the code, category and whether it is retryable.
+        :rtype: dict
+        """
+        return {
+            "code": self.code,
+            "category": self.category.value,
+            "retryable": self.retryable,
+        }
+
+    def error(self, description: Optional[str] = None) -> DarajaError:
+        """This method creates the exception for a failure with this code.
+        :param description: the description Daraja returned, defaults to the table's description.
+        :type description: str
+        :return: the exception.
+        :rtype: DarajaError
+        """
+        return self.exception(self.code, description or self.description)
+
+
+_ERROR_CODES = (
+    # errorCode values returned with non-200 responses.
+    ("400.002.01", ErrorCategory.INVALID_REQUEST, "Invalid request type."),
+    ("400.002.02", ErrorCategory.INVALID_REQUEST, "Bad request, invalid field."),
+    ("400.002.05", ErrorCategory.INVALID_REQUEST, "Invalid request payload."),
+    ("400.003.01", ErrorCategory.AUTHENTICATION, "Invalid access token."),
+    ("400.003.02", ErrorCategory.INVALID_REQUEST, "Bad request."),
+    ("400.008.01", ErrorCategory.INVALID_CREDENTIALS, "Invalid authentication."),
+    ("400.008.02", ErrorCategory.INVALID_REQUEST, "Invalid grant type."),
+    ("401.002.01", ErrorCategory.AUTHENTICATION, "Invalid access token."),
+    ("401.003.01", ErrorCategory.AUTHENTICATION, "Invalid access token."),
+    ("404.001.01", ErrorCategory.INVALID_REQUEST, "Resource not found."),
+    ("404.001.03", ErrorCategory.AUTHENTICATION, "Invalid access token."),
+    ("404.001.04", ErrorCategory.INVALID_REQUEST, "Invalid authentication header."),
+    ("500.001.1001", ErrorCategory.INVALID_CREDENTIALS, "Merchant validation failed."),
+    ("500.002.1001", ErrorCategory.SERVER_ERROR, "Internal server error."),
+    ("500.003.02", ErrorCategory.THROTTLED, "System is busy."),
+    ("500.003.03", ErrorCategory.THROTTLED, "Quota violation."),
+    ("500.003.1001", ErrorCategory.SERVER_ERROR, "Internal server error."),
+    ("503.001.01", ErrorCategory.SERVER_ERROR, "Service unavailable."),
+    # ResultCode values returned with responses and callbacks.
+    ("1", ErrorCategory.INSUFFICIENT_FUNDS, "The balance is insufficient."),
+    ("2", ErrorCategory.LIMIT_EXCEEDED, "The amount is less than the minimum."),
+    ("3", ErrorCategory.LIMIT_EXCEEDED, "The amount is more than the maximum."),
+    ("4", ErrorCategory.LIMIT_EXCEEDED, "The amount would exceed the daily limit."),
+    ("8", ErrorCategory.LIMIT_EXCEEDED, "The amount would exceed the maximum balance."),
+    ("11", ErrorCategory.INVALID_REQUEST, "The debit party is in an invalid state."),
+    ("15", ErrorCategory.DUPLICATE, "Duplicate transaction detected."),
+    ("17", ErrorCategory.THROTTLED, "Transaction limited by a system rule."),
+    ("26", ErrorCategory.THROTTLED, "System busy."),
+    ("1001", ErrorCategory.IN_PROGRESS, "A transaction is already in process."),
+    ("1019", ErrorCategory.TIMEOUT, "The transaction has expired."),
+    (
+        "1025",
+        ErrorCategory.SERVER_ERROR,
+        "An error occurred while sending the push request.",
+    ),
+    ("1032", ErrorCategory.CANCELLED, "The request was cancelled by the user."),
+    ("1037", ErrorCategory.TIMEOUT, "The subscriber cannot be reached."),
+    (
+        "2001",
+        ErrorCategory.INVALID_CREDENTIALS,
+        "The initiator information is invalid.",
+    ),
+    ("2028", ErrorCategory.INVALID_REQUEST, "The request is not permitted."),
+    ("8006", ErrorCategory.INVALID_CREDENTIALS, "The security credential is locked."),
+    (
+        "9999",
+        ErrorCategory.SERVER_ERROR,
+        "An error occurred while sending the push request.",
+    ),
+)
+
+# Codes returned before Daraja processed the request, so that even a payment can be sent again. An internal server
+# error does not tell whether the request was processed and is only retried for idempotent requests.
+_RESEND_SAFE_CODES = frozenset(
+    (
+        "400.003.01",
+        "401.002.01",
+        "401.003.01",
+        "404.001.03",
+        "500.003.02",
+        "500.003.03",
+        "503.001.01",
+        "17",
+        "26",
+    )
+)
+
+ERROR_CODES: dict[str, DarajaErrorCode] = {
+    code: DarajaErrorCode(code, category, description, code in _RESEND_SAFE_CODES)
+    for code, category, description in _ERROR_CODES
+}
+
+# Daraja reports both wrong merchant credentials and a locked subscriber as 500.001.1001.
+_MERCHANT_VALIDATION = ERROR_CODES["500.001.1001"]
+_LOCKED_SUBSCRIBER = DarajaErrorCode(
+    "500.001.1001",
+    ErrorCategory.IN_PROGRESS,
+    "Unable to lock subscriber, a transaction is already in process.",
+)
+_SERVER_ERROR = DarajaErrorCode("", ErrorCategory.SERVER_ERROR, "Server error.")
+_THROTTLED = DarajaErrorCode("", ErrorCategory.THROTTLED, "Too many requests.")
+_UNKNOWN = DarajaErrorCode("", ErrorCategory.UNKNOWN, "Unknown error.")
+
+
+def classify(
+    code: Any, description: Optional[str] = None, status_code: Optional[int] = None
+) -> Optional[DarajaErrorCode]:
+    """This function classifies a Daraja error or result code.
+
+    Codes missing from the table are classified by the HTTP status: server errors and 429 responses are retryable,
+    anything else is terminal.
+    :param code: the errorCode or ResultCode, 0 or None when the request succeeded.
+    :type code: Any
+    :param description: the description Daraja returned with the code.
+    :type description: str
+    :param status_code: the HTTP status of the response the code was returned with.
+    :type status_code: int
+    :return: the classification, None when the code reports success.
+    :rtype: DarajaErrorCode
+    """
+    key = "" if code is None else str(code)
+    if key in ("", "0"):
+        if status_code is None or 200 <= status_code < 300:
+            return None
+        key = ""
+    entry = ERROR_CODES.get(key)
+    if (
+        entry is _MERCHANT_VALIDATION
+        and description
+        and "lock subscriber" in description
+    ):
+        return _LOCKED_SUBSCRIBER
+    if entry is not None:
+        return entry
+    if status_code == 429:
+        fallback = _THROTTLED
+    elif status_code is not None and status_code >= 500:
+        fallback = _SERVER_ERROR
+    else:
+        fallback = _UNKNOWN
+    return DarajaErrorCode(
+        key or str(status_code or ""), fallback.category, fallback.description
+    )
+
+
+def classify_payload(
+    payload: Optional[dict], status_code: Optional[int] = None
+) -> Optional[DarajaErrorCode]:
+    """This function classifies the failure reported by a Daraja response or callback body.
+    :param payload: the decoded response or callback body.
+    :type payload: dict
+    :param status_code: the HTTP status of the response.
+    :type status_code: int
+    :return: the classification, None when the body reports success.
+    :rtype: DarajaErrorCode
+    """
+    if not isinstance(payload, dict):
+        return classify(None, status_code=status_code or 500)
+    code = payload.get("errorCode")
+    if code is None:
+        code = payload.get("ResultCode")
+    if code is None:
+        code = payload.get("ResponseCode")
+    description = (
+        payload.get("errorMessage")
+        or payload.get("ResultDesc")
+        or payload.get("ResponseDescription")
+    )
+    return classify(code, description, status_code)
+
+
+def classify_response(response: Any) -> Optional[DarajaErrorCode]:
+    """This function classifies the failure reported by a transport response.
+    :param response: the response.
+    :type response: TransportResponse
+    :return: the classification, None when the response reports success.
+    :rtype: DarajaErrorCode
+    """
+    try:
+        payload = response.json()
+    except ValueError:
+        payload = None
+    if payload is None and 200 <= response.status_code < 300:
+        return None
+    return classify_payload(payload, response.status_code)
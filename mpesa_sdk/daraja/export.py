@@ -0,0 +1,451 @@
+"""This module exports parsed Daraja callbacks to columnar Parquet and Arrow IPC files."""
+
+# standard imports
+import logging
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Iterable, Optional
+
+# local imports
+from .b2c import B2CCallbackParser
+from .c2b import C2BCallbackParser
+from .reconciliation import to_cents
+from .reverse import ReversalRequestCallbackParser
+from .stk import StkPushCallbackRequestParser
+from .transaction_status import TransactionStatusCallbackParser
+from mpesa_sdk.utils import EAST_AFRICA_TIME, import_pyarrow
+
+logg = logging.getLogger()
+
+ARROW_FORMAT = "arrow"
+PARQUET_FORMAT = "parquet"
+
+Extractor = Callable[[Any, dict], Any]
+
+# the exclusive bounds of the integer column types.
+_INTEGER_BOUNDS = {"int32": 1 << 31, "int64": 1 << 63}
+
+
+def _timestamp(value: Any, date_format: str) -> Optional[datetime]:
+    """This function parses a time as reported by M-Pesa.
+    :param value: the time, e.g. 20191219102115 or "19.12.2019 11:45:50".
+    :type value: Any
+    :param date_format: the strptime format of the time.
+    :type date_format: str
+    :return: the time in East Africa Time, None if it cannot be parsed.
+    :rtype: datetime
+    """
+    try:
+        return datetime.strptime(str(value), date_format).replace(
+            tzinfo=EAST_AFRICA_TIME
+        )
+    except ValueError:
+        return None
+
+
+def _msisdn(value: Any) -> Optional[str]:
+    """This function extracts the MSISDN from a value such as "254708374149 - John Doe"."""
+    if value is None:
+        return None
+    return str(value).split(" - ", 1)[0].strip() or None
+
+
+def _coerce(column_type: str, value: Any) -> Any:
+    """This function converts an extracted value to the type of its column, so that a batch of them can be written.
+    :param column_type: the column type, e.g. int32.
+    :type column_type: str
+    :param value: the extracted value, e.g. the ResultCode "0".
+    :type value: Any
+    :return: the converted value, None if it cannot be converted.
+    :rtype: Any
+    """
+    if value is None:
+        return None
+    if column_type == "string":
+        return str(value)
+    if column_type in _INTEGER_BOUNDS:
+        if isinstance(value, bool):
+            return None
+        try:
+            number = value if isinstance(value, int) else int(str(value).strip())
+        except ValueError:
+            return None
+        bound = _INTEGER_BOUNDS[column_type]
+        return number if -bound <= number < bound else None
+    if column_type == "bool":
+        return value if isinstance(value, bool) else None
+    return value if isinstance(value, datetime) else None
+
+
+def _data(key: str) -> Extractor:
+    return lambda parser, result: (result.get("data") or {}).get(key)
+
+
+def _result_code(parser: Any, result: dict) -> Optional[int]:
+    return (parser.result or {}).get("ResultCode")
+
+
+@dataclass(frozen=True)
+class Column:
+    """This class describes a column of an export schema."""
+
+    name: str
+    type: str
+    extract: Extractor
+
+    def value(self, parser: Any, result: dict) -> Any:
+        """This method extracts the column's value from a parsed callback, converted to the column's type.
+        :param parser: the callback parser.
+        :type parser: Any
+        :param result: the parsed callback.
+        :type result: dict
+        :return: the value, None if the callback does not provide a valid one.
+        :rtype: Any
+        """
+        try:
+            return _coerce(self.type, self.extract(parser, result))
+        except (AttributeError, KeyError, TypeError):
+            return None
+
+
+@dataclass(frozen=True)
+class ExportSchema:
+    """This class describes the fixed columns exported for a callback type."""
+
+    name: str
+    columns: tuple[Column, ...]
+
+    def arrow_schema(self, pyarrow):
+        """This method builds the Arrow schema.
+        :param pyarrow: the pyarrow module.
+        :type pyarrow: module
+        :return: the Arrow schema.
+        :rtype: pyarrow.Schema
+        """
+        types = {
+            "string": pyarrow.string(),
+            "int32": pyarrow.int32(),
+            "int64": pyarrow.int64(),
+            "bool": pyarrow.bool_(),
+            "timestamp": pyarrow.timestamp("s", tz="+03:00"),
+        }
+        return pyarrow.schema(
+            [pyarrow.field(column.name, types[column.type]) for column in self.columns]
+        )
+
+
+def _common_columns(
+    receipt: Extractor, amount: Extractor, msisdn: Extractor, completed_at: Extractor
+) -> tuple[Column, ...]:
+    return (
+        Column(
+            "transaction_id", "string", lambda parser, result: parser.transaction_id
+        ),
+        Column("receipt", "string", receipt),
+        Column(
+            "amount_cents",
+            "int64",
+            lambda parser, result: to_cents(amount(parser, result)),
+        ),
+        Column(
+            "msisdn",
+            "string",
+            lambda parser, result: _msisdn(msisdn(parser, result)),
+        ),
+        Column("result_code", "int32", _result_code),
+        Column("success", "bool", lambda parser, result: result.get("success")),
+        Column(
+            "description", "string", lambda parser, result: result.get("description")
+        ),
+        Column("completed_at", "timestamp", completed_at),
+    )
+
+
+B2C_SCHEMA = ExportSchema(
+    "b2c",
+    _common_columns(
+        _data("transaction_receipt"),
+        _data("transaction_amount"),
+        _data("receiver_party_public_name"),
+        lambda parser, result: _timestamp(
+            _data("transaction_completed_date_time")(parser, result),
+            "%d.%m.%Y %H:%M:%S",
+        ),
+    ),
+)
+
+C2B_SCHEMA = ExportSchema(
+    "c2b",
+    (
+        Column(
+            "transaction_id", "string", lambda parser, result: parser.transaction_id
+        ),
+        Column("receipt", "string", lambda parser, result: parser.transaction_id),
+        Column(
+            "amount_cents",
+            "int64",
+            lambda parser, result: to_cents(parser.transaction.amount),
+        ),
+        Column("msisdn", "string", lambda parser, result: parser.transaction.msisdn),
+        Column("result_code", "int32", lambda parser, result: 0),
+        Column("success", "bool", lambda parser, result: True),
+        Column(
+            "description",
+            "string",
+            lambda parser, result: parser.transaction.transaction_type,
+        ),
+        Column(
+            "completed_at",
+            "timestamp",
+            lambda parser, result: _timestamp(
+                parser.transaction.transaction_time, "%Y%m%d%H%M%S"
+            ),
+        ),
+        Column(
+            "bill_reference_number",
+            "string",
+            lambda parser, result: parser.transaction.bill_reference_number,
+        ),
+        Column(
+            "business_short_code",
+            "string",
+            lambda parser, result: parser.transaction.business_short_code,
+        ),
+    ),
+)
+
+REVERSAL_SCHEMA = ExportSchema(
+    "reversal",
+    _common_columns(
+        lambda parser, result: parser.transaction_id,
+        _data("amount"),
+        _data("credit_party_public_name"),
+        lambda parser, result: _timestamp(
+            _data("trans_completed_time")(parser, result), "%Y%m%d%H%M%S"
+        ),
+    )
+    + (Column("original_transaction_id", "string", _data("original_transaction_id")),),
+)
+
+STK_PUSH_SCHEMA = ExportSchema(
+    "stk_push",
+    _common_columns(
+        _data("mpesa_receipt_number"),
+        _data("amount"),
+        _data("phone_number"),
+        lambda parser, result: _timestamp(
+            _data("transaction_date")(parser, result), "%Y%m%d%H%M%S"
+        ),
+    )
+    + (
+        Column(
+            "checkout_request_id",
+            "string",
+            lambda parser, result: parser.result.get("CheckoutRequestID"),
+        ),
+    ),
+)
+
+TRANSACTION_STATUS_SCHEMA = ExportSchema(
+    "transaction_status",
+    _common_columns(
+        _data("receipt_no"),
+        _data("amount"),
+        _data("credit_party_name"),
+        lambda parser, result: _timestamp(
+            _data("finalised_time")(parser, result), "%Y%m%d%H%M%S"
+        ),
+    )
+    + (Column("transaction_status", "string", _data("transaction_status")),),
+)
+
+EXPORT_SCHEMAS: dict[type, ExportSchema] = {
+    B2CCallbackParser: B2C_SCHEMA,
+    C2BCallbackParser: C2B_SCHEMA,
+    ReversalRequestCallbackParser: REVERSAL_SCHEMA,
+    StkPushCallbackRequestParser: STK_PUSH_SCHEMA,
+    TransactionStatusCallbackParser: TRANSACTION_STATUS_SCHEMA,
+}
+
+
+def export_schema(parser: Any) -> ExportSchema:
+    """This function returns the export schema for a callback parser.
+    :param parser: the callback parser.
+    :type parser: Any
+    :return: the export schema.
+    :rtype: ExportSchema
+    """
+    for parser_class in type(parser).__mro__:
+        if schema := EXPORT_SCHEMAS.get(parser_class):
+            return schema
+    raise ValueError(f"No export schema for: {type(parser).__name__}.")
+
+
+class _SchemaWriter:
+    """This class buffers the rows of one callback type and writes them as row groups."""
+
+    def __init__(self, sink: "ArrowExportSink", schema: ExportSchema):
+        self.sink = sink
+        self.schema = schema
+        self.arrow_schema = schema.arrow_schema(sink.pyarrow)
+        self.columns: list[list] = [[] for _ in schema.columns]
+        self.writer: Any = None
+        self.row_groups = 0
+        self.files = self.next_file_number()
+        self.paths: list[str] = []
+
+    def next_file_number(self) -> int:
+        """This method returns the number following those of the files of this type already in the directory, so
+        that a restarted export does not overwrite the files of an earlier one.
+        :return: the number of the next file.
+        :rtype: int
+        """
+        pattern = re.compile(
+            rf"{re.escape(self.sink.prefix + self.schema.name)}-(\d+)\.{self.sink.file_format}"
+        )
+        numbers = [
+            int(match.group(1))
+            for name in os.listdir(self.sink.directory)
+            if (match := pattern.fullmatch(name))
+        ]
+        return max(numbers, default=-1) + 1
+
+    def append(self, parser: Any, result: dict):
+        for column, values in zip(self.schema.columns, self.columns):
+            values.append(column.value(parser, result))
+        if len(self.columns[0]) >= self.sink.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self.columns[0]:
+            return
+        pyarrow = self.sink.pyarrow
+        batch = pyarrow.RecordBatch.from_arrays(
+            [
+                pyarrow.array(values, type=field.type)
+                for values, field in zip(self.columns, self.arrow_schema)
+            ],
+            schema=self.arrow_schema,
+        )
+        self.columns = [[] for _ in self.schema.columns]
+        if self.writer is None:
+            self.open()
+        if self.sink.file_format == PARQUET_FORMAT:
+            self.writer.write_table(pyarrow.Table.from_batches([batch]))
+        else:
+            self.writer.write_batch(batch)
+        self.row_groups += 1
+        if self.row_groups >= self.sink.row_groups_per_file:
+            self.close()
+
+    def open(self):
+        pyarrow = self.sink.pyarrow
+        path = os.path.join(
+            self.sink.directory,
+            f"{self.sink.prefix}{self.schema.name}-{self.files:05d}.{self.sink.file_format}",
+        )
+        if self.sink.file_format == PARQUET_FORMAT:
+            self.writer = pyarrow.parquet.ParquetWriter(
+                path, self.arrow_schema, compression=self.sink.compression
+            )
+        else:
+            self.writer = pyarrow.ipc.new_file(path, self.arrow_schema)
+        self.files += 1
+        self.paths.append(path)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            logg.info("Exported %s row groups to: %s.", self.row_groups, self.paths[-1])
+            self.writer = None
+            self.row_groups = 0
+
+
+class ArrowExportSink:
+    """This class exports parsed callbacks to Parquet or Arrow IPC files, one set of files per callback type.
+
+    Rows are buffered as columns and written as a row group (a record batch for Arrow IPC files) once
+    row_group_size rows of a callback type have accumulated; a new file is started after row_groups_per_file row
+    groups. Every callback type has a fixed schema sharing the transaction_id, receipt, amount_cents, msisdn,
+    result_code, success, description and completed_at columns, so files can be memory-mapped and queried
+    without re-parsing JSON. The sink's extend method can be used as the handler of a CallbackPipeline.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        file_format: str = PARQUET_FORMAT,
+        row_group_size: int = 65536,
+        row_groups_per_file: int = 16,
+        compression: str = "zstd",
+        prefix: str = "",
+    ):
+        """This method initializes the export sink.
+        :param directory: the directory files are written to.
+        :type directory: str
+        :param file_format: parquet or arrow.
+        :type file_format: str
+        :param row_group_size: the number of rows per row group.
+        :type row_group_size: int
+        :param row_groups_per_file: the number of row groups written to a file before a new file is started.
+        :type row_groups_per_file: int
+        :param compression: the Parquet compression codec.
+        :type compression: str
+        :param prefix: a prefix for the names of the files written, e.g. the date of the export.
+        :type prefix: str
+        """
+        if file_format not in (ARROW_FORMAT, PARQUET_FORMAT):
+            raise ValueError(f"Unsupported export format: {file_format}.")
+        self.pyarrow = import_pyarrow()
+        self.directory = directory
+        self.file_format = file_format
+        self.row_group_size = row_group_size
+        self.row_groups_per_file = row_groups_per_file
+        self.compression = compression
+        self.prefix = prefix
+        self._writers: dict[str, _SchemaWriter] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def __enter__(self) -> "ArrowExportSink":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def paths(self) -> list[str]:
+        """This method returns the paths of the files written so far."""
+        return [path for writer in self._writers.values() for path in writer.paths]
+
+    def append(self, parser: Any, result: Optional[dict] = None):
+        """This method adds a parsed callback to the export.
+        :param parser: the callback parser.
+        :type parser: Any
+        :param result: the parsed callback, parsed with the parser when omitted.
+        :type result: dict
+        """
+        schema = export_schema(parser)
+        if (writer := self._writers.get(schema.name)) is None:
+            writer = self._writers[schema.name] = _SchemaWriter(self, schema)
+        writer.append(parser, parser.parse() if result is None else result)
+
+    def extend(self, callbacks: Iterable[Any]):
+        """This method adds decoded callbacks, as delivered by a CallbackReceiver or CallbackPipeline.
+        :param callbacks: the decoded callbacks.
+        :type callbacks: Iterable
+        """
+        for callback in callbacks:
+            self.append(callback.parser, callback.result)
+
+    def flush(self):
+        """This method writes the buffered rows of every callback type as row groups."""
+        for writer in self._writers.values():
+            writer.flush()
+
+    def close(self):
+        """This method writes the buffered rows and closes every open file."""
+        for writer in self._writers.values():
+            writer.flush()
+            writer.close()
@@ -0,0 +1,20 @@
+"""This module opens the payout and statement files read by the bulk payout loaders and by reconciliation."""
+
+# standard imports
+import gzip
+import io
+from typing import IO
+
+
+def open_payout_file(path: str) -> IO[str]:
+    """This function opens a payout file for reading, transparently decompressing gzip files.
+    :param path: the path to the payout file.
+    :type path: str
+    :return: a text stream.
+    :rtype: IO[str]
+    """
+    with open(path, "rb") as file:
+        is_gzip = file.read(2) == b"\x1f\x8b"
+    if is_gzip:
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
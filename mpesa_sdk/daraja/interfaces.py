@@ -4,21 +4,49 @@
 import logging
 import os
 from abc import ABC, abstractmethod
-from typing import Union
-
-# external imports
-from requests import Response
-
-from mpesa_sdk.utils import camel_to_snake, make_request, preprocess_http_response
+from typing import Callable, Hashable, Optional, Union
 
 # local imports
-from .auth import daraja_access_token
+from mpesa_sdk.deadline import Deadline, resolve_deadline, wait_for
+from mpesa_sdk.hedging import HedgingPolicy
+from mpesa_sdk.retry import RetryPolicy
+from mpesa_sdk.scheduler import RequestScheduler
+from mpesa_sdk.singleflight import SingleFlight
+from mpesa_sdk.transport import AsyncTransport, Transport, TransportResponse
+from mpesa_sdk.utils import (
+    camel_to_snake,
+    make_request,
+    make_request_async,
+    preprocess_http_response,
+)
+from .auth import AccessTokenCache, daraja_access_token, daraja_access_token_async
+from .credentials import SecurityCredentialCache, security_credential
+from .enums import ErrorCategory, RequestPriority
+from .errors import DarajaErrorCode, classify, classify_response
+from .msisdn import validate_msisdn
+from .responses import ResponseShape, extract_response_fields, snake_case_payload
+from .validation import Field, payload_validation_enabled, validate_payload
 
 logg = logging.getLogger()
 
 
+class ErrorClassificationInterface:
+    """This class exposes the classification of a failed response or callback."""
+
+    error: Optional[DarajaErrorCode] = None
+    description: Optional[str] = None
+
+    def raise_for_error(self):
+        """This method raises the typed exception of a failure, e.g. TransactionCancelledError for result code 1032.
+        :raises DarajaError: if the response or callback reports a failure.
+        """
+        error = self.error
+        if error is not None:
+            raise error.error(self.description)
+
+
 # pylint: disable=too-few-public-methods
-class CallbackParserInterface(ABC):
+class CallbackParserInterface(ABC, ErrorClassificationInterface):
     """This class contains the interface for parsing callbacks."""
 
     def parse(self):
@@ -58,14 +86,14 @@ class RequestBuilderInterface(ABC):
         :param args: request parameters.
         :type args: dict
         :return: response
-        :rtype: requests.Response
+        :rtype: TransportResponse
         :raises: NotImplementedError
         """
         raise NotImplementedError()
 
 
 # pylint: disable=too-few-public-methods
-class ResponseParserInterface(ABC):
+class ResponseParserInterface(ABC, ErrorClassificationInterface):
     """This class contains the interface for parsing responses."""
 
     @abstractmethod
@@ -94,6 +122,16 @@ class BaseCallbackParser(CallbackParserInterface):
                 self.transaction = result_parameters.get("ResultParameter")
             self.transaction_id = self.result.get("TransactionID")
 
+    @property
+    def error(self) -> Optional[DarajaErrorCode]:  # type: ignore[override]
+        """This property classifies the callback's result code.
+        :return: the classification, None if the callback reports success.
+        :rtype: DarajaErrorCode
+        """
+        if not self.result:
+            return None
+        return classify(self.result.get("ResultCode"), self.description)
+
     def parse(self):
         """This method parses the callback.
         :return: the parsed callback.
@@ -116,6 +154,8 @@ class BaseCallbackParser(CallbackParserInterface):
             parsed_response["data"] = data
         else:
             logg.error(self.get_error_log_message())
+            if (error := self.error) is not None:
+                parsed_response["error"] = error.as_dict()
 
         return parsed_response
 
@@ -128,12 +168,48 @@ class BaseCallbackParser(CallbackParserInterface):
         raise NotImplementedError
 
 
+def _accepted(response: TransportResponse) -> bool:
+    """This function checks whether Daraja accepted a request, only accepted requests are shared with later callers.
+    :param response: the response.
+    :type response: TransportResponse
+    :return: whether the request was accepted.
+    :rtype: bool
+    """
+    return 200 <= response.status_code < 300 and classify_response(response) is None
+
+
 class BaseRequestBuilder(RequestBuilderInterface):
     """This is a base payment request class that implements common methods"""
 
     URL_ENV = "URL_ENV"
-
-    def __init__(self, consumer_key: str, consumer_secret: str, shortcode: str):
+    IDEMPOTENT = False
+    PRIORITY = RequestPriority.BULK
+    MSISDN_FIELDS: tuple[str, ...] = ()
+    PAYLOAD_FIELDS: tuple[Field, ...] = ()
+    # fields regenerated for every request, which would otherwise keep identical requests from being coalesced.
+    VOLATILE_FIELDS: frozenset[str] = frozenset(
+        {"Password", "SecurityCredential", "Timestamp"}
+    )
+
+    def __init__(
+        self,
+        consumer_key: str,
+        consumer_secret: str,
+        shortcode: str,
+        transport: Optional[Transport] = None,
+        token_cache: Optional[AccessTokenCache] = None,
+        async_transport: Optional[AsyncTransport] = None,
+        hedging: Optional[HedgingPolicy] = None,
+        validate_msisdns: bool = False,
+        credential_cache: Optional[SecurityCredentialCache] = None,
+        validate_payloads: Optional[bool] = None,
+        retry: Optional[RetryPolicy] = None,
+        single_flight: Optional[SingleFlight] = None,
+        coalesce_key: Optional[Callable[[dict], Hashable]] = None,
+        scheduler: Optional[RequestScheduler] = None,
+        priority: Optional[RequestPriority] = None,
+        tenant: Optional[str] = None,
+    ):
         """This method initializes the base payment request class.
         :param consumer_key: the consumer key.
         :type consumer_key: str
@@ -141,19 +217,73 @@ class BaseRequestBuilder(RequestBuilderInterface):
         :type consumer_secret: str
         :param shortcode: the shortcode.
         :type shortcode: str
+        :param transport: the transport requests are made with, defaults to the pooled requests transport.
+        :type transport: Transport
+        :param token_cache: the cache to retrieve access tokens from.
+        :type token_cache: AccessTokenCache
+        :param async_transport: the transport asynchronous requests are made with.
+        :type async_transport: AsyncTransport
+        :param hedging: the policy used to hedge requests, only supported by idempotent requests.
+        :type hedging: HedgingPolicy
+        :param validate_msisdns: whether phone numbers are normalized and validated before a request is sent.
+        :type validate_msisdns: bool
+        :param credential_cache: the cache security credentials are generated through, defaults to the shared cache.
+        :type credential_cache: SecurityCredentialCache
+        :param validate_payloads: whether payloads are checked against PAYLOAD_FIELDS before they are sent, defaults
+        to the global setting.
+        :type validate_payloads: bool
+        :param retry: the policy used to retry requests that fail with a retryable error.
+        :type retry: RetryPolicy
+        :param single_flight: the group identical requests are coalesced in, so that callers executing a request
+        that is in flight, or was accepted within the group's TTL, share its response instead of sending it again.
+        :type single_flight: SingleFlight
+        :param coalesce_key: a function returning the key identifying identical payloads, defaults to every field
+        but the VOLATILE_FIELDS.
+        :type coalesce_key: Callable
+        :param scheduler: the scheduler each attempt waits for a slot in.
+        :type scheduler: RequestScheduler
+        :param priority: the priority class requests are scheduled in, defaults to the builder's PRIORITY.
+        :type priority: RequestPriority
+        :param tenant: the tenant requests are fairly queued as, defaults to the shortcode.
+        :type tenant: str
         """
+        if hedging is not None and not self.IDEMPOTENT:
+            raise ValueError(
+                f"{type(self).__name__} is not idempotent and cannot be hedged."
+            )
         self.consumer_key = consumer_key
         self.consumer_secret = consumer_secret
         self.shortcode = shortcode
-
-    def authenticate(self):
+        self.transport = transport
+        self.token_cache = token_cache
+        self.async_transport = async_transport
+        self.hedging = hedging
+        self.validate_msisdns = validate_msisdns
+        self.credential_cache = credential_cache
+        self.validate_payloads = validate_payloads
+        self.retry = retry
+        self.single_flight = single_flight
+        self.coalesce_key = coalesce_key
+        self.scheduler = scheduler
+        self.priority = self.PRIORITY if priority is None else priority
+        self.tenant = tenant or shortcode
+
+    def authenticate(self, deadline: Optional[Deadline] = None):
         """This method authenticates the payment request.
+        :param deadline: the deadline the access token must be retrieved by.
+        :type deadline: Deadline
         :return: the authentication headers.
         :rtype: dict
         """
-        access_token = daraja_access_token(
-            consumer_key=self.consumer_key, consumer_secret=self.consumer_secret
-        )
+        if self.token_cache is not None:
+            access_token = self.token_cache.get(deadline)
+        else:
+            access_token = daraja_access_token(
+                consumer_key=self.consumer_key,
+                consumer_secret=self.consumer_secret,
+                transport=self.transport,
+                deadline=deadline,
+            )
         return {"Authorization": f"Bearer {access_token}"}
 
     def build(self, *args):
@@ -163,57 +293,302 @@ class BaseRequestBuilder(RequestBuilderInterface):
         """
         raise NotImplementedError
 
-    def execute(self, *args):
+    def execute(
+        self,
+        *args,
+        timeout: Optional[float] = None,
+        deadline: Optional[Deadline] = None,
+    ):
         """This method executes the payment request.
+        :param timeout: the budget in seconds for the request, including its token fetch, queueing and retries.
+        :type timeout: float
+        :param deadline: the deadline the request must complete by, e.g. one shared with other steps of the caller.
+        :type deadline: Deadline
+        :return: response
+        :rtype: TransportResponse
+        :raises DeadlineExceededError: if the request cannot complete within the budget.
+        """
+        deadline = resolve_deadline(timeout, deadline)
+        payload = self.prepare(self.build(*args))
+        if self.single_flight is None:
+            return self.send(payload, deadline)
+        return self.single_flight.do(
+            self.coalescing_key(payload),
+            lambda: self.send(payload, deadline),
+            _accepted,
+            None if deadline is None else deadline.remaining(),
+        )
+
+    def coalescing_key(self, payload: dict) -> Hashable:
+        """This method returns the key identifying requests that are coalesced with a payload.
+        :param payload: the request payload.
+        :type payload: dict
+        :return: the key.
+        :rtype: Hashable
+        """
+        if self.coalesce_key is not None:
+            return (type(self).__name__, self.coalesce_key(payload))
+        volatile = self.VOLATILE_FIELDS
+        return (
+            type(self).__name__,
+            tuple(
+                (field, str(value))
+                for field, value in sorted(payload.items())
+                if field not in volatile
+            ),
+        )
+
+    def security_credential(self, initiator: str) -> str:
+        """This method returns the security credential of an initiator.
+        :param initiator: the initiator name.
+        :type initiator: str
+        :return: the security credential.
+        :rtype: str
+        """
+        return security_credential(initiator, cache=self.credential_cache)
+
+    def prepare(self, payload: dict) -> dict:
+        """This method checks a built payload before it is sent, normalizing its phone numbers if enabled.
+        :param payload: the request payload.
+        :type payload: dict
+        :return: the request payload.
+        :rtype: dict
+        :raises InvalidMsisdnError: if a phone number is not a valid Safaricom number.
+        :raises PayloadValidationError: if the payload breaks the rules declared in PAYLOAD_FIELDS.
+        """
+        if self.validate_msisdns:
+            for field in self.MSISDN_FIELDS:
+                payload[field] = validate_msisdn(payload[field])
+        validate_payloads = self.validate_payloads
+        if validate_payloads is None:
+            validate_payloads = payload_validation_enabled()
+        if validate_payloads:
+            validate_payload(type(self), payload)
+        return payload
+
+    def send(self, payload: dict, deadline: Optional[Deadline] = None):
+        """This method sends an already built payload.
+
+        With a deadline, each attempt's timeout is capped to the time left, and a retry is only made if it can
+        complete before the deadline.
+        :param payload: the request payload.
+        :type payload: dict
+        :param deadline: the deadline the request must complete by.
+        :type deadline: Deadline
         :return: response
-        :rtype: requests.Response
+        :rtype: TransportResponse
         """
-        payload = self.build(*args)
-        auth_headers = self.authenticate()
-        headers = {"Content-Type": "application/json", **auth_headers}
-        return make_request(
-            "POST", os.environ.get(self.URL_ENV), headers=headers, json=payload
+        url = os.environ.get(self.URL_ENV)
+
+        def attempt():
+            headers = {
+                "Content-Type": "application/json",
+                **self.authenticate(deadline),
+            }
+
+            def post():
+                return make_request(
+                    "POST",
+                    url,
+                    headers=headers,
+                    json=payload,
+                    transport=self.transport,
+                    deadline=deadline,
+                )
+
+            if self.hedging is not None:
+                return self.hedging.call(post, *self._hedge_slot())
+            return post()
+
+        def scheduled():
+            if self.scheduler is None:
+                return attempt()
+            return self.scheduler.run(
+                attempt,
+                self.priority,
+                self.tenant,
+                None if deadline is None else deadline.remaining(),
+            )
+
+        if self.retry is None:
+            return scheduled()
+        return self.retry.call(
+            scheduled,
+            idempotent=self.IDEMPOTENT,
+            on_retry=self._before_retry,
+            deadline=deadline,
         )
 
+    async def authenticate_async(self, deadline: Optional[Deadline] = None):
+        """This method authenticates the payment request through the asynchronous transport.
+        :param deadline: the deadline the access token must be retrieved by.
+        :type deadline: Deadline
+        :return: the authentication headers.
+        :rtype: dict
+        """
+        if (
+            self.token_cache is not None
+            and self.token_cache.async_transport is not None
+        ):
+            access_token = await self.token_cache.get_async(deadline)
+        else:
+            access_token = await daraja_access_token_async(
+                self.consumer_key,
+                self.consumer_secret,
+                self._require_async_transport(),
+                deadline=deadline,
+            )
+        return {"Authorization": f"Bearer {access_token}"}
+
+    async def execute_async(
+        self,
+        *args,
+        timeout: Optional[float] = None,
+        deadline: Optional[Deadline] = None,
+    ):
+        """This method executes the payment request through the asynchronous transport.
+
+        The request can be cancelled by cancelling the task awaiting it, which also frees its scheduler slot and
+        closes its in-flight HTTP request. A request coalesced with an in-flight one only stops waiting for it.
+        :param timeout: the budget in seconds for the request, including its token fetch, queueing and retries.
+        :type timeout: float
+        :param deadline: the deadline the request must complete by, e.g. one shared with other steps of the caller.
+        :type deadline: Deadline
+        :return: response
+        :rtype: TransportResponse
+        :raises DeadlineExceededError: if the request does not complete within the budget, it is cancelled then.
+        """
+        deadline = resolve_deadline(timeout, deadline)
+        payload = self.prepare(self.build(*args))
+        if self.single_flight is None:
+            return await self.send_async(payload, deadline)
+        call = self.single_flight.do_async(
+            self.coalescing_key(payload),
+            lambda: self.send_async(payload, deadline),
+            _accepted,
+        )
+        if deadline is None:
+            return await call
+        return await wait_for(call, deadline)
+
+    async def send_async(self, payload: dict, deadline: Optional[Deadline] = None):
+        """This method sends an already built payload through the asynchronous transport.
+        :param payload: the request payload.
+        :type payload: dict
+        :param deadline: the deadline the request must complete by, it is cancelled once the deadline passes.
+        :type deadline: Deadline
+        :return: response
+        :rtype: TransportResponse
+        """
+        url = os.environ.get(self.URL_ENV)
+        transport = self._require_async_transport()
+
+        async def attempt():
+            headers = {
+                "Content-Type": "application/json",
+                **await self.authenticate_async(deadline),
+            }
+
+            def post():
+                return make_request_async(
+                    "POST",
+                    url,
+                    transport,
+                    headers=headers,
+                    json=payload,
+                    deadline=deadline,
+                )
+
+            if self.hedging is not None:
+                return await self.hedging.call_async(post, *self._hedge_slot())
+            return await post()
+
+        async def scheduled():
+            if self.scheduler is None:
+                return await attempt()
+            return await self.scheduler.run_async(attempt, self.priority, self.tenant)
+
+        async def retried():
+            if self.retry is None:
+                return await scheduled()
+            return await self.retry.call_async(
+                scheduled,
+                idempotent=self.IDEMPOTENT,
+                on_retry=self._before_retry,
+                deadline=deadline,
+            )
+
+        if deadline is None:
+            return await retried()
+        return await wait_for(retried(), deadline)
+
+    def _before_retry(self, error: DarajaErrorCode):
+        """This method discards the cached access token before a request rejected for its token is retried.
+        :param error: the error the request failed with.
+        :type error: DarajaErrorCode
+        """
+        if error.category is ErrorCategory.AUTHENTICATION and self.token_cache:
+            self.token_cache.invalidate()
+
+    def _hedge_slot(
+        self,
+    ) -> tuple[Optional[Callable[[], bool]], Optional[Callable[[], None]]]:
+        """This method returns the functions a hedge takes and frees its own scheduler slot with, so that hedged
+        attempts count against the scheduler's limits.
+        :return: the functions acquiring and releasing a slot, None for both without a scheduler.
+        :rtype: tuple
+        """
+        scheduler = self.scheduler
+        if scheduler is None:
+            return None, None
+        return (
+            lambda: scheduler.try_acquire(self.priority),
+            lambda: scheduler.release(self.priority),
+        )
+
+    def _require_async_transport(self) -> AsyncTransport:
+        """This method returns the configured asynchronous transport.
+        :return: the asynchronous transport.
+        :rtype: AsyncTransport
+        """
+        if self.async_transport is None:
+            raise ValueError(
+                "An async transport is required to execute requests asynchronously."
+            )
+        return self.async_transport
+
 
 class BaseResponseParser(ResponseParserInterface):
     """This class is the base response parser."""
 
-    def __init__(self, response: Response):
+    SHAPE = ResponseShape()
+
+    def __init__(self, response: TransportResponse):
         """This method initializes the base response parser class.
         :param response: the response.
-        :type response: Response
+        :type response: TransportResponse
         """
 
         self.response = preprocess_http_response(response)
-        if self.response:
-            try:
-                self.description = self.response["ResponseDescription"]
-            except KeyError:
-                self.description = self.response["errorMessage"]
-
-            try:
-                self.request_id = self.response["OriginatorConversationID"]
-            except KeyError:
-                self.request_id = self.response["requestId"]
-
-            try:
-                self.response_code = self.response["ResponseCode"]
-            except KeyError:
-                self.response_code = self.response["errorCode"]
+        self.fields = extract_response_fields(
+            self.response, self.SHAPE, response.status_code
+        )
+        self.description = self.fields.description
+        self.request_id = self.fields.request_id
+        self.response_code = self.fields.code
+        self.error = self.fields.error
 
     def parse(self) -> dict[str, Union[str, int]]:
         """This method parses the response.
-        :return: the parsed response.
+        :return: the parsed response, empty when the response has no body.
         :rtype: dict
         """
 
-        if self.response_code == 0:
+        if self.fields.success:
             logg.info(self.get_success_log_message())
         else:
             logg.error(self.get_error_log_message())
-
-        return {camel_to_snake(key): value for key, value in self.response.items()}
+        return snake_case_payload(self.response, self.error)
 
     def get_error_log_message(self):
         """Get error log message."""
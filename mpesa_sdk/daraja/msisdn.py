@@ -0,0 +1,127 @@
+"""This module normalizes and validates Kenyan phone numbers (MSISDNs) before they are sent to the Daraja API."""
+
+# standard imports
+import re
+from typing import Any, Iterable, Optional
+
+# local imports
+from mpesa_sdk.exceptions import InvalidMsisdnError
+
+COUNTRY_CODE = "254"
+
+# The first three digits of the subscriber number for each range allocated to Safaricom.
+SAFARICOM_PREFIXES = frozenset(
+    [f"{prefix}" for prefix in range(700, 730)]
+    + ["740", "741", "742", "743", "745", "746", "748"]
+    + ["757", "758", "759", "768", "769"]
+    + [f"{prefix}" for prefix in range(790, 800)]
+    + [f"{prefix}" for prefix in range(110, 116)]
+)
+
+_MSISDN_PATTERN = re.compile(r"\s*(?:\+?254|0)?([17]\d{8})\s*")
+_SAFARICOM_SUBSCRIBER_PREFIXES = tuple(sorted(int(p) for p in SAFARICOM_PREFIXES))
+
+
+def normalize_msisdn(value: Any) -> Optional[str]:
+    """This function normalizes a phone number to the 254XXXXXXXXX format.
+    :param value: the phone number e.g. 0712345678, +254712345678, 254112345678 or 712345678.
+    :type value: Any
+    :return: the normalized phone number or None if the value is not a valid number.
+    :rtype: str
+    """
+    match = _MSISDN_PATTERN.fullmatch(str(value))
+    if match is None:
+        return None
+    return f"{COUNTRY_CODE}{match.group(1)}"
+
+
+def is_safaricom(msisdn: str) -> bool:
+    """This function checks whether a normalized phone number belongs to a Safaricom range.
+    :param msisdn: the phone number in the 254XXXXXXXXX format.
+    :type msisdn: str
+    :return: whether the number belongs to Safaricom.
+    :rtype: bool
+    """
+    return msisdn[3:6] in SAFARICOM_PREFIXES
+
+
+def validate_msisdn(value: Any) -> str:
+    """This function normalizes a phone number and checks that it can receive M-Pesa payments.
+    :param value: the phone number.
+    :type value: Any
+    :return: the phone number in the 254XXXXXXXXX format.
+    :rtype: str
+    :raises InvalidMsisdnError: if the value is not a valid Safaricom number.
+    """
+    msisdn = normalize_msisdn(value)
+    if msisdn is None:
+        raise InvalidMsisdnError(f"Invalid phone number: {value!r}.")
+    if not is_safaricom(msisdn):
+        raise InvalidMsisdnError(f"Phone number is not a Safaricom number: {value!r}.")
+    return msisdn
+
+
+def normalize_msisdns(
+    values: Iterable[Any], safaricom_only: bool = True
+) -> list[Optional[str]]:
+    """This function normalizes a batch of phone numbers.
+    :param values: the phone numbers.
+    :type values: Iterable
+    :param safaricom_only: whether numbers outside the Safaricom ranges are rejected.
+    :type safaricom_only: bool
+    :return: the normalized phone numbers, None for each invalid value.
+    :rtype: list
+    """
+    fullmatch = _MSISDN_PATTERN.fullmatch
+    normalized: list[Optional[str]] = []
+    append = normalized.append
+    for value in values:
+        match = fullmatch(str(value))
+        if match is None or (
+            safaricom_only and match.group(1)[:3] not in SAFARICOM_PREFIXES
+        ):
+            append(None)
+        else:
+            append(COUNTRY_CODE + match.group(1))
+    return normalized
+
+
+def normalize_msisdn_array(values: Any, safaricom_only: bool = True):
+    """This function normalizes a NumPy array, or any array-like, of phone numbers with vectorized operations.
+
+    Values are reduced to integers so that each format is recognized by its length and leading digits, the
+    subscriber number is taken as the last nine digits, and the Safaricom ranges are checked with a single
+    membership test over the whole array. The formats accepted are those normalize_msisdn accepts, so a "+" is
+    only allowed before the 254 country code.
+    :param values: the phone numbers.
+    :type values: numpy.ndarray
+    :param safaricom_only: whether numbers outside the Safaricom ranges are rejected.
+    :type safaricom_only: bool
+    :return: the normalized phone numbers as int64, and a boolean mask of the valid values.
+    :rtype: tuple
+    """
+    try:
+        import numpy  # pylint: disable=import-outside-toplevel
+    except ImportError as error:
+        raise ImportError(
+            "Normalizing phone number arrays requires NumPy: pip install python-mpesa-sdk[reconciliation]."
+        ) from error
+
+    stripped = numpy.char.strip(numpy.asarray(values, dtype=str))
+    strings = numpy.char.lstrip(stripped, "+")
+    lengths = numpy.char.str_len(strings)
+    signs = numpy.char.str_len(stripped) - lengths
+    digits = numpy.char.isdigit(strings) & (lengths <= 12)
+    numbers = numpy.where(digits, strings, "0").astype(numpy.int64)
+    subscribers = numbers % 1_000_000_000
+    leading = numbers // 1_000_000_000
+
+    valid = digits & (
+        ((lengths == 12) & (leading == 254) & (signs <= 1))
+        | ((lengths == 10) & numpy.char.startswith(strings, "0") & (signs == 0))
+        | ((lengths == 9) & (signs == 0))
+    )
+    valid &= numpy.isin(subscribers // 100_000_000, (1, 7))
+    if safaricom_only:
+        valid &= numpy.isin(subscribers // 1_000_000, _SAFARICOM_SUBSCRIBER_PREFIXES)
+    return numpy.where(valid, 254_000_000_000 + subscribers, 0), valid
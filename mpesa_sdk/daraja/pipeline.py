@@ -0,0 +1,475 @@
+"""This module implements a backpressure-aware pipeline for processing Daraja callbacks."""
+
+# standard imports
+import base64
+import hashlib
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Optional
+
+# local imports
+from mpesa_sdk.daraja.receiver import Callback, CallbackReceiver
+from mpesa_sdk.retry import RetryPolicy
+
+logg = logging.getLogger()
+
+_FLUSH = object()
+
+
+class SpillBuffer:
+    """This class is an append-only file holding callbacks that did not fit in the pipeline's queue.
+
+    Callbacks are appended as JSON lines and read back in the order they were written. A callback read back stays in
+    the file until it is committed as delivered: the file is truncated once everything written to it has been
+    delivered, and compacted once the delivered part outgrows compact_size. Callbacks left in it by a previous
+    process are read back on start, so a crash between reading a callback back and delivering it delivers it again
+    rather than losing it.
+    """
+
+    def __init__(self, path: str, compact_size: int = 1 << 24):
+        """This method initializes the spill buffer.
+        :param path: the path of the spill file.
+        :type path: str
+        :param compact_size: the number of delivered bytes at the start of the file that triggers a compaction.
+        :type compact_size: int
+        """
+        self.path = path
+        self.compact_size = compact_size
+        self._lock = threading.Lock()
+        self._file = open(path, "ab+")  # pylint: disable=consider-using-with
+        self._base = 0
+        self._offset = 0
+        self._committed = 0
+        self._size = os.path.getsize(path)
+
+    @property
+    def pending(self) -> int:
+        """This method returns the number of spilled bytes that have not been read back."""
+        with self._lock:
+            return self._size - self._offset
+
+    @property
+    def uncommitted(self) -> int:
+        """This method returns the number of spilled bytes that have not been committed as delivered."""
+        with self._lock:
+            return self._size - self._committed
+
+    def append(self, path: str, body: bytes):
+        """This method spills a callback to the file.
+        :param path: the path the callback was received on.
+        :type path: str
+        :param body: the raw callback body.
+        :type body: bytes
+        """
+        line = json.dumps(
+            {"path": path, "body": base64.b64encode(body).decode()}
+        ).encode()
+        with self._lock:
+            self._file.seek(0, os.SEEK_END)
+            self._file.write(line + b"\n")
+            self._file.flush()
+            self._size += len(line) + 1
+
+    def read(self, limit: int = 100) -> tuple[list[tuple[str, bytes]], int]:
+        """This method reads spilled callbacks back in the order they were written.
+        :param limit: the maximum number of callbacks to read.
+        :type limit: int
+        :return: the path and raw body of each callback read, and the position to commit once they are delivered.
+        :rtype: tuple
+        """
+        items: list[tuple[str, bytes]] = []
+        with self._lock:
+            self._file.seek(self._offset)
+            while len(items) < limit and self._offset < self._size:
+                line = self._file.readline()
+                self._offset += len(line)
+                record = json.loads(line)
+                items.append((record["path"], base64.b64decode(record["body"])))
+            return items, self._base + self._offset
+
+    def commit(self, position: int):
+        """This method discards the callbacks read back before a position once they have been delivered.
+        :param position: a position returned by read.
+        :type position: int
+        """
+        with self._lock:
+            self._committed = max(self._committed, position - self._base)
+            if self._committed == self._size:
+                self._file.truncate(0)
+                self._base += self._size
+                self._offset = self._size = self._committed = 0
+            elif self._committed >= self.compact_size:
+                self._compact()
+
+    def _compact(self):
+        """This method rewrites the file without the callbacks committed as delivered."""
+        compacted = f"{self.path}.compact"
+        self._file.seek(self._committed)
+        with open(compacted, "wb") as file:
+            shutil.copyfileobj(self._file, file)
+        os.replace(compacted, self.path)
+        self._file.close()
+        self._file = open(self.path, "ab+")  # pylint: disable=consider-using-with
+        self._base += self._committed
+        self._offset -= self._committed
+        self._size -= self._committed
+        self._committed = 0
+
+    def close(self):
+        """This method closes the spill file."""
+        with self._lock:
+            self._file.close()
+
+
+class _SpillTicket:
+    """This class tracks the delivery of the callbacks read back from the spill file at once."""
+
+    __slots__ = ("position", "remaining")
+
+    def __init__(self, position: int, remaining: int):
+        self.position = position
+        self.remaining = remaining
+
+
+# a decoded callback, its raw body and the spill read it came from, if it was spilled.
+_Decoded = tuple[Callback, bytes, Optional[_SpillTicket]]
+
+
+def _digest(body: bytes) -> bytes:
+    """This function returns the key a callback body is deduplicated by.
+    :param body: the raw callback body.
+    :type body: bytes
+    :return: the digest of the body.
+    :rtype: bytes
+    """
+    return hashlib.blake2b(body, digest_size=16).digest()
+
+
+class CallbackPipeline(CallbackReceiver):
+    """This class processes Daraja callbacks in bounded stages: receive, dedupe, decode and deliver.
+
+    Requests are acknowledged as soon as their body has been queued. Decoding threads drop bodies identical to one
+    seen recently, as sent when Safaricom retries a callback, and pass the decoded callbacks to a delivery thread
+    which hands them to the handler in batches. When the handler falls behind the bounded queues fill up, and
+    callbacks that do not fit are spilled to disk and fed back into the pipeline as it drains, so a slow handler
+    neither blocks nor drops an acknowledgement. Spilled callbacks are removed from disk only once the handler has
+    returned for them, so they are delivered at least once. A batch the handler raises on is retried with the retry
+    policy's backoff and then spilled again to be redelivered, so with a spill file a handler failing for good keeps
+    join and stop waiting; without one the batch is dropped.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[list[Callback]], Any],
+        routes: Optional[dict[str, type]] = None,
+        workers: int = 4,
+        queue_size: int = 10000,
+        batch_size: int = 500,
+        batch_queue_size: Optional[int] = None,
+        flush_interval: float = 1.0,
+        dedupe_window: int = 100000,
+        spill_path: Optional[str] = None,
+        on_receive: Optional[Callable[[str, bytes], Any]] = None,
+        retry: Optional[RetryPolicy] = None,
+    ):
+        """This method initializes the callback pipeline.
+        :param handler: the function called with each batch of decoded callbacks.
+        :type handler: Callable
+        :param routes: the parser for each callback path, derived from the callback URL environment variables
+        when omitted.
+        :type routes: dict
+        :param workers: the number of decoding threads.
+        :type workers: int
+        :param queue_size: the maximum number of callbacks waiting to be decoded.
+        :type queue_size: int
+        :param batch_size: the maximum number of callbacks handed to the handler at once.
+        :type batch_size: int
+        :param batch_queue_size: the maximum number of decoded callbacks waiting to be delivered, twice the batch
+        size when omitted.
+        :type batch_queue_size: int
+        :param flush_interval: the maximum time in seconds a decoded callback waits for its batch to fill.
+        :type flush_interval: float
+        :param dedupe_window: the number of most recent callback bodies checked for duplicates.
+        :type dedupe_window: int
+        :param spill_path: the file callbacks are spilled to when the queue is full, callbacks are rejected when
+        omitted.
+        :type spill_path: str
+        :param on_receive: a function called with the path and raw body of each routed callback before it is
+        queued, e.g. a TraceRecorder's record_callback.
+        :type on_receive: Callable
+        :param retry: the policy whose attempts and backoff are used when the handler raises on a batch.
+        :type retry: RetryPolicy
+        """
+        super().__init__(
+            self._handle_one,
+            routes=routes,
+            workers=workers,
+            queue_size=queue_size,
+            on_receive=on_receive,
+        )
+        self.batch_handler = handler
+        self.retry = retry or RetryPolicy()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dedupe_window = dedupe_window
+        self.decoded: queue.Queue = queue.Queue(batch_queue_size or 2 * batch_size)
+        self.spill = SpillBuffer(spill_path) if spill_path else None
+        self.duplicates = 0
+        self._seen: OrderedDict[bytes, None] = OrderedDict()
+        self._seen_lock = threading.Lock()
+        self._tickets: deque[_SpillTicket] = deque()
+        self._tickets_lock = threading.Lock()
+        self._stage_threads: list[threading.Thread] = []
+        self._spilled = threading.Event()
+        self._stopping = threading.Event()
+        self._draining = False
+
+    def start(self):
+        """This method starts the decoding, delivery and spill threads if they are not running."""
+        super().start()
+        with self._lock:
+            if self._stage_threads:
+                return
+            self._stopping.clear()
+            self._stage_threads = [
+                threading.Thread(
+                    target=self._deliver, name="mpesa-callback-delivery", daemon=True
+                )
+            ]
+            if self.spill is not None:
+                self._stage_threads.append(
+                    threading.Thread(
+                        target=self._drain_spill,
+                        name="mpesa-callback-spill",
+                        daemon=True,
+                    )
+                )
+                if self.spill.pending:
+                    self._spilled.set()
+            for thread in self._stage_threads:
+                thread.start()
+
+    def stop(self):
+        """This method processes every received callback, including spilled ones, and stops the pipeline."""
+        with self._lock:
+            stage_threads, self._stage_threads = self._stage_threads, []
+        self._stopping.set()
+        self._spilled.set()
+        for thread in stage_threads[1:]:
+            thread.join()
+        super().stop()
+        if stage_threads:
+            self.decoded.put(None)
+            stage_threads[0].join()
+
+    def join(self):
+        """This method blocks until every received callback, including spilled ones, has been delivered."""
+        while True:
+            while self.spill is not None and (self.spill.pending or self._draining):
+                time.sleep(0.01)
+            self.queue.join()
+            self.decoded.join()
+            # a batch the handler failed on may have been spilled again meanwhile.
+            if self.spill is None or not self.spill.pending:
+                return
+
+    def submit(self, path: str, body: bytes) -> bool:
+        """This method queues a callback body for decoding, spilling it to disk when the queue is full.
+        :param path: the path the callback was received on.
+        :type path: str
+        :param body: the raw callback body.
+        :type body: bytes
+        :return: whether the callback was accepted.
+        :rtype: bool
+        """
+        parser = self.routes.get(path)
+        if parser is None:
+            return False
+        if self.on_receive is not None:
+            self.on_receive(path, body)
+        if not self._threads:
+            self.start()
+        try:
+            self.queue.put_nowait((path, parser, body))
+        except queue.Full:
+            if self.spill is None:
+                logg.error("Callback queue is full, rejecting callback on: %s.", path)
+                return False
+            self.spill.append(path, body)
+            self._spilled.set()
+        return True
+
+    def handle(
+        self,
+        path: str,
+        parser: type,
+        body: bytes,
+        ticket: Optional[_SpillTicket] = None,
+    ):
+        """This method decodes a callback body and queues the result for delivery unless it is a duplicate.
+        :param path: the path the callback was received on.
+        :type path: str
+        :param parser: the parser class for the callback.
+        :type parser: type
+        :param body: the raw callback body.
+        :type body: bytes
+        :param ticket: the spill read the callback came from, if it was spilled.
+        :type ticket: _SpillTicket
+        """
+        queued = False
+        try:
+            if self.is_duplicate(body):
+                logg.debug("Dropping duplicate callback received on: %s.", path)
+                return
+            instance = parser(json.loads(body))
+            self.decoded.put((Callback(path, instance, instance.parse()), body, ticket))
+            queued = True
+        finally:
+            if not queued:
+                self._delivered(ticket)
+
+    def is_duplicate(self, body: bytes) -> bool:
+        """This method checks whether a callback body was seen within the dedupe window and records it.
+        :param body: the raw callback body.
+        :type body: bytes
+        :return: whether the body is a duplicate.
+        :rtype: bool
+        """
+        key = _digest(body)
+        with self._seen_lock:
+            if key in self._seen:
+                self._seen.move_to_end(key)
+                self.duplicates += 1
+                return True
+            self._seen[key] = None
+            if len(self._seen) > self.dedupe_window:
+                self._seen.popitem(last=False)
+        return False
+
+    def _deliver(self):
+        """This method hands decoded callbacks to the handler in batches until it receives a sentinel."""
+        batch: list[_Decoded] = []
+        deadline = 0.0
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if batch else None
+            try:
+                item = self.decoded.get(timeout=timeout)
+            except queue.Empty:
+                item = _FLUSH
+            if isinstance(item, tuple):
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+                if len(batch) < self.batch_size:
+                    continue
+            if batch:
+                self._flush(batch)
+                batch = []
+            if item is None:
+                self.decoded.task_done()
+                return
+
+    def _handle_one(self, callback: Callback):
+        """This method hands a single decoded callback to the handler as a batch of one.
+        :param callback: the decoded callback.
+        :type callback: Callback
+        """
+        self.batch_handler([callback])
+
+    def _flush(self, batch: list[_Decoded]):
+        """This method hands a batch of decoded callbacks to the handler, retrying it while the handler raises.
+        :param batch: the decoded callbacks, their raw bodies and the spill reads they came from.
+        :type batch: list
+        """
+        callbacks = [callback for callback, _, _ in batch]
+        try:
+            attempt = 1
+            while True:
+                try:
+                    self.batch_handler(callbacks)
+                    return
+                except Exception:  # pylint: disable=broad-except
+                    if attempt >= self.retry.attempts:
+                        logg.exception(
+                            "Failed to handle batch of %s callbacks.", len(batch)
+                        )
+                        self._respill(batch)
+                        return
+                    logg.warning(
+                        "Failed to handle batch of %s callbacks, retrying.",
+                        len(batch),
+                        exc_info=True,
+                    )
+                    time.sleep(self.retry.delay(attempt))
+                    attempt += 1
+        finally:
+            for _, _, ticket in batch:
+                self._delivered(ticket)
+                self.decoded.task_done()
+
+    def _respill(self, batch: list[_Decoded]):
+        """This method spills a batch the handler failed on so that it is delivered again, before the spill reads it
+        came from are committed.
+        :param batch: the decoded callbacks, their raw bodies and the spill reads they came from.
+        :type batch: list
+        """
+        if self.spill is None:
+            logg.error(
+                "Dropping batch of %s callbacks without a spill file.", len(batch)
+            )
+            return
+        with self._seen_lock:
+            for _, body, _ in batch:
+                self._seen.pop(_digest(body), None)
+        for callback, body, _ in batch:
+            self.spill.append(callback.path, body)
+        self._spilled.set()
+
+    def _delivered(self, ticket: Optional[_SpillTicket]):
+        """This method records the delivery of a spilled callback, committing the spill reads fully delivered.
+        :param ticket: the spill read the callback came from, if it was spilled.
+        :type ticket: _SpillTicket
+        """
+        if ticket is None:
+            return
+        with self._tickets_lock:
+            ticket.remaining -= 1
+            position = None
+            while self._tickets and not self._tickets[0].remaining:
+                position = self._tickets.popleft().position
+            if position is not None:
+                # tickets are only issued for reads from the spill.
+                assert self.spill is not None
+                self.spill.commit(position)
+
+    def _drain_spill(self):
+        """This method feeds spilled callbacks back into the pipeline until it is stopped and the spill is empty."""
+        while True:
+            self._spilled.wait()
+            self._draining = True
+            items, position = self.spill.read()
+            if not items:
+                self._draining = False
+                if self._stopping.is_set():
+                    return
+                self._spilled.clear()
+                if self.spill.pending:
+                    self._spilled.set()
+                continue
+            ticket = _SpillTicket(position, len(items))
+            with self._tickets_lock:
+                self._tickets.append(ticket)
+            for path, body in items:
+                parser = self.routes.get(path)
+                if parser is None:
+                    logg.error("Dropping spilled callback for unknown path: %s.", path)
+                    self._delivered(ticket)
+                    continue
+                self.queue.put((path, parser, body, ticket))
+            self._draining = False
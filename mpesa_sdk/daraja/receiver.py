@@ -0,0 +1,253 @@
+"""This module implements minimal WSGI and ASGI applications for receiving Daraja callbacks."""
+
+# standard imports
+import json
+import logging
+import os
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+from urllib.parse import urlparse
+
+# local imports
+from mpesa_sdk.daraja.b2c import B2CCallbackParser
+from mpesa_sdk.daraja.c2b import C2BConfirmationParser
+from mpesa_sdk.daraja.reverse import ReversalRequestCallbackParser
+from mpesa_sdk.daraja.stk import StkPushCallbackRequestParser
+from mpesa_sdk.daraja.transaction_status import TransactionStatusCallbackParser
+
+logg = logging.getLogger()
+
+ACKNOWLEDGEMENT = json.dumps({"ResultCode": 0, "ResultDesc": "Accepted"}).encode()
+
+CALLBACK_URL_PARSERS: dict[str, type] = {
+    "B2C_CALLBACK_URL": B2CCallbackParser,
+    "B2C_QUEUE_TIMEOUT_URL": B2CCallbackParser,
+    "C2B_CONFIRMATION_URL": C2BConfirmationParser,
+    "REVERSAL_CALLBACK_URL": ReversalRequestCallbackParser,
+    "REVERSAL_QUEUE_TIMEOUT_URL": ReversalRequestCallbackParser,
+    "STK_PUSH_CALLBACK_URL": StkPushCallbackRequestParser,
+    "TRANSACTION_STATUS_CALLBACK_URL": TransactionStatusCallbackParser,
+    "TRANSACTION_STATUS_QUEUE_TIMEOUT_URL": TransactionStatusCallbackParser,
+}
+
+_ACKNOWLEDGEMENT_HEADERS = [
+    ("Content-Type", "application/json"),
+    ("Content-Length", str(len(ACKNOWLEDGEMENT))),
+]
+_EMPTY_HEADERS = [("Content-Length", "0")]
+_ASGI_HEADERS = {
+    True: [
+        (key.lower().encode(), value.encode())
+        for key, value in _ACKNOWLEDGEMENT_HEADERS
+    ],
+    False: [(key.lower().encode(), value.encode()) for key, value in _EMPTY_HEADERS],
+}
+
+
+@dataclass
+class Callback:
+    """This class holds a decoded callback handed to the user's handler."""
+
+    path: str
+    parser: Any
+    result: Optional[dict]
+
+
+def callback_routes() -> dict[str, type]:
+    """This function maps the paths of the configured callback URLs to the parsers for their callbacks.
+    :return: the parser for each callback path.
+    :rtype: dict
+    """
+    routes = {}
+    for env, parser in CALLBACK_URL_PARSERS.items():
+        if url := os.getenv(env):
+            routes[urlparse(url).path or "/"] = parser
+    return routes
+
+
+class CallbackReceiver:
+    """This class receives Daraja callbacks and decodes them on a pool of worker threads.
+
+    Requests are acknowledged as soon as their body has been read and queued, so acknowledgement latency does not
+    depend on the cost of decoding or of the handler. Routes are looked up in a table precomputed from the
+    configured callback URLs. The receiver is served through its wsgi or asgi attribute.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Callback], Any],
+        routes: Optional[dict[str, type]] = None,
+        workers: int = 4,
+        queue_size: int = 10000,
+        on_receive: Optional[Callable[[str, bytes], Any]] = None,
+    ):
+        """This method initializes the callback receiver.
+        :param handler: the function called with each decoded callback.
+        :type handler: Callable
+        :param routes: the parser for each callback path, derived from the callback URL environment variables
+        when omitted.
+        :type routes: dict
+        :param workers: the number of decoding threads.
+        :type workers: int
+        :param queue_size: the maximum number of callbacks waiting to be decoded.
+        :type queue_size: int
+        :param on_receive: a function called with the path and raw body of each routed callback before it is
+        queued, e.g. a TraceRecorder's record_callback.
+        :type on_receive: Callable
+        """
+        self.handler = handler
+        self.routes = callback_routes() if routes is None else routes
+        self.workers = workers
+        self.on_receive = on_receive
+        self.queue: queue.Queue = queue.Queue(queue_size)
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        """This method starts the decoding threads if they are not running."""
+        with self._lock:
+            if self._threads:
+                return
+            self._threads = [
+                threading.Thread(
+                    target=self._work, name=f"mpesa-callback-{index}", daemon=True
+                )
+                for index in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self):
+        """This method decodes the queued callbacks and stops the decoding threads."""
+        with self._lock:
+            for _ in self._threads:
+                self.queue.put(None)
+            for thread in self._threads:
+                thread.join()
+            self._threads = []
+
+    def join(self):
+        """This method blocks until every queued callback has been handled."""
+        self.queue.join()
+
+    def submit(self, path: str, body: bytes) -> bool:
+        """This method queues a callback body for decoding.
+        :param path: the path the callback was received on.
+        :type path: str
+        :param body: the raw callback body.
+        :type body: bytes
+        :return: whether the callback was accepted.
+        :rtype: bool
+        """
+        parser = self.routes.get(path)
+        if parser is None:
+            return False
+        if self.on_receive is not None:
+            self.on_receive(path, body)
+        if not self._threads:
+            self.start()
+        try:
+            self.queue.put_nowait((path, parser, body))
+        except queue.Full:
+            logg.error("Callback queue is full, rejecting callback on: %s.", path)
+            return False
+        return True
+
+    def handle(self, path: str, parser: type, body: bytes):
+        """This method decodes a callback body and hands the result to the handler.
+        :param path: the path the callback was received on.
+        :type path: str
+        :param parser: the parser class for the callback.
+        :type parser: type
+        :param body: the raw callback body.
+        :type body: bytes
+        """
+        instance = parser(json.loads(body))
+        self.handler(Callback(path, instance, instance.parse()))
+
+    def _work(self):
+        """This method decodes queued callbacks until it receives a sentinel."""
+        while (item := self.queue.get()) is not None:
+            try:
+                self.handle(*item)
+            except Exception:  # pylint: disable=broad-except
+                logg.exception("Failed to handle callback received on: %s.", item[0])
+            finally:
+                self.queue.task_done()
+        self.queue.task_done()
+
+    def wsgi(self, environ: dict, start_response: Callable) -> list[bytes]:
+        """This method is the WSGI application.
+        :param environ: the WSGI environment.
+        :type environ: dict
+        :param start_response: the WSGI start_response callable.
+        :type start_response: Callable
+        :return: the response body.
+        :rtype: list
+        """
+        path = environ.get("PATH_INFO") or "/"
+        if path not in self.routes:
+            start_response("404 Not Found", _EMPTY_HEADERS)
+            return [b""]
+        if environ.get("REQUEST_METHOD") != "POST":
+            start_response("405 Method Not Allowed", _EMPTY_HEADERS)
+            return [b""]
+
+        length = int(environ.get("CONTENT_LENGTH") or 0)
+        body = environ["wsgi.input"].read(length)
+        if not self.submit(path, body):
+            start_response("503 Service Unavailable", _EMPTY_HEADERS)
+            return [b""]
+        start_response("200 OK", _ACKNOWLEDGEMENT_HEADERS)
+        return [ACKNOWLEDGEMENT]
+
+    async def asgi(self, scope: dict, receive: Callable, send: Callable):
+        """This method is the ASGI application.
+        :param scope: the ASGI connection scope.
+        :type scope: dict
+        :param receive: the ASGI receive callable.
+        :type receive: Callable
+        :param send: the ASGI send callable.
+        :type send: Callable
+        """
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    self.start()
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    self.stop()
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        path = scope.get("path") or "/"
+        if path not in self.routes:
+            status = 404
+        elif scope.get("method") != "POST":
+            status = 405
+        else:
+            body = bytearray()
+            more_body = True
+            while more_body:
+                message = await receive()
+                body.extend(message.get("body", b""))
+                more_body = message.get("more_body", False)
+            status = 200 if self.submit(path, bytes(body)) else 503
+
+        accepted = status == 200
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": _ASGI_HEADERS[accepted],
+            }
+        )
+        await send(
+            {
+                "type": "http.response.body",
+                "body": ACKNOWLEDGEMENT if accepted else b"",
+            }
+        )
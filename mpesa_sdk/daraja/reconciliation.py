@@ -0,0 +1,385 @@
+"""This module reconciles parsed Daraja callbacks against M-Pesa statement exports."""
+
+# standard imports
+import csv
+import json
+import logging
+import os
+import tempfile
+import zlib
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from typing import Any, Iterable, Iterator, NamedTuple, Optional
+
+# local imports
+from .files import open_payout_file
+
+logg = logging.getLogger()
+
+AUTO_BACKEND = "auto"
+NUMPY_BACKEND = "numpy"
+PYTHON_BACKEND = "python"
+
+
+class LedgerEntry(NamedTuple):
+    """This class holds a transaction reference and its amount in cents."""
+
+    reference: str
+    amount: int
+
+
+@dataclass
+class AmountMismatch:
+    """This class holds a transaction whose amount differs between the callbacks and the statement."""
+
+    reference: str
+    callback_amount: Decimal
+    statement_amount: Decimal
+
+
+@dataclass
+class ReconciliationReport:
+    """This class holds the outcome of a reconciliation run."""
+
+    matched: int = 0
+    amount_mismatches: list[AmountMismatch] = field(default_factory=list)
+    missing_from_statement: list[str] = field(default_factory=list)
+    missing_from_callbacks: list[str] = field(default_factory=list)
+    duplicate_callbacks: list[str] = field(default_factory=list)
+    duplicate_statement: list[str] = field(default_factory=list)
+
+    @property
+    def balanced(self) -> bool:
+        """This method checks whether every transaction was matched exactly once on both sides."""
+        return not (
+            self.amount_mismatches
+            or self.missing_from_statement
+            or self.missing_from_callbacks
+            or self.duplicate_callbacks
+            or self.duplicate_statement
+        )
+
+    def merge(self, other: "ReconciliationReport"):
+        """This method adds the outcome of another reconciliation run, e.g. of another partition.
+        :param other: the other report.
+        :type other: ReconciliationReport
+        """
+        self.matched += other.matched
+        self.amount_mismatches.extend(other.amount_mismatches)
+        self.missing_from_statement.extend(other.missing_from_statement)
+        self.missing_from_callbacks.extend(other.missing_from_callbacks)
+        self.duplicate_callbacks.extend(other.duplicate_callbacks)
+        self.duplicate_statement.extend(other.duplicate_statement)
+
+
+def to_cents(value: Any) -> Optional[int]:
+    """This function converts an amount as found in callbacks and statements to whole cents.
+    :param value: the amount, e.g. 100, "1,000.50" or "-250.00".
+    :type value: Any
+    :return: the absolute amount in cents, None if the value is not an amount.
+    :rtype: int
+    """
+    if value is None or value == "":
+        return None
+    try:
+        amount = Decimal(str(value).replace(",", "").strip())
+    except InvalidOperation:
+        return None
+    if not amount.is_finite():
+        return None
+    return abs(int(amount.scaleb(2).to_integral_value()))
+
+
+def _from_cents(amount: int) -> Decimal:
+    return Decimal(amount).scaleb(-2)
+
+
+def callback_entries(records: Iterable[dict]) -> Iterator[LedgerEntry]:
+    """This function extracts ledger entries from parsed callbacks, skipping failed transactions.
+
+    Both the flat records returned by the C2B parsers and the records returned by BaseCallbackParser and the STK
+    push callback parser, which carry the transaction details under data, are supported.
+    :param records: the parsed callbacks.
+    :type records: Iterable
+    :return: the ledger entries.
+    :rtype: Iterator
+    """
+    for record in records:
+        if record.get("success") is False:
+            continue
+        data = record.get("data") or {}
+        reference = (
+            record.get("transaction_id")
+            or data.get("transaction_receipt")
+            or data.get("mpesa_receipt_number")
+        )
+        amount = to_cents(
+            record.get("amount", data.get("transaction_amount", data.get("amount")))
+        )
+        if reference and amount is not None:
+            yield LedgerEntry(str(reference), amount)
+
+
+def read_callbacks(path: str) -> Iterator[dict]:
+    """This function streams parsed callbacks from a JSON lines file, which may be gzip compressed.
+    :param path: the path to the file.
+    :type path: str
+    :return: the parsed callbacks.
+    :rtype: Iterator
+    """
+    with open_payout_file(path) as stream:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+
+def statement_entries(
+    path: str,
+    reference_column: str = "Receipt No.",
+    paid_in_column: str = "Paid In",
+    withdrawn_column: str = "Withdrawn",
+    status_column: str = "Transaction Status",
+) -> Iterator[LedgerEntry]:
+    """This function streams ledger entries from an M-Pesa statement CSV export, which may be gzip compressed.
+    :param path: the path to the statement.
+    :type path: str
+    :param reference_column: the column holding the receipt number.
+    :type reference_column: str
+    :param paid_in_column: the column holding amounts paid in.
+    :type paid_in_column: str
+    :param withdrawn_column: the column holding amounts withdrawn.
+    :type withdrawn_column: str
+    :param status_column: the column holding the transaction status, only completed transactions are kept.
+    :type status_column: str
+    :return: the ledger entries.
+    :rtype: Iterator
+    """
+    with open_payout_file(path) as stream:
+        for row in csv.DictReader(stream):
+            status = row.get(status_column)
+            if status and status.strip().lower() != "completed":
+                continue
+            reference = (row.get(reference_column) or "").strip()
+            amount = to_cents(row.get(paid_in_column)) or to_cents(
+                row.get(withdrawn_column)
+            )
+            if reference and amount is not None:
+                yield LedgerEntry(reference, amount)
+
+
+def _import_numpy():
+    """This function imports NumPy, returning None when it is not installed."""
+    try:
+        import numpy  # pylint: disable=import-outside-toplevel
+
+        return numpy
+    except ImportError:
+        return None
+
+
+def _first_occurrences(
+    entries: Iterable[LedgerEntry],
+) -> tuple[dict[str, int], list[str]]:
+    """This function indexes entries by reference, keeping the first occurrence of each.
+    :param entries: the ledger entries.
+    :type entries: Iterable
+    :return: the amount of each reference and the references that occur more than once.
+    :rtype: tuple
+    """
+    amounts: dict[str, int] = {}
+    duplicates = set()
+    for reference, amount in entries:
+        if reference in amounts:
+            duplicates.add(reference)
+        else:
+            amounts[reference] = amount
+    return amounts, sorted(duplicates)
+
+
+def _reconcile_python(
+    callbacks: Iterable[LedgerEntry], statement: Iterable[LedgerEntry]
+) -> ReconciliationReport:
+    """This function reconciles two sets of ledger entries with dictionaries."""
+    callback_amounts, duplicate_callbacks = _first_occurrences(callbacks)
+    statement_amounts, duplicate_statement = _first_occurrences(statement)
+    report = ReconciliationReport(
+        duplicate_callbacks=duplicate_callbacks,
+        duplicate_statement=duplicate_statement,
+    )
+    for reference in sorted(callback_amounts):
+        statement_amount = statement_amounts.get(reference)
+        if statement_amount is None:
+            report.missing_from_statement.append(reference)
+        elif statement_amount == callback_amounts[reference]:
+            report.matched += 1
+        else:
+            report.amount_mismatches.append(
+                AmountMismatch(
+                    reference,
+                    _from_cents(callback_amounts[reference]),
+                    _from_cents(statement_amount),
+                )
+            )
+    report.missing_from_callbacks = sorted(
+        statement_amounts.keys() - callback_amounts.keys()
+    )
+    return report
+
+
+def _reconcile_numpy(
+    numpy, callbacks: Iterable[LedgerEntry], statement: Iterable[LedgerEntry]
+) -> ReconciliationReport:
+    """This function reconciles two sets of ledger entries with sorted NumPy arrays."""
+
+    def index(entries):
+        entries = list(entries)
+        references = numpy.array([entry[0] for entry in entries], dtype=str)
+        amounts = numpy.array([entry[1] for entry in entries], dtype=numpy.int64)
+        unique, first, counts = numpy.unique(
+            references, return_index=True, return_counts=True
+        )
+        return unique, amounts[first], unique[counts > 1]
+
+    callback_references, callback_amounts, duplicate_callbacks = index(callbacks)
+    statement_references, statement_amounts, duplicate_statement = index(statement)
+    _, callback_index, statement_index = numpy.intersect1d(
+        callback_references,
+        statement_references,
+        assume_unique=True,
+        return_indices=True,
+    )
+    mismatched = callback_amounts[callback_index] != statement_amounts[statement_index]
+    return ReconciliationReport(
+        matched=int(numpy.count_nonzero(~mismatched)),
+        amount_mismatches=[
+            AmountMismatch(
+                str(callback_references[left]),
+                _from_cents(int(callback_amounts[left])),
+                _from_cents(int(statement_amounts[right])),
+            )
+            for left, right in zip(
+                callback_index[mismatched], statement_index[mismatched]
+            )
+        ],
+        missing_from_statement=numpy.setdiff1d(
+            callback_references, statement_references, assume_unique=True
+        ).tolist(),
+        missing_from_callbacks=numpy.setdiff1d(
+            statement_references, callback_references, assume_unique=True
+        ).tolist(),
+        duplicate_callbacks=duplicate_callbacks.tolist(),
+        duplicate_statement=duplicate_statement.tolist(),
+    )
+
+
+class Reconciler:
+    """This class reconciles parsed callbacks against statement entries by transaction reference.
+
+    With a single partition both sides are indexed in memory. With more partitions both streams are first
+    hash-partitioned by reference into files on disk, so every occurrence of a reference lands in the same
+    partition, and the partitions are then reconciled one at a time; memory use is bounded by the size of the
+    largest partition rather than by the size of the inputs. Partitions are reconciled with sorted NumPy arrays
+    when NumPy is installed and with dictionaries otherwise.
+    """
+
+    def __init__(
+        self,
+        partitions: int = 1,
+        workdir: Optional[str] = None,
+        backend: str = AUTO_BACKEND,
+    ):
+        """This method initializes the reconciler.
+        :param partitions: the number of partitions the inputs are split into on disk, 1 to work in memory.
+        :type partitions: int
+        :param workdir: the directory partition files are written to, a temporary directory when omitted.
+        :type workdir: str
+        :param backend: auto, numpy or python.
+        :type backend: str
+        """
+        self.partitions = partitions
+        self.workdir = workdir
+        self.numpy = None
+        if backend in (AUTO_BACKEND, NUMPY_BACKEND):
+            self.numpy = _import_numpy()
+            if self.numpy is None and backend == NUMPY_BACKEND:
+                raise ImportError(
+                    "The numpy backend requires NumPy, install python-mpesa-sdk[reconciliation]."
+                )
+        elif backend != PYTHON_BACKEND:
+            raise ValueError(f"Unknown reconciliation backend: {backend}.")
+
+    def reconcile(
+        self, callbacks: Iterable[LedgerEntry], statement: Iterable[LedgerEntry]
+    ) -> ReconciliationReport:
+        """This method reconciles callbacks against statement entries.
+        :param callbacks: the ledger entries from parsed callbacks.
+        :type callbacks: Iterable
+        :param statement: the ledger entries from the statement.
+        :type statement: Iterable
+        :return: the reconciliation report.
+        :rtype: ReconciliationReport
+        """
+        if self.partitions <= 1:
+            return self._reconcile_partition(callbacks, statement)
+
+        report = ReconciliationReport()
+        with tempfile.TemporaryDirectory(dir=self.workdir) as workdir:
+            callback_paths = self._partition(callbacks, workdir, "callbacks")
+            statement_paths = self._partition(statement, workdir, "statement")
+            for callback_path, statement_path in zip(callback_paths, statement_paths):
+                report.merge(
+                    self._reconcile_partition(
+                        self._read_partition(callback_path),
+                        self._read_partition(statement_path),
+                    )
+                )
+        for references in (
+            report.missing_from_statement,
+            report.missing_from_callbacks,
+            report.duplicate_callbacks,
+            report.duplicate_statement,
+        ):
+            references.sort()
+        report.amount_mismatches.sort(key=lambda mismatch: mismatch.reference)
+        return report
+
+    def _reconcile_partition(
+        self, callbacks: Iterable[LedgerEntry], statement: Iterable[LedgerEntry]
+    ) -> ReconciliationReport:
+        if self.numpy is not None:
+            return _reconcile_numpy(self.numpy, callbacks, statement)
+        return _reconcile_python(callbacks, statement)
+
+    def _partition(
+        self, entries: Iterable[LedgerEntry], workdir: str, side: str
+    ) -> list[str]:
+        """This method writes ledger entries to partition files by hash of their reference.
+        :param entries: the ledger entries.
+        :type entries: Iterable
+        :param workdir: the directory partition files are written to.
+        :type workdir: str
+        :param side: the name of the side the entries come from.
+        :type side: str
+        :return: the paths of the partition files.
+        :rtype: list
+        """
+        paths = [
+            os.path.join(workdir, f"{side}-{partition}.tsv")
+            for partition in range(self.partitions)
+        ]
+        files = [open(path, "w", encoding="utf-8") for path in paths]
+        try:
+            for reference, amount in entries:
+                partition = zlib.crc32(reference.encode()) % self.partitions
+                files[partition].write(f"{reference}\t{amount}\n")
+        finally:
+            for partition_file in files:
+                partition_file.close()
+        return paths
+
+    @staticmethod
+    def _read_partition(path: str) -> Iterator[LedgerEntry]:
+        with open(path, encoding="utf-8") as partition_file:
+            for line in partition_file:
+                reference, amount = line.rstrip("\n").split("\t")
+                yield LedgerEntry(reference, int(amount))
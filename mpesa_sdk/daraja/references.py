@@ -0,0 +1,157 @@
+"""This module implements an in-memory index of valid account references for C2B validation."""
+
+# standard imports
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+logg = logging.getLogger()
+
+PREFIX_WILDCARD = "*"
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    """This class holds an immutable generation of the reference index."""
+
+    references: frozenset
+    prefixes: tuple
+    mtime: Optional[float] = None
+
+
+class ReferenceIndex:
+    """This class answers whether an account reference, e.g. a C2B BillRefNumber, is valid.
+
+    References are held in a frozenset and prefix rules in a tuple, so a lookup is a hash probe followed by a
+    single str.startswith call. Reloading builds a new generation off to the side and swaps it in with one
+    attribute assignment, so lookups never wait on a reload and never observe a partially loaded index. In a
+    reference file, each line holds one reference, a line ending with * is a prefix rule and lines starting with #
+    are ignored. The index plugs into C2B validation through mpesa_sdk.daraja.c2b.account_rule.
+    """
+
+    def __init__(
+        self,
+        references: Iterable[str] = (),
+        prefixes: Iterable[str] = (),
+        case_sensitive: bool = False,
+        path: Optional[str] = None,
+    ):
+        """This method initializes the reference index.
+        :param references: the valid account references.
+        :type references: Iterable
+        :param prefixes: the prefixes a valid account reference may start with.
+        :type prefixes: Iterable
+        :param case_sensitive: whether references are matched case sensitively.
+        :type case_sensitive: bool
+        :param path: the reference file the index is reloaded from.
+        :type path: str
+        """
+        self.case_sensitive = case_sensitive
+        self.path = path
+        self._reload_lock = threading.Lock()
+        self._snapshot = self._build(references, prefixes)
+
+    @classmethod
+    def from_file(cls, path: str, case_sensitive: bool = False) -> "ReferenceIndex":
+        """This method creates a reference index from a reference file.
+        :param path: the reference file.
+        :type path: str
+        :param case_sensitive: whether references are matched case sensitively.
+        :type case_sensitive: bool
+        :return: the reference index.
+        :rtype: ReferenceIndex
+        """
+        index = cls(case_sensitive=case_sensitive, path=path)
+        index.reload()
+        return index
+
+    def __contains__(self, reference: object) -> bool:
+        if not isinstance(reference, str):
+            return False
+        snapshot = self._snapshot
+        key = self.normalize(reference)
+        return key in snapshot.references or (
+            bool(snapshot.prefixes) and key.startswith(snapshot.prefixes)
+        )
+
+    def __len__(self) -> int:
+        return len(self._snapshot.references)
+
+    def normalize(self, reference: str) -> str:
+        """This method normalizes an account reference as entered by a customer.
+        :param reference: the account reference.
+        :type reference: str
+        :return: the normalized account reference.
+        :rtype: str
+        """
+        reference = reference.strip()
+        return reference if self.case_sensitive else reference.upper()
+
+    def load(self, references: Iterable[str], prefixes: Iterable[str] = ()):
+        """This method atomically replaces the indexed references.
+        :param references: the valid account references.
+        :type references: Iterable
+        :param prefixes: the prefixes a valid account reference may start with.
+        :type prefixes: Iterable
+        """
+        snapshot = self._build(references, prefixes)
+        with self._reload_lock:
+            self._snapshot = snapshot
+
+    def reload(self):
+        """This method atomically replaces the indexed references with the contents of the reference file."""
+        if self.path is None:
+            raise ValueError("A reference file is required to reload the index.")
+        with self._reload_lock:
+            mtime = os.path.getmtime(self.path)
+            references, prefixes = [], []
+            with open(self.path, encoding="utf-8") as reference_file:
+                for line in reference_file:
+                    line = line.strip()
+                    if not line or line.startswith("#"):
+                        continue
+                    if line.endswith(PREFIX_WILDCARD):
+                        prefixes.append(line[:-1])
+                    else:
+                        references.append(line)
+            self._snapshot = self._build(references, prefixes, mtime)
+        logg.info(
+            "Loaded %s account references and %s prefix rules from: %s.",
+            len(references),
+            len(prefixes),
+            self.path,
+        )
+
+    def reload_if_changed(self) -> bool:
+        """This method reloads the reference file if it was modified since it was last loaded.
+        :return: whether the index was reloaded.
+        :rtype: bool
+        """
+        if self.path is None or os.path.getmtime(self.path) == self._snapshot.mtime:
+            return False
+        self.reload()
+        return True
+
+    def _build(
+        self,
+        references: Iterable[str],
+        prefixes: Iterable[str],
+        mtime: Optional[float] = None,
+    ) -> _Snapshot:
+        """This method builds a generation of the index.
+        :param references: the valid account references.
+        :type references: Iterable
+        :param prefixes: the prefixes a valid account reference may start with.
+        :type prefixes: Iterable
+        :param mtime: the modification time of the reference file the generation was loaded from.
+        :type mtime: float
+        :return: the generation.
+        :rtype: _Snapshot
+        """
+        return _Snapshot(
+            frozenset(self.normalize(reference) for reference in references),
+            tuple(sorted({self.normalize(prefix) for prefix in prefixes if prefix})),
+            mtime,
+        )
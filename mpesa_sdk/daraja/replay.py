@@ -0,0 +1,683 @@
+"""This module records Daraja traffic and replays it to measure the SDK's performance.
+
+A recording transport wraps the transport requests are made with and appends every exchange, together with the
+callbacks handed to it, e.g. by a CallbackReceiver's on_receive hook, to a gzip compressed JSON lines trace. Values
+that identify customers or grant access are redacted before they are written: credentials and names are replaced,
+and phone numbers are replaced by stable pseudonyms, so a trace keeps its traffic mix, e.g. repeat customers,
+without personal data.
+
+The replay runner sends the recorded payloads through the request builders and parses the recorded responses and
+callbacks with the SDK's parsers, against an in-process stand-in that answers each request with its recorded
+response. Events are replayed at their original pace, a multiple of it, or as fast as possible, and the runner
+reports throughput, latency percentiles per endpoint and, optionally, memory allocations, so the results of two SDK
+versions replaying the same trace can be compared.
+"""
+
+# standard imports
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import IO, Any, Iterable, Iterator, Optional, Union
+from urllib.parse import urlparse
+
+# local imports
+from mpesa_sdk.transport import (
+    AsyncTransport,
+    Transport,
+    TransportResponse,
+    encode_body,
+)
+from .auth import AccessTokenCache
+from .b2c import B2CPaymentRequest, B2CPaymentResponseParser
+from .c2b import C2BRegisterUrlRequest, C2BRegisterUrlResponseParser
+from .receiver import CALLBACK_URL_PARSERS
+from .reverse import ReversalRequest, ReversalResponseParser
+from .stk import (
+    StkPushPaymentRequest,
+    StkPushPaymentResponseParser,
+    StkPushRequestInterface,
+    StkPushStatusQueryRequest,
+    StkPushStatusQueryResponseParser,
+)
+from .transaction_status import (
+    TransactionStatusQueryRequest,
+    TransactionStatusResponseParser,
+)
+
+logg = logging.getLogger()
+
+CALLBACK = "callback"
+REQUEST = "request"
+
+# the request builder and response parser of each endpoint, keyed by the environment variable holding its URL.
+ENDPOINTS: dict[str, tuple[type, type]] = {
+    builder.URL_ENV: (builder, parser)
+    for builder, parser in (
+        (B2CPaymentRequest, B2CPaymentResponseParser),
+        (C2BRegisterUrlRequest, C2BRegisterUrlResponseParser),
+        (ReversalRequest, ReversalResponseParser),
+        (StkPushPaymentRequest, StkPushPaymentResponseParser),
+        (StkPushStatusQueryRequest, StkPushStatusQueryResponseParser),
+        (TransactionStatusQueryRequest, TransactionStatusResponseParser),
+    )
+}
+OAUTH_ENDPOINT = "OAUTH_URL"
+
+REDACTED = "REDACTED"
+REDACTED_KEYS = frozenset(
+    {
+        "access_token",
+        "CreditPartyName",
+        "CreditPartyPublicName",
+        "DebitPartyName",
+        "FirstName",
+        "LastName",
+        "MiddleName",
+        "Password",
+        "ReceiverPartyPublicName",
+        "SecurityCredential",
+    }
+)
+_MSISDN = re.compile(r"^254[17]\d{8}$")
+
+
+class Redactor:
+    """This class removes personal data and credentials from recorded bodies.
+
+    The values of REDACTED_KEYS, including those of callback items named by a Key or Name field, are replaced, and
+    every value that is a Kenyan MSISDN is replaced by a pseudonym derived from it, so the same customer keeps the
+    same pseudonym throughout a trace. Pseudonyms are keyed with a random salt unless one is passed, since the few
+    hundred million Kenyan MSISDNs could otherwise be hashed to reverse them; pass the same secret salt to keep
+    pseudonyms stable across traces.
+    """
+
+    def __init__(
+        self,
+        keys: Iterable[str] = REDACTED_KEYS,
+        salt: Optional[Union[str, bytes]] = None,
+    ):
+        """This method initializes the redactor.
+        :param keys: the keys whose values are replaced.
+        :type keys: Iterable
+        :param salt: a secret mixed into pseudonyms, a random one generated for this redactor when omitted.
+        :type salt: str | bytes
+        """
+        self.keys = frozenset(keys)
+        if salt is None:
+            salt = os.urandom(16)
+        self.salt = salt.encode("utf-8") if isinstance(salt, str) else salt
+
+    def __call__(self, value: Any) -> Any:
+        """This method returns a redacted copy of a value.
+        :param value: the decoded body.
+        :type value: Any
+        :return: the redacted body.
+        :rtype: Any
+        """
+        if isinstance(value, dict):
+            keys = self.keys
+            redacted = {
+                key: REDACTED if key in keys else self(item)
+                for key, item in value.items()
+            }
+            name = value.get("Key", value.get("Name"))
+            if isinstance(name, str) and name in keys and "Value" in value:
+                redacted["Value"] = REDACTED
+            return redacted
+        if isinstance(value, list):
+            return [self(item) for item in value]
+        if isinstance(value, (str, int)) and not isinstance(value, bool):
+            text = str(value)
+            if _MSISDN.match(text):
+                pseudonym = self.msisdn(text)
+                return pseudonym if isinstance(value, str) else int(pseudonym)
+        return value
+
+    def msisdn(self, msisdn: str) -> str:
+        """This method derives the pseudonym of an MSISDN.
+        :param msisdn: the MSISDN, e.g. 254712345678.
+        :type msisdn: str
+        :return: a valid looking MSISDN in the 2547 range.
+        :rtype: str
+        """
+        digest = hashlib.blake2b(
+            msisdn.encode("utf-8"), digest_size=8, key=self.salt
+        ).digest()
+        return f"2547{int.from_bytes(digest, 'big') % 10 ** 8:08d}"
+
+
+@dataclass(frozen=True, slots=True)
+class TraceEvent:
+    """This class holds a recorded exchange or callback."""
+
+    at: float
+    kind: str
+    endpoint: Optional[str]
+    method: Optional[str] = None
+    url: Optional[str] = None
+    status: Optional[int] = None
+    latency: float = 0.0
+    request: Any = None
+    response: Any = None
+
+
+def _decode(body: Any) -> Any:
+    """This function decodes a raw body as JSON, falling back to its text.
+    :param body: the raw body.
+    :type body: Any
+    :return: the decoded body.
+    :rtype: Any
+    """
+    if not body:
+        return None
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", errors="replace")
+    if not isinstance(body, str):
+        return body
+    try:
+        return json.loads(body)
+    except ValueError:
+        return body
+
+
+def _endpoints() -> dict[str, str]:
+    """This function maps the configured API URLs to the environment variables holding them.
+    :return: the endpoint of each URL.
+    :rtype: dict
+    """
+    return {
+        url: endpoint
+        for endpoint in (OAUTH_ENDPOINT, *ENDPOINTS)
+        if (url := os.getenv(endpoint))
+    }
+
+
+class TraceRecorder:
+    """This class appends redacted exchanges and callbacks to a trace file."""
+
+    def __init__(self, path: str, redactor: Optional[Redactor] = None):
+        """This method initializes the recorder, replacing an existing trace.
+        :param path: the path to the trace file.
+        :type path: str
+        :param redactor: the redactor applied to every body, defaults to one redacting REDACTED_KEYS.
+        :type redactor: Redactor
+        """
+        self.path = path
+        self.redactor = redactor or Redactor()
+        self.recorded = 0
+        self._file: IO[str] = gzip.open(path, "wt", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+
+    def __enter__(self) -> "TraceRecorder":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def record(self, event: TraceEvent):
+        """This method appends an event to the trace.
+        :param event: the event.
+        :type event: TraceEvent
+        """
+        line = json.dumps(
+            {key: value for key, value in asdict(event).items() if value is not None},
+            separators=(",", ":"),
+        )
+        with self._lock:
+            self._file.write(line + "\n")
+            self.recorded += 1
+
+    def record_exchange(
+        self,
+        method: str,
+        url: str,
+        body: Any,
+        response: TransportResponse,
+        latency: float,
+    ):
+        """This method records a request and its response. Headers are not recorded.
+        :param method: the HTTP method.
+        :type method: str
+        :param url: the URL.
+        :type url: str
+        :param body: the JSON serializable or raw request body.
+        :type body: Any
+        :param response: the response.
+        :type response: TransportResponse
+        :param latency: the time the request took in seconds.
+        :type latency: float
+        """
+        redact = self.redactor
+        self.record(
+            TraceEvent(
+                round(time.monotonic() - self._started - latency, 6),
+                REQUEST,
+                _endpoints().get(url),
+                method,
+                url,
+                response.status_code,
+                round(latency, 6),
+                redact(_decode(body)),
+                redact(_decode(response.content)),
+            )
+        )
+
+    def record_callback(self, path: str, body: bytes):
+        """This method records a callback, it can be used as a CallbackReceiver's on_receive hook.
+        :param path: the path the callback was received on.
+        :type path: str
+        :param body: the raw callback body.
+        :type body: bytes
+        """
+        endpoints = {
+            urlparse(url).path or "/": env
+            for env in reversed(CALLBACK_URL_PARSERS)
+            if (url := os.getenv(env))
+        }
+        self.record(
+            TraceEvent(
+                round(time.monotonic() - self._started, 6),
+                CALLBACK,
+                endpoints.get(path),
+                url=path,
+                request=self.redactor(_decode(body)),
+            )
+        )
+
+    def transport(self, transport: Transport) -> "RecordingTransport":
+        """This method wraps a transport so that its exchanges are recorded.
+        :param transport: the transport.
+        :type transport: Transport
+        :return: the recording transport.
+        :rtype: RecordingTransport
+        """
+        return RecordingTransport(transport, self)
+
+    def async_transport(self, transport: AsyncTransport) -> "AsyncRecordingTransport":
+        """This method wraps an asynchronous transport so that its exchanges are recorded.
+        :param transport: the asynchronous transport.
+        :type transport: AsyncTransport
+        :return: the recording transport.
+        :rtype: AsyncRecordingTransport
+        """
+        return AsyncRecordingTransport(transport, self)
+
+    def close(self):
+        """This method closes the trace file."""
+        with self._lock:
+            self._file.close()
+
+
+class RecordingTransport(Transport):
+    """This class implements a transport that records the exchanges of the transport it wraps."""
+
+    def __init__(self, transport: Transport, recorder: TraceRecorder):
+        """This method initializes the recording transport.
+        :param transport: the transport requests are sent with.
+        :type transport: Transport
+        :param recorder: the recorder exchanges are appended to.
+        :type recorder: TraceRecorder
+        """
+        self.transport = transport
+        self.recorder = recorder
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[dict[str, str]] = None,
+        json: Any = None,
+        data: Any = None,
+        timeout: float = 2,
+    ) -> TransportResponse:
+        started = time.perf_counter()
+        response = self.transport.request(
+            method, url, headers=headers, json=json, data=data, timeout=timeout
+        )
+        self.recorder.record_exchange(
+            method,
+            url,
+            json if json is not None else data,
+            response,
+            time.perf_counter() - started,
+        )
+        return response
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncRecordingTransport(AsyncTransport):
+    """This class implements an asynchronous transport that records the exchanges of the transport it wraps."""
+
+    def __init__(self, transport: AsyncTransport, recorder: TraceRecorder):
+        """This method initializes the recording transport.
+        :param transport: the asynchronous transport requests are sent with.
+        :type transport: AsyncTransport
+        :param recorder: the recorder exchanges are appended to.
+        :type recorder: TraceRecorder
+        """
+        self.transport = transport
+        self.recorder = recorder
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[dict[str, str]] = None,
+        json: Any = None,
+        data: Any = None,
+        timeout: float = 2,
+    ) -> TransportResponse:
+        started = time.perf_counter()
+        response = await self.transport.request(
+            method, url, headers=headers, json=json, data=data, timeout=timeout
+        )
+        self.recorder.record_exchange(
+            method,
+            url,
+            json if json is not None else data,
+            response,
+            time.perf_counter() - started,
+        )
+        return response
+
+    async def close(self):
+        await self.transport.close()
+
+
+def read_trace(path: str) -> Iterator[TraceEvent]:
+    """This function streams the events of a trace file.
+    :param path: the path to the trace file.
+    :type path: str
+    :return: an iterator of events, in the order they were recorded.
+    :rtype: Iterator[TraceEvent]
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield TraceEvent(**json.loads(line))
+
+
+def _percentile(latencies: list[float], percentile: float) -> float:
+    return latencies[min(len(latencies) - 1, int(percentile * len(latencies)))]
+
+
+@dataclass
+class ReplayReport:
+    """This class holds the measurements of a replay."""
+
+    sdk_version: str
+    speed: Optional[float]
+    events: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+    latencies: dict[str, list[float]] = field(default_factory=dict)
+    peak_memory: Optional[int] = None
+    retained_blocks: Optional[int] = None
+    allocation_sites: list[tuple[str, int, int]] = field(default_factory=list)
+
+    @property
+    def throughput(self) -> float:
+        """This property returns the number of events replayed per second.
+        :return: the throughput.
+        :rtype: float
+        """
+        return self.events / self.elapsed if self.elapsed else 0.0
+
+    def latency_summary(self) -> dict[str, dict[str, float]]:
+        """This method summarizes the latency distribution of each endpoint.
+        :return: the count, mean, p50, p90, p99 and max latency in seconds per endpoint.
+        :rtype: dict
+        """
+        summary = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            ordered = sorted(latencies)
+            summary[endpoint] = {
+                "count": len(ordered),
+                "mean": sum(ordered) / len(ordered),
+                "p50": _percentile(ordered, 0.5),
+                "p90": _percentile(ordered, 0.9),
+                "p99": _percentile(ordered, 0.99),
+                "max": ordered[-1],
+            }
+        return summary
+
+    def as_dict(self) -> dict[str, Any]:
+        """This method returns the report without the raw latencies, e.g. to store as a baseline.
+        :return: the report.
+        :rtype: dict
+        """
+        return {
+            "sdk_version": self.sdk_version,
+            "speed": self.speed,
+            "events": self.events,
+            "errors": self.errors,
+            "elapsed": self.elapsed,
+            "throughput": self.throughput,
+            "latency": self.latency_summary(),
+            "peak_memory": self.peak_memory,
+            "retained_blocks": self.retained_blocks,
+            "allocation_sites": self.allocation_sites,
+        }
+
+
+class ReplayTransport(Transport):
+    """This class implements the stand-in that answers each replayed request with its recorded response.
+
+    The event being replayed is set per thread by the replay runner. Token requests are answered with a fixed token.
+    """
+
+    TOKEN = {"access_token": "replay", "expires_in": "3599"}
+
+    def __init__(self, speed: Optional[float] = None):
+        """This method initializes the replay transport.
+        :param speed: the factor recorded latencies are divided by, None to answer immediately.
+        :type speed: float
+        """
+        self.speed = speed
+        self._current = threading.local()
+
+    @property
+    def event(self) -> Optional[TraceEvent]:
+        """This property returns the event being replayed on the calling thread.
+        :return: the event.
+        :rtype: TraceEvent
+        """
+        return getattr(self._current, "event", None)
+
+    @event.setter
+    def event(self, event: Optional[TraceEvent]):
+        self._current.event = event
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[dict[str, str]] = None,
+        json: Any = None,
+        data: Any = None,
+        timeout: float = 2,
+    ) -> TransportResponse:
+        event = self.event
+        if method == "GET" or event is None:
+            return TransportResponse(200, "OK", content=encode_body(self.TOKEN) or b"")
+        if self.speed and event.latency:
+            time.sleep(event.latency / self.speed)
+        return TransportResponse(
+            event.status or 200,
+            headers={"Content-Type": "application/json"},
+            content=encode_body(event.response) or b"",
+        )
+
+
+def sdk_version() -> str:
+    """This function returns the installed version of the SDK.
+    :return: the version, "unknown" when the SDK is not installed.
+    :rtype: str
+    """
+    # pylint: disable=import-outside-toplevel
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version("python-mpesa-sdk")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+class ReplayRunner:
+    """This class replays a trace through the request builders and parsers."""
+
+    def __init__(
+        self,
+        speed: Optional[float] = 1.0,
+        concurrency: int = 16,
+        trace_allocations: bool = False,
+        builder_options: Optional[dict[str, Any]] = None,
+    ):
+        """This method initializes the replay runner.
+        :param speed: the factor the recorded pace and latencies are sped up by, None to replay as fast as
+        possible.
+        :type speed: float
+        :param concurrency: the maximum number of events replayed at once.
+        :type concurrency: int
+        :param trace_allocations: whether memory allocations are traced, which slows the replay down.
+        :type trace_allocations: bool
+        :param builder_options: keyword arguments passed to every request builder, e.g. a retry policy.
+        :type builder_options: dict
+        """
+        self.speed = speed
+        self.concurrency = concurrency
+        self.trace_allocations = trace_allocations
+        self.builder_options = dict(builder_options or {})
+        self.transport = ReplayTransport(speed)
+        self.token_cache = AccessTokenCache("replay", "replay", self.transport)
+        self._builders: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def builder(self, endpoint: str) -> Any:
+        """This method returns the request builder replaying an endpoint's requests.
+        :param endpoint: the environment variable holding the endpoint's URL.
+        :type endpoint: str
+        :return: the request builder.
+        :rtype: BaseRequestBuilder
+        """
+        if (builder := self._builders.get(endpoint)) is None:
+            builder_class = ENDPOINTS[endpoint][0]
+            options = {
+                "transport": self.transport,
+                "token_cache": self.token_cache,
+                **self.builder_options,
+            }
+            if issubclass(builder_class, StkPushRequestInterface):
+                options["passkey"] = "replay"
+            builder = self._builders[endpoint] = builder_class(
+                consumer_key="replay",
+                consumer_secret="replay",
+                shortcode="replay",
+                **options,
+            )
+        return builder
+
+    def replay_event(self, event: TraceEvent):
+        """This method replays a single event: a request is sent and its response parsed, a callback is parsed.
+        :param event: the event.
+        :type event: TraceEvent
+        """
+        if event.kind == CALLBACK:
+            parser = CALLBACK_URL_PARSERS[event.endpoint or ""]
+            parser(event.request).parse()
+            return
+        builder = self.builder(event.endpoint or "")
+        self.transport.event = event
+        try:
+            response = builder.send(event.request)
+        finally:
+            self.transport.event = None
+        ENDPOINTS[event.endpoint or ""][1](response).parse()
+
+    def replayable(self, event: TraceEvent) -> bool:
+        """This method checks whether an event can be replayed; token requests are left to the token cache.
+        :param event: the event.
+        :type event: TraceEvent
+        :return: whether the event is replayed.
+        :rtype: bool
+        """
+        if event.kind == CALLBACK:
+            return event.endpoint in CALLBACK_URL_PARSERS
+        return event.endpoint in ENDPOINTS
+
+    def run(self, events: Union[str, Iterable[TraceEvent]]) -> ReplayReport:
+        """This method replays a trace.
+        :param events: the events, or the path to a trace file.
+        :type events: Iterable
+        :return: the replay report.
+        :rtype: ReplayReport
+        """
+        if isinstance(events, str):
+            events = read_trace(events)
+        report = ReplayReport(sdk_version(), self.speed)
+        slots = threading.BoundedSemaphore(self.concurrency)
+
+        def replay(event: TraceEvent):
+            try:
+                started = time.perf_counter()
+                self.replay_event(event)
+                latency = time.perf_counter() - started
+                with self._lock:
+                    report.latencies.setdefault(event.endpoint or "", []).append(
+                        latency
+                    )
+            except Exception as error:  # pylint: disable=broad-except
+                logg.error("Replaying %s event failed with: %s.", event.endpoint, error)
+                with self._lock:
+                    report.errors += 1
+            finally:
+                slots.release()
+
+        before = None
+        if self.trace_allocations:
+            tracemalloc.start()
+            before = tracemalloc.take_snapshot()
+
+        started = time.perf_counter()
+        first = None
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for event in events:
+                if not self.replayable(event):
+                    continue
+                if self.speed:
+                    first = event.at if first is None else first
+                    delay = started + (event.at - first) / self.speed
+                    if (wait := delay - time.perf_counter()) > 0:
+                        time.sleep(wait)
+                slots.acquire()
+                report.events += 1
+                executor.submit(replay, event)
+        report.elapsed = time.perf_counter() - started
+
+        if before is not None:
+            report.peak_memory = tracemalloc.get_traced_memory()[1]
+            package = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            sdk_only = [tracemalloc.Filter(True, os.path.join(package, "*"))]
+            statistics = (
+                tracemalloc.take_snapshot()
+                .filter_traces(sdk_only)
+                .compare_to(before.filter_traces(sdk_only), "lineno")
+            )
+            tracemalloc.stop()
+            report.retained_blocks = sum(stat.count_diff for stat in statistics)
+            report.allocation_sites = [
+                (str(stat.traceback), stat.size_diff, stat.count_diff)
+                for stat in statistics[:10]
+            ]
+        return report
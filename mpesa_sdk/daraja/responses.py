@@ -0,0 +1,111 @@
+"""This module extracts the fields shared by Daraja API responses in a single pass.
+
+A Daraja response body comes in one of two shapes: the accepted shape, whose keys differ per API, e.g. ResponseCode
+or ResultCode, and the error shape, errorCode, errorMessage and requestId, returned with rejected requests. The shape
+is detected once, by the presence of errorCode, and each field is then read with plain dict lookups rather than by
+trying one key after another and catching the KeyError.
+"""
+
+# standard imports
+from dataclasses import dataclass
+from typing import Any, Optional
+
+# local imports
+from mpesa_sdk.daraja.errors import DarajaErrorCode, classify
+from mpesa_sdk.utils import camel_to_snake
+
+
+@dataclass(frozen=True, slots=True)
+class ResponseShape:
+    """This class names the keys a response carries its code, description and request id under, in order of
+    precedence."""
+
+    code: tuple[str, ...] = ("ResponseCode",)
+    description: tuple[str, ...] = ("ResponseDescription",)
+    request_id: tuple[str, ...] = ("OriginatorConversationID",)
+
+
+ERROR_SHAPE = ResponseShape(("errorCode",), ("errorMessage",), ("requestId",))
+
+
+@dataclass(frozen=True, slots=True)
+class ResponseFields:
+    """This class holds the fields extracted from a response body."""
+
+    code: Any = None
+    description: Optional[str] = None
+    request_id: Optional[str] = None
+    error: Optional[DarajaErrorCode] = None
+
+    @property
+    def success(self) -> bool:
+        """This property indicates whether the response reports that the request was accepted.
+        :return: whether the request was accepted.
+        :rtype: bool
+        """
+        return self.error is None and self.code is not None
+
+
+def _first(payload: dict, keys: tuple[str, ...]) -> Any:
+    """This function returns the value of the first key present in a payload.
+    :param payload: the response body.
+    :type payload: dict
+    :param keys: the keys, in order of precedence.
+    :type keys: tuple
+    :return: the value, None if none of the keys is present.
+    :rtype: Any
+    """
+    get = payload.get
+    for key in keys:
+        value = get(key)
+        if value is not None:
+            return value
+    return None
+
+
+def extract_response_fields(
+    payload: Any, shape: ResponseShape, status_code: Optional[int] = None
+) -> ResponseFields:
+    """This function extracts the code, description and request id of a response body and classifies its failure.
+    :param payload: the decoded response body, None when the body is empty.
+    :type payload: Any
+    :param shape: the keys of the accepted shape of the response.
+    :type shape: ResponseShape
+    :param status_code: the HTTP status of the response.
+    :type status_code: int
+    :return: the extracted fields.
+    :rtype: ResponseFields
+    """
+    if not isinstance(payload, dict):
+        return ResponseFields(error=classify(None, status_code=status_code))
+    if "errorCode" in payload:
+        shape = ERROR_SHAPE
+    code = _first(payload, shape.code)
+    description = _first(payload, shape.description)
+    return ResponseFields(
+        code,
+        description,
+        _first(payload, shape.request_id),
+        classify(code, description, status_code),
+    )
+
+
+def snake_case_payload(
+    payload: Any, error: Optional[DarajaErrorCode] = None
+) -> dict[str, Any]:
+    """This function converts a response body to a dict with snake case keys.
+    :param payload: the decoded response body, None when the body is empty.
+    :type payload: Any
+    :param error: the classification of the response's failure.
+    :type error: DarajaErrorCode
+    :return: the parsed response, with the classification under "error" when the request failed.
+    :rtype: dict
+    """
+    parsed = (
+        {camel_to_snake(key): value for key, value in payload.items()}
+        if isinstance(payload, dict)
+        else {}
+    )
+    if error is not None:
+        parsed["error"] = error.as_dict()
+    return parsed
@@ -6,12 +6,20 @@ import os
 from typing import Union
 
 # local imports
-from mpesa_sdk.daraja.enums import CommandID
+from mpesa_sdk.daraja.amounts import Amount, format_amount
+from mpesa_sdk.daraja.enums import CommandID, RequestPriority
 from mpesa_sdk.daraja.interfaces import (
     BaseCallbackParser,
     BaseRequestBuilder,
     BaseResponseParser,
 )
+from mpesa_sdk.daraja.validation import (
+    AMOUNT_PATTERN,
+    TRANSACTION_ID_PATTERN,
+    SHORTCODE_PATTERN,
+    URL_PATTERN,
+    Field,
+)
 
 # external imports
 
@@ -22,10 +30,24 @@ class ReversalRequest(BaseRequestBuilder):
     """This class implements the transaction reversal request builder interface."""
 
     URL_ENV = "REVERSAL_URL"
+    PRIORITY = RequestPriority.REVERSAL
+    PAYLOAD_FIELDS = (
+        Field("Initiator", max_length=100),
+        Field("SecurityCredential"),
+        Field("CommandID", choices=(CommandID.TRANSACTION_REVERSAL.value,)),
+        Field("TransactionID", pattern=TRANSACTION_ID_PATTERN),
+        Field("Amount", pattern=AMOUNT_PATTERN),
+        Field("ReceiverParty", pattern=SHORTCODE_PATTERN),
+        Field("ReceiverIdentifierType", choices=("11",)),
+        Field("QueueTimeOutURL", pattern=URL_PATTERN),
+        Field("ResultURL", pattern=URL_PATTERN),
+        Field("Remarks", max_length=100),
+        Field("Occasion", min_length=0, max_length=100),
+    )
 
     def build(
         self,
-        amount: float,
+        amount: Amount,
         initiator: str,
         occasion: str,
         receiver_party: str,
@@ -33,8 +55,8 @@ class ReversalRequest(BaseRequestBuilder):
         transaction_id: str,
     ) -> dict[str, Union[str, int]]:
         """This method builds the transaction reversal request.
-        :param amount: the amount.
-        :type amount: float
+        :param amount: the amount in whole shillings.
+        :type amount: Amount
         :param initiator: the initiator.
         :type initiator: str
         :param occasion: the occasion.
@@ -47,15 +69,14 @@ class ReversalRequest(BaseRequestBuilder):
         :type transaction_id: str
         :return: the transaction reversal request.
         :rtype: dict
+        :raises InvalidAmountError: if the amount is not valid for a reversal.
         """
         return {
             "Initiator": initiator,
-            "SecurityCredential": os.getenv(
-                "SECURITY_CREDENTIAL", "your-security-credential"
-            ),
+            "SecurityCredential": self.security_credential(initiator),
             "CommandID": CommandID.TRANSACTION_REVERSAL.value,
             "TransactionID": transaction_id,
-            "Amount": amount,
+            "Amount": format_amount(amount, CommandID.TRANSACTION_REVERSAL),
             "ReceiverParty": receiver_party,
             "ReceiverIdentifierType": "11",
             "ResultURL": os.getenv(
@@ -0,0 +1,530 @@
+"""This module streams the results of bulk payouts to disk.
+
+A bulk payout run can send millions of payouts, so its results are written to a sink as they complete instead of
+being held in memory until the run ends. Results are buffered and written in batches, once batch_size results have
+accumulated or flush_interval seconds have passed since the last write. Every sink is append-only and can be read
+back while or after a run, and the line numbers it holds tell a resumed run which payouts to skip: every payout
+recorded, except those Daraja definitely rejected without processing them, which a resumed run sends again. A crash
+loses the results still buffered, whose payouts a resumed run would send again, so the batch size trades write
+throughput against the number of payouts that may be repeated.
+"""
+
+# standard imports
+import csv
+import json
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from typing import IO, Any, Callable, Iterable, Iterator, Optional
+
+# local imports
+from mpesa_sdk.utils import import_pyarrow
+from .enums import ErrorCategory
+from .errors import classify_payload
+
+logg = logging.getLogger()
+
+RESULT_COLUMNS = ("line_number", "shard", "status_code", "success", "error", "response")
+
+
+@dataclass
+class PayoutResult:
+    """This class holds the outcome of sending a single payout."""
+
+    line_number: int
+    shard: int
+    status_code: Optional[int] = None
+    response: Optional[dict] = None
+    error: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        """This property indicates whether Daraja accepted the payout request.
+        :return: whether the payout request was accepted.
+        :rtype: bool
+        """
+        return self.error is None and self.status_code == 200
+
+    @property
+    def resendable(self) -> bool:
+        """This property indicates whether Daraja definitely rejected the payout without processing it, e.g. for an
+        invalid field or because of throttling, so that sending it again cannot pay the recipient twice. Transport
+        errors and server errors are ambiguous, the payout may have been made.
+        :return: whether the payout may be sent again.
+        :rtype: bool
+        """
+        if self.error is not None or self.status_code is None or self.success:
+            return False
+        error = classify_payload(self.response, self.status_code)
+        if error is None or error.category == ErrorCategory.UNKNOWN:
+            return False
+        return error.resend_safe or not error.retryable
+
+
+def _optional_int(value: Any) -> Optional[int]:
+    return None if value in (None, "") else int(value)
+
+
+def _row(result: PayoutResult) -> tuple:
+    """This function converts a result to a row of RESULT_COLUMNS, with the response encoded as JSON.
+    :param result: the result.
+    :type result: PayoutResult
+    :return: the row.
+    :rtype: tuple
+    """
+    return (
+        result.line_number,
+        result.shard,
+        result.status_code,
+        result.success,
+        result.error,
+        None if result.response is None else json.dumps(result.response),
+    )
+
+
+def _from_row(row: dict) -> PayoutResult:
+    """This function converts a row of RESULT_COLUMNS back to a result.
+    :param row: the row, with string values when read from a CSV file.
+    :type row: dict
+    :return: the result.
+    :rtype: PayoutResult
+    """
+    response = row.get("response")
+    return PayoutResult(
+        int(row["line_number"]),
+        int(row["shard"]),
+        _optional_int(row.get("status_code")),
+        json.loads(response) if response else None,
+        row.get("error") or None,
+    )
+
+
+class ResultSink(ABC):
+    """This class is the base of the sinks payout results are streamed to."""
+
+    def __init__(self, batch_size: int = 500, flush_interval: float = 1.0):
+        """This method initializes the result sink.
+        :param batch_size: the number of results buffered before they are written.
+        :type batch_size: int
+        :param flush_interval: the maximum number of seconds a result is buffered before it is written.
+        :type flush_interval: float
+        """
+        if batch_size < 1:
+            raise ValueError("A result sink needs a batch size of at least one.")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self._buffer: list[PayoutResult] = []
+        self._flushed_at = time.monotonic()
+
+    def __enter__(self) -> "ResultSink":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, result: PayoutResult):
+        """This method adds a result, writing the buffered results if the batch is full or the interval has passed.
+        :param result: the result.
+        :type result: PayoutResult
+        """
+        self._buffer.append(result)
+        if (
+            len(self._buffer) >= self.batch_size
+            or time.monotonic() - self._flushed_at >= self.flush_interval
+        ):
+            self.flush()
+
+    def extend(self, results: Iterable[PayoutResult]):
+        """This method adds several results.
+        :param results: the results.
+        :type results: Iterable
+        """
+        for result in results:
+            self.write(result)
+
+    def flush(self):
+        """This method writes the buffered results."""
+        if self._buffer:
+            self._write_batch(self._buffer)
+            self.written += len(self._buffer)
+            self._buffer = []
+        self._flushed_at = time.monotonic()
+
+    def close(self):
+        """This method writes the buffered results and releases the file. Writing to the sink again reopens it."""
+        self.flush()
+        self._close()
+
+    def attempted(self) -> set[int]:
+        """This method returns the line numbers of the payouts recorded in the sink.
+        :return: the attempted line numbers.
+        :rtype: set
+        """
+        self.flush()
+        return {result.line_number for result in self.read()}
+
+    def succeeded(self) -> set[int]:
+        """This method returns the line numbers of the payouts whose latest recorded result was accepted by Daraja.
+        :return: the succeeded line numbers.
+        :rtype: set
+        """
+        return self._latest_matching(lambda result: result.success)
+
+    def completed(self) -> set[int]:
+        """This method returns the line numbers of the payouts a resumed run skips: those recorded, except where the
+        latest result is a definite rejection that may be sent again.
+        :return: the completed line numbers.
+        :rtype: set
+        """
+        return self._latest_matching(lambda result: not result.resendable)
+
+    def _latest_matching(self, predicate: Callable[[PayoutResult], bool]) -> set[int]:
+        """This method returns the line numbers whose latest recorded result matches a predicate.
+        :param predicate: the function checking a result.
+        :type predicate: Callable
+        :return: the matching line numbers.
+        :rtype: set
+        """
+        self.flush()
+        matching: set[int] = set()
+        for result in self.read():
+            if predicate(result):
+                matching.add(result.line_number)
+            else:
+                matching.discard(result.line_number)
+        return matching
+
+    @abstractmethod
+    def read(self) -> Iterator[PayoutResult]:
+        """This method streams the results written so far.
+        :return: an iterator of results.
+        :rtype: Iterator[PayoutResult]
+        :raises: NotImplementedError
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def _write_batch(self, results: list[PayoutResult]):
+        """This method appends a batch of results to the underlying file.
+        :param results: the results.
+        :type results: list
+        :raises: NotImplementedError
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def _close(self):
+        """This method releases the underlying file.
+        :raises: NotImplementedError
+        """
+        raise NotImplementedError()
+
+
+def _truncate_partial_line(path: str):
+    """This function removes a line left incomplete by a crash from the end of a file, so appends start on a new
+    line.
+    :param path: the path to the file.
+    :type path: str
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as file:
+        size = file.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        file.seek(size - 1)
+        if file.read(1) == b"\n":
+            return
+        # read backwards until the last complete line.
+        position = size
+        while position > 0:
+            step = min(4096, position)
+            position -= step
+            file.seek(position)
+            newline = file.read(step).rfind(b"\n")
+            if newline != -1:
+                file.truncate(position + newline + 1)
+                break
+        else:
+            file.truncate(0)
+    logg.warning("Discarded an incomplete result at the end of: %s.", path)
+
+
+def _complete_lines(file: IO[str]) -> Iterator[str]:
+    """This function yields the lines of a file up to one that is still being written, or was cut short by a crash.
+    :param file: the text file.
+    :type file: IO[str]
+    :return: an iterator of complete lines.
+    :rtype: Iterator[str]
+    """
+    for line in file:
+        if not line.endswith("\n"):
+            return
+        yield line
+
+
+class _TextResultSink(ResultSink, ABC):
+    """This class is the base of the sinks appending results to a text file."""
+
+    def __init__(self, path: str, batch_size: int = 500, flush_interval: float = 1.0):
+        """This method initializes the text result sink.
+        :param path: the path to the file, results are appended to it if it exists.
+        :type path: str
+        :param batch_size: the number of results buffered before they are written.
+        :type batch_size: int
+        :param flush_interval: the maximum number of seconds a result is buffered before it is written.
+        :type flush_interval: float
+        """
+        super().__init__(batch_size, flush_interval)
+        self.path = path
+        self._file: Optional[IO[str]] = None
+
+    def _open(self) -> IO[str]:
+        if self._file is None:
+            _truncate_partial_line(self.path)
+            self._file = open(self.path, "a", encoding="utf-8", newline="")
+        return self._file
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class JsonlResultSink(_TextResultSink):
+    """This class appends results to a JSON lines file, one result per line."""
+
+    def _write_batch(self, results: list[PayoutResult]):
+        file = self._open()
+        file.write("".join(json.dumps(asdict(result)) + "\n" for result in results))
+        file.flush()
+
+    def read(self) -> Iterator[PayoutResult]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as file:
+            for line in _complete_lines(file):
+                if line.strip():
+                    yield PayoutResult(**json.loads(line))
+
+
+class CsvResultSink(_TextResultSink):
+    """This class appends results to a CSV file with the RESULT_COLUMNS, the response encoded as JSON."""
+
+    def _write_batch(self, results: list[PayoutResult]):
+        file = self._open()
+        writer = csv.writer(file)
+        if file.tell() == 0:
+            writer.writerow(RESULT_COLUMNS)
+        writer.writerows(_row(result) for result in results)
+        file.flush()
+
+    def read(self) -> Iterator[PayoutResult]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8", newline="") as file:
+            for row in csv.DictReader(_complete_lines(file)):
+                yield _from_row(row)
+
+
+class SQLiteResultSink(ResultSink):
+    """This class writes results to a SQLite table keyed by line number, a batch per transaction.
+
+    Results written again for a line number, e.g. by a resumed run, replace the earlier result.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        table: str = "payout_results",
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+    ):
+        """This method initializes the SQLite result sink.
+        :param path: the database file.
+        :type path: str
+        :param table: the table results are written to, created if it does not exist.
+        :type table: str
+        :param batch_size: the number of results buffered before they are written.
+        :type batch_size: int
+        :param flush_interval: the maximum number of seconds a result is buffered before it is written.
+        :type flush_interval: float
+        """
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table}.")
+        super().__init__(batch_size, flush_interval)
+        self.path = path
+        self.table = table
+        self._connection: Any = None
+
+    def _connect(self):
+        if self._connection is None:
+            # pylint: disable=import-outside-toplevel
+            import sqlite3
+
+            self._connection = sqlite3.connect(self.path, isolation_level=None)
+            if self.path != ":memory:":
+                self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    line_number INTEGER PRIMARY KEY,
+                    shard INTEGER NOT NULL,
+                    status_code INTEGER,
+                    success INTEGER NOT NULL,
+                    error TEXT,
+                    response TEXT
+                )
+                """
+            )
+        return self._connection
+
+    def _write_batch(self, results: list[PayoutResult]):
+        connection = self._connect()
+        connection.execute("BEGIN")
+        try:
+            connection.executemany(
+                f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?, ?, ?)",
+                [_row(result) for result in results],
+            )
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def read(self) -> Iterator[PayoutResult]:
+        cursor = self._connect().execute(
+            f"SELECT {', '.join(RESULT_COLUMNS)} FROM {self.table} ORDER BY line_number"
+        )
+        for row in cursor:
+            yield _from_row(dict(zip(RESULT_COLUMNS, row)))
+
+    def attempted(self) -> set[int]:
+        self.flush()
+        cursor = self._connect().execute(f"SELECT line_number FROM {self.table}")
+        return {line_number for (line_number,) in cursor}
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class ParquetResultSink(ResultSink):
+    """This class writes results to Parquet files in a directory, a row group per batch.
+
+    Each time the sink is opened, e.g. by a resumed run, a new file is started. A Parquet file can only be read
+    once it is closed, so the results of a run that crashed are not recorded; prefer the JSONL or SQLite sinks when
+    a run must resume after a crash. This sink requires the optional pyarrow dependency.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        prefix: str = "results-",
+        compression: str = "zstd",
+        batch_size: int = 10_000,
+        flush_interval: float = 5.0,
+    ):
+        """This method initializes the Parquet result sink.
+        :param directory: the directory files are written to.
+        :type directory: str
+        :param prefix: the prefix of the names of the files written.
+        :type prefix: str
+        :param compression: the Parquet compression codec.
+        :type compression: str
+        :param batch_size: the number of results per row group.
+        :type batch_size: int
+        :param flush_interval: the maximum number of seconds a result is buffered before it is written.
+        :type flush_interval: float
+        """
+        super().__init__(batch_size, flush_interval)
+        self.pyarrow = import_pyarrow()
+        self.directory = directory
+        self.prefix = prefix
+        self.compression = compression
+        self.schema = self.pyarrow.schema(
+            [
+                ("line_number", self.pyarrow.int64()),
+                ("shard", self.pyarrow.int32()),
+                ("status_code", self.pyarrow.int32()),
+                ("success", self.pyarrow.bool_()),
+                ("error", self.pyarrow.string()),
+                ("response", self.pyarrow.string()),
+            ]
+        )
+        self._writer: Any = None
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def paths(self) -> list[str]:
+        """This property returns the paths of the files in the directory, in the order they were written.
+        :return: the paths.
+        :rtype: list
+        """
+        return sorted(
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.startswith(self.prefix) and name.endswith(".parquet")
+        )
+
+    def _write_batch(self, results: list[PayoutResult]):
+        pyarrow = self.pyarrow
+        if self._writer is None:
+            path = os.path.join(
+                self.directory, f"{self.prefix}{len(self.paths):05d}.parquet"
+            )
+            self._writer = pyarrow.parquet.ParquetWriter(
+                path, self.schema, compression=self.compression
+            )
+        columns = list(zip(*(_row(result) for result in results)))
+        self._writer.write_table(
+            pyarrow.Table.from_arrays(
+                [
+                    pyarrow.array(values, type=field.type)
+                    for values, field in zip(columns, self.schema)
+                ],
+                schema=self.schema,
+            )
+        )
+
+    def read(self) -> Iterator[PayoutResult]:
+        for path in self.paths:
+            try:
+                file = self.pyarrow.parquet.ParquetFile(path)
+            except self.pyarrow.ArrowException:
+                # the file is still being written, or its run crashed before closing it.
+                logg.warning("Skipping unreadable result file: %s.", path)
+                continue
+            for batch in file.iter_batches():
+                for row in batch.to_pylist():
+                    yield _from_row(row)
+
+    def _close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def result_sink(path: str, **kwargs) -> ResultSink:
+    """This function creates the sink for a path from its extension: .jsonl or .ndjson, .csv, .db or .sqlite, and
+    .parquet, or no extension, for a directory of Parquet files.
+    :param path: the path to the file or directory.
+    :type path: str
+    :param kwargs: the options of the sink.
+    :type kwargs: dict
+    :return: the sink.
+    :rtype: ResultSink
+    """
+    if path.endswith((".jsonl", ".ndjson")):
+        return JsonlResultSink(path, **kwargs)
+    if path.endswith(".csv"):
+        return CsvResultSink(path, **kwargs)
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        return SQLiteResultSink(path, **kwargs)
+    if path.endswith(".parquet") or not os.path.splitext(path)[1]:
+        return ParquetResultSink(path, **kwargs)
+    raise ValueError(f"Cannot infer result sink format from: {path}.")
@@ -0,0 +1,591 @@
+"""This module caches the final results of transaction status queries.
+
+A transaction status query is answered twice: the response only acknowledges the query, and the result arrives
+later on the ResultURL. Once a result reports a final status, e.g. a completed or failed transaction, querying again
+can only return the same result, so it is cached per shortcode and TransactionID and repeat queries are served
+locally. Identical queries made while one is in flight share it. Results expire after a TTL and the least recently
+used are evicted beyond a maximum size. The in-memory store serves a single process; the SQLite store lets the
+process receiving callbacks and the processes querying share results.
+"""
+
+# standard imports
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Optional
+
+# local imports
+from mpesa_sdk.singleflight import SingleFlight
+
+if TYPE_CHECKING:
+    from mpesa_sdk.daraja.interfaces import BaseCallbackParser
+
+logg = logging.getLogger()
+
+CacheKey = tuple[str, str]
+
+# transaction statuses after which the transaction can still change.
+PENDING_STATUSES = frozenset({"Pending", "Processing", "Submitted"})
+
+
+def is_final(result: dict) -> bool:
+    """This function checks whether a parsed transaction status result reports a final status.
+
+    Only a successful query reports the status of the transaction itself. A failed query, e.g. with invalid
+    initiator credentials or an unknown TransactionID, describes the query and may succeed once it is corrected.
+    :param result: the parsed callback.
+    :type result: dict
+    :return: whether querying again would return the same result.
+    :rtype: bool
+    """
+    if not result.get("success"):
+        return False
+    status = (result.get("data") or {}).get("transaction_status")
+    return status is not None and status not in PENDING_STATUSES
+
+
+class MemoryStatusStore:
+    """This class stores transaction status results in process memory, in least recently used order."""
+
+    def __init__(self, maxsize: int = 1024):
+        """This method initializes the in-memory store.
+        :param maxsize: the maximum number of results kept.
+        :type maxsize: int
+        """
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._results: OrderedDict[CacheKey, tuple[float, dict]] = OrderedDict()
+        self._pending: OrderedDict[str, tuple[float, CacheKey]] = OrderedDict()
+        self._unmatched: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def get(self, key: CacheKey) -> Optional[dict]:
+        """This method returns a stored result.
+        :param key: the shortcode and TransactionID.
+        :type key: tuple
+        :return: the result, None if it is missing or expired.
+        :rtype: dict
+        """
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._results[key]
+                return None
+            self._results.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: CacheKey, result: dict, ttl: float):
+        """This method stores a result, evicting the least recently used results beyond the maximum size.
+        :param key: the shortcode and TransactionID.
+        :type key: tuple
+        :param result: the result.
+        :type result: dict
+        :param ttl: the number of seconds the result is kept.
+        :type ttl: float
+        """
+        with self._lock:
+            self._results[key] = (time.monotonic() + ttl, result)
+            self._results.move_to_end(key)
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+
+    def delete(self, key: Optional[CacheKey] = None):
+        """This method discards a stored result, all of them when no key is given.
+        :param key: the shortcode and TransactionID.
+        :type key: tuple
+        """
+        with self._lock:
+            if key is None:
+                self._results.clear()
+            else:
+                self._results.pop(key, None)
+
+    def expect(self, conversation_id: str, key: CacheKey, ttl: float):
+        """This method records the query a conversation id belongs to, until its result arrives.
+        :param conversation_id: the conversation id Daraja acknowledged the query with.
+        :type conversation_id: str
+        :param key: the shortcode and TransactionID.
+        :type key: tuple
+        :param ttl: the number of seconds to wait for the result.
+        :type ttl: float
+        """
+        with self._lock:
+            self._pending[conversation_id] = (time.monotonic() + ttl, key)
+            while len(self._pending) > self.maxsize:
+                self._pending.popitem(last=False)
+
+    def resolve(self, conversation_id: str) -> Optional[CacheKey]:
+        """This method returns, and forgets, the query a conversation id belongs to.
+        :param conversation_id: the conversation id the result arrived with.
+        :type conversation_id: str
+        :return: the shortcode and TransactionID, None if the conversation is unknown or expired.
+        :rtype: tuple
+        """
+        with self._lock:
+            entry = self._pending.pop(conversation_id, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def hold(self, conversation_id: str, result: dict, ttl: float):
+        """This method keeps a result that matches no query yet, until the query is registered.
+        :param conversation_id: the conversation id the result arrived with.
+        :type conversation_id: str
+        :param result: the result.
+        :type result: dict
+        :param ttl: the number of seconds the result is kept.
+        :type ttl: float
+        """
+        with self._lock:
+            self._unmatched[conversation_id] = (time.monotonic() + ttl, result)
+            self._unmatched.move_to_end(conversation_id)
+            while len(self._unmatched) > self.maxsize:
+                self._unmatched.popitem(last=False)
+
+    def claim(self, conversation_id: str) -> Optional[dict]:
+        """This method returns, and forgets, a result held for a conversation id.
+        :param conversation_id: the conversation id Daraja acknowledged the query with.
+        :type conversation_id: str
+        :return: the result, None if none is held or it expired.
+        :rtype: dict
+        """
+        with self._lock:
+            entry = self._unmatched.pop(conversation_id, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def close(self):
+        """This method releases the store, there is nothing to release in memory."""
+
+
+class SQLiteStatusStore:
+    """This class stores transaction status results in a SQLite database shared between processes.
+
+    Expiry times are wall clock times so that every process sharing the database agrees on them.
+    """
+
+    def __init__(self, path: str, maxsize: int = 100_000, timeout: float = 5.0):
+        """This method initializes the SQLite store, creating its tables if needed.
+        :param path: the database file.
+        :type path: str
+        :param maxsize: the maximum number of results kept.
+        :type maxsize: int
+        :param timeout: the number of seconds to wait for another process's write lock.
+        :type timeout: float
+        """
+        # pylint: disable=import-outside-toplevel
+        import sqlite3
+
+        self.path = path
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, timeout=timeout, check_same_thread=False, isolation_level=None
+        )
+        if path != ":memory:":
+            self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS transaction_status (
+                shortcode TEXT NOT NULL,
+                transaction_id TEXT NOT NULL,
+                result TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (shortcode, transaction_id)
+            );
+            CREATE INDEX IF NOT EXISTS transaction_status_accessed_at
+                ON transaction_status (accessed_at);
+            CREATE TABLE IF NOT EXISTS transaction_status_pending (
+                conversation_id TEXT PRIMARY KEY,
+                shortcode TEXT NOT NULL,
+                transaction_id TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS transaction_status_unmatched (
+                conversation_id TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            """
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM transaction_status"
+            ).fetchone()[0]
+
+    def get(self, key: CacheKey) -> Optional[dict]:
+        """This method returns a stored result.
+        :param key: the shortcode and TransactionID.
+        :type key: tuple
+        :return: the result, None if it is missing or expired.
+        :rtype: dict
+        """
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT result FROM transaction_status "
+                "WHERE shortcode = ? AND transaction_id = ? AND expires_at > ?",
+                (*key, now),
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE transaction_status SET accessed_at = ? "
+                "WHERE shortcode = ? AND transaction_id = ?",
+                (now, *key),
+            )
+        return json.loads(row[0])
+
+    def set(self, key: CacheKey, result: dict, ttl: float):
+        """This method stores a result, evicting expired and least recently used results beyond the maximum size.
+        :param key: the shortcode and TransactionID.
+        :type key: tuple
+        :param result: the JSON serializable result.
+        :type result: dict
+        :param ttl: the number of seconds the result is kept.
+        :type ttl: float
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            self._connection.execute(
+                "INSERT OR REPLACE INTO transaction_status VALUES (?, ?, ?, ?, ?)",
+                (*key, json.dumps(result), now + ttl, now),
+            )
+            self._connection.execute(
+                "DELETE FROM transaction_status WHERE expires_at <= ?", (now,)
+            )
+            self._connection.execute(
+                "DELETE FROM transaction_status WHERE rowid IN (SELECT rowid FROM transaction_status "
+                "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+
+    def delete(self, key: Optional[CacheKey] = None):
+        """This method discards a stored result, all of them when no key is given.
+        :param key: the shortcode and TransactionID.
+        :type key: tuple
+        """
+        with self._lock:
+            if key is None:
+                self._connection.execute("DELETE FROM transaction_status")
+            else:
+                self._connection.execute(
+                    "DELETE FROM transaction_status WHERE shortcode = ? AND transaction_id = ?",
+                    key,
+                )
+
+    def expect(self, conversation_id: str, key: CacheKey, ttl: float):
+        """This method records the query a conversation id belongs to, until its result arrives.
+        :param conversation_id: the conversation id Daraja acknowledged the query with.
+        :type conversation_id: str
+        :param key: the shortcode and TransactionID.
+        :type key: tuple
+        :param ttl: the number of seconds to wait for the result.
+        :type ttl: float
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            self._connection.execute(
+                "INSERT OR REPLACE INTO transaction_status_pending VALUES (?, ?, ?, ?)",
+                (conversation_id, *key, now + ttl),
+            )
+            self._connection.execute(
+                "DELETE FROM transaction_status_pending WHERE expires_at <= ?", (now,)
+            )
+
+    def resolve(self, conversation_id: str) -> Optional[CacheKey]:
+        """This method returns, and forgets, the query a conversation id belongs to.
+        :param conversation_id: the conversation id the result arrived with.
+        :type conversation_id: str
+        :return: the shortcode and TransactionID, None if the conversation is unknown or expired.
+        :rtype: tuple
+        """
+        with self._lock, self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            row = self._connection.execute(
+                "SELECT shortcode, transaction_id FROM transaction_status_pending "
+                "WHERE conversation_id = ? AND expires_at > ?",
+                (conversation_id, time.time()),
+            ).fetchone()
+            self._connection.execute(
+                "DELETE FROM transaction_status_pending WHERE conversation_id = ?",
+                (conversation_id,),
+            )
+        return None if row is None else (row[0], row[1])
+
+    def hold(self, conversation_id: str, result: dict, ttl: float):
+        """This method keeps a result that matches no query yet, until the query is registered.
+        :param conversation_id: the conversation id the result arrived with.
+        :type conversation_id: str
+        :param result: the JSON serializable result.
+        :type result: dict
+        :param ttl: the number of seconds the result is kept.
+        :type ttl: float
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            self._connection.execute(
+                "INSERT OR REPLACE INTO transaction_status_unmatched VALUES (?, ?, ?)",
+                (conversation_id, json.dumps(result), now + ttl),
+            )
+            self._connection.execute(
+                "DELETE FROM transaction_status_unmatched WHERE expires_at <= ?", (now,)
+            )
+
+    def claim(self, conversation_id: str) -> Optional[dict]:
+        """This method returns, and forgets, a result held for a conversation id.
+        :param conversation_id: the conversation id Daraja acknowledged the query with.
+        :type conversation_id: str
+        :return: the result, None if none is held or it expired.
+        :rtype: dict
+        """
+        with self._lock, self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            row = self._connection.execute(
+                "SELECT result FROM transaction_status_unmatched "
+                "WHERE conversation_id = ? AND expires_at > ?",
+                (conversation_id, time.time()),
+            ).fetchone()
+            self._connection.execute(
+                "DELETE FROM transaction_status_unmatched WHERE conversation_id = ?",
+                (conversation_id,),
+            )
+        return None if row is None else json.loads(row[0])
+
+    def close(self):
+        """This method closes the database connection."""
+        with self._lock:
+            self._connection.close()
+
+
+class TransactionStatusCache:
+    """This class caches final transaction status results per shortcode and TransactionID.
+
+    Queries made through TransactionStatusQueryRequest.fetch_result are registered here by the conversation id
+    Daraja acknowledges them with; the callback handler passes each result callback to record, which stores it if it
+    reports a final status and wakes the callers waiting for it. Only a successful query reporting a status that can
+    no longer change is final; other results are handed to the caller waiting for them but never cached. A result
+    that arrives before its query is registered is held for pending_ttl seconds and matched when the query is.
+    """
+
+    def __init__(
+        self,
+        store: Any = None,
+        ttl: float = 3600.0,
+        pending_ttl: float = 600.0,
+        poll_interval: float = 0.25,
+    ):
+        """This method initializes the transaction status cache.
+        :param store: the store results are kept in, defaults to an in-memory store.
+        :type store: MemoryStatusStore or SQLiteStatusStore
+        :param ttl: the number of seconds a final result is served from the cache.
+        :type ttl: float
+        :param pending_ttl: the number of seconds a query and its result callback wait to be matched.
+        :type pending_ttl: float
+        :param poll_interval: the number of seconds between checks of the store while waiting for a result, which
+        picks up results recorded by another process.
+        :type poll_interval: float
+        """
+        self.store = store if store is not None else MemoryStatusStore()
+        self.ttl = ttl
+        self.pending_ttl = pending_ttl
+        self.poll_interval = poll_interval
+        self.flight = SingleFlight()
+        self._recorded = threading.Condition()
+        # results that are not final are handed to the next caller waiting in this process, never cached.
+        self._delivered: OrderedDict[CacheKey, tuple[float, dict]] = OrderedDict()
+
+    def get(self, shortcode: str, transaction_id: str) -> Optional[dict]:
+        """This method returns the cached result of a transaction.
+        :param shortcode: the shortcode the transaction was queried for.
+        :type shortcode: str
+        :param transaction_id: the TransactionID.
+        :type transaction_id: str
+        :return: the parsed result callback, None if no final result is cached.
+        :rtype: dict
+        """
+        return self.store.get((shortcode, transaction_id))
+
+    def put(self, shortcode: str, transaction_id: str, result: dict) -> bool:
+        """This method caches the result of a transaction if it reports a final status, else hands it to the caller
+        waiting for it in this process.
+        :param shortcode: the shortcode the transaction was queried for.
+        :type shortcode: str
+        :param transaction_id: the TransactionID.
+        :type transaction_id: str
+        :param result: the parsed result callback.
+        :type result: dict
+        :return: whether the result was cached.
+        :rtype: bool
+        """
+        key = (shortcode, transaction_id)
+        final = is_final(result)
+        if final:
+            self.store.set(key, result, self.ttl)
+        with self._recorded:
+            if not final:
+                now = time.monotonic()
+                while (
+                    self._delivered and next(iter(self._delivered.values()))[0] <= now
+                ):
+                    self._delivered.popitem(last=False)
+                self._delivered.pop(key, None)
+                self._delivered[key] = (now + self.pending_ttl, result)
+            self._recorded.notify_all()
+        return final
+
+    def invalidate(
+        self, shortcode: Optional[str] = None, transaction_id: Optional[str] = None
+    ):
+        """This method discards the cached result of a transaction, all of them when no transaction is given.
+        :param shortcode: the shortcode the transaction was queried for.
+        :type shortcode: str
+        :param transaction_id: the TransactionID.
+        :type transaction_id: str
+        """
+        if shortcode is None or transaction_id is None:
+            self.store.delete()
+        else:
+            self.store.delete((shortcode, transaction_id))
+
+    def expect(
+        self, shortcode: str, transaction_id: str, *conversation_ids: Optional[str]
+    ):
+        """This method registers a sent query so that its result callback can be matched to it.
+        :param shortcode: the shortcode the transaction was queried for.
+        :type shortcode: str
+        :param transaction_id: the TransactionID.
+        :type transaction_id: str
+        :param conversation_ids: the conversation ids Daraja acknowledged the query with, missing ones are skipped.
+        :type conversation_ids: str
+        """
+        key = (shortcode, transaction_id)
+        with self._recorded:
+            # a result handed over for an earlier query must not answer this one.
+            self._delivered.pop(key, None)
+        known = tuple(
+            conversation_id for conversation_id in conversation_ids if conversation_id
+        )
+        for conversation_id in known:
+            self.store.expect(conversation_id, key, self.pending_ttl)
+        # the query is registered before held results are claimed, and record holds a result before matching it, so
+        # a result arriving concurrently is found by one or the other.
+        for conversation_id in known:
+            if (result := self.store.claim(conversation_id)) is not None:
+                self._forget(known)
+                self.put(shortcode, transaction_id, result)
+                return
+
+    def record(self, parser: "BaseCallbackParser") -> bool:
+        """This method caches a result callback of a query sent through fetch_result, if it is final. A result that
+        matches no registered query yet is held until the query is registered.
+        :param parser: the transaction status callback parser.
+        :type parser: TransactionStatusCallbackParser
+        :return: whether the result was cached.
+        :rtype: bool
+        """
+        result = parser.result or {}
+        conversation_ids = tuple(
+            filter(
+                None,
+                (result.get("ConversationID"), result.get("OriginatorConversationID")),
+            )
+        )
+        parsed = parser.parse()
+        for conversation_id in conversation_ids:
+            self.store.hold(conversation_id, parsed, self.pending_ttl)
+        for conversation_id in conversation_ids:
+            key = self.store.resolve(conversation_id)
+            if key is not None:
+                self._forget(conversation_ids)
+                shortcode, transaction_id = key
+                return self.put(shortcode, transaction_id, parsed)
+        logg.debug("Transaction status result: %s, matches no query yet.", result)
+        return False
+
+    def _forget(self, conversation_ids: tuple[str, ...]):
+        """This method discards the registered query and the held result of a matched conversation.
+        :param conversation_ids: the conversation ids of the query and its result.
+        :type conversation_ids: tuple
+        """
+        for conversation_id in conversation_ids:
+            self.store.resolve(conversation_id)
+            self.store.claim(conversation_id)
+
+    def wait(
+        self, shortcode: str, transaction_id: str, timeout: float
+    ) -> Optional[dict]:
+        """This method waits for the result of a transaction to be recorded.
+
+        A result that is not final is only seen by a caller waiting in the process that recorded it.
+        :param shortcode: the shortcode the transaction was queried for.
+        :type shortcode: str
+        :param transaction_id: the TransactionID.
+        :type transaction_id: str
+        :param timeout: the maximum number of seconds to wait.
+        :type timeout: float
+        :return: the parsed result callback, None if it did not arrive in time.
+        :rtype: dict
+        """
+        key = (shortcode, transaction_id)
+        deadline = time.monotonic() + timeout
+        while (result := self._received(key)) is None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            with self._recorded:
+                self._recorded.wait(min(remaining, self.poll_interval))
+        return result
+
+    async def wait_async(
+        self, shortcode: str, transaction_id: str, timeout: float
+    ) -> Optional[dict]:
+        """This method waits for the result of a transaction to be recorded, without blocking the event loop.
+        :param shortcode: the shortcode the transaction was queried for.
+        :type shortcode: str
+        :param transaction_id: the TransactionID.
+        :type transaction_id: str
+        :param timeout: the maximum number of seconds to wait.
+        :type timeout: float
+        :return: the parsed result callback, None if it did not arrive in time.
+        :rtype: dict
+        """
+        # pylint: disable=import-outside-toplevel
+        import asyncio
+
+        key = (shortcode, transaction_id)
+        deadline = time.monotonic() + timeout
+        while (result := self._received(key)) is None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            await asyncio.sleep(min(remaining, self.poll_interval))
+        return result
+
+    def _received(self, key: CacheKey) -> Optional[dict]:
+        """This method returns the result recorded for a waiting caller.
+        :param key: the shortcode and TransactionID.
+        :type key: tuple
+        :return: the cached final result, else a result handed to this process, None if neither arrived.
+        :rtype: dict
+        """
+        if (result := self.store.get(key)) is not None:
+            return result
+        with self._recorded:
+            entry = self._delivered.pop(key, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
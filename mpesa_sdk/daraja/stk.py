@@ -5,14 +5,21 @@ import logging
 import os
 from typing import Union
 
-# external imports
-from requests import Response
-
 # local imports
+from .amounts import Amount, format_amount
 from .auth import stk_push_password
-from .enums import TransactionType
-from .interfaces import BaseCallbackParser, BaseRequestBuilder, ResponseParserInterface
-from mpesa_sdk.utils import camel_to_snake, preprocess_http_response, timestamp
+from .enums import RequestPriority, TransactionType
+from .interfaces import BaseCallbackParser, BaseRequestBuilder, BaseResponseParser
+from .responses import ResponseShape
+from .validation import (
+    AMOUNT_PATTERN,
+    MSISDN_PATTERN,
+    SHORTCODE_PATTERN,
+    TIMESTAMP_PATTERN,
+    URL_PATTERN,
+    Field,
+)
+from mpesa_sdk.utils import camel_to_snake, timestamp
 
 logg = logging.getLogger()
 
@@ -21,7 +28,13 @@ class StkPushRequestInterface(BaseRequestBuilder):
     """This class contains the interface for building STK push payment requests."""
 
     def __init__(
-        self, consumer_key: str, consumer_secret: str, passkey: str, shortcode: str
+        self,
+        consumer_key: str,
+        consumer_secret: str,
+        passkey: str,
+        shortcode: str,
+        *args,
+        **kwargs,
     ):
         """This method initializes the STK push payment request builder class.
         :param consumer_key: the consumer key.
@@ -32,8 +45,12 @@ class StkPushRequestInterface(BaseRequestBuilder):
         :type passkey: str
         :param shortcode: the shortcode.
         :type shortcode: str
+        :param args: the further positional arguments of BaseRequestBuilder, starting with the transport.
+        :type args: Any
+        :param kwargs: the options of BaseRequestBuilder, e.g. transport, retry or scheduler.
+        :type kwargs: Any
         """
-        super().__init__(consumer_key, consumer_secret, shortcode)
+        super().__init__(consumer_key, consumer_secret, shortcode, *args, **kwargs)
         self.passkey = passkey
 
     @property
@@ -48,75 +65,70 @@ class StkPushRequestInterface(BaseRequestBuilder):
         pass
 
 
-class StkPushResponseParser(ResponseParserInterface):
+class StkPushResponseParser(BaseResponseParser):
     """This class contains the interface for parsing STK push payment responses."""
 
-    def __init__(self, response: Response):
-        self.response = preprocess_http_response(response)
-        if isinstance(self.response, dict):
-            self.description = (
-                self.response.get("ResultDesc")
-                or self.response.get("ResponseDescription")
-                or self.response.get("errorMessage")
-            )
-
-            try:
-                self.request_id = self.response["MerchantRequestID"]
-            except KeyError:
-                self.request_id = self.response["requestId"]
-
-            try:
-                self.result_code = self.response["ResultCode"]
-            except KeyError:
-                self.result_code = self.response["errorCode"]
-
-    def parse(self):
-        if isinstance(self.response, dict):
-            if self.result_code == 0:
-                logg.info(self.get_success_log_message())
-            else:
-                logg.error(self.get_error_log_message())
-            return {camel_to_snake(key): value for key, value in self.response.items()}
-
-    def get_error_log_message(self):
-        """Get error log message."""
-        raise NotImplementedError
+    SHAPE = ResponseShape(
+        code=("ResultCode", "ResponseCode"),
+        description=("ResultDesc", "ResponseDescription"),
+        request_id=("MerchantRequestID",),
+    )
 
-    def get_success_log_message(self):
-        """Get success log message."""
-        raise NotImplementedError
+    @property
+    def result_code(self):
+        """This property returns the response's ResultCode or ResponseCode.
+        :return: the code.
+        :rtype: str
+        """
+        return self.response_code
 
 
 class StkPushPaymentRequest(StkPushRequestInterface):
     """This class implements the STK push payment request builder interface."""
 
     URL_ENV = "STK_PUSH_INITIATION_URL"
+    PRIORITY = RequestPriority.INTERACTIVE
+    MSISDN_FIELDS = ("PartyA", "PhoneNumber")
+    PAYLOAD_FIELDS = (
+        Field("BusinessShortCode", pattern=SHORTCODE_PATTERN),
+        Field("Password"),
+        Field("Timestamp", pattern=TIMESTAMP_PATTERN),
+        Field("TransactionType", choices=TransactionType),
+        Field("Amount", pattern=AMOUNT_PATTERN),
+        Field("PartyA", pattern=MSISDN_PATTERN),
+        Field("PartyB", pattern=SHORTCODE_PATTERN),
+        Field("PhoneNumber", pattern=MSISDN_PATTERN),
+        Field("CallBackURL", pattern=URL_PATTERN),
+        Field("AccountReference", max_length=12),
+        Field("TransactionDesc", max_length=100),
+    )
 
     def build(
         self,
         account_reference: str,
-        amount: str,
+        amount: Amount,
         recipient: str,
         transaction_description: str,
     ):
         """This method builds the STK push payment request.
         :param account_reference: the account reference.
         :type account_reference: str
-        :param amount: the amount.
-        :type amount: str
+        :param amount: the amount in whole shillings.
+        :type amount: Amount
         :param recipient: the recipient.
         :type recipient: str
         :param transaction_description: the transaction description.
         :type transaction_description: str
         :return: the STK push payment request.
         :rtype: dict
+        :raises InvalidAmountError: if the amount is not valid for an STK push.
         """
         return {
             "BusinessShortCode": self.shortcode,
             "Password": self.password,
             "Timestamp": timestamp(),
             "TransactionType": TransactionType.CUSTOMER_BUY_GOODS_ONLINE.value,
-            "Amount": amount,
+            "Amount": format_amount(amount, TransactionType.CUSTOMER_BUY_GOODS_ONLINE),
             "PartyA": recipient,
             "PartyB": self.shortcode,
             "PhoneNumber": recipient,
@@ -146,6 +158,14 @@ class StkPushStatusQueryRequest(StkPushRequestInterface):
     """This class handles the STK push status query request."""
 
     URL_ENV = "STK_PUSH_STATUS_QUERY_URL"
+    IDEMPOTENT = True
+    PRIORITY = RequestPriority.STATUS_QUERY
+    PAYLOAD_FIELDS = (
+        Field("BusinessShortCode", pattern=SHORTCODE_PATTERN),
+        Field("Password"),
+        Field("Timestamp", pattern=TIMESTAMP_PATTERN),
+        Field("CheckoutRequestID", max_length=100),
+    )
 
     def build(self, checkout_request_id: str):
         """This method builds the request payload.
@@ -3,15 +3,23 @@
 # standard imports
 import logging
 import os
-from typing import Union
+from typing import Optional, Union
 
 # local imports
-from mpesa_sdk.daraja.enums import CommandID, IdentifierType
+from mpesa_sdk.daraja.enums import CommandID, IdentifierType, RequestPriority
 from mpesa_sdk.daraja.interfaces import (
     BaseCallbackParser,
     BaseRequestBuilder,
     BaseResponseParser,
 )
+from mpesa_sdk.daraja.status_cache import TransactionStatusCache
+from mpesa_sdk.daraja.validation import (
+    PARTY_PATTERN,
+    TRANSACTION_ID_PATTERN,
+    URL_PATTERN,
+    Field,
+)
+from mpesa_sdk.transport import TransportResponse
 
 # external imports
 
@@ -22,6 +30,37 @@ class TransactionStatusQueryRequest(BaseRequestBuilder):
     """This class implements the transaction status query request builder interface."""
 
     URL_ENV = "TRANSACTION_STATUS_URL"
+    IDEMPOTENT = True
+    PRIORITY = RequestPriority.STATUS_QUERY
+    PAYLOAD_FIELDS = (
+        Field("Initiator", max_length=100),
+        Field("SecurityCredential"),
+        Field("CommandID", choices=(CommandID.TRANSACTION_STATUS_QUERY.value,)),
+        Field("TransactionID", pattern=TRANSACTION_ID_PATTERN),
+        Field("PartyA", pattern=PARTY_PATTERN),
+        Field("IdentifierType", choices=IdentifierType),
+        Field("QueueTimeOutURL", pattern=URL_PATTERN),
+        Field("ResultURL", pattern=URL_PATTERN),
+        Field("Remarks", max_length=100),
+        Field("Occasion", min_length=0, max_length=100),
+    )
+
+    def __init__(
+        self,
+        *args,
+        status_cache: Optional[TransactionStatusCache] = None,
+        **kwargs,
+    ):
+        """This method initializes the transaction status query request builder class.
+        :param args: the positional arguments of BaseRequestBuilder, the consumer key, consumer secret and shortcode.
+        :type args: Any
+        :param status_cache: the cache final results are served from by fetch_result, which requires one.
+        :type status_cache: TransactionStatusCache
+        :param kwargs: the options of BaseRequestBuilder, e.g. transport, retry or scheduler.
+        :type kwargs: Any
+        """
+        super().__init__(*args, **kwargs)
+        self.status_cache = status_cache
 
     def build(
         self,
@@ -50,9 +89,7 @@ class TransactionStatusQueryRequest(BaseRequestBuilder):
         """
         return {
             "Initiator": initiator,
-            "SecurityCredential": os.getenv(
-                "SECURITY_CREDENTIAL", "your-security-credential"
-            ),
+            "SecurityCredential": self.security_credential(initiator),
             "CommandID": CommandID.TRANSACTION_STATUS_QUERY.value,
             "TransactionID": transaction_id,
             "PartyA": party_a,
@@ -69,6 +106,129 @@ class TransactionStatusQueryRequest(BaseRequestBuilder):
             "Occasion": occasion,
         }
 
+    def fetch_result(
+        self,
+        identifier_type: IdentifierType,
+        initiator: str,
+        occasion: str,
+        party_a: str,
+        remarks: str,
+        transaction_id: str,
+        timeout: float = 30.0,
+    ) -> Optional[dict]:
+        """This method returns the final status of a transaction, from the status cache when it is known.
+
+        Otherwise the query is sent and the method waits for its result callback to be recorded in the cache;
+        concurrent calls for the same transaction share a single query.
+        :param identifier_type: the identifier type.
+        :type identifier_type: IdentifierType
+        :param initiator: the initiator.
+        :type initiator: str
+        :param occasion: the occasion.
+        :type occasion: str
+        :param party_a: the party a.
+        :type party_a: str
+        :param remarks: the remarks.
+        :type remarks: str
+        :param transaction_id: the transaction id.
+        :type transaction_id: str
+        :param timeout: the maximum number of seconds to wait for the result callback.
+        :type timeout: float
+        :return: the parsed result callback, the parsed response if Daraja rejected the query, or None if the
+        result did not arrive in time.
+        :rtype: dict
+        """
+        cache = self._require_status_cache()
+        key = (self.shortcode, transaction_id)
+        if (result := cache.get(*key)) is not None:
+            return result
+
+        def query():
+            response = self.execute(
+                identifier_type, initiator, occasion, party_a, remarks, transaction_id
+            )
+            if (rejected := self._expect_result(response, transaction_id)) is not None:
+                return rejected
+            return cache.wait(*key, timeout)
+
+        return cache.flight.do(key, query)
+
+    async def fetch_result_async(
+        self,
+        identifier_type: IdentifierType,
+        initiator: str,
+        occasion: str,
+        party_a: str,
+        remarks: str,
+        transaction_id: str,
+        timeout: float = 30.0,
+    ) -> Optional[dict]:
+        """This method returns the final status of a transaction through the asynchronous transport, from the status
+        cache when it is known.
+        :param identifier_type: the identifier type.
+        :type identifier_type: IdentifierType
+        :param initiator: the initiator.
+        :type initiator: str
+        :param occasion: the occasion.
+        :type occasion: str
+        :param party_a: the party a.
+        :type party_a: str
+        :param remarks: the remarks.
+        :type remarks: str
+        :param transaction_id: the transaction id.
+        :type transaction_id: str
+        :param timeout: the maximum number of seconds to wait for the result callback.
+        :type timeout: float
+        :return: the parsed result callback, the parsed response if Daraja rejected the query, or None if the
+        result did not arrive in time.
+        :rtype: dict
+        """
+        cache = self._require_status_cache()
+        key = (self.shortcode, transaction_id)
+        if (result := cache.get(*key)) is not None:
+            return result
+
+        async def query():
+            response = await self.execute_async(
+                identifier_type, initiator, occasion, party_a, remarks, transaction_id
+            )
+            if (rejected := self._expect_result(response, transaction_id)) is not None:
+                return rejected
+            return await cache.wait_async(*key, timeout)
+
+        return await cache.flight.do_async(key, query)
+
+    def _expect_result(
+        self, response: TransportResponse, transaction_id: str
+    ) -> Optional[dict]:
+        """This method registers an acknowledged query with the status cache so its result callback is matched.
+        :param response: the response to the query.
+        :type response: TransportResponse
+        :param transaction_id: the transaction id.
+        :type transaction_id: str
+        :return: the parsed response if Daraja rejected the query, None if it was accepted.
+        :rtype: dict
+        """
+        parser = TransactionStatusResponseParser(response)
+        if not parser.fields.success:
+            return parser.parse()
+        self._require_status_cache().expect(
+            self.shortcode,
+            transaction_id,
+            (parser.response or {}).get("ConversationID"),
+            parser.request_id,
+        )
+        return None
+
+    def _require_status_cache(self) -> TransactionStatusCache:
+        """This method returns the configured status cache.
+        :return: the status cache.
+        :rtype: TransactionStatusCache
+        """
+        if self.status_cache is None:
+            raise ValueError("A status cache is required to fetch transaction results.")
+        return self.status_cache
+
 
 class TransactionStatusResponseParser(BaseResponseParser):
     """This class implements the transaction status response parser interface."""
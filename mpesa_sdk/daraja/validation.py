@@ -0,0 +1,141 @@
+"""This module checks request payloads against Daraja's field rules before they are sent.
+
+Daraja reports a malformed payload only after a round trip, and sometimes only through the queue timeout URL. Each
+builder class declares its fields once, the declaration is compiled into flat checks on first use, and a payload is
+then checked in a single pass over those checks. Validation is on by default and can be disabled with the
+VALIDATE_PAYLOADS environment variable or set_payload_validation.
+"""
+
+# standard imports
+import enum
+import functools
+import os
+import re
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional, Union
+
+# local imports
+from mpesa_sdk.exceptions import PayloadValidationError
+
+PayloadValidator = Callable[[dict], list[str]]
+
+SHORTCODE_PATTERN = r"\d{5,7}"
+MSISDN_PATTERN = r"254\d{9}"
+PARTY_PATTERN = r"\d{5,7}|254\d{9}"
+TRANSACTION_ID_PATTERN = r"[A-Za-z0-9]{8,20}"
+AMOUNT_PATTERN = r"[1-9]\d*"
+TIMESTAMP_PATTERN = r"\d{14}"
+URL_PATTERN = r"https?://\S+"
+
+_enabled = os.getenv("VALIDATE_PAYLOADS", "true").strip().lower() not in (
+    "0",
+    "false",
+    "no",
+    "off",
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Field:
+    """This class describes the rules a single payload field must satisfy."""
+
+    name: str
+    required: bool = True
+    min_length: int = 1
+    max_length: Optional[int] = None
+    choices: Union[type[enum.Enum], Iterable[str], None] = None
+    pattern: Optional[str] = None
+
+
+def set_payload_validation(enabled: bool):
+    """This function enables or disables payload validation for builders that do not override it.
+    :param enabled: whether payloads are validated.
+    :type enabled: bool
+    """
+    global _enabled  # pylint: disable=global-statement
+    _enabled = enabled
+
+
+def payload_validation_enabled() -> bool:
+    """This function indicates whether payload validation is enabled by default.
+    :return: whether payloads are validated.
+    :rtype: bool
+    """
+    return _enabled
+
+
+def compile_fields(fields: Iterable[Field]) -> PayloadValidator:
+    """This function compiles field declarations into a payload validator.
+    :param fields: the field declarations.
+    :type fields: Iterable[Field]
+    :return: a function returning the errors found in a payload.
+    :rtype: Callable
+    """
+    checks = []
+    for field in fields:
+        choices = field.choices
+        if isinstance(choices, type) and issubclass(choices, enum.Enum):
+            choices = frozenset(str(member.value) for member in choices)
+        elif choices is not None:
+            choices = frozenset(choices)
+        match = re.compile(field.pattern).fullmatch if field.pattern else None
+        checks.append(
+            (
+                field.name,
+                field.required,
+                field.min_length,
+                field.max_length,
+                choices,
+                match,
+            )
+        )
+    compiled = tuple(checks)
+
+    def validate(payload: dict) -> list[str]:
+        errors = []
+        for name, required, min_length, max_length, choices, match in compiled:
+            value = payload.get(name)
+            if value is None:
+                if required:
+                    errors.append(f"{name} is required.")
+                continue
+            text = value if isinstance(value, str) else str(value)
+            length = len(text)
+            if length < min_length:
+                errors.append(f"{name} is required.")
+            elif max_length is not None and length > max_length:
+                errors.append(f"{name} exceeds {max_length} characters.")
+            elif choices is not None and text not in choices:
+                errors.append(f"{name} has an unsupported value: {value!r}.")
+            elif match is not None and match(text) is None:
+                errors.append(f"{name} is malformed: {value!r}.")
+        return errors
+
+    return validate
+
+
+@functools.cache
+def payload_validator(builder_class: type) -> PayloadValidator:
+    """This function returns the compiled validator of a builder class, compiling it on first use.
+    :param builder_class: the builder class, whose PAYLOAD_FIELDS declare its fields.
+    :type builder_class: type
+    :return: the payload validator.
+    :rtype: Callable
+    """
+    return compile_fields(getattr(builder_class, "PAYLOAD_FIELDS", ()))
+
+
+def validate_payload(builder_class: type, payload: dict) -> dict:
+    """This function checks a payload against the fields declared by its builder class.
+    :param builder_class: the builder class.
+    :type builder_class: type
+    :param payload: the request payload.
+    :type payload: dict
+    :return: the request payload.
+    :rtype: dict
+    :raises PayloadValidationError: if the payload breaks any of the rules.
+    """
+    errors = payload_validator(builder_class)(payload)
+    if errors:
+        raise PayloadValidationError(builder_class.__name__, errors)
+    return payload
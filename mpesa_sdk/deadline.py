@@ -0,0 +1,126 @@
+"""This module bounds the time a request, with its token fetch, queueing and retries, may take.
+
+A deadline is a point in time, taken from the monotonic clock, that is passed down to every step of a request. Each
+network call uses the smaller of its own timeout and the time left, and a retry is only made if the time left can
+cover its backoff and another attempt, so a caller with a fixed budget, e.g. a checkout API with a 5 second SLA, gets
+an answer, or a DeadlineExceededError, within that budget.
+"""
+
+# standard imports
+import time
+from typing import Awaitable, Optional, TypeVar
+
+# local imports
+from mpesa_sdk.exceptions import DeadlineExceededError
+
+T = TypeVar("T")
+
+
+class Deadline:
+    """This class represents the point in time by which an operation must complete."""
+
+    __slots__ = ("expires_at",)
+
+    def __init__(self, expires_at: float):
+        """This method initializes the deadline.
+        :param expires_at: the time, on the time.monotonic clock, at which the deadline expires.
+        :type expires_at: float
+        """
+        self.expires_at = expires_at
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        """This method creates a deadline expiring a number of seconds from now.
+        :param seconds: the budget in seconds.
+        :type seconds: float
+        :return: the deadline.
+        :rtype: Deadline
+        """
+        return cls(time.monotonic() + seconds)
+
+    def __repr__(self) -> str:
+        return f"Deadline(remaining={self.remaining():.3f})"
+
+    @property
+    def expired(self) -> bool:
+        """This property indicates whether the deadline has passed.
+        :return: whether the deadline has passed.
+        :rtype: bool
+        """
+        return time.monotonic() >= self.expires_at
+
+    def remaining(self) -> float:
+        """This method returns the time left before the deadline.
+        :return: the number of seconds left, 0 once the deadline has passed.
+        :rtype: float
+        """
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def covers(self, seconds: float) -> bool:
+        """This method checks whether the time left is enough for an operation.
+        :param seconds: the time the operation needs.
+        :type seconds: float
+        :return: whether the operation can complete before the deadline.
+        :rtype: bool
+        """
+        return self.expires_at - time.monotonic() >= seconds
+
+    def check(self):
+        """This method raises if the deadline has passed.
+        :raises DeadlineExceededError: if the deadline has passed.
+        """
+        if self.expired:
+            raise DeadlineExceededError("The request deadline was exceeded.")
+
+    def timeout(self, timeout: float) -> float:
+        """This method caps a timeout to the time left before the deadline.
+        :param timeout: the timeout in seconds.
+        :type timeout: float
+        :return: the smaller of the timeout and the time left.
+        :rtype: float
+        :raises DeadlineExceededError: if the deadline has passed.
+        """
+        remaining = self.expires_at - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceededError("The request deadline was exceeded.")
+        return min(timeout, remaining)
+
+
+def resolve_deadline(
+    timeout: Optional[float] = None, deadline: Optional[Deadline] = None
+) -> Optional[Deadline]:
+    """This function returns the deadline of an operation given a timeout, a deadline, or both.
+    :param timeout: the budget in seconds, counted from now.
+    :type timeout: float
+    :param deadline: the deadline, e.g. one shared by the steps of a larger operation.
+    :type deadline: Deadline
+    :return: the earlier of the two, None if neither is given.
+    :rtype: Deadline
+    """
+    if timeout is None:
+        return deadline
+    budget = Deadline.after(timeout)
+    if deadline is None or budget.expires_at < deadline.expires_at:
+        return budget
+    return deadline
+
+
+async def wait_for(awaitable: Awaitable[T], deadline: Deadline) -> T:
+    """This function awaits an awaitable, cancelling it once a deadline passes.
+    :param awaitable: the awaitable.
+    :type awaitable: Awaitable
+    :param deadline: the deadline.
+    :type deadline: Deadline
+    :return: the result of the awaitable.
+    :rtype: Any
+    :raises DeadlineExceededError: if the awaitable does not complete before the deadline.
+    """
+    # pylint: disable=import-outside-toplevel
+    import asyncio
+
+    try:
+        return await asyncio.wait_for(awaitable, deadline.remaining())
+    except asyncio.TimeoutError as error:
+        if not deadline.expired:
+            raise
+        raise DeadlineExceededError("The request deadline was exceeded.") from error
@@ -19,3 +19,89 @@ class NoResponse(Exception):
 
 class UnsupportedMethodError(Exception):
     """Raised when the method passed to the make request function is unsupported."""
+
+
+class InvalidMsisdnError(ValueError):
+    """Raised when a phone number is malformed or cannot receive M-Pesa payments."""
+
+
+class InvalidAmountError(ValueError):
+    """Raised when an amount is not a whole number of shillings or is outside a command's limits."""
+
+
+class PayloadValidationError(ValueError):
+    """Raised when a request payload breaks Daraja's field rules before it is sent."""
+
+    def __init__(self, builder: str, errors: list[str]):
+        self.builder = builder
+        self.errors = errors
+        super().__init__(f"Invalid {builder} payload: {' '.join(errors)}")
+
+
+class DarajaError(Exception):
+    """Raised when Daraja rejects a request or reports a failed transaction."""
+
+    retryable = False
+
+    def __init__(self, code: str, description: str = ""):
+        self.code = code
+        self.description = description
+        super().__init__(f"{code}: {description}" if description else code)
+
+
+class RetryableDarajaError(DarajaError):
+    """Raised for Daraja failures that may succeed when the request is retried."""
+
+    retryable = True
+
+
+class TerminalDarajaError(DarajaError):
+    """Raised for Daraja failures that will fail again if the request is retried."""
+
+
+class InvalidAccessTokenError(RetryableDarajaError):
+    """Raised when Daraja rejects the access token, retrying with a new token may succeed."""
+
+
+class ThrottledError(RetryableDarajaError):
+    """Raised when Daraja rejects a request because of spike arrest, quotas or a busy system."""
+
+
+class DarajaServerError(RetryableDarajaError):
+    """Raised when Daraja fails with an internal error."""
+
+
+class TransactionInProgressError(RetryableDarajaError):
+    """Raised when the subscriber is locked by a transaction that is already in progress."""
+
+
+class SubscriberTimeoutError(RetryableDarajaError):
+    """Raised when the subscriber cannot be reached or does not respond in time."""
+
+
+class TransactionCancelledError(TerminalDarajaError):
+    """Raised when the subscriber cancels the transaction."""
+
+
+class InsufficientFundsError(TerminalDarajaError):
+    """Raised when the paying account does not have enough funds."""
+
+
+class InvalidCredentialsError(TerminalDarajaError):
+    """Raised when the PIN, initiator or security credential is wrong."""
+
+
+class InvalidRequestError(TerminalDarajaError):
+    """Raised when Daraja rejects the request as malformed or unsupported."""
+
+
+class LimitExceededError(TerminalDarajaError):
+    """Raised when a transaction is outside the allowed amount or balance limits."""
+
+
+class DuplicateTransactionError(TerminalDarajaError):
+    """Raised when Daraja detects a duplicate transaction."""
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when a request cannot complete before its deadline."""
@@ -0,0 +1,254 @@
+"""This module implements hedged requests for idempotent API operations."""
+
+# standard imports
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import TYPE_CHECKING, Awaitable, Callable, Optional, TypeVar
+
+if TYPE_CHECKING:
+    from concurrent.futures import ThreadPoolExecutor
+
+    from mpesa_sdk.ratelimit import RateLimiter
+
+logg = logging.getLogger(__file__)
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """This class keeps a rolling window of observed latencies."""
+
+    def __init__(self, window: int = 200):
+        """This method initializes the latency tracker.
+        :param window: the number of most recent latencies kept.
+        :type window: int
+        """
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._latencies)
+
+    def record(self, latency: float):
+        """This method records an observed latency.
+        :param latency: the latency in seconds.
+        :type latency: float
+        """
+        with self._lock:
+            self._latencies.append(latency)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """This method computes a percentile of the recorded latencies.
+        :param percentile: the percentile as a fraction, e.g. 0.95.
+        :type percentile: float
+        :return: the latency at the percentile, None if no latencies were recorded.
+        :rtype: float
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(percentile * len(latencies)))]
+
+
+class HedgingPolicy:
+    """This class issues a second identical request when the first has not completed within the hedge delay.
+
+    The first successful response wins and the other attempt is cancelled; an asynchronous attempt is cancelled
+    outright, whereas a synchronous attempt that is already running is abandoned and its response discarded. The
+    hedge delay is either fixed or learned as a percentile of recently observed latencies. A hedge is only sent when
+    the rate limiter, if any, has capacity for it, so hedging never pushes traffic past the configured limit, and,
+    when the caller passes a slot to acquire, e.g. of a request scheduler, only if the slot is free; the hedge then
+    holds the slot until it completes. Hedging must only be used for idempotent operations.
+    """
+
+    def __init__(
+        self,
+        delay: Optional[float] = None,
+        percentile: float = 0.95,
+        default_delay: float = 0.5,
+        min_samples: int = 20,
+        window: int = 200,
+        rate_limiter: Optional["RateLimiter"] = None,
+        max_workers: int = 32,
+    ):
+        """This method initializes the hedging policy.
+        :param delay: a fixed hedge delay in seconds, learned from observed latencies when omitted.
+        :type delay: float
+        :param percentile: the latency percentile used as the learned hedge delay.
+        :type percentile: float
+        :param default_delay: the hedge delay used until enough latencies have been observed.
+        :type default_delay: float
+        :param min_samples: the number of observed latencies required before the learned delay is used.
+        :type min_samples: int
+        :param window: the number of most recent latencies the learned delay is computed from.
+        :type window: int
+        :param rate_limiter: the rate limiter hedges must acquire a token from.
+        :type rate_limiter: RateLimiter
+        :param max_workers: the maximum number of threads used for synchronous attempts.
+        :type max_workers: int
+        """
+        self.delay = delay
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_samples = min_samples
+        self.latencies = LatencyTracker(window)
+        self.rate_limiter = rate_limiter
+        self.max_workers = max_workers
+        self._executor: Optional["ThreadPoolExecutor"] = None
+        self._executor_lock = threading.Lock()
+
+    def hedge_delay(self) -> float:
+        """This method returns the time to wait for the first attempt before hedging.
+        :return: the hedge delay in seconds.
+        :rtype: float
+        """
+        if self.delay is not None:
+            return self.delay
+        if len(self.latencies) < self.min_samples:
+            return self.default_delay
+        return self.latencies.percentile(self.percentile) or self.default_delay
+
+    def allow_hedge(
+        self,
+        acquire_slot: Optional[Callable[[], bool]] = None,
+        release_slot: Optional[Callable[[], None]] = None,
+    ) -> bool:
+        """This method checks whether a hedge may be sent without exceeding the rate limit or the free slots.
+        :param acquire_slot: a function taking a slot for the hedge without waiting, returning whether it did.
+        :type acquire_slot: Callable
+        :param release_slot: a function freeing the slot, called if the rate limit turns the hedge down.
+        :type release_slot: Callable
+        :return: whether a hedge may be sent.
+        :rtype: bool
+        """
+        if acquire_slot is not None and not acquire_slot():
+            logg.debug("Skipping hedged request, no request slot is free.")
+            return False
+        if self.rate_limiter is None or self.rate_limiter.try_acquire() == 0:
+            return True
+        if release_slot is not None:
+            release_slot()
+        logg.debug("Skipping hedged request, rate limit reached.")
+        return False
+
+    def call(
+        self,
+        operation: Callable[[], T],
+        acquire_slot: Optional[Callable[[], bool]] = None,
+        release_slot: Optional[Callable[[], None]] = None,
+    ) -> T:
+        """This method runs a synchronous operation with hedging.
+        :param operation: the idempotent operation.
+        :type operation: Callable
+        :param acquire_slot: a function taking a slot for the hedge without waiting, returning whether it did.
+        :type acquire_slot: Callable
+        :param release_slot: a function freeing the hedge's slot once the hedge completes.
+        :type release_slot: Callable
+        :return: the result of the first successful attempt.
+        :rtype: Any
+        """
+
+        def attempt() -> T:
+            started = time.monotonic()
+            result = operation()
+            self.latencies.record(time.monotonic() - started)
+            return result
+
+        executor = self._get_executor()
+        attempts: list[Future] = [executor.submit(attempt)]
+        done, _ = wait(attempts, timeout=self.hedge_delay())
+        if not done and self.allow_hedge(acquire_slot, release_slot):
+            logg.debug("Sending hedged request.")
+            hedge = executor.submit(attempt)
+            if release_slot is not None:
+                hedge.add_done_callback(lambda _: release_slot())
+            attempts.append(hedge)
+
+        pending = set(attempts)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    for loser in pending:
+                        loser.cancel()
+                    return future.result()
+        raise error  # type: ignore[misc]
+
+    async def call_async(
+        self,
+        operation: Callable[[], Awaitable[T]],
+        acquire_slot: Optional[Callable[[], bool]] = None,
+        release_slot: Optional[Callable[[], None]] = None,
+    ) -> T:
+        """This method runs an asynchronous operation with hedging.
+        :param operation: a factory returning a new awaitable for each attempt of the idempotent operation.
+        :type operation: Callable
+        :param acquire_slot: a function taking a slot for the hedge without waiting, returning whether it did.
+        :type acquire_slot: Callable
+        :param release_slot: a function freeing the hedge's slot once the hedge completes or is cancelled.
+        :type release_slot: Callable
+        :return: the result of the first successful attempt.
+        :rtype: Any
+        """
+
+        # pylint: disable=import-outside-toplevel
+        import asyncio
+
+        async def attempt() -> T:
+            started = time.monotonic()
+            result = await operation()
+            self.latencies.record(time.monotonic() - started)
+            return result
+
+        attempts = [asyncio.ensure_future(attempt())]
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=self.hedge_delay())
+            if not done and self.allow_hedge(acquire_slot, release_slot):
+                logg.debug("Sending hedged request.")
+                hedge = asyncio.ensure_future(attempt())
+                if release_slot is not None:
+                    hedge.add_done_callback(lambda _: release_slot())
+                attempts.append(hedge)
+
+            pending = set(attempts)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        return task.result()
+            raise error  # type: ignore[misc]
+        finally:
+            for task in attempts:
+                task.cancel()
+
+    def close(self):
+        """This method shuts down the threads used for synchronous attempts."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _get_executor(self) -> "ThreadPoolExecutor":
+        """This method returns the thread pool used for synchronous attempts, creating it on first use.
+        :return: the thread pool.
+        :rtype: ThreadPoolExecutor
+        """
+        # pylint: disable=import-outside-toplevel
+        from concurrent.futures import ThreadPoolExecutor
+
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="mpesa-hedge"
+                )
+            return self._executor
@@ -0,0 +1,77 @@
+"""This module implements a token bucket rate limiter that can be shared across threads and processes."""
+
+# standard imports
+import multiprocessing
+import time
+from typing import Optional
+
+
+class RateLimiter:
+    """This class implements a token bucket rate limiter.
+
+    The bucket state lives in shared memory guarded by a process-safe lock, so a single limiter created in a parent
+    process and handed to worker processes enforces one limit across all of them.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        context: Optional[multiprocessing.context.BaseContext] = None,
+    ):
+        """This method initializes the rate limiter.
+        :param rate: the number of tokens added to the bucket per second.
+        :type rate: float
+        :param capacity: the maximum number of tokens in the bucket, defaults to the rate.
+        :type capacity: float
+        :param context: the multiprocessing context used to allocate shared state.
+        :type context: multiprocessing.context.BaseContext
+        """
+        if rate <= 0:
+            raise ValueError("Rate must be greater than zero.")
+        context = context or multiprocessing.get_context()
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._lock = context.Lock()
+        self._tokens = context.Value("d", self.capacity, lock=False)
+        self._updated_at = context.Value("d", time.monotonic(), lock=False)
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """This method attempts to take tokens from the bucket without blocking.
+        :param tokens: the number of tokens to take.
+        :type tokens: float
+        :return: 0 if the tokens were taken, otherwise the number of seconds until they will be available.
+        :rtype: float
+        """
+        with self._lock:
+            now = time.monotonic()
+            available = min(
+                self.capacity,
+                self._tokens.value + (now - self._updated_at.value) * self.rate,
+            )
+            self._updated_at.value = now
+            if available >= tokens:
+                self._tokens.value = available - tokens
+                return 0.0
+            self._tokens.value = available
+            return (tokens - available) / self.rate
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """This method takes tokens from the bucket, waiting until they are available.
+        :param tokens: the number of tokens to take.
+        :type tokens: float
+        :param timeout: the maximum number of seconds to wait, waits indefinitely when omitted.
+        :type timeout: float
+        :return: whether the tokens were taken.
+        :rtype: bool
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining < wait:
+                    return False
+            time.sleep(wait)
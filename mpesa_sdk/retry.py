@@ -0,0 +1,221 @@
+"""This module implements retries of API requests that failed with a retryable Daraja error."""
+
+# standard imports
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Optional
+
+# local imports
+from mpesa_sdk.daraja.errors import DarajaErrorCode, classify_response
+from mpesa_sdk.deadline import Deadline
+from mpesa_sdk.exceptions import DeadlineExceededError
+from mpesa_sdk.transport import TransportResponse
+
+logg = logging.getLogger(__file__)
+
+Classifier = Callable[[TransportResponse], Optional[DarajaErrorCode]]
+RetryHook = Callable[[DarajaErrorCode], None]
+
+
+class RetryPolicy:
+    """This class retries requests whose response Daraja classifies as retryable, with exponential backoff.
+
+    Responses with a terminal error, e.g. a wrong PIN or a cancelled transaction, are returned immediately, since a
+    retry cannot succeed. Transport errors and server errors, where it is unknown whether Daraja processed the
+    request, are only retried for idempotent requests so that a payment is never sent twice. With a deadline, a retry
+    is only made if the time left covers its backoff and another attempt; otherwise the last response is returned, or
+    its error raised.
+    """
+
+    def __init__(
+        self,
+        attempts: int = 3,
+        backoff: float = 0.5,
+        multiplier: float = 2.0,
+        max_backoff: float = 8.0,
+        jitter: float = 0.1,
+        classifier: Classifier = classify_response,
+        retry_exceptions: tuple[type[BaseException], ...] = (OSError,),
+        min_attempt_time: float = 0.5,
+    ):
+        """This method initializes the retry policy.
+        :param attempts: the maximum number of attempts, including the first.
+        :type attempts: int
+        :param backoff: the delay in seconds before the first retry.
+        :type backoff: float
+        :param multiplier: the factor the delay grows by after each retry.
+        :type multiplier: float
+        :param max_backoff: the longest delay in seconds between attempts.
+        :type max_backoff: float
+        :param jitter: the fraction of the delay randomly added or removed to spread out retries.
+        :type jitter: float
+        :param classifier: the function classifying a response's failure, None for success.
+        :type classifier: Callable
+        :param retry_exceptions: the transport errors retried for idempotent requests, OSError covers the connection
+        errors and timeouts raised by requests.
+        :type retry_exceptions: tuple
+        :param min_attempt_time: the least time in seconds an attempt needs, a retry is not made if the time left
+        before the deadline cannot cover it after the backoff.
+        :type min_attempt_time: float
+        """
+        if attempts < 1:
+            raise ValueError("A retry policy needs at least one attempt.")
+        self.attempts = attempts
+        self.backoff = backoff
+        self.multiplier = multiplier
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.classifier = classifier
+        self.retry_exceptions = retry_exceptions
+        self.min_attempt_time = min_attempt_time
+
+    def delay(self, retry: int) -> float:
+        """This method returns the time to wait before a retry.
+        :param retry: the number of the retry, starting at 1.
+        :type retry: int
+        :return: the delay in seconds.
+        :rtype: float
+        """
+        delay = min(self.max_backoff, self.backoff * self.multiplier ** (retry - 1))
+        if self.jitter:
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(0.0, delay)
+
+    def within_budget(self, delay: float, deadline: Optional[Deadline]) -> bool:
+        """This method checks whether the time left before a deadline covers a retry.
+        :param delay: the backoff before the retry.
+        :type delay: float
+        :param deadline: the deadline of the request, retries are always within budget without one.
+        :type deadline: Deadline
+        :return: whether the retry can complete before the deadline.
+        :rtype: bool
+        """
+        return deadline is None or deadline.covers(delay + self.min_attempt_time)
+
+    def should_retry(
+        self, response: TransportResponse, attempt: int, idempotent: bool = False
+    ) -> Optional[DarajaErrorCode]:
+        """This method checks whether a response should be retried.
+
+        A non-idempotent request is only retried when Daraja rejected it with a code that is safe to resend, e.g.
+        throttling or an expired token; a server error, e.g. an internal error or a gateway timeout, does not tell
+        whether the request was processed.
+        :param response: the response of the attempt.
+        :type response: TransportResponse
+        :param attempt: the number of the attempt, starting at 1.
+        :type attempt: int
+        :param idempotent: whether the request is idempotent.
+        :type idempotent: bool
+        :return: the retryable error, None if the response is returned as is.
+        :rtype: DarajaErrorCode
+        """
+        if attempt >= self.attempts:
+            return None
+        error = self.classifier(response)
+        if error is None or not error.retryable:
+            return None
+        if not idempotent and not error.resend_safe:
+            return None
+        return error
+
+    def call(
+        self,
+        operation: Callable[[], TransportResponse],
+        idempotent: bool = False,
+        on_retry: Optional[RetryHook] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> TransportResponse:
+        """This method runs a synchronous request, retrying it while it fails with a retryable error.
+        :param operation: a function sending the request.
+        :type operation: Callable
+        :param idempotent: whether transport errors and bare server errors may be retried.
+        :type idempotent: bool
+        :param on_retry: a function called with the error before each retry, e.g. to discard a rejected token.
+        :type on_retry: Callable
+        :param deadline: the deadline of the request, a retry is not made if it cannot complete before it.
+        :type deadline: Deadline
+        :return: the response of the last attempt.
+        :rtype: TransportResponse
+        """
+        attempt = 1
+        while True:
+            try:
+                response = operation()
+            except DeadlineExceededError:
+                raise
+            except self.retry_exceptions as error:
+                if not idempotent or attempt >= self.attempts:
+                    raise
+                delay = self.delay(attempt)
+                if not self.within_budget(delay, deadline):
+                    raise
+                logg.warning("Retrying request after transport error: %s.", error)
+            else:
+                retryable = self.should_retry(response, attempt, idempotent)
+                if retryable is None:
+                    return response
+                delay = self.delay(attempt)
+                if not self.within_budget(delay, deadline):
+                    logg.warning(
+                        "Not retrying request after error: %s, the deadline is too close.",
+                        retryable.code,
+                    )
+                    return response
+                logg.warning("Retrying request after error: %s.", retryable.code)
+                if on_retry is not None:
+                    on_retry(retryable)
+            time.sleep(delay)
+            attempt += 1
+
+    async def call_async(
+        self,
+        operation: Callable[[], Awaitable[TransportResponse]],
+        idempotent: bool = False,
+        on_retry: Optional[RetryHook] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> TransportResponse:
+        """This method runs an asynchronous request, retrying it while it fails with a retryable error.
+        :param operation: a factory returning a new awaitable for each attempt.
+        :type operation: Callable
+        :param idempotent: whether transport errors and bare server errors may be retried.
+        :type idempotent: bool
+        :param on_retry: a function called with the error before each retry.
+        :type on_retry: Callable
+        :param deadline: the deadline of the request, a retry is not made if it cannot complete before it.
+        :type deadline: Deadline
+        :return: the response of the last attempt.
+        :rtype: TransportResponse
+        """
+        # pylint: disable=import-outside-toplevel
+        import asyncio
+
+        attempt = 1
+        while True:
+            try:
+                response = await operation()
+            except DeadlineExceededError:
+                raise
+            except self.retry_exceptions as error:
+                if not idempotent or attempt >= self.attempts:
+                    raise
+                delay = self.delay(attempt)
+                if not self.within_budget(delay, deadline):
+                    raise
+                logg.warning("Retrying request after transport error: %s.", error)
+            else:
+                retryable = self.should_retry(response, attempt, idempotent)
+                if retryable is None:
+                    return response
+                delay = self.delay(attempt)
+                if not self.within_budget(delay, deadline):
+                    logg.warning(
+                        "Not retrying request after error: %s, the deadline is too close.",
+                        retryable.code,
+                    )
+                    return response
+                logg.warning("Retrying request after error: %s.", retryable.code)
+                if on_retry is not None:
+                    on_retry(retryable)
+            await asyncio.sleep(delay)
+            attempt += 1
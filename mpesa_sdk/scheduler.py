@@ -0,0 +1,315 @@
+"""This module schedules outbound requests by priority class, fairly across tenants.
+
+Requests run in a bounded number of slots. When a slot frees up it goes to the most urgent priority class with a
+waiting request that is below its own concurrency limit, so a large bulk payout cannot starve interactive STK pushes,
+while a class limit keeps bulk traffic from occupying every slot in the first place. Within a class, tenants, e.g.
+shortcodes, are served by weighted fair queueing: each waiting request is tagged with a virtual finish time that
+grows by the inverse of its tenant's weight, and the smallest tag is served first. Synchronous callers, e.g. a thread
+pool, and asynchronous callers share the same slots.
+"""
+
+# standard imports
+import heapq
+import itertools
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, Optional, TypeVar
+
+# local imports
+from mpesa_sdk.daraja.enums import RequestPriority
+from mpesa_sdk.exceptions import DeadlineExceededError
+
+T = TypeVar("T")
+
+DEFAULT_TENANT = ""
+
+
+class _Waiter:
+    """This class holds a request waiting for a slot."""
+
+    __slots__ = ("priority", "granted", "cancelled", "event", "loop", "future")
+
+    def __init__(self, priority: RequestPriority, loop: Any = None):
+        self.priority = priority
+        self.granted = False
+        self.cancelled = False
+        self.loop = loop
+        self.event: Optional[threading.Event] = (
+            None if loop is not None else threading.Event()
+        )
+        self.future: Optional[Any] = None if loop is None else loop.create_future()
+
+    def wake(self):
+        """This method hands the waiter its slot. It is called with the scheduler's lock held."""
+        self.granted = True
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class RequestScheduler:
+    """This class limits the number of requests in flight and decides which waiting request runs next."""
+
+    def __init__(
+        self,
+        concurrency: int = 8,
+        class_limits: Optional[dict[RequestPriority, int]] = None,
+        tenant_weights: Optional[dict[str, float]] = None,
+        default_weight: float = 1.0,
+    ):
+        """This method initializes the request scheduler.
+        :param concurrency: the maximum number of requests in flight.
+        :type concurrency: int
+        :param class_limits: the maximum number of requests in flight per priority class, classes without a limit
+        may use every slot.
+        :type class_limits: dict
+        :param tenant_weights: the share of its priority class each tenant is served, relative to the other tenants.
+        :type tenant_weights: dict
+        :param default_weight: the weight of tenants missing from tenant_weights.
+        :type default_weight: float
+        """
+        if concurrency < 1:
+            raise ValueError("A scheduler needs at least one slot.")
+        self.concurrency = concurrency
+        self.class_limits = dict(class_limits or {})
+        self.tenant_weights = dict(tenant_weights or {})
+        self.default_weight = default_weight
+        self._lock = threading.Lock()
+        self._active = 0
+        self._active_by_class = {priority: 0 for priority in RequestPriority}
+        self._queues: dict[RequestPriority, list] = {
+            priority: [] for priority in RequestPriority
+        }
+        self._virtual_time = {priority: 0.0 for priority in RequestPriority}
+        self._finish_tags: dict[tuple[RequestPriority, str], float] = {}
+        self._sequence = itertools.count()
+
+    @property
+    def active(self) -> int:
+        """This property returns the number of requests in flight.
+        :return: the number of requests in flight.
+        :rtype: int
+        """
+        return self._active
+
+    def queued(self, priority: Optional[RequestPriority] = None) -> int:
+        """This method returns the number of requests waiting for a slot.
+        :param priority: the priority class to count, all classes when omitted.
+        :type priority: RequestPriority
+        :return: the number of waiting requests.
+        :rtype: int
+        """
+        with self._lock:
+            queues = (
+                self._queues.values() if priority is None else (self._queues[priority],)
+            )
+            return sum(
+                1 for queue in queues for entry in queue if not entry[2].cancelled
+            )
+
+    def acquire(
+        self,
+        priority: RequestPriority,
+        tenant: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> bool:
+        """This method waits for a slot.
+        :param priority: the priority class of the request.
+        :type priority: RequestPriority
+        :param tenant: the tenant the request is made for.
+        :type tenant: str
+        :param timeout: the maximum number of seconds to wait, waits indefinitely when omitted.
+        :type timeout: float
+        :return: whether a slot was acquired.
+        :rtype: bool
+        """
+        waiter = _Waiter(priority)
+        self._enqueue(waiter, tenant)
+        assert waiter.event is not None
+        if waiter.event.wait(timeout):
+            return True
+        with self._lock:
+            if waiter.granted:
+                return True
+            waiter.cancelled = True
+        return False
+
+    def try_acquire(self, priority: RequestPriority) -> bool:
+        """This method takes a slot without waiting, e.g. for a hedged request, if one is free and within the class
+        limit. Slots left free by dispatching have no waiting request entitled to them, so none is overtaken.
+        :param priority: the priority class of the request.
+        :type priority: RequestPriority
+        :return: whether a slot was acquired.
+        :rtype: bool
+        """
+        limit = self.class_limits.get(priority)
+        with self._lock:
+            if self._active >= self.concurrency or (
+                limit is not None and self._active_by_class[priority] >= limit
+            ):
+                return False
+            self._active += 1
+            self._active_by_class[priority] += 1
+            return True
+
+    async def acquire_async(
+        self, priority: RequestPriority, tenant: Optional[str] = None
+    ):
+        """This method waits for a slot without blocking the event loop. A caller cancelled while waiting gives up
+        its place in the queue.
+        :param priority: the priority class of the request.
+        :type priority: RequestPriority
+        :param tenant: the tenant the request is made for.
+        :type tenant: str
+        """
+        # pylint: disable=import-outside-toplevel
+        import asyncio
+
+        waiter = _Waiter(priority, asyncio.get_running_loop())
+        self._enqueue(waiter, tenant)
+        assert waiter.future is not None
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter.granted
+                waiter.cancelled = True
+            if granted:
+                self.release(priority)
+            raise
+
+    def release(self, priority: RequestPriority):
+        """This method frees a slot and hands it to the next waiting request.
+        :param priority: the priority class of the request that held the slot.
+        :type priority: RequestPriority
+        """
+        with self._lock:
+            self._active -= 1
+            self._active_by_class[priority] -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(
+        self,
+        priority: RequestPriority,
+        tenant: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> Iterator[None]:
+        """This method holds a slot for the duration of a with block.
+        :param priority: the priority class of the request.
+        :type priority: RequestPriority
+        :param tenant: the tenant the request is made for.
+        :type tenant: str
+        :param timeout: the maximum number of seconds to wait for the slot, waits indefinitely when omitted.
+        :type timeout: float
+        :raises DeadlineExceededError: if no slot is free within the timeout.
+        """
+        if not self.acquire(priority, tenant, timeout):
+            raise DeadlineExceededError("No request slot was free in time.")
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    @asynccontextmanager
+    async def slot_async(
+        self, priority: RequestPriority, tenant: Optional[str] = None
+    ) -> AsyncIterator[None]:
+        """This method holds a slot for the duration of an async with block.
+        :param priority: the priority class of the request.
+        :type priority: RequestPriority
+        :param tenant: the tenant the request is made for.
+        :type tenant: str
+        """
+        await self.acquire_async(priority, tenant)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def run(
+        self,
+        operation: Callable[[], T],
+        priority: RequestPriority,
+        tenant: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> T:
+        """This method runs an operation once a slot is free.
+        :param operation: the operation.
+        :type operation: Callable
+        :param priority: the priority class of the operation.
+        :type priority: RequestPriority
+        :param tenant: the tenant the operation is run for.
+        :type tenant: str
+        :param timeout: the maximum number of seconds to wait for the slot, waits indefinitely when omitted.
+        :type timeout: float
+        :return: the result of the operation.
+        :rtype: Any
+        :raises DeadlineExceededError: if no slot is free within the timeout.
+        """
+        with self.slot(priority, tenant, timeout):
+            return operation()
+
+    async def run_async(
+        self,
+        operation: Callable[[], Awaitable[T]],
+        priority: RequestPriority,
+        tenant: Optional[str] = None,
+    ) -> T:
+        """This method runs an asynchronous operation once a slot is free.
+        :param operation: a factory returning the awaitable to run.
+        :type operation: Callable
+        :param priority: the priority class of the operation.
+        :type priority: RequestPriority
+        :param tenant: the tenant the operation is run for.
+        :type tenant: str
+        :return: the result of the operation.
+        :rtype: Any
+        """
+        async with self.slot_async(priority, tenant):
+            return await operation()
+
+    def _enqueue(self, waiter: _Waiter, tenant: Optional[str]):
+        """This method queues a waiter behind the requests with smaller finish tags and dispatches free slots.
+        :param waiter: the waiter.
+        :type waiter: _Waiter
+        :param tenant: the tenant the request is made for.
+        :type tenant: str
+        """
+        tenant = tenant or DEFAULT_TENANT
+        priority = waiter.priority
+        weight = self.tenant_weights.get(tenant, self.default_weight)
+        with self._lock:
+            start = max(
+                self._virtual_time[priority],
+                self._finish_tags.get((priority, tenant), 0.0),
+            )
+            tag = start + 1.0 / weight
+            self._finish_tags[(priority, tenant)] = tag
+            heapq.heappush(self._queues[priority], (tag, next(self._sequence), waiter))
+            self._dispatch()
+
+    def _dispatch(self):
+        """This method hands free slots to waiting requests, most urgent class first. It must be called with the
+        lock held."""
+        while self._active < self.concurrency:
+            for priority, queue in self._queues.items():
+                limit = self.class_limits.get(priority)
+                if limit is not None and self._active_by_class[priority] >= limit:
+                    continue
+                while queue and queue[0][2].cancelled:
+                    heapq.heappop(queue)
+                if queue:
+                    tag, _, waiter = heapq.heappop(queue)
+                    self._virtual_time[priority] = tag
+                    self._active += 1
+                    self._active_by_class[priority] += 1
+                    waiter.wake()
+                    break
+            else:
+                return
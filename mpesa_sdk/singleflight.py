@@ -0,0 +1,202 @@
+"""This module coalesces concurrent identical operations into a single call whose outcome every caller shares."""
+
+# standard imports
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional, TypeVar
+
+# local imports
+from mpesa_sdk.exceptions import DeadlineExceededError
+
+T = TypeVar("T")
+
+Retain = Callable[[Any], bool]
+
+
+class _Call:
+    """This class holds the outcome of an in-flight call for the callers waiting on it."""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """This class runs at most one call per key at a time.
+
+    The first caller for a key runs the operation; callers arriving with the same key while it is in flight wait for
+    it and receive its result, or its exception, instead of starting another. Synchronous and asynchronous calls are
+    tracked separately, and an asynchronous call is only shared with callers on the same event loop. With a TTL, the
+    result of a completed call is also returned to callers arriving within the TTL, e.g. a retry fired by an upstream
+    service shortly after the original request succeeded.
+    """
+
+    def __init__(self, ttl: float = 0.0):
+        """This method initializes the single flight group.
+        :param ttl: the number of seconds the result of a completed call is returned to new callers.
+        :type ttl: float
+        """
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self._async_calls: dict[Hashable, Any] = {}
+        self._recent: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def forget(self, key: Optional[Hashable] = None):
+        """This method discards the retained result for a key, all of them when no key is given.
+        :param key: the key.
+        :type key: Hashable
+        """
+        with self._lock:
+            if key is None:
+                self._recent.clear()
+            else:
+                self._recent.pop(key, None)
+
+    def _recent_result(self, key: Hashable) -> tuple[bool, Any]:
+        """This method returns the retained result for a key, expiring the results older than the TTL. It must be
+        called with the lock held.
+        :param key: the key.
+        :type key: Hashable
+        :return: whether a result is retained, and the result.
+        :rtype: tuple
+        """
+        recent = self._recent
+        if not recent:
+            return False, None
+        now = time.monotonic()
+        # results share one TTL, so the oldest, and first to expire, are at the front.
+        while recent and next(iter(recent.values()))[0] <= now:
+            recent.popitem(last=False)
+        entry = recent.get(key)
+        if entry is None or entry[0] <= now:
+            return False, None
+        return True, entry[1]
+
+    def _retain(self, key: Hashable, result: Any, retain: Optional[Retain]):
+        """This method keeps the result of a completed call for the TTL.
+        :param key: the key.
+        :type key: Hashable
+        :param result: the result.
+        :type result: Any
+        :param retain: a predicate deciding whether the result is kept, all results are kept when omitted.
+        :type retain: Callable
+        """
+        if self.ttl > 0 and (retain is None or retain(result)):
+            with self._lock:
+                self._recent[key] = (time.monotonic() + self.ttl, result)
+                self._recent.move_to_end(key)
+
+    def in_flight(self, key: Hashable) -> bool:
+        """This method checks whether a call for a key is in flight.
+        :param key: the key.
+        :type key: Hashable
+        :return: whether a call is in flight.
+        :rtype: bool
+        """
+        return key in self._calls or key in self._async_calls
+
+    def do(
+        self,
+        key: Hashable,
+        operation: Callable[[], T],
+        retain: Optional[Retain] = None,
+        timeout: Optional[float] = None,
+    ) -> T:
+        """This method runs an operation, or waits for the in-flight call with the same key.
+        :param key: the key identifying identical operations.
+        :type key: Hashable
+        :param operation: the operation.
+        :type operation: Callable
+        :param retain: a predicate deciding whether the result is returned to callers arriving within the TTL.
+        :type retain: Callable
+        :param timeout: the maximum number of seconds to wait for an in-flight call, waits indefinitely when
+        omitted. The in-flight call itself is not interrupted.
+        :type timeout: float
+        :return: the result of the operation.
+        :rtype: Any
+        :raises DeadlineExceededError: if the in-flight call does not complete within the timeout.
+        """
+        with self._lock:
+            retained, result = self._recent_result(key)
+            if retained:
+                return result
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+        if not leader:
+            if not call.done.wait(timeout):
+                raise DeadlineExceededError(
+                    "The in-flight request did not complete in time."
+                )
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = operation()
+            self._retain(key, call.result, retain)
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    async def do_async(
+        self,
+        key: Hashable,
+        operation: Callable[[], Awaitable[T]],
+        retain: Optional[Retain] = None,
+    ) -> T:
+        """This method runs an asynchronous operation, or awaits the in-flight call with the same key.
+
+        A caller that is cancelled while waiting does not cancel the shared call; cancelling the caller running it
+        cancels it for everyone.
+        :param key: the key identifying identical operations.
+        :type key: Hashable
+        :param operation: a factory returning the awaitable to run.
+        :type operation: Callable
+        :param retain: a predicate deciding whether the result is returned to callers arriving within the TTL.
+        :type retain: Callable
+        :return: the result of the operation.
+        :rtype: Any
+        """
+        # pylint: disable=import-outside-toplevel
+        import asyncio
+
+        with self._lock:
+            retained, result = self._recent_result(key)
+        if retained:
+            return result
+        loop = asyncio.get_running_loop()
+        future = self._async_calls.get(key)
+        if future is not None and future.get_loop() is loop:
+            return await asyncio.shield(future)
+
+        future = loop.create_future()
+        self._async_calls[key] = future
+        try:
+            result = await operation()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as error:
+            future.set_exception(error)
+            # the waiters, if any, retrieve the exception; this keeps asyncio from reporting it as unretrieved.
+            future.exception()
+            raise
+        else:
+            self._retain(key, result, retain)
+            future.set_result(result)
+        finally:
+            if self._async_calls.get(key) is future:
+                del self._async_calls[key]
+        return result
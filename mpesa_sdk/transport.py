@@ -0,0 +1,489 @@
+"""This module contains the HTTP transports used by the SDK to communicate with the Daraja API."""
+
+# standard imports
+import json as jsonlib
+import logging
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    import asyncio
+
+logg = logging.getLogger(__file__)
+
+SUPPORTED_METHODS = frozenset(
+    {"DELETE", "GET", "HEAD", "OPTIONS", "PATCH", "POST", "PUT"}
+)
+
+
+class TransportResponse:
+    """This class is the minimal response abstraction returned by every transport."""
+
+    __slots__ = ("status_code", "reason", "headers", "content")
+
+    def __init__(
+        self,
+        status_code: int,
+        reason: str = "",
+        headers: Optional[dict[str, str]] = None,
+        content: bytes = b"",
+    ):
+        """This method initializes the response.
+        :param status_code: the HTTP status code.
+        :type status_code: int
+        :param reason: the HTTP reason phrase.
+        :type reason: str
+        :param headers: the response headers.
+        :type headers: dict
+        :param content: the raw response body.
+        :type content: bytes
+        """
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers or {}
+        self.content = content
+
+    @property
+    def text(self) -> str:
+        """This property decodes the response body.
+        :return: the response body.
+        :rtype: str
+        """
+        return self.content.decode("utf-8")
+
+    def json(self) -> Any:
+        """This method deserializes the JSON response body.
+        :return: the deserialized body, None if the body is empty.
+        :rtype: Any
+        """
+        if not self.content:
+            return None
+        return jsonlib.loads(self.content)
+
+
+def encode_body(json: Any = None, data: Any = None) -> Optional[bytes]:
+    """This function encodes a request body for transports that only accept bytes.
+    :param json: the JSON serializable body.
+    :type json: Any
+    :param data: the raw body.
+    :type data: Any
+    :return: the encoded body.
+    :rtype: bytes
+    """
+    if json is not None:
+        return jsonlib.dumps(json).encode("utf-8")
+    if isinstance(data, str):
+        return data.encode("utf-8")
+    return data
+
+
+class Transport(ABC):
+    """This class contains the interface for synchronous HTTP transports."""
+
+    @abstractmethod
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[dict[str, str]] = None,
+        json: Any = None,
+        data: Any = None,
+        timeout: float = 2,
+    ) -> TransportResponse:
+        """This method sends an HTTP request.
+        :param method: the HTTP method.
+        :type method: str
+        :param url: the URL.
+        :type url: str
+        :param headers: the request headers.
+        :type headers: dict
+        :param json: the JSON serializable request body.
+        :type json: Any
+        :param data: the raw request body.
+        :type data: Any
+        :param timeout: the timeout in seconds.
+        :type timeout: float
+        :return: the response.
+        :rtype: TransportResponse
+        :raises: NotImplementedError
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        """This method releases the transport's connections."""
+
+
+class AsyncTransport(ABC):
+    """This class contains the interface for asynchronous HTTP transports."""
+
+    @abstractmethod
+    async def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[dict[str, str]] = None,
+        json: Any = None,
+        data: Any = None,
+        timeout: float = 2,
+    ) -> TransportResponse:
+        """This method sends an HTTP request.
+        :param method: the HTTP method.
+        :type method: str
+        :param url: the URL.
+        :type url: str
+        :param headers: the request headers.
+        :type headers: dict
+        :param json: the JSON serializable request body.
+        :type json: Any
+        :param data: the raw request body.
+        :type data: Any
+        :param timeout: the timeout in seconds.
+        :type timeout: float
+        :return: the response.
+        :rtype: TransportResponse
+        :raises: NotImplementedError
+        """
+        raise NotImplementedError()
+
+    async def close(self):
+        """This method releases the transport's connections."""
+
+
+class RequestsTransport(Transport):
+    """This class implements a pooled transport on top of requests."""
+
+    def __init__(self, session=None, pool_maxsize: int = 10):
+        """This method initializes the transport.
+        :param session: the session to send requests with, a pooled session is created when omitted.
+        :type session: requests.Session
+        :param pool_maxsize: the maximum number of connections kept per host.
+        :type pool_maxsize: int
+        """
+        if session is None:
+            # pylint: disable=import-outside-toplevel
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=pool_maxsize)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[dict[str, str]] = None,
+        json: Any = None,
+        data: Any = None,
+        timeout: float = 2,
+        **kwargs,
+    ) -> TransportResponse:
+        # further keyword arguments, e.g. verify or proxies, are passed to requests as make_request always has.
+        response = self.session.request(
+            method,
+            url,
+            headers=headers,
+            json=json,
+            data=data,
+            timeout=timeout,
+            **kwargs,
+        )
+        return TransportResponse(
+            response.status_code,
+            response.reason,
+            dict(response.headers),
+            response.content,
+        )
+
+    def close(self):
+        self.session.close()
+
+
+class Urllib3Transport(Transport):
+    """This class implements a transport directly on top of a urllib3 pool manager."""
+
+    def __init__(self, pool_manager=None, maxsize: int = 10):
+        """This method initializes the transport.
+        :param pool_manager: the urllib3 pool manager, one is created when omitted.
+        :type pool_manager: urllib3.PoolManager
+        :param maxsize: the maximum number of connections kept per host.
+        :type maxsize: int
+        """
+        # pylint: disable=import-outside-toplevel
+        import urllib3
+
+        self.pool_manager = pool_manager or urllib3.PoolManager(maxsize=maxsize)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[dict[str, str]] = None,
+        json: Any = None,
+        data: Any = None,
+        timeout: float = 2,
+    ) -> TransportResponse:
+        headers = dict(headers or {})
+        if json is not None:
+            headers.setdefault("Content-Type", "application/json")
+        response = self.pool_manager.request(
+            method,
+            url,
+            body=encode_body(json, data),
+            headers=headers,
+            timeout=timeout,
+            retries=False,
+        )
+        return TransportResponse(
+            response.status,
+            response.reason or "",
+            dict(response.headers),
+            response.data,
+        )
+
+    def close(self):
+        self.pool_manager.clear()
+
+
+def _import_httpx():
+    """This function imports the optional httpx dependency.
+    :return: the httpx module.
+    :rtype: module
+    """
+    try:
+        # pylint: disable=import-outside-toplevel
+        import httpx
+    except ImportError as error:
+        raise ImportError(
+            "The httpx transports require the http2 extra: pip install python-mpesa-sdk[http2]."
+        ) from error
+    return httpx
+
+
+def _from_httpx(response) -> TransportResponse:
+    """This function converts an httpx response into a transport response.
+    :param response: the httpx response.
+    :type response: httpx.Response
+    :return: the transport response.
+    :rtype: TransportResponse
+    """
+    return TransportResponse(
+        response.status_code,
+        response.reason_phrase,
+        dict(response.headers),
+        response.content,
+    )
+
+
+class HttpxTransport(Transport):
+    """This class implements a synchronous transport on top of httpx, optionally over HTTP/2."""
+
+    def __init__(self, client=None, http2: bool = False):
+        """This method initializes the transport.
+        :param client: the httpx client, one is created when omitted.
+        :type client: httpx.Client
+        :param http2: whether a created client should negotiate HTTP/2.
+        :type http2: bool
+        """
+        httpx = _import_httpx()
+        self.client = client or httpx.Client(http2=http2)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[dict[str, str]] = None,
+        json: Any = None,
+        data: Any = None,
+        timeout: float = 2,
+    ) -> TransportResponse:
+        response = self.client.request(
+            method,
+            url,
+            headers=headers,
+            json=json,
+            content=encode_body(data=data),
+            timeout=timeout,
+        )
+        return _from_httpx(response)
+
+    def close(self):
+        self.client.close()
+
+
+class AsyncHttpxTransport(AsyncTransport):
+    """This class implements an asynchronous transport on top of httpx, optionally over HTTP/2."""
+
+    def __init__(self, client=None, http2: bool = False):
+        """This method initializes the transport.
+        :param client: the httpx async client, one is created when omitted.
+        :type client: httpx.AsyncClient
+        :param http2: whether a created client should negotiate HTTP/2.
+        :type http2: bool
+        """
+        httpx = _import_httpx()
+        self.client = client or httpx.AsyncClient(http2=http2)
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[dict[str, str]] = None,
+        json: Any = None,
+        data: Any = None,
+        timeout: float = 2,
+    ) -> TransportResponse:
+        response = await self.client.request(
+            method,
+            url,
+            headers=headers,
+            json=json,
+            content=encode_body(data=data),
+            timeout=timeout,
+        )
+        return _from_httpx(response)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class Http2Transport(AsyncHttpxTransport):
+    """This class implements an asynchronous transport that multiplexes concurrent requests over a few HTTP/2
+    connections.
+
+    Concurrent requests to the same host share connections as HTTP/2 streams instead of each holding a connection of
+    its own. The number of in-flight requests is capped at the number of streams the connections can carry, so
+    bursts queue locally rather than being refused by the server.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 2,
+        max_concurrent_streams: int = 100,
+        prior_knowledge: bool = False,
+    ):
+        """This method initializes the transport.
+        :param max_connections: the maximum number of connections per host.
+        :type max_connections: int
+        :param max_concurrent_streams: the maximum number of in-flight requests per connection.
+        :type max_concurrent_streams: int
+        :param prior_knowledge: whether to speak HTTP/2 without negotiation, required for plain-text hosts.
+        :type prior_knowledge: bool
+        """
+        httpx = _import_httpx()
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        )
+        super().__init__(
+            httpx.AsyncClient(http1=not prior_knowledge, http2=True, limits=limits)
+        )
+        self.max_in_flight = max_connections * max_concurrent_streams
+        self._streams: Optional["asyncio.Semaphore"] = None
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[dict[str, str]] = None,
+        json: Any = None,
+        data: Any = None,
+        timeout: float = 2,
+    ) -> TransportResponse:
+        streams = self._streams
+        if streams is None:
+            # pylint: disable=import-outside-toplevel
+            import asyncio
+
+            streams = self._streams = asyncio.Semaphore(self.max_in_flight)
+        async with streams:
+            return await super().request(
+                method, url, headers=headers, json=json, data=data, timeout=timeout
+            )
+
+
+class InMemoryTransport(Transport):
+    """This class implements a transport that serves registered responses without any network access.
+
+    It is intended for tests: every request is recorded and answered with the response registered for its method
+    and URL, or a 404 response if there is none.
+    """
+
+    def __init__(self):
+        """This method initializes the transport."""
+        self.responses: dict[tuple[str, str], TransportResponse] = {}
+        self.requests: list[dict[str, Any]] = []
+
+    def register(
+        self,
+        method: str,
+        url: str,
+        json: Any = None,
+        status_code: int = 200,
+        reason: str = "OK",
+    ):
+        """This method registers the response served for a method and URL.
+        :param method: the HTTP method.
+        :type method: str
+        :param url: the URL.
+        :type url: str
+        :param json: the JSON serializable response body.
+        :type json: Any
+        :param status_code: the HTTP status code.
+        :type status_code: int
+        :param reason: the HTTP reason phrase.
+        :type reason: str
+        """
+        self.responses[(method, url)] = TransportResponse(
+            status_code,
+            reason,
+            {"Content-Type": "application/json"},
+            encode_body(json) or b"",
+        )
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[dict[str, str]] = None,
+        json: Any = None,
+        data: Any = None,
+        timeout: float = 2,
+    ) -> TransportResponse:
+        self.requests.append(
+            {
+                "method": method,
+                "url": url,
+                "headers": headers,
+                "json": json,
+                "data": data,
+            }
+        )
+        return self.responses.get(
+            (method, url), TransportResponse(404, "Not Found", content=b"null")
+        )
+
+
+_default_transport: Optional[Transport] = None
+
+
+def get_default_transport() -> Transport:
+    """This function returns the transport used when none is configured, creating a pooled requests transport.
+    :return: the default transport.
+    :rtype: Transport
+    """
+    global _default_transport  # pylint: disable=global-statement
+    if _default_transport is None:
+        _default_transport = RequestsTransport()
+    return _default_transport
+
+
+def set_default_transport(transport: Optional[Transport]):
+    """This function replaces the transport used when none is configured.
+    :param transport: the transport, None restores the pooled requests transport.
+    :type transport: Transport
+    """
+    global _default_transport  # pylint: disable=global-statement
+    _default_transport = transport
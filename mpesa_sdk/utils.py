@@ -4,21 +4,59 @@
 import logging
 import os
 import re
-from datetime import datetime
-from typing import Optional
-
-# external imports
-import requests
-from pytz import timezone
+from datetime import datetime, timedelta, timezone, tzinfo
+from functools import lru_cache
+from typing import Any, Callable, Optional
+from zoneinfo import ZoneInfo
 
 # local imports
+from mpesa_sdk.deadline import Deadline, wait_for
 from mpesa_sdk.exceptions import UnsupportedMethodError
+from mpesa_sdk.transport import (
+    SUPPORTED_METHODS,
+    AsyncTransport,
+    Transport,
+    TransportResponse,
+    get_default_transport,
+)
 
 logg = logging.getLogger(__file__)
 
+_METHOD_VERBS = {"POST": "Posting", "PUT": "Putting", "PATCH": "Patching"}
+
+DEFAULT_TIMEZONE = "Africa/Nairobi"
+TIMESTAMP_FORMAT = "%Y%m%d%H%M%S"
+
+# Kenya observes East Africa Time, a fixed UTC+3 offset without daylight saving.
+EAST_AFRICA_TIME = timezone(timedelta(hours=3), "EAT")
+_FIXED_OFFSET_ZONES = {"Africa/Nairobi": EAST_AFRICA_TIME, "EAT": EAST_AFRICA_TIME}
+
+Clock = Callable[[tzinfo], datetime]
+_clock: Clock = datetime.now
+
 
+def import_pyarrow():
+    """This function imports the optional pyarrow dependency with the IPC and Parquet modules the SDK writes with.
+    :return: the pyarrow module.
+    :rtype: module
+    :raises ImportError: if pyarrow is not installed.
+    """
+    try:
+        # pylint: disable=import-outside-toplevel
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as error:
+        raise ImportError(
+            "Writing Parquet and Arrow files requires the export extra: pip install python-mpesa-sdk[export]."
+        ) from error
+    return pyarrow
+
+
+@lru_cache(maxsize=1024)
 def camel_to_snake(value: str):
-    """This function converts a camel case string to snake case.
+    """This function converts a camel case string to snake case, caching the result since responses repeat the same
+    few keys.
     :param value: string to be converted
     :type value: str
     :return: snake case string
@@ -33,8 +71,12 @@ def make_request(
     url: str,
     data: Optional[dict] = None,
     headers: Optional[dict] = None,
+    transport: Optional[Transport] = None,
+    timeout: float = 2,
+    json: Any = None,
+    deadline: Optional[Deadline] = None,
     **kwargs,
-):
+) -> TransportResponse:
     """This function makes the actual HTTP request to the API.
     :param method: The HTTP method to use.
     :type method: str
@@ -44,27 +86,95 @@ def make_request(
     :type data: dict
     :param headers: The headers to send with the request.
     :type headers: dict
+    :param transport: The transport to send the request with, defaults to the pooled requests transport.
+    :type transport: Transport
+    :param timeout: The timeout in seconds.
+    :type timeout: float
+    :param json: The JSON serializable body to send with the request.
+    :type json: Any
+    :param deadline: The deadline the request must complete by, the timeout is capped to the time left.
+    :type deadline: Deadline
+    :param kwargs: Further keyword arguments passed to requests, e.g. verify or proxies, only accepted by the requests
+    transport.
+    :type kwargs: Any
     :return: The response object.
-    :rtype: requests.Response
+    :rtype: TransportResponse
+    :raises DeadlineExceededError: if the deadline has already passed.
     """
+    if method not in SUPPORTED_METHODS:
+        raise UnsupportedMethodError(f"Unsupported method: {method}.")
+    if deadline is not None:
+        timeout = deadline.timeout(timeout)
+
     if method == "GET":
         logg.debug("Retrieving data from: %s.", url)
-        result = requests.get(timeout=2, url=url, **kwargs)
-    elif method == "POST":
-        logg.debug("Posting to: %s with: %s.", url, data)
-        result = requests.post(data=data, headers=headers, timeout=2, url=url, **kwargs)
-    elif method == "PUT":
-        logg.debug("Putting to: %s with: %s.", url, data)
-        result = requests.put(data=data, headers=headers, timeout=2, url=url, **kwargs)
     else:
-        raise UnsupportedMethodError(f"Unsupported method: {method}.")
-    return result
+        logg.debug("%s to: %s with: %s.", _METHOD_VERBS.get(method, method), url, data)
+    transport = transport or get_default_transport()
+    return transport.request(
+        method, url, headers=headers, json=json, data=data, timeout=timeout, **kwargs
+    )
 
 
-def preprocess_http_response(response: requests.Response) -> Optional[dict]:
+async def make_request_async(
+    method: str,
+    url: str,
+    transport: AsyncTransport,
+    data: Optional[dict] = None,
+    headers: Optional[dict] = None,
+    timeout: float = 2,
+    json: Any = None,
+    deadline: Optional[Deadline] = None,
+) -> TransportResponse:
+    """This function makes the actual HTTP request to the API through an asynchronous transport.
+
+    With a deadline, the request is also cancelled once the deadline passes, in case the transport does not enforce
+    its timeout, e.g. while waiting for a connection from its pool.
+    :param method: The HTTP method to use.
+    :type method: str
+    :param url: The URL to make the request to.
+    :type url: str
+    :param transport: The asynchronous transport to send the request with.
+    :type transport: AsyncTransport
+    :param data: The data to send with the request.
+    :type data: dict
+    :param headers: The headers to send with the request.
+    :type headers: dict
+    :param timeout: The timeout in seconds.
+    :type timeout: float
+    :param json: The JSON serializable body to send with the request.
+    :type json: Any
+    :param deadline: The deadline the request must complete by.
+    :type deadline: Deadline
+    :return: The response object.
+    :rtype: TransportResponse
+    :raises DeadlineExceededError: if the request does not complete before the deadline.
+    """
+    if method not in SUPPORTED_METHODS:
+        raise UnsupportedMethodError(f"Unsupported method: {method}.")
+
+    logg.debug("Sending %s request to: %s.", method, url)
+    if deadline is None:
+        return await transport.request(
+            method, url, headers=headers, json=json, data=data, timeout=timeout
+        )
+    return await wait_for(
+        transport.request(
+            method,
+            url,
+            headers=headers,
+            json=json,
+            data=data,
+            timeout=deadline.timeout(timeout),
+        ),
+        deadline,
+    )
+
+
+def preprocess_http_response(response: TransportResponse) -> Optional[dict]:
     """This function preprocesses the HTTP response and returns the response as a JSON object.
     :param response: The HTTP response object.
-    :type response: requests.Response
+    :type response: TransportResponse
     :return: The response as a JSON object.
     :rtype: dict
     """
@@ -89,12 +199,43 @@ def preprocess_http_response(response: requests.Response) -> Optional[dict]:
     return response.json() or None
 
 
-def timestamp():
+def get_timezone(zone: Optional[str] = None) -> tzinfo:
+    """This function returns the timezone timestamps are generated in.
+    :param zone: the timezone name, e.g. Africa/Nairobi, defaults to Africa/Nairobi.
+    :type zone: str
+    :return: the timezone.
+    :rtype: tzinfo
+    """
+    zone = zone or DEFAULT_TIMEZONE
+    return _FIXED_OFFSET_ZONES.get(zone) or _zoneinfo(zone)
+
+
+@lru_cache(maxsize=None)
+def _zoneinfo(zone: str) -> tzinfo:
+    """This function loads a timezone from the timezone database once per name.
+    :param zone: the timezone name.
+    :type zone: str
+    :return: the timezone.
+    :rtype: tzinfo
+    """
+    return ZoneInfo(zone)
+
+
+def set_clock(clock: Optional[Clock]):
+    """This function replaces the clock timestamps are read from, e.g. to freeze time in tests or simulations.
+    :param clock: a callable taking a timezone and returning the current time in it, None restores the system clock.
+    :type clock: Callable
+    """
+    global _clock  # pylint: disable=global-statement
+    _clock = clock or datetime.now
+
+
+def timestamp(clock: Optional[Clock] = None) -> str:
     """This function returns the current timestamp in the format required by the API.
+    :param clock: the clock to read the time from, defaults to the clock set with set_clock.
+    :type clock: Callable
     :return: timestamp in the format %Y%m%d%H%M%S. e.g. 20191010120000
     :rtype: str
     """
-    timestamp_format = "%Y%m%d%H%M%S"
-    zone = os.getenv("TIMEZONE")
-    sys_timestamp = datetime.now(timezone(zone))
-    return sys_timestamp.strftime(timestamp_format)
+    now = (clock or _clock)(get_timezone(os.getenv("TIMEZONE")))
+    return now.strftime(TIMESTAMP_FORMAT)
@@ -1,6 +1,7 @@
 from tests.fixtures.base import *
 from tests.fixtures.auth import *
 from tests.fixtures.b2c import *
+from tests.fixtures.c2b import *
 from tests.fixtures.reverse import *
 from tests.fixtures.stk import *
 from tests.fixtures.transcation_status import *
@@ -5,11 +5,19 @@ import os
 import dotenv
 import pytest
 
+# local imports
+from mpesa_sdk.daraja.validation import set_payload_validation
+
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
 env_file = os.path.join(parent_dir, '.env.test')
 
 
+@pytest.fixture(scope='session', autouse=True)
+def validate_payloads():
+    set_payload_validation(True)
+
+
 @pytest.fixture(scope='session')
 def load_env_vars():
     dotenv.load_dotenv(dotenv_path=env_file)
@@ -0,0 +1,46 @@
+# standard imports
+import logging
+
+# external imports
+import pytest
+
+# local imports
+
+logg = logging.getLogger(__file__)
+
+
+@pytest.fixture(scope="function")
+def c2b_payment_request():
+    return {
+        "TransactionType": "Pay Bill",
+        "TransID": "RKTQDM7W6S",
+        "TransTime": "20191122063845",
+        "TransAmount": "10",
+        "BusinessShortCode": "123456",
+        "BillRefNumber": "invoice008",
+        "InvoiceNumber": "",
+        "OrgAccountBalance": "",
+        "ThirdPartyTransID": "",
+        "MSISDN": "25470****149",
+        "FirstName": "John",
+        "MiddleName": "",
+        "LastName": "Doe"
+    }
+
+
+@pytest.fixture(scope="function")
+def successful_c2b_register_url_response():
+    return {
+        "OriginatorCoversationID": "7619-37765134-1",
+        "ResponseCode": "0",
+        "ResponseDescription": "success"
+    }
+
+
+@pytest.fixture(scope="function")
+def failed_c2b_register_url_response():
+    return {
+        "requestId": "11728-2929992-1",
+        "errorCode": "401.003.01",
+        "errorMessage": "Error Occurred - Invalid Access Token - BJGFGOXv5aZnw90KkA4TDtu4Xdyf"
+    }
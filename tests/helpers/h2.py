@@ -0,0 +1,82 @@
+# standard imports
+import asyncio
+import json
+import threading
+from contextlib import contextmanager
+from typing import Dict
+
+# external imports
+from h2.config import H2Configuration
+from h2.connection import H2Connection
+from h2.events import DataReceived, RequestReceived, StreamEnded
+
+# local imports
+
+# test imports
+
+
+class H2StubProtocol(asyncio.Protocol):
+    """Serves canned JSON responses keyed by request method over cleartext HTTP/2 with prior knowledge."""
+
+    def __init__(self, server):
+        self.server = server
+        self.connection = H2Connection(config=H2Configuration(client_side=False))
+        self.streams = {}
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.server.connections += 1
+        self.transport = transport
+        self.connection.initiate_connection()
+        self.transport.write(self.connection.data_to_send())
+
+    def data_received(self, data):
+        for event in self.connection.receive_data(data):
+            if isinstance(event, RequestReceived):
+                headers = {key.decode() if isinstance(key, bytes) else key: value.decode()
+                           if isinstance(value, bytes) else value for key, value in event.headers}
+                self.streams[event.stream_id] = (headers, bytearray())
+            elif isinstance(event, DataReceived):
+                self.streams[event.stream_id][1].extend(event.data)
+                self.connection.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+            elif isinstance(event, StreamEnded):
+                asyncio.get_running_loop().call_later(self.server.delay, self.respond, event.stream_id)
+        self.transport.write(self.connection.data_to_send())
+
+    def respond(self, stream_id):
+        headers, body = self.streams.pop(stream_id)
+        method = headers[":method"]
+        self.server.received.append((method, headers[":path"], json.loads(body) if body else None))
+        content, status_code = self.server.responses[method]
+        encoded = json.dumps(content).encode()
+        self.connection.send_headers(stream_id, [(":status", str(status_code)),
+                                                 ("content-type", "application/json"),
+                                                 ("content-length", str(len(encoded)))])
+        self.connection.send_data(stream_id, encoded, end_stream=True)
+        self.transport.write(self.connection.data_to_send())
+
+
+class H2StubServer:
+    def __init__(self, responses: Dict[str, tuple], delay: float):
+        self.responses = responses
+        self.delay = delay
+        self.received = []
+        self.connections = 0
+
+
+@contextmanager
+def h2_stub_server(responses: Dict[str, tuple], delay: float = 0):
+    server = H2StubServer(responses, delay)
+    loop = asyncio.new_event_loop()
+    listener = loop.run_until_complete(loop.create_server(lambda: H2StubProtocol(server), "127.0.0.1", 0))
+    port = listener.sockets[0].getsockname()[1]
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        yield server, f"http://127.0.0.1:{port}"
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        listener.close()
+        loop.run_until_complete(listener.wait_closed())
+        loop.close()
@@ -1,5 +1,9 @@
 # standard imports
 import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from typing import Dict, Optional
 
 # external imports
@@ -17,3 +21,42 @@ def build_response(content: Optional[Dict], encoding: str, reason: str, status_c
     response.reason = reason
     response.status_code = status_code
     return response
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves canned JSON responses keyed by request method and records the request bodies it receives."""
+
+    def _respond(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        self.server.received.append((self.command, self.path, json.loads(body) if body else None))
+        time.sleep(self.server.delay)
+        content, status_code = self.server.responses[self.command]
+        encoded = json.dumps(content).encode()
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    do_GET = _respond
+    do_POST = _respond
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+
+@contextmanager
+def stub_server(responses: Dict[str, tuple], delay: float = 0):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.delay = delay
+    server.responses = responses
+    server.received = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server, f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,53 @@
+# standard imports
+from decimal import Decimal
+
+# external imports
+import pytest
+
+# local imports
+from mpesa_sdk.daraja.amounts import (AmountLimit,
+                                      amount_limit,
+                                      format_amount,
+                                      parse_amount,
+                                      try_parse_amount,
+                                      validate_amounts)
+from mpesa_sdk.daraja.enums import CommandID, TransactionType
+from mpesa_sdk.exceptions import InvalidAmountError
+
+# test imports
+
+
+@pytest.mark.parametrize("value, expected", [
+    (100, 100),
+    ("100", 100),
+    (" 100.00 ", 100),
+    (Decimal("1E+2"), 100),
+    (100.0, 100),
+])
+def test_parse_amount(value, expected):
+    assert parse_amount(value) == expected
+    assert format_amount(value) == str(expected)
+
+
+@pytest.mark.parametrize("value", [10.5, "10.50", Decimal("0.1") * 3, "ten", "", Decimal("NaN"), True, None, 0, -5,
+                                   250_001])
+def test_parse_amount_rejects_invalid_amounts(value):
+    assert try_parse_amount(value) is None
+    with pytest.raises(InvalidAmountError):
+        parse_amount(value)
+
+
+def test_amount_limits():
+    assert amount_limit(CommandID.SALARY_PAYMENT) == AmountLimit(10, 250_000)
+    assert amount_limit(TransactionType.CUSTOMER_PAY_BILL_ONLINE).minimum == 1
+    assert try_parse_amount(5, CommandID.BUSINESS_PAYMENT) is None
+    assert try_parse_amount(5, TransactionType.CUSTOMER_BUY_GOODS_ONLINE) == 5
+    with pytest.raises(InvalidAmountError, match="between 10 and 250000"):
+        format_amount("9", CommandID.PROMOTION_PAYMENT)
+
+
+def test_validate_amounts():
+    values = [100, "250", Decimal("300.0"), "9", "10.50", "١٠٠", 1_000_000, "abc", 400.0]
+    assert validate_amounts(values, CommandID.SALARY_PAYMENT) == [100, 250, 300, None, None, None, None, None, 400]
+    assert validate_amounts(values) == [
+        try_parse_amount(value) for value in values]
@@ -8,7 +8,7 @@ from requests.exceptions import HTTPError
 from requests_mock import Mocker
 
 # local imports
-from mpesa_sdk.daraja.auth import daraja_access_token, stk_push_password
+from mpesa_sdk.daraja.auth import AccessTokenCache, daraja_access_token, stk_push_password
 from mpesa_sdk.exceptions import AuthenticationError
 from mpesa_sdk.utils import timestamp
 
@@ -37,11 +37,25 @@ def test_successful_daraja_access_token_retrieval(failed_oauth_response, load_en
 
     # test failed attempt
     with pytest.raises(HTTPError) as error:
-        mocker.patch("requests.get", return_value=None)
+        mocker.patch("mpesa_sdk.transport.RequestsTransport.request", return_value=None)
         daraja_access_token(consumer_key, consumer_secret)
     assert str(error.value) == "Could not retrieve access token."
 
 
+def test_access_token_cache(load_env_vars, successful_oauth_response):
+    token_cache = AccessTokenCache(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"))
+    with Mocker(real_http=False) as requests_mocker:
+        requests_mocker.register_uri("GET", os.getenv("OAUTH_URL"), json=successful_oauth_response, reason="OK",
+                                     status_code=200)
+        assert token_cache.get() == successful_oauth_response.get("access_token")
+        assert token_cache.get() == successful_oauth_response.get("access_token")
+        assert requests_mocker.call_count == 1
+
+        token_cache.invalidate()
+        token_cache.get()
+        assert requests_mocker.call_count == 2
+
+
 def test_stk_push_password(load_env_vars):
     passkey = os.getenv('PASSKEY')
     shortcode = os.getenv("SHORTCODE")
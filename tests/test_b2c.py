@@ -11,6 +11,7 @@ from mpesa_sdk.daraja.enums import CommandID
 from mpesa_sdk.daraja.b2c import (B2CPaymentRequest,
                        B2CPaymentResponseParser,
                        B2CCallbackParser)
+from mpesa_sdk.exceptions import InvalidAccessTokenError
 from mpesa_sdk.utils import camel_to_snake
 
 # test imports
@@ -64,7 +65,11 @@ def test_b2c_response_parser(caplog, failed_b2c_response, successful_b2c_respons
     error_message = parsed_response.get("error_message")
     request_id = parsed_response.get("request_id")
     assert f"B2C payment request: {request_id}, initiation failed. {error_message}." in caplog.text
-    assert parsed_response == {camel_to_snake(key): value for key, value in failed_b2c_response.items()}
+    assert parsed_response == {
+        **{camel_to_snake(key): value for key, value in failed_b2c_response.items()},
+        "error": {"code": "401.002.01", "category": "authentication", "retryable": True}}
+    with pytest.raises(InvalidAccessTokenError):
+        b2c_response_parser.raise_for_error()
 
     caplog.set_level(logging.INFO)
     successful_response = build_response(successful_b2c_response, "utf-8", "OK", 200)
@@ -0,0 +1,233 @@
+# standard imports
+import gzip
+import json
+import multiprocessing
+import os
+import pickle
+
+# external imports
+import pytest
+
+# local imports
+from mpesa_sdk.daraja.b2c import B2CPaymentRequest
+from mpesa_sdk.daraja.bulk import (REJECTED_SAMPLE_SIZE, B2CPayoutLoader, PayoutRow, PayoutRunReport,
+                                   ShardedPayoutExecutor, detect_format, normalize_msisdn)
+from mpesa_sdk.daraja.enums import CommandID
+from mpesa_sdk.daraja.sinks import SQLiteResultSink
+from mpesa_sdk.retry import RetryPolicy
+from mpesa_sdk.transport import RequestsTransport
+
+# test imports
+from tests.helpers.http import stub_server
+
+
+INVALID_REQUEST = {"requestId": "1", "errorCode": "400.002.02", "errorMessage": "Bad Request - Invalid Amount"}
+INTERNAL_ERROR = {"requestId": "1", "errorCode": "500.002.1001", "errorMessage": "Internal Server Error"}
+
+
+@pytest.fixture(scope="function")
+def b2c_payment_request(load_env_vars):
+    return B2CPaymentRequest(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"), os.getenv("SHORTCODE"))
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("0712345678", "254712345678"),
+    ("+254712345678", "254712345678"),
+    (" 254112345678 ", "254112345678"),
+    ("712345678", "254712345678"),
+    ("0812345678", None),
+    ("07123", None),
+])
+def test_normalize_msisdn(value, expected):
+    assert normalize_msisdn(value) == expected
+
+
+def test_detect_format():
+    assert detect_format("payouts.csv") == "csv"
+    assert detect_format("payouts.jsonl.gz") == "jsonl"
+    with pytest.raises(ValueError):
+        detect_format("payouts.xlsx")
+
+
+def test_csv_payout_loader(b2c_payment_request, tmp_path):
+    path = tmp_path / "payouts.csv"
+    path.write_text(
+        "amount,command_id,party_b,remarks\n"
+        "100,SalaryPayment,0712345678,June salary\n"
+        "10.50,SalaryPayment,0712345678,\n"
+        "200,TransactionReversal,0812345678,\n"
+        "300,BUSINESS_PAYMENT,+254112345678,\n"
+    )
+    rows = list(B2CPayoutLoader(b2c_payment_request, str(path), "test-api"))
+    assert [row.valid for row in rows] == [True, False, False, True]
+    assert rows[0].payload == b2c_payment_request.build(
+        "100", CommandID.SALARY_PAYMENT, "test-api", "", os.getenv("SHORTCODE"), "254712345678", "June salary"
+    )
+    assert rows[1].errors == ["Invalid amount: '10.50'."]
+    assert len(rows[2].errors) == 2
+    assert rows[3].payload["PartyB"] == "254112345678"
+    assert rows[3].payload["Remarks"] == "Bulk payment"
+
+
+def test_payout_loader_rejects_invalid_payloads(b2c_payment_request, tmp_path):
+    path = tmp_path / "payouts.jsonl"
+    path.write_text(json.dumps({"amount": 100, "command_id": "SalaryPayment", "party_b": "0712345678",
+                                "remarks": "x" * 101}) + "\n")
+    rows = list(B2CPayoutLoader(b2c_payment_request, str(path), "test-api"))
+    assert rows[0].errors == ["Remarks exceeds 100 characters."]
+
+
+def test_run_report_keeps_a_sample_of_rejected_rows():
+    report = PayoutRunReport()
+    for line_number in range(2, 2 + REJECTED_SAMPLE_SIZE + 50):
+        report.reject(PayoutRow(line_number, {}, errors=["Invalid amount: ''."]))
+    assert report.rejected == REJECTED_SAMPLE_SIZE + 50
+    assert [row.line_number for row in report.rejected_rows] == list(range(2, 2 + REJECTED_SAMPLE_SIZE))
+
+
+def test_gzip_jsonl_payout_loader_resumes_from_checkpoint(b2c_payment_request, tmp_path):
+    path = tmp_path / "payouts.jsonl.gz"
+    lines = [json.dumps({"amount": str(100 + index), "command_id": "BusinessPayment", "party_b": "0712345678"})
+             for index in range(5)]
+    lines.insert(2, "{not json")
+    with gzip.open(path, "wt") as file:
+        file.write("\n".join(lines))
+    checkpoint_path = str(tmp_path / "payouts.checkpoint")
+
+    loader = B2CPayoutLoader(b2c_payment_request, str(path), "test-api", checkpoint_path=checkpoint_path,
+                             checkpoint_interval=2)
+    consumed = []
+    for row in loader:
+        if row.line_number == 4:
+            break
+        consumed.append(row)
+    assert [row.valid for row in consumed] == [True, True, False]
+    assert loader.read_checkpoint() == 3
+
+    resumed = list(B2CPayoutLoader(b2c_payment_request, str(path), "test-api", checkpoint_path=checkpoint_path))
+    assert [row.line_number for row in resumed] == [4, 5, 6]
+    assert [row.payload["Amount"] for row in resumed] == ["102", "103", "104"]
+    assert loader.read_checkpoint() == 6
+
+
+def test_sharded_payout_executor_resumes_from_journal(b2c_payment_request, monkeypatch, successful_b2c_response,
+                                                      successful_oauth_response, tmp_path):
+    path = tmp_path / "payouts.csv"
+    path.write_text("amount,command_id,party_b\n" + "".join(
+        f"{100 + index},SalaryPayment,07{index:08d}\n" for index in range(8)) + "0,SalaryPayment,0712345678\n")
+    journal_path = str(tmp_path / "payouts.journal")
+    responses = {"GET": (successful_oauth_response, 200), "POST": (successful_b2c_response, 200)}
+
+    with stub_server(responses) as (server, url):
+        monkeypatch.setenv("OAUTH_URL", f"{url}/oauth")
+        monkeypatch.setenv("B2C_URL", f"{url}/b2c")
+        executor = ShardedPayoutExecutor(b2c_payment_request, workers=2, rate_limit=1000,
+                                         shortcode_rate_limits={os.getenv("SHORTCODE"): 1000},
+                                         journal_path=journal_path)
+        loader = B2CPayoutLoader(b2c_payment_request, str(path), "test-api")
+        report = executor.run(row for row in loader if row.line_number <= 6)
+        assert report.succeeded == 5
+        assert {result.shard for result in report.results} == {0, 1}
+        assert all(result.response == successful_b2c_response for result in report.results)
+
+        report = executor.run(B2CPayoutLoader(b2c_payment_request, str(path), "test-api"))
+        assert (report.succeeded, report.failed, report.skipped, report.rejected) == (3, 0, 5, 1)
+        assert [row.line_number for row in report.rejected_rows] == [10]
+        assert not report.cancelled
+
+    posted = sorted(body["Amount"] for method, _, body in server.received if method == "POST")
+    assert posted == [str(100 + index) for index in range(8)]
+    assert executor.completed() == set(range(2, 10))
+
+    def cancelled_rows():
+        executor.cancel()
+        yield from B2CPayoutLoader(b2c_payment_request, str(path), "test-api")
+
+    report = executor.run(cancelled_rows())
+    assert report.cancelled
+    assert (report.results, report.skipped) == ([], 0)
+
+    def interrupted_rows():
+        raise KeyboardInterrupt
+        yield  # pylint: disable=unreachable
+
+    with pytest.raises(KeyboardInterrupt):
+        executor.run(interrupted_rows())
+
+    # a cancelled run does not cancel the next one.
+    report = executor.run(B2CPayoutLoader(b2c_payment_request, str(path), "test-api"))
+    assert (report.cancelled, report.skipped) == (False, 8)
+
+
+def test_shard_workers_rebuild_the_request_builder_settings(load_env_vars):
+    request = B2CPaymentRequest(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"), os.getenv("SHORTCODE"),
+                                retry=RetryPolicy(attempts=5), validate_payloads=False, validate_msisdns=True,
+                                tenant="payroll")
+    executor = ShardedPayoutExecutor(request, workers=1, timeout=10)
+    # the configuration crosses the process boundary, so it is rebuilt from its pickled form.
+    config = pickle.loads(pickle.dumps(executor.config))
+    transport = RequestsTransport()
+    worker_request = config.request(transport)
+    transport.close()
+
+    assert worker_request.retry.attempts == 5
+    assert (worker_request.validate_payloads, worker_request.validate_msisdns) == (False, True)
+    assert (worker_request.tenant, worker_request.shortcode) == ("payroll", os.getenv("SHORTCODE"))
+    assert worker_request.transport is transport
+    assert config.timeout == 10
+
+
+def test_sharded_payout_executor_reports_payouts_lost_with_a_shard(b2c_payment_request, monkeypatch, tmp_path):
+    path = tmp_path / "payouts.csv"
+    path.write_text("amount,command_id,party_b\n" + "".join(
+        f"{100 + index},SalaryPayment,07{index:08d}\n" for index in range(6)))
+    # the forked workers die on their first payout, before reporting a result.
+    monkeypatch.setattr("mpesa_sdk.daraja.bulk._send_payout", lambda *args: os._exit(1))
+    executor = ShardedPayoutExecutor(b2c_payment_request, workers=2, queue_size=1,
+                                     context=multiprocessing.get_context("fork"))
+    report = executor.run(B2CPayoutLoader(b2c_payment_request, str(path), "test-api"))
+    assert (report.sent, report.cancelled) == (0, False)
+    assert report.unsent == list(range(2, 8))
+
+
+def test_sharded_payout_executor_streams_results_to_a_sink(b2c_payment_request, monkeypatch, successful_b2c_response,
+                                                           successful_oauth_response, tmp_path):
+    path = tmp_path / "payouts.csv"
+    path.write_text("amount,command_id,party_b\n" + "".join(
+        f"{100 + index},SalaryPayment,07{index:08d}\n" for index in range(6)))
+    sink = SQLiteResultSink(str(tmp_path / "results.db"), batch_size=4)
+    responses = {"GET": (successful_oauth_response, 200), "POST": (successful_b2c_response, 200)}
+
+    with stub_server(responses) as (server, url):
+        monkeypatch.setenv("OAUTH_URL", f"{url}/oauth")
+        monkeypatch.setenv("B2C_URL", f"{url}/b2c")
+        executor = ShardedPayoutExecutor(b2c_payment_request, workers=2, sink=sink)
+        report = executor.run(row for row in B2CPayoutLoader(b2c_payment_request, str(path), "test-api")
+                              if row.line_number <= 4)
+        assert (report.succeeded, report.failed, report.results) == (3, 0, [])
+        report = executor.run(B2CPayoutLoader(b2c_payment_request, str(path), "test-api"))
+        assert (report.succeeded, report.skipped) == (3, 3)
+
+    assert [result.line_number for result in sink.read()] == list(range(2, 8))
+    assert all(result.response == successful_b2c_response for result in sink.read())
+
+    # payouts Daraja definitely rejected are sent again when the run resumes, ambiguous failures are not.
+    sink = SQLiteResultSink(str(tmp_path / "rejected.db"))
+    with stub_server(dict(responses, POST=(INVALID_REQUEST, 400))) as (server, url):
+        monkeypatch.setenv("OAUTH_URL", f"{url}/oauth")
+        monkeypatch.setenv("B2C_URL", f"{url}/b2c")
+        executor = ShardedPayoutExecutor(b2c_payment_request, workers=2, sink=sink)
+        report = executor.run(row for row in B2CPayoutLoader(b2c_payment_request, str(path), "test-api")
+                              if row.line_number <= 4)
+        assert (report.succeeded, report.failed) == (0, 3)
+        server.responses["POST"] = (INTERNAL_ERROR, 500)
+        report = executor.run(row for row in B2CPayoutLoader(b2c_payment_request, str(path), "test-api")
+                              if row.line_number != 2)
+        assert (report.failed, report.skipped) == (5, 0)
+        server.responses["POST"] = (successful_b2c_response, 200)
+        report = executor.run(B2CPayoutLoader(b2c_payment_request, str(path), "test-api"))
+        assert (report.succeeded, report.skipped) == (1, 5)
+    assert sink.succeeded() == {2}
+
+    with pytest.raises(ValueError):
+        ShardedPayoutExecutor(b2c_payment_request, journal_path=str(tmp_path / "journal"), sink=sink)
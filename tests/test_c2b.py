@@ -0,0 +1,117 @@
+# standard imports
+import io
+import json
+import logging
+import os
+from decimal import Decimal
+
+# external imports
+import pytest
+from requests_mock import Mocker
+
+# local imports
+from mpesa_sdk.daraja.c2b import (C2BConfirmationParser,
+                                  C2BRegisterUrlRequest,
+                                  C2BRegisterUrlResponseParser,
+                                  C2BTransaction,
+                                  C2BValidationParser,
+                                  C2BValidator,
+                                  account_rule,
+                                  amount_rule,
+                                  shortcode_rule,
+                                  validation_response)
+from mpesa_sdk.daraja.enums import C2BRejectionCode, ResponseType
+from mpesa_sdk.utils import camel_to_snake
+
+# test imports
+from tests.helpers.http import build_response
+
+
+@pytest.mark.parametrize("response_type", [ResponseType.COMPLETED, ResponseType.CANCELLED])
+def test_c2b_register_url_request(load_env_vars, response_type, successful_c2b_register_url_response,
+                                  successful_oauth_response):
+    register_url_request = C2BRegisterUrlRequest(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"),
+                                                 os.getenv("SHORTCODE"))
+    expected_payload = {
+        "ShortCode": os.getenv("SHORTCODE"),
+        "ResponseType": response_type.value,
+        "ConfirmationURL": os.getenv("C2B_CONFIRMATION_URL"),
+        "ValidationURL": os.getenv("C2B_VALIDATION_URL"),
+    }
+    assert register_url_request.build(response_type) == expected_payload
+
+    with Mocker(real_http=False) as requests_mocker:
+        requests_mocker.register_uri("GET", os.getenv("OAUTH_URL"), json=successful_oauth_response, reason="OK",
+                                     status_code=200)
+        requests_mocker.register_uri("POST", os.getenv("C2B_REGISTER_URL"), json=successful_c2b_register_url_response,
+                                     reason="OK", status_code=200)
+        response = register_url_request.execute(response_type)
+        assert response.json() == successful_c2b_register_url_response
+        assert requests_mocker.last_request.json() == expected_payload
+
+
+def test_c2b_register_url_response_parser(caplog, failed_c2b_register_url_response,
+                                          successful_c2b_register_url_response):
+    caplog.set_level(logging.INFO)
+    parser = C2BRegisterUrlResponseParser(build_response(successful_c2b_register_url_response, "utf-8", "OK", 200))
+    assert parser.parse() == {camel_to_snake(key): value
+                              for key, value in successful_c2b_register_url_response.items()}
+    assert "C2B URLs registered: 7619-37765134-1, with description: success." in caplog.text
+
+    parser = C2BRegisterUrlResponseParser(build_response(failed_c2b_register_url_response, "utf-8", "Unauthorized",
+                                                         401))
+    parser.parse()
+    assert f"C2B URL registration: 11728-2929992-1, failed with description: " \
+           f"{failed_c2b_register_url_response['errorMessage']}." in caplog.text
+
+
+def test_c2b_callback_parsers(c2b_payment_request, caplog):
+    caplog.set_level(logging.INFO)
+    transaction = C2BTransaction.from_request(c2b_payment_request)
+    assert transaction.amount == Decimal("10")
+    assert transaction.bill_reference_number == "invoice008"
+    assert C2BTransaction.from_request(dict(c2b_payment_request, TransAmount="ten")).amount.is_nan()
+
+    parsed = C2BValidationParser(c2b_payment_request).parse()
+    assert parsed["transaction_id"] == "RKTQDM7W6S"
+    assert "C2B payment: RKTQDM7W6S received for validation." in caplog.text
+
+    parser = C2BConfirmationParser(c2b_payment_request)
+    assert parser.parse() == parsed
+    assert parser.transaction == transaction
+    assert "C2B payment: RKTQDM7W6S confirmed." in caplog.text
+
+
+def test_c2b_validator(c2b_payment_request, caplog):
+    validator = C2BValidator([shortcode_rule(["123456"]), amount_rule(1, 70000), account_rule({"invoice008"})])
+    assert validator.validate(c2b_payment_request) is None
+    assert validator.validate(dict(c2b_payment_request, BillRefNumber="invoice009")) \
+           == C2BRejectionCode.INVALID_ACCOUNT_NUMBER
+    assert validator.validate(dict(c2b_payment_request, TransAmount="0.5")) == C2BRejectionCode.INVALID_AMOUNT
+    assert validator.validate(dict(c2b_payment_request, TransAmount="70001")) == C2BRejectionCode.INVALID_AMOUNT
+    assert validator.validate(dict(c2b_payment_request, BusinessShortCode="654321")) \
+           == C2BRejectionCode.INVALID_SHORTCODE
+
+    def failing_rule(transaction):
+        raise LookupError(transaction.transaction_id)
+
+    validator.add_rule(failing_rule)
+    assert validator.validate(c2b_payment_request) == C2BRejectionCode.OTHER_ERROR
+    assert "C2B validation rule failed for payment: RKTQDM7W6S." in caplog.text
+    assert validator.respond(b"not json") == (C2BRejectionCode.OTHER_ERROR, validation_response(
+        C2BRejectionCode.OTHER_ERROR))
+
+
+def test_c2b_validation_wsgi(c2b_payment_request):
+    validator = C2BValidator([account_rule({"invoice008"})])
+
+    def post(body):
+        statuses = []
+        content = json.dumps(body).encode()
+        environ = {"CONTENT_LENGTH": str(len(content)), "wsgi.input": io.BytesIO(content)}
+        result = validator.wsgi(environ, lambda status, headers: statuses.append(status))
+        return statuses[0], json.loads(b"".join(result))
+
+    assert post(c2b_payment_request) == ("200 OK", {"ResultCode": "0", "ResultDesc": "Accepted"})
+    assert post(dict(c2b_payment_request, BillRefNumber="unknown")) == (
+        "200 OK", {"ResultCode": "C2B00012", "ResultDesc": "Rejected"})
@@ -0,0 +1,97 @@
+# standard imports
+import base64
+import datetime
+import os
+
+# external imports
+import pytest
+
+# local imports
+from mpesa_sdk.daraja import credentials
+from mpesa_sdk.daraja.b2c import B2CPaymentRequest
+from mpesa_sdk.daraja.credentials import SecurityCredentialCache, security_credential
+from mpesa_sdk.daraja.enums import CommandID
+
+# test imports
+
+pytest.importorskip("cryptography")
+
+
+@pytest.fixture(scope="module")
+def private_key():
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture
+def certificate_path(private_key, tmp_path):
+    return write_certificate(private_key, str(tmp_path / "ProductionCertificate.cer"))
+
+
+def write_certificate(private_key, path, pem=True):
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.x509.oid import NameOID
+
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "apicrypt.safaricom.co.ke")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (x509.CertificateBuilder().subject_name(name).issuer_name(name)
+                   .public_key(private_key.public_key()).serial_number(x509.random_serial_number())
+                   .not_valid_before(now).not_valid_after(now + datetime.timedelta(days=1))
+                   .sign(private_key, hashes.SHA256()))
+    encoding = serialization.Encoding.PEM if pem else serialization.Encoding.DER
+    with open(path, "wb") as file:
+        file.write(certificate.public_bytes(encoding))
+    return path
+
+
+def decrypt(private_key, credential):
+    from cryptography.hazmat.primitives.asymmetric import padding
+
+    return private_key.decrypt(base64.b64decode(credential), padding.PKCS1v15()).decode("utf-8")
+
+
+def test_security_credential_cache(certificate_path, mocker, private_key, tmp_path):
+    cache = SecurityCredentialCache()
+    encrypt = mocker.spy(credentials, "encrypt_credential")
+    load = mocker.spy(credentials, "load_public_key")
+
+    credential = cache.get("test-api", "Safaricom999!", certificate_path)
+    assert decrypt(private_key, credential) == "Safaricom999!"
+    assert cache.get("test-api", "Safaricom999!", certificate_path) == credential
+    assert decrypt(private_key, cache.get("other-api", "Safaricom000!", certificate_path)) == "Safaricom000!"
+    assert (encrypt.call_count, load.call_count) == (2, 1)
+
+    assert cache.get("test-api", "Rotated111!", certificate_path) != credential
+    assert encrypt.call_count == 3
+
+    cache.invalidate(initiator="test-api")
+    cache.get("test-api", "Rotated111!", certificate_path)
+    cache.get("other-api", "Safaricom000!", certificate_path)
+    assert (encrypt.call_count, load.call_count) == (4, 1)
+
+    der_path = write_certificate(private_key, str(tmp_path / "SandboxCertificate.cer"), pem=False)
+    assert decrypt(private_key, cache.get("test-api", "Rotated111!", der_path)) == "Rotated111!"
+    cache.invalidate(certificate_path=certificate_path)
+    cache.get("test-api", "Rotated111!", der_path)
+    cache.get("test-api", "Rotated111!", certificate_path)
+    assert (encrypt.call_count, load.call_count) == (6, 3)
+
+    cache.invalidate()
+    cache.get("test-api", "Rotated111!", der_path)
+    assert (encrypt.call_count, load.call_count) == (7, 4)
+
+
+def test_builders_generate_security_credential(certificate_path, load_env_vars, monkeypatch, private_key):
+    request = B2CPaymentRequest(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"), os.getenv("SHORTCODE"),
+                                credential_cache=SecurityCredentialCache())
+    payload = request.build("100", CommandID.BUSINESS_PAYMENT, "test-api", "", "600000", "254712345678", "Remarks")
+    assert payload["SecurityCredential"] == os.getenv("SECURITY_CREDENTIAL")
+
+    monkeypatch.setenv("INITIATOR_PASSWORD", "Safaricom999!")
+    monkeypatch.setenv("DARAJA_CERTIFICATE_PATH", certificate_path)
+    payload = request.build("100", CommandID.BUSINESS_PAYMENT, "test-api", "", "600000", "254712345678", "Remarks")
+    assert decrypt(private_key, payload["SecurityCredential"]) == "Safaricom999!"
+    assert request.security_credential("test-api") == payload["SecurityCredential"]
+    assert security_credential("test-api", cache=request.credential_cache) == payload["SecurityCredential"]
@@ -0,0 +1,222 @@
+# standard imports
+import asyncio
+import os
+import threading
+import time
+
+# external imports
+import pytest
+
+# local imports
+from mpesa_sdk.daraja.auth import AccessTokenCache, daraja_access_token
+from mpesa_sdk.daraja.b2c import B2CPaymentRequest
+from mpesa_sdk.daraja.enums import CommandID, RequestPriority
+from mpesa_sdk.daraja.stk import StkPushPaymentRequest
+from mpesa_sdk.deadline import Deadline, resolve_deadline
+from mpesa_sdk.exceptions import DeadlineExceededError
+from mpesa_sdk.retry import RetryPolicy
+from mpesa_sdk.scheduler import RequestScheduler
+from mpesa_sdk.singleflight import SingleFlight
+from mpesa_sdk.transport import AsyncTransport, InMemoryTransport, TransportResponse, encode_body
+from mpesa_sdk.utils import make_request
+
+# test imports
+
+
+class TimeoutTransport(InMemoryTransport):
+    """Records the timeout of every request."""
+
+    def __init__(self):
+        super().__init__()
+        self.timeouts = []
+
+    def request(self, method, url, headers=None, json=None, data=None, timeout=2):
+        self.timeouts.append((method, timeout))
+        return super().request(method, url, headers=headers, json=json, data=data, timeout=timeout)
+
+
+class HangingTransport(AsyncTransport):
+    """Serves GET requests from an in-memory transport and holds POST requests until they are cancelled."""
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.started = asyncio.Event()
+        self.cancelled = 0
+
+    async def request(self, method, url, headers=None, json=None, data=None, timeout=2):
+        if method != "POST":
+            return self.transport.request(method, url, headers=headers, json=json, data=data, timeout=timeout)
+        self.started.set()
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+def stk_request(transport, successful_oauth_response, **kwargs):
+    transport.register("GET", os.getenv("OAUTH_URL"), json=successful_oauth_response)
+    return StkPushPaymentRequest(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"), os.getenv("PASSKEY"),
+                                 os.getenv("SHORTCODE"), transport=transport, **kwargs)
+
+
+def test_deadline():
+    deadline = Deadline.after(0.5)
+    assert not deadline.expired
+    assert 0.4 < deadline.remaining() <= 0.5
+    assert deadline.covers(0.4) and not deadline.covers(1)
+    assert deadline.timeout(2) <= 0.5
+    assert deadline.timeout(0.1) == 0.1
+    deadline.check()
+
+    expired = Deadline.after(0)
+    assert expired.expired and expired.remaining() == 0
+    with pytest.raises(DeadlineExceededError):
+        expired.check()
+    with pytest.raises(TimeoutError):
+        expired.timeout(2)
+
+    assert resolve_deadline() is None
+    assert resolve_deadline(deadline=deadline) is deadline
+    assert resolve_deadline(10, deadline) is deadline
+    assert resolve_deadline(0.1, deadline).remaining() <= 0.1
+
+
+def test_request_timeouts_are_capped_to_the_deadline(load_env_vars, successful_oauth_response):
+    transport = TimeoutTransport()
+    make_request("GET", "https://example.com", transport=transport)
+    make_request("GET", "https://example.com", transport=transport, deadline=Deadline.after(0.5))
+    make_request("GET", "https://example.com", transport=transport, timeout=0.2, deadline=Deadline.after(10))
+    assert transport.timeouts[0] == ("GET", 2)
+    assert 0 < transport.timeouts[1][1] <= 0.5
+    assert transport.timeouts[2] == ("GET", 0.2)
+
+    with pytest.raises(DeadlineExceededError):
+        make_request("GET", "https://example.com", transport=transport, deadline=Deadline.after(0))
+    assert len(transport.requests) == 3
+
+    transport.register("GET", os.getenv("OAUTH_URL"), json=successful_oauth_response)
+    assert daraja_access_token("key", "secret", transport=transport, deadline=Deadline.after(0.5))
+    assert transport.timeouts[-1][1] <= 0.5
+
+
+def test_execute_propagates_its_budget(load_env_vars, successful_oauth_response, successful_stk_push_response):
+    transport = TimeoutTransport()
+    transport.register("POST", os.getenv("STK_PUSH_INITIATION_URL"), json=successful_stk_push_response)
+    request = stk_request(transport, successful_oauth_response,
+                          token_cache=AccessTokenCache("key", "secret", transport=transport))
+    assert request.execute("ref", "10", "254712345678", "Airtime", timeout=1.5).status_code == 200
+    assert [method for method, _ in transport.timeouts] == ["GET", "POST"]
+    assert all(timeout <= 1.5 for _, timeout in transport.timeouts)
+
+    with pytest.raises(DeadlineExceededError):
+        request.execute("ref", "10", "254712345678", "Airtime", deadline=Deadline.after(0))
+
+
+def test_token_cache_waits_for_a_refresh_within_the_deadline():
+    cache = AccessTokenCache("key", "secret", transport=InMemoryTransport())
+    holder = threading.Thread(target=lambda: (cache._lock.acquire(), time.sleep(0.2), cache._lock.release()))
+    holder.start()
+    time.sleep(0.05)
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceededError):
+        cache.get(Deadline.after(0.05))
+    assert time.monotonic() - started < 0.15
+    holder.join()
+
+
+def test_retries_stay_within_the_deadline(load_env_vars, successful_oauth_response, successful_b2c_response):
+    throttled = {"requestId": "1", "errorCode": "500.003.02", "errorMessage": "System is busy"}
+    transport = InMemoryTransport()
+    transport.register("GET", os.getenv("OAUTH_URL"), json=successful_oauth_response)
+    transport.register("POST", os.getenv("B2C_URL"), json=throttled, status_code=500)
+
+    def execute(backoff, timeout):
+        request = B2CPaymentRequest(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"), os.getenv("SHORTCODE"),
+                                    transport=transport, retry=RetryPolicy(attempts=3, backoff=backoff, jitter=0,
+                                                                           min_attempt_time=0.1))
+        transport.requests.clear()
+        started = time.monotonic()
+        response = request.execute("100", CommandID.BUSINESS_PAYMENT, "test-api", "", "600000", "254712345678",
+                                   "Remarks", timeout=timeout)
+        posts = sum(1 for sent in transport.requests if sent["method"] == "POST")
+        return response.status_code, posts, time.monotonic() - started
+
+    # the backoff before the first retry does not fit in the budget, so the throttled response is returned at once.
+    status_code, posts, elapsed = execute(backoff=1, timeout=0.5)
+    assert (status_code, posts) == (500, 1) and elapsed < 0.5
+    # the first retry fits, the second, after a 0.2 second backoff, does not.
+    assert execute(backoff=0.1, timeout=0.35)[:2] == (500, 2)
+    assert execute(backoff=0, timeout=5)[:2] == (500, 3)
+
+
+def test_transport_errors_are_not_retried_past_the_deadline():
+    calls = []
+
+    def operation():
+        calls.append(1)
+        raise ConnectionError("reset")
+
+    policy = RetryPolicy(attempts=3, backoff=1, jitter=0)
+    with pytest.raises(ConnectionError):
+        policy.call(operation, idempotent=True, deadline=Deadline.after(0.5))
+    assert len(calls) == 1
+
+    def expired():
+        calls.append(1)
+        raise DeadlineExceededError("late")
+
+    with pytest.raises(DeadlineExceededError):
+        RetryPolicy(attempts=3, backoff=0).call(expired, idempotent=True)
+    assert len(calls) == 2
+
+
+def test_queueing_and_coalesced_waits_are_bounded():
+    scheduler = RequestScheduler(concurrency=1)
+    assert scheduler.acquire(RequestPriority.BULK)
+    with pytest.raises(DeadlineExceededError):
+        scheduler.run(lambda: "sent", RequestPriority.INTERACTIVE, timeout=0.01)
+    scheduler.release(RequestPriority.BULK)
+    assert scheduler.run(lambda: "sent", RequestPriority.INTERACTIVE, timeout=0.01) == "sent"
+
+    flight = SingleFlight()
+    leader = threading.Thread(target=lambda: flight.do("key", lambda: time.sleep(0.2)))
+    leader.start()
+    time.sleep(0.05)
+    with pytest.raises(DeadlineExceededError):
+        flight.do("key", lambda: "sent", timeout=0.01)
+    leader.join()
+
+
+def test_async_requests_are_cancelled_at_the_deadline(load_env_vars, successful_oauth_response):
+    transport = InMemoryTransport()
+    async_transport = HangingTransport(transport)
+    request = stk_request(transport, successful_oauth_response, async_transport=async_transport,
+                          single_flight=SingleFlight())
+
+    async def run():
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceededError):
+            await request.execute_async("ref", "10", "254712345678", "Airtime", timeout=0.1)
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) < 0.5
+    assert async_transport.cancelled == 1
+
+
+def test_async_requests_can_be_cancelled(load_env_vars, successful_oauth_response):
+    transport = InMemoryTransport()
+    scheduler = RequestScheduler(concurrency=1)
+    request = stk_request(transport, successful_oauth_response, scheduler=scheduler)
+
+    async def run():
+        request.async_transport = async_transport = HangingTransport(transport)
+        task = asyncio.ensure_future(request.execute_async("ref", "10", "254712345678", "Airtime"))
+        await async_transport.started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return async_transport
+
+    assert asyncio.run(run()).cancelled == 1
+    assert scheduler.active == 0
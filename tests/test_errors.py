@@ -0,0 +1,70 @@
+# standard imports
+
+# external imports
+import pytest
+
+# local imports
+from mpesa_sdk.daraja.enums import ErrorCategory
+from mpesa_sdk.daraja.errors import ERROR_CODES, classify, classify_payload, classify_response
+from mpesa_sdk.exceptions import (DarajaError,
+                                  InvalidCredentialsError,
+                                  SubscriberTimeoutError,
+                                  TerminalDarajaError,
+                                  TransactionCancelledError,
+                                  TransactionInProgressError)
+from mpesa_sdk.transport import TransportResponse
+
+# test imports
+
+
+@pytest.mark.parametrize("code, category, retryable, exception", [
+    (1032, ErrorCategory.CANCELLED, False, TransactionCancelledError),
+    ("1037", ErrorCategory.TIMEOUT, True, SubscriberTimeoutError),
+    (2001, ErrorCategory.INVALID_CREDENTIALS, False, InvalidCredentialsError),
+    ("500.001.1001", ErrorCategory.INVALID_CREDENTIALS, False, InvalidCredentialsError),
+    ("500.003.02", ErrorCategory.THROTTLED, True, None),
+    ("401.002.01", ErrorCategory.AUTHENTICATION, True, None),
+])
+def test_classify(code, category, retryable, exception):
+    error = classify(code)
+    assert (error.code, error.category, error.retryable) == (str(code), category, retryable)
+    assert error is ERROR_CODES[str(code)]
+    if exception is not None:
+        raised = error.error("Daraja says no")
+        assert isinstance(raised, exception)
+        assert isinstance(raised, DarajaError)
+        assert (raised.code, raised.description, raised.retryable) == (str(code), "Daraja says no", retryable)
+
+
+def test_classify_fallbacks():
+    assert classify(0) is None
+    assert classify("0", status_code=200) is None
+    assert classify(None) is None
+
+    locked = classify("500.001.1001", "Unable to lock subscriber, a transaction is already in process")
+    assert (locked.category, locked.exception) == (ErrorCategory.IN_PROGRESS, TransactionInProgressError)
+
+    assert classify("999.999.01").category == ErrorCategory.UNKNOWN
+    assert classify("999.999.01").exception is TerminalDarajaError
+    assert classify("999.999.01", status_code=503).retryable
+    assert classify(None, status_code=429).category == ErrorCategory.THROTTLED
+    assert classify(None, status_code=504).code == "504"
+    assert not classify(None, status_code=404).retryable
+
+    assert classify("500.003.03").resend_safe and classify("503.001.01").resend_safe
+    assert classify("500.002.1001").retryable and not classify("500.002.1001").resend_safe
+    assert not classify(None, status_code=502).resend_safe
+
+
+def test_classify_payloads_and_responses(failed_stk_push_response, failed_stk_push_status_query,
+                                         successful_stk_push_status_query):
+    assert classify_payload(successful_stk_push_status_query, 200) is None
+    assert classify_payload(failed_stk_push_status_query).category == ErrorCategory.CANCELLED
+    assert classify_payload(failed_stk_push_response, 500).code == "500.001.1001"
+    assert classify_payload(None, 502).category == ErrorCategory.SERVER_ERROR
+
+    assert classify_response(TransportResponse(200, content=b"")) is None
+    assert classify_response(TransportResponse(502, content=b"<html>Bad Gateway</html>")).retryable
+    response = TransportResponse(400, content=b'{"errorCode": "400.002.02", "errorMessage": "Bad Request"}')
+    assert classify_response(response).as_dict() == {
+        "code": "400.002.02", "category": "invalid_request", "retryable": False}
@@ -0,0 +1,102 @@
+# standard imports
+import copy
+from datetime import datetime
+
+# external imports
+import pytest
+
+# local imports
+from mpesa_sdk.daraja.b2c import B2CCallbackParser
+from mpesa_sdk.daraja.c2b import C2BConfirmationParser
+from mpesa_sdk.daraja.export import EAST_AFRICA_TIME, ArrowExportSink, export_schema
+from mpesa_sdk.daraja.receiver import Callback
+from mpesa_sdk.daraja.reverse import ReversalRequestCallbackParser
+from mpesa_sdk.daraja.stk import StkPushCallbackRequestParser
+from mpesa_sdk.daraja.transaction_status import TransactionStatusCallbackParser
+
+# test imports
+
+pyarrow = pytest.importorskip("pyarrow")
+
+
+def test_parquet_export(c2b_payment_request, failed_stk_push_callback, successful_b2c_callback,
+                        successful_reversal_callback, successful_stk_push_callback,
+                        successful_transaction_status_query_callback, tmp_path):
+    import pyarrow.parquet
+
+    with ArrowExportSink(str(tmp_path), row_group_size=2, row_groups_per_file=2) as sink:
+        for _ in range(5):
+            sink.append(B2CCallbackParser(successful_b2c_callback))
+        sink.append(StkPushCallbackRequestParser(successful_stk_push_callback))
+        sink.append(StkPushCallbackRequestParser(failed_stk_push_callback))
+        parser = C2BConfirmationParser(c2b_payment_request)
+        sink.extend([Callback("/c2b-confirmation-url", parser, parser.parse())])
+        sink.append(ReversalRequestCallbackParser(successful_reversal_callback))
+        sink.append(TransactionStatusCallbackParser(successful_transaction_status_query_callback))
+
+    assert sorted(path.rsplit("/", 1)[1] for path in sink.paths) == [
+        "b2c-00000.parquet", "b2c-00001.parquet", "c2b-00000.parquet", "reversal-00000.parquet",
+        "stk_push-00000.parquet", "transaction_status-00000.parquet"]
+
+    b2c = pyarrow.parquet.ParquetFile(str(tmp_path / "b2c-00000.parquet"))
+    assert b2c.metadata.num_row_groups == 2
+    row = b2c.read().to_pylist()[0]
+    assert row["receipt"] == "NLJ41HAY6Q"
+    assert row["amount_cents"] == 1000
+    assert row["msisdn"] == "254708374149"
+    assert row["result_code"] == 0
+    assert row["completed_at"] == datetime(2019, 12, 19, 11, 45, 50, tzinfo=EAST_AFRICA_TIME)
+    assert pyarrow.parquet.read_table(str(tmp_path / "b2c-00001.parquet")).num_rows == 1
+
+    stk = pyarrow.parquet.read_table(str(tmp_path / "stk_push-00000.parquet")).to_pylist()
+    assert [row["success"] for row in stk] == [True, False]
+    assert stk[0]["receipt"] == "NLJ7RT61SV"
+    assert stk[1]["amount_cents"] is None
+
+    c2b = pyarrow.parquet.read_table(str(tmp_path / "c2b-00000.parquet")).to_pylist()[0]
+    assert (c2b["amount_cents"], c2b["bill_reference_number"]) == (1000, "invoice008")
+    status = pyarrow.parquet.read_table(str(tmp_path / "transaction_status-00000.parquet")).to_pylist()[0]
+    assert (status["receipt"], status["amount_cents"]) == ("MBN31H462N", 30000)
+
+
+def test_arrow_ipc_export(successful_b2c_callback, tmp_path):
+    sink = ArrowExportSink(str(tmp_path), file_format="arrow", prefix="2019-12-19-")
+    sink.append(B2CCallbackParser(successful_b2c_callback))
+    sink.flush()
+    sink.close()
+
+    with pyarrow.memory_map(str(tmp_path / "2019-12-19-b2c-00000.arrow")) as source:
+        table = pyarrow.ipc.open_file(source).read_all()
+    assert table.column("transaction_id").to_pylist() == ["NLJ41HAY6Q"]
+
+
+def test_restarted_export_keeps_earlier_files(successful_b2c_callback, tmp_path):
+    for _ in range(2):
+        with ArrowExportSink(str(tmp_path), file_format="arrow") as sink:
+            sink.append(B2CCallbackParser(successful_b2c_callback))
+    assert sink.paths == [str(tmp_path / "b2c-00001.arrow")]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["b2c-00000.arrow", "b2c-00001.arrow"]
+
+
+def test_export_coerces_values_to_the_column_types(successful_b2c_callback, tmp_path):
+    import pyarrow.parquet
+
+    callback = copy.deepcopy(successful_b2c_callback)
+    callback["Result"].update(ResultCode="0", TransactionID=12345)
+    overflowing = copy.deepcopy(successful_b2c_callback)
+    overflowing["Result"]["ResultCode"] = 1 << 40
+    with ArrowExportSink(str(tmp_path), row_group_size=1) as sink:
+        sink.append(B2CCallbackParser(callback), {"success": "yes", "data": {"transaction_amount": "ten"}})
+        sink.append(B2CCallbackParser(overflowing))
+
+    rows = pyarrow.parquet.read_table(str(tmp_path / "b2c-00000.parquet")).to_pylist()
+    assert (rows[0]["result_code"], rows[0]["transaction_id"]) == (0, "12345")
+    assert (rows[0]["success"], rows[0]["amount_cents"]) == (None, None)
+    assert rows[1]["result_code"] is None
+
+
+def test_export_errors(tmp_path):
+    with pytest.raises(ValueError):
+        ArrowExportSink(str(tmp_path), file_format="csv")
+    with pytest.raises(ValueError):
+        export_schema(object())
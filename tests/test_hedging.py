@@ -0,0 +1,160 @@
+# standard imports
+import asyncio
+import os
+import time
+
+# external imports
+import pytest
+
+# local imports
+from mpesa_sdk.daraja.b2c import B2CPaymentRequest
+from mpesa_sdk.daraja.enums import IdentifierType
+from mpesa_sdk.daraja.stk import StkPushStatusQueryRequest, StkPushStatusQueryResponseParser
+from mpesa_sdk.daraja.transaction_status import TransactionStatusQueryRequest
+from mpesa_sdk.hedging import HedgingPolicy, LatencyTracker
+from mpesa_sdk.ratelimit import RateLimiter
+from mpesa_sdk.scheduler import RequestScheduler
+from mpesa_sdk.transport import AsyncTransport, InMemoryTransport
+
+# test imports
+
+
+class SlowFirstTransport(InMemoryTransport):
+    """Delays the first request to the query URL, simulating a slow tail response."""
+
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+        self.posts = 0
+
+    def request(self, method, url, headers=None, json=None, data=None, timeout=2):
+        if method == "POST":
+            self.posts += 1
+            if self.posts == 1:
+                time.sleep(self.delay)
+        return super().request(method, url, headers=headers, json=json, data=data, timeout=timeout)
+
+
+class AsyncSlowFirstTransport(AsyncTransport):
+    def __init__(self, transport, delay):
+        self.transport = transport
+        self.delay = delay
+        self.posts = 0
+        self.cancelled = 0
+
+    async def request(self, method, url, headers=None, json=None, data=None, timeout=2):
+        if method == "POST":
+            self.posts += 1
+            if self.posts == 1:
+                try:
+                    await asyncio.sleep(self.delay)
+                except asyncio.CancelledError:
+                    self.cancelled += 1
+                    raise
+        return self.transport.request(method, url, headers=headers, json=json, data=data, timeout=timeout)
+
+
+@pytest.fixture(scope="function")
+def stk_query_transport(load_env_vars, successful_oauth_response, successful_stk_push_status_query):
+    transport = SlowFirstTransport(delay=0.5)
+    transport.register("GET", os.getenv("OAUTH_URL"), json=successful_oauth_response)
+    transport.register("POST", os.getenv("STK_PUSH_STATUS_QUERY_URL"), json=successful_stk_push_status_query)
+    return transport
+
+
+def test_latency_tracker():
+    tracker = LatencyTracker(window=10)
+    assert tracker.percentile(0.95) is None
+    for latency in range(20):
+        tracker.record(latency / 100)
+    assert len(tracker) == 10
+    assert tracker.percentile(0.95) == 0.19
+    assert tracker.percentile(0.5) == 0.15
+
+    policy = HedgingPolicy(min_samples=5, default_delay=1)
+    assert policy.hedge_delay() == 1
+    for _ in range(5):
+        policy.latencies.record(0.05)
+    assert policy.hedge_delay() == 0.05
+
+
+def test_hedged_stk_push_status_query(stk_query_transport, successful_stk_push_status_query):
+    hedging = HedgingPolicy(delay=0.05)
+    stk_push_status_query = StkPushStatusQueryRequest(
+        os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"), os.getenv("PASSKEY"), os.getenv("SHORTCODE"),
+        transport=stk_query_transport, hedging=hedging)
+
+    started = time.monotonic()
+    response = stk_push_status_query.execute("ws_CO_13012021093521236557")
+    assert time.monotonic() - started < 0.5
+    assert StkPushStatusQueryResponseParser(response).parse()["result_code"] == 0
+    posts = [request for request in stk_query_transport.requests if request["method"] == "POST"]
+    assert len(posts) == 1
+    assert stk_query_transport.posts == 2
+    hedging.close()
+
+
+def test_hedging_respects_rate_limiter(stk_query_transport):
+    rate_limiter = RateLimiter(rate=0.001, capacity=1)
+    assert rate_limiter.try_acquire() == 0
+    stk_push_status_query = StkPushStatusQueryRequest(
+        os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"), os.getenv("PASSKEY"), os.getenv("SHORTCODE"),
+        transport=stk_query_transport, hedging=HedgingPolicy(delay=0.05, rate_limiter=rate_limiter))
+
+    started = time.monotonic()
+    stk_push_status_query.execute("ws_CO_13012021093521236557")
+    assert time.monotonic() - started >= 0.5
+    assert stk_query_transport.posts == 1
+
+
+@pytest.mark.parametrize("concurrency, posts", [(1, 1), (2, 2)])
+def test_hedges_take_their_own_scheduler_slot(stk_query_transport, concurrency, posts):
+    scheduler = RequestScheduler(concurrency=concurrency)
+    stk_push_status_query = StkPushStatusQueryRequest(
+        os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"), os.getenv("PASSKEY"), os.getenv("SHORTCODE"),
+        transport=stk_query_transport, hedging=HedgingPolicy(delay=0.05), scheduler=scheduler)
+
+    stk_push_status_query.execute("ws_CO_13012021093521236557")
+    # the hedge is only sent when a slot besides the one held by the first attempt is free.
+    assert stk_query_transport.posts == posts
+    deadline = time.monotonic() + 2
+    while scheduler.active and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert scheduler.active == 0
+
+
+def test_hedged_async_transaction_status_query(load_env_vars, successful_oauth_response,
+                                               successful_transaction_status_query_response):
+    transport = InMemoryTransport()
+    transport.register("GET", os.getenv("OAUTH_URL"), json=successful_oauth_response)
+    transport.register("POST", os.getenv("TRANSACTION_STATUS_URL"), json=successful_transaction_status_query_response)
+    async_transport = AsyncSlowFirstTransport(transport, delay=5)
+    transaction_status_query = TransactionStatusQueryRequest(
+        os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"), os.getenv("SHORTCODE"),
+        async_transport=async_transport, hedging=HedgingPolicy(delay=0.01))
+
+    response = asyncio.run(transaction_status_query.execute_async(
+        IdentifierType.ORGANIZATION_SHORT_CODE, "test-api", "", "600000", "Test remarks", "QWEDF4MS007"))
+    assert response.json() == successful_transaction_status_query_response
+    assert async_transport.cancelled == 1
+
+
+def test_hedging_is_restricted_to_idempotent_requests(load_env_vars):
+    with pytest.raises(ValueError):
+        B2CPaymentRequest(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"), os.getenv("SHORTCODE"),
+                          hedging=HedgingPolicy())
+
+
+def test_hedging_raises_when_all_attempts_fail():
+    def fail():
+        raise ConnectionError("unreachable")
+
+    async def fail_async():
+        raise ConnectionError("unreachable")
+
+    policy = HedgingPolicy(delay=0)
+    with pytest.raises(ConnectionError):
+        policy.call(fail)
+    with pytest.raises(ConnectionError):
+        asyncio.run(policy.call_async(fail_async))
+    policy.close()
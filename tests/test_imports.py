@@ -0,0 +1,47 @@
+# standard imports
+import json
+import subprocess
+import sys
+
+# external imports
+import pytest
+
+# local imports
+import mpesa_sdk
+
+# test imports
+
+# modules whose import dominates start-up time, checked instead of timing the import, which is flaky on a loaded
+# machine.
+HEAVY_MODULES = ["asyncio", "concurrent.futures.thread", "cryptography", "httpx", "multiprocessing", "numpy",
+                 "pyarrow", "pytz", "requests", "sqlite3", "urllib3"]
+
+
+def imported_after(statement):
+    script = (f"import json, sys\n{statement}\n"
+              f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))")
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, check=True, text=True).stdout
+    return json.loads(output)
+
+
+@pytest.mark.parametrize("statement", [
+    "import mpesa_sdk",
+    "from mpesa_sdk.daraja.b2c import B2CCallbackParser",
+    "from mpesa_sdk.daraja.c2b import C2BConfirmationParser",
+    "from mpesa_sdk.daraja.stk import StkPushCallbackRequestParser",
+    "from mpesa_sdk import TransactionStatusCallbackParser, ReversalRequestCallbackParser",
+    "from mpesa_sdk.daraja.reconciliation import Reconciler",
+])
+def test_parsing_callbacks_does_not_import_http_clients(statement):
+    assert imported_after(statement) == []
+
+
+def test_lazy_attributes():
+    from mpesa_sdk.daraja.stk import StkPushPaymentRequest
+
+    assert mpesa_sdk.StkPushPaymentRequest is StkPushPaymentRequest
+    assert "StkPushPaymentRequest" in dir(mpesa_sdk)
+    with pytest.raises(AttributeError):
+        mpesa_sdk.UnknownRequest
+    for name in mpesa_sdk.__all__:
+        assert getattr(mpesa_sdk, name) is not None
@@ -0,0 +1,80 @@
+# standard imports
+import os
+
+# external imports
+import pytest
+from requests_mock import Mocker
+
+# local imports
+from mpesa_sdk.daraja.b2c import B2CPaymentRequest
+from mpesa_sdk.daraja.enums import CommandID
+from mpesa_sdk.daraja.msisdn import (is_safaricom,
+                                     normalize_msisdn,
+                                     normalize_msisdn_array,
+                                     normalize_msisdns,
+                                     validate_msisdn)
+from mpesa_sdk.daraja.stk import StkPushPaymentRequest
+from mpesa_sdk.exceptions import InvalidMsisdnError
+
+# test imports
+
+VALUES = ["0712345678", "+254712345678", " 254112345678 ", "712345678", "0787654321", "0812345678", "07123",
+          "07l2345678", "254712345678901"]
+SAFARICOM = ["254712345678", "254712345678", "254112345678", "254712345678", None, None, None, None, None]
+
+
+def test_normalize_and_validate_msisdn():
+    assert normalize_msisdn("0787654321") == "254787654321"
+    assert normalize_msisdn(712345678) == "254712345678"
+    assert is_safaricom("254748123456")
+    assert not is_safaricom("254787654321")
+    assert validate_msisdn("+254 712345678".replace(" ", "")) == "254712345678"
+    with pytest.raises(InvalidMsisdnError):
+        validate_msisdn("0812345678")
+    with pytest.raises(InvalidMsisdnError, match="not a Safaricom number"):
+        validate_msisdn("0787654321")
+
+
+def test_normalize_msisdns():
+    assert normalize_msisdns(VALUES) == SAFARICOM
+    assert normalize_msisdns(["0787654321"], safaricom_only=False) == ["254787654321"]
+
+
+def test_normalize_msisdn_array():
+    numpy = pytest.importorskip("numpy")
+    normalized, valid = normalize_msisdn_array(numpy.array(VALUES))
+    assert valid.tolist() == [value is not None for value in SAFARICOM]
+    assert normalized[valid].astype(str).tolist() == [value for value in SAFARICOM if value]
+
+    _, valid = normalize_msisdn_array(VALUES, safaricom_only=False)
+    assert valid.tolist()[:6] == [True, True, True, True, True, False]
+
+
+@pytest.mark.parametrize("safaricom_only", [True, False])
+def test_scalar_and_array_normalization_agree(safaricom_only):
+    numpy = pytest.importorskip("numpy")
+    values = VALUES + ["+0712345678", "+712345678", "++254712345678", "+ 254712345678", " +254787654321 ",
+                       "0254712345678", "254012345678", "+2547123456789"]
+    normalized, valid = normalize_msisdn_array(values, safaricom_only=safaricom_only)
+    assert [str(number) if is_valid else None for number, is_valid in zip(normalized.tolist(), valid.tolist())] == \
+        normalize_msisdns(values, safaricom_only=safaricom_only)
+
+
+def test_builders_reject_invalid_msisdns_before_sending(load_env_vars, successful_oauth_response,
+                                                        successful_stk_push_response):
+    stk_push = StkPushPaymentRequest(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"), os.getenv("PASSKEY"),
+                                     os.getenv("SHORTCODE"), validate_msisdns=True)
+    b2c = B2CPaymentRequest(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"), os.getenv("SHORTCODE"),
+                            validate_msisdns=True)
+    with Mocker(real_http=False) as requests_mocker:
+        requests_mocker.register_uri("GET", os.getenv("OAUTH_URL"), json=successful_oauth_response)
+        requests_mocker.register_uri("POST", os.getenv("STK_PUSH_INITIATION_URL"), json=successful_stk_push_response)
+        with pytest.raises(InvalidMsisdnError):
+            stk_push.execute("ref", "1", "0787654321", "Airtime")
+        with pytest.raises(InvalidMsisdnError):
+            b2c.execute("10", CommandID.BUSINESS_PAYMENT, "api", "", "600000", "not-a-number", "Remarks")
+        assert requests_mocker.call_count == 0
+
+        stk_push.execute("ref", "1", "0712345678", "Airtime")
+        assert requests_mocker.last_request.json()["PhoneNumber"] == "254712345678"
+        assert requests_mocker.last_request.json()["PartyA"] == "254712345678"
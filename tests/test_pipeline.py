@@ -0,0 +1,163 @@
+# standard imports
+import json
+import os
+import threading
+
+# external imports
+
+# local imports
+from mpesa_sdk.daraja.pipeline import CallbackPipeline, SpillBuffer
+from mpesa_sdk.retry import RetryPolicy
+
+# test imports
+from tests.test_receiver import wsgi_request
+
+
+def test_spill_buffer(tmp_path):
+    path = str(tmp_path / "spill.jsonl")
+    spill = SpillBuffer(path)
+    spill.append("/b2c-callback", b'{"a": 1}')
+    spill.append("/b2c-callback", b"\xff")
+    spill.close()
+
+    spill = SpillBuffer(path)
+    assert spill.pending > 0
+    first, position = spill.read(limit=1)
+    assert first == [("/b2c-callback", b'{"a": 1}')]
+    assert spill.read() == ([("/b2c-callback", b"\xff")], os.path.getsize(path))
+    assert spill.pending == 0 and spill.uncommitted == os.path.getsize(path)
+
+    # callbacks read back stay on disk until they are committed as delivered.
+    spill.commit(position)
+    assert spill.uncommitted == os.path.getsize(path) - position
+    spill.commit(os.path.getsize(path))
+    assert spill.uncommitted == 0
+    assert os.path.getsize(path) == 0
+    spill.close()
+
+
+def test_spill_buffer_compacts_delivered_callbacks(tmp_path):
+    path = str(tmp_path / "spill.jsonl")
+    spill = SpillBuffer(path, compact_size=1)
+    for index in range(3):
+        spill.append("/b2c-callback", str(index).encode())
+    _, position = spill.read(limit=2)
+    size = os.path.getsize(path)
+    spill.commit(position)
+    assert os.path.getsize(path) == size - position == spill.uncommitted
+    spill.append("/b2c-callback", b"3")
+    items, position = spill.read()
+    assert items == [("/b2c-callback", b"2"), ("/b2c-callback", b"3")]
+    spill.commit(position)
+    assert os.path.getsize(path) == 0
+    spill.close()
+
+
+def test_pipeline_batches_and_dedupes(load_env_vars, successful_b2c_callback, successful_stk_push_callback):
+    batches, received = [], []
+    pipeline = CallbackPipeline(batches.append, workers=2, batch_size=2, flush_interval=0.05,
+                                on_receive=lambda path, body: received.append(path))
+
+    assert wsgi_request(pipeline, "/b2c-callback", successful_b2c_callback)[0] == "200 OK"
+    assert wsgi_request(pipeline, "/b2c-callback", successful_b2c_callback)[0] == "200 OK"
+    assert wsgi_request(pipeline, "/stk-push-callback-url", successful_stk_push_callback)[0] == "200 OK"
+    pipeline.join()
+    pipeline.stop()
+
+    assert pipeline.duplicates == 1
+    assert received == ["/b2c-callback", "/b2c-callback", "/stk-push-callback-url"]
+    assert sorted(callback.path for batch in batches for callback in batch) == ["/b2c-callback",
+                                                                               "/stk-push-callback-url"]
+    assert all(len(batch) <= 2 for batch in batches)
+
+
+def test_pipeline_spills_when_handler_falls_behind(load_env_vars, mocker, successful_b2c_callback, tmp_path):
+    started, release = threading.Event(), threading.Event()
+    delivered = []
+
+    def handler(batch):
+        started.set()
+        release.wait()
+        delivered.extend(batch)
+
+    spill_path = str(tmp_path / "spill.jsonl")
+    pipeline = CallbackPipeline(handler, workers=1, queue_size=1, batch_size=1, batch_queue_size=1,
+                                spill_path=spill_path)
+    append = mocker.spy(pipeline.spill, "append")
+    for index in range(20):
+        body = dict(successful_b2c_callback, index=index)
+        assert wsgi_request(pipeline, "/b2c-callback", body) == ("200 OK", json.dumps(
+            {"ResultCode": 0, "ResultDesc": "Accepted"}).encode())
+        if index == 0:
+            assert started.wait(timeout=1)
+    assert append.call_count > 0
+
+    release.set()
+    pipeline.join()
+    pipeline.stop()
+    assert len(delivered) == 20
+    assert pipeline.spill.pending == 0
+
+
+def test_spilled_callbacks_survive_a_crash_before_delivery(load_env_vars, successful_b2c_callback, tmp_path):
+    spill_path = str(tmp_path / "spill.jsonl")
+    spill = SpillBuffer(spill_path)
+    for index in range(3):
+        spill.append("/b2c-callback", json.dumps(dict(successful_b2c_callback, index=index)).encode())
+    spill.close()
+    size = os.path.getsize(spill_path)
+
+    # without decoding threads the spilled callbacks are read back but never handled, as if the process died.
+    crashed = CallbackPipeline(lambda batch: None, workers=0, spill_path=spill_path)
+    crashed.start()
+    while crashed.spill.pending or crashed._draining:
+        threading.Event().wait(0.01)
+    assert crashed.queue.qsize() == 3
+    assert os.path.getsize(spill_path) == size
+
+    delivered = []
+    pipeline = CallbackPipeline(delivered.extend, workers=1, flush_interval=0.01, spill_path=spill_path)
+    pipeline.start()
+    pipeline.join()
+    pipeline.stop()
+    assert sorted(callback.parser.request["index"] for callback in delivered) == [0, 1, 2]
+    assert os.path.getsize(spill_path) == 0
+
+
+def test_pipeline_rejects_without_spill(caplog, load_env_vars, successful_b2c_callback):
+    release = threading.Event()
+    pipeline = CallbackPipeline(lambda batch: release.wait(), workers=1, queue_size=1, batch_size=1,
+                                batch_queue_size=1)
+    statuses = [wsgi_request(pipeline, "/b2c-callback", dict(successful_b2c_callback, index=index))[0]
+                for index in range(10)]
+    assert "503 Service Unavailable" in statuses
+    release.set()
+    pipeline.stop()
+
+    pipeline = CallbackPipeline(lambda batch: 1 / 0, batch_size=1, retry=RetryPolicy(attempts=1))
+    assert wsgi_request(pipeline, "/b2c-callback", successful_b2c_callback)[0] == "200 OK"
+    pipeline.stop()
+    assert "Failed to handle batch of 1 callbacks." in caplog.text
+
+
+def test_pipeline_retries_and_respills_failed_batches(caplog, load_env_vars, successful_b2c_callback, tmp_path):
+    calls, delivered = [], []
+
+    def handler(batch):
+        calls.append(len(batch))
+        # the first batch fails both attempts and is spilled again, its redelivery then succeeds.
+        if len(calls) <= 2:
+            raise OSError("database unavailable")
+        delivered.extend(batch)
+
+    spill_path = str(tmp_path / "spill.jsonl")
+    pipeline = CallbackPipeline(handler, batch_size=1, spill_path=spill_path,
+                                retry=RetryPolicy(attempts=2, backoff=0.01))
+    assert wsgi_request(pipeline, "/b2c-callback", successful_b2c_callback)[0] == "200 OK"
+    pipeline.join()
+    pipeline.stop()
+
+    assert calls == [1, 1, 1]
+    assert [callback.path for callback in delivered] == ["/b2c-callback"]
+    assert "Failed to handle batch of 1 callbacks, retrying." in caplog.text
+    assert os.path.getsize(spill_path) == 0
@@ -0,0 +1,25 @@
+# standard imports
+import time
+
+# external imports
+import pytest
+
+# local imports
+from mpesa_sdk.ratelimit import RateLimiter
+
+# test imports
+
+
+def test_rate_limiter():
+    with pytest.raises(ValueError):
+        RateLimiter(0)
+
+    rate_limiter = RateLimiter(rate=100, capacity=2)
+    assert rate_limiter.try_acquire() == 0
+    assert rate_limiter.try_acquire() == 0
+    assert 0 < rate_limiter.try_acquire() <= 0.01
+    assert not rate_limiter.acquire(tokens=2, timeout=0.001)
+
+    started = time.monotonic()
+    assert rate_limiter.acquire(tokens=2)
+    assert time.monotonic() - started >= 0.01
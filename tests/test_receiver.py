@@ -0,0 +1,99 @@
+# standard imports
+import asyncio
+import io
+import json
+import os
+import threading
+
+# external imports
+import pytest
+
+# local imports
+from mpesa_sdk.daraja.b2c import B2CCallbackParser
+from mpesa_sdk.daraja.receiver import ACKNOWLEDGEMENT, CallbackReceiver, callback_routes
+from mpesa_sdk.daraja.stk import StkPushCallbackRequestParser
+
+# test imports
+
+
+def wsgi_request(receiver, path, body, method="POST"):
+    responses = []
+    content = json.dumps(body).encode()
+    environ = {"PATH_INFO": path, "REQUEST_METHOD": method, "CONTENT_LENGTH": str(len(content)),
+               "wsgi.input": io.BytesIO(content)}
+    result = receiver.wsgi(environ, lambda status, headers: responses.append(status))
+    return responses[0], b"".join(result)
+
+
+def asgi_request(receiver, scope, messages):
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(receiver.asgi(scope, receive, send))
+    return sent
+
+
+def test_callback_routes(load_env_vars):
+    routes = callback_routes()
+    assert routes["/b2c-callback"] is B2CCallbackParser
+    assert routes["/stk-push-callback-url"] is StkPushCallbackRequestParser
+
+
+def test_wsgi_callback_receiver(load_env_vars, successful_b2c_callback, successful_stk_push_callback):
+    callbacks = []
+    receiver = CallbackReceiver(callbacks.append, workers=2)
+
+    assert wsgi_request(receiver, "/b2c-callback", successful_b2c_callback) == ("200 OK", ACKNOWLEDGEMENT)
+    assert wsgi_request(receiver, "/stk-push-callback-url", successful_stk_push_callback)[0] == "200 OK"
+    assert wsgi_request(receiver, "/stk-push-callback-url", {}, method="GET")[0] == "405 Method Not Allowed"
+    assert wsgi_request(receiver, "/unknown", {})[0] == "404 Not Found"
+    receiver.join()
+
+    results = {callback.path: callback for callback in callbacks}
+    assert results["/b2c-callback"].result == B2CCallbackParser(successful_b2c_callback).parse()
+    assert results["/stk-push-callback-url"].parser.transaction_id == "29115-34620561-1"
+    receiver.stop()
+
+
+def test_acknowledgement_does_not_wait_for_handler(load_env_vars, successful_b2c_callback):
+    started, release = threading.Event(), threading.Event()
+
+    def handler(callback):
+        started.set()
+        release.wait()
+
+    receiver = CallbackReceiver(handler, workers=1, queue_size=1)
+    assert wsgi_request(receiver, "/b2c-callback", successful_b2c_callback)[0] == "200 OK"
+    assert started.wait(timeout=1)
+    assert wsgi_request(receiver, "/b2c-callback", successful_b2c_callback)[0] == "200 OK"
+    assert wsgi_request(receiver, "/b2c-callback", successful_b2c_callback)[0] == "503 Service Unavailable"
+    release.set()
+    receiver.stop()
+
+
+def test_asgi_callback_receiver(caplog, load_env_vars, successful_b2c_callback):
+    callbacks = []
+    receiver = CallbackReceiver(callbacks.append)
+
+    body = json.dumps(successful_b2c_callback).encode()
+    sent = asgi_request(receiver, {"type": "http", "method": "POST", "path": "/b2c-callback"},
+                        [{"type": "http.request", "body": body[:10], "more_body": True},
+                         {"type": "http.request", "body": body[10:]}])
+    assert sent[0]["status"] == 200
+    assert sent[1]["body"] == ACKNOWLEDGEMENT
+
+    sent = asgi_request(receiver, {"type": "http", "method": "POST", "path": "/b2c-callback"},
+                        [{"type": "http.request", "body": b"not json"}])
+    assert sent[0]["status"] == 200
+    assert asgi_request(receiver, {"type": "http", "method": "POST", "path": "/unknown"}, [])[0]["status"] == 404
+
+    sent = asgi_request(receiver, {"type": "lifespan"}, [{"type": "lifespan.startup"},
+                                                         {"type": "lifespan.shutdown"}])
+    assert sent == [{"type": "lifespan.startup.complete"}, {"type": "lifespan.shutdown.complete"}]
+    assert [callback.result["transaction_id"] for callback in callbacks] == ["NLJ41HAY6Q"]
+    assert "Failed to handle callback received on: /b2c-callback." in caplog.text
@@ -0,0 +1,79 @@
+# standard imports
+import gzip
+import json
+from decimal import Decimal
+
+# external imports
+import pytest
+
+# local imports
+from mpesa_sdk.daraja.b2c import B2CCallbackParser
+from mpesa_sdk.daraja.c2b import C2BConfirmationParser
+from mpesa_sdk.daraja.reconciliation import (AmountMismatch,
+                                             LedgerEntry,
+                                             Reconciler,
+                                             callback_entries,
+                                             read_callbacks,
+                                             statement_entries,
+                                             to_cents)
+
+# test imports
+
+CALLBACKS = [LedgerEntry("QA1", 10000), LedgerEntry("QA2", 2550), LedgerEntry("QA3", 500),
+             LedgerEntry("QA3", 500), LedgerEntry("QA4", 100)]
+STATEMENT = [LedgerEntry("QA1", 10000), LedgerEntry("QA2", 2500), LedgerEntry("QA3", 500),
+             LedgerEntry("QA5", 700), LedgerEntry("QA5", 700)]
+
+
+def test_to_cents():
+    assert to_cents("1,000.50") == 100050
+    assert to_cents("-250.00") == 25000
+    assert to_cents(10) == 1000
+    assert to_cents("") is None
+    assert to_cents("n/a") is None
+    assert to_cents("NaN") is None
+
+
+@pytest.mark.parametrize("backend", ["python", "numpy"])
+@pytest.mark.parametrize("partitions", [1, 4])
+def test_reconciler(backend, partitions, tmp_path):
+    if backend == "numpy":
+        pytest.importorskip("numpy")
+    report = Reconciler(partitions=partitions, workdir=str(tmp_path), backend=backend).reconcile(
+        iter(CALLBACKS), iter(STATEMENT))
+
+    assert report.matched == 2
+    assert report.amount_mismatches == [AmountMismatch("QA2", Decimal("25.50"), Decimal("25.00"))]
+    assert report.missing_from_statement == ["QA4"]
+    assert report.missing_from_callbacks == ["QA5"]
+    assert report.duplicate_callbacks == ["QA3"]
+    assert report.duplicate_statement == ["QA5"]
+    assert not report.balanced
+    assert Reconciler(backend=backend).reconcile(STATEMENT[:3], STATEMENT[:3]).balanced
+
+
+def test_reconciler_backends():
+    with pytest.raises(ValueError):
+        Reconciler(backend="spark")
+
+
+def test_reconciliation_from_files(c2b_payment_request, successful_b2c_callback, tmp_path):
+    callbacks_path = tmp_path / "callbacks.jsonl.gz"
+    with gzip.open(callbacks_path, "wt") as callbacks_file:
+        for record in (B2CCallbackParser(successful_b2c_callback).parse(),
+                       C2BConfirmationParser(c2b_payment_request).parse(),
+                       {"success": False, "transaction_id": "FAILED"}):
+            callbacks_file.write(json.dumps(record, default=str) + "\n")
+
+    statement_path = tmp_path / "statement.csv"
+    statement_path.write_text(
+        "Receipt No.,Completion Time,Details,Transaction Status,Paid In,Withdrawn,Balance\n"
+        "NLJ41HAY6Q,2019-12-19 10:21:15,Business Payment,Completed,,-10.00,1000.00\n"
+        "RKTQDM7W6S,2019-11-22 06:38:45,Pay Bill,Completed,10.00,,1010.00\n"
+        "RKTQDM7W7T,2019-11-22 06:40:45,Pay Bill,Failed,10.00,,1010.00\n")
+
+    entries = list(callback_entries(read_callbacks(str(callbacks_path))))
+    assert [entry.reference for entry in entries] == ["NLJ41HAY6Q", "RKTQDM7W6S"]
+    report = Reconciler().reconcile(entries, statement_entries(str(statement_path)))
+    assert report.matched == 2
+    assert report.balanced
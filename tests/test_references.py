@@ -0,0 +1,69 @@
+# standard imports
+import os
+import threading
+
+# external imports
+import pytest
+
+# local imports
+from mpesa_sdk.daraja.c2b import C2BValidator, account_rule
+from mpesa_sdk.daraja.enums import C2BRejectionCode
+from mpesa_sdk.daraja.references import ReferenceIndex
+
+# test imports
+
+
+def test_reference_index():
+    index = ReferenceIndex(["invoice008", "ACC-1"], prefixes=["LOAN-"])
+    assert len(index) == 2
+    assert " Invoice008 " in index
+    assert "loan-2231" in index
+    assert "invoice009" not in index
+    assert 8 not in index
+
+    case_sensitive = ReferenceIndex(["ACC-1"], case_sensitive=True)
+    assert "ACC-1" in case_sensitive
+    assert "acc-1" not in case_sensitive
+
+    index.load(["invoice009"])
+    assert "invoice009" in index
+    assert "loan-2231" not in index
+    with pytest.raises(ValueError):
+        index.reload()
+
+
+def test_reference_index_hot_reload(tmp_path):
+    path = tmp_path / "references.txt"
+    path.write_text("# paybill accounts\ninvoice008\nLOAN-*\n\n")
+    index = ReferenceIndex.from_file(str(path))
+    assert "invoice008" in index
+    assert "loan-1" in index
+    assert not index.reload_if_changed()
+
+    stop = threading.Event()
+    misses = []
+
+    def lookup():
+        while not stop.is_set():
+            if "invoice008" not in index:
+                misses.append(1)
+
+    reader = threading.Thread(target=lookup)
+    reader.start()
+    for generation in range(20):
+        path.write_text("invoice008\n" + "".join(f"ref-{generation}-{item}\n" for item in range(1000)))
+        os.utime(path, (generation, generation))
+        assert index.reload_if_changed()
+    stop.set()
+    reader.join()
+
+    assert misses == []
+    assert "ref-19-999" in index
+    assert "loan-1" not in index
+
+
+def test_reference_index_c2b_validation(c2b_payment_request):
+    validator = C2BValidator([account_rule(ReferenceIndex(["INVOICE008"]))])
+    assert validator.validate(c2b_payment_request) is None
+    assert validator.validate(dict(c2b_payment_request, BillRefNumber="other")) == \
+           C2BRejectionCode.INVALID_ACCOUNT_NUMBER
@@ -0,0 +1,114 @@
+# standard imports
+import gzip
+import json
+import os
+
+# external imports
+
+# local imports
+from mpesa_sdk.daraja.auth import AccessTokenCache
+from mpesa_sdk.daraja.b2c import B2CPaymentRequest
+from mpesa_sdk.daraja.enums import CommandID
+from mpesa_sdk.daraja.receiver import CallbackReceiver
+from mpesa_sdk.daraja.replay import (CALLBACK, REDACTED, REQUEST, Redactor, ReplayRunner, TraceEvent, TraceRecorder,
+                                     read_trace)
+from mpesa_sdk.daraja.stk import StkPushPaymentRequest
+from mpesa_sdk.retry import RetryPolicy
+from mpesa_sdk.transport import InMemoryTransport
+
+# test imports
+
+
+def record_trace(path, successful_oauth_response, successful_stk_push_response, successful_b2c_response,
+                 successful_stk_push_callback):
+    transport = InMemoryTransport()
+    transport.register("GET", os.getenv("OAUTH_URL"), json=successful_oauth_response)
+    transport.register("POST", os.getenv("STK_PUSH_INITIATION_URL"), json=successful_stk_push_response)
+    transport.register("POST", os.getenv("B2C_URL"), json=successful_b2c_response)
+
+    with TraceRecorder(path, Redactor(salt="secret")) as recorder:
+        recording = recorder.transport(transport)
+        token_cache = AccessTokenCache("key", "secret", transport=recording)
+        stk = StkPushPaymentRequest(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"), os.getenv("PASSKEY"),
+                                    os.getenv("SHORTCODE"), transport=recording, token_cache=token_cache)
+        b2c = B2CPaymentRequest(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"), os.getenv("SHORTCODE"),
+                                transport=recording, token_cache=token_cache)
+        for index in range(3):
+            stk.execute(f"ref-{index}", "10", "254712345678", "Airtime")
+        b2c.execute("100", CommandID.SALARY_PAYMENT, "test-api", "", "600000", "254712345679", "Salary")
+
+        receiver = CallbackReceiver(lambda callback: None, on_receive=recorder.record_callback)
+        assert receiver.submit("/stk-push-callback-url", json.dumps(successful_stk_push_callback).encode())
+        receiver.stop()
+    return recorder
+
+
+def test_traces_are_recorded_redacted(load_env_vars, successful_oauth_response, successful_stk_push_response,
+                                      successful_b2c_response, successful_stk_push_callback, tmp_path):
+    path = str(tmp_path / "trace.jsonl.gz")
+    recorder = record_trace(path, successful_oauth_response, successful_stk_push_response, successful_b2c_response,
+                            successful_stk_push_callback)
+    events = list(read_trace(path))
+    assert recorder.recorded == len(events) == 6
+    assert [(event.kind, event.endpoint) for event in events] == [
+        (REQUEST, "OAUTH_URL"), (REQUEST, "STK_PUSH_INITIATION_URL"), (REQUEST, "STK_PUSH_INITIATION_URL"),
+        (REQUEST, "STK_PUSH_INITIATION_URL"), (REQUEST, "B2C_URL"), (CALLBACK, "STK_PUSH_CALLBACK_URL")]
+    assert all(event.at >= 0 and event.latency >= 0 for event in events)
+
+    raw = gzip.open(path, "rt").read()
+    for secret in ("254712345678", "254712345679", "254708374149", successful_oauth_response["access_token"],
+                   "Bearer"):
+        assert secret not in raw
+    token, push, _, _, payout, callback = events
+    assert token.response["access_token"] == REDACTED
+    assert push.request["Password"] == REDACTED and push.request["PartyA"] == push.request["PhoneNumber"]
+    assert push.request["PhoneNumber"].startswith("2547") and push.request["PhoneNumber"] != payout.request["PartyB"]
+    assert payout.request["SecurityCredential"] == REDACTED and payout.request["Amount"] == "100"
+    assert push.response == successful_stk_push_response and push.status == 200
+    phone = callback.request["Body"]["stkCallback"]["CallbackMetadata"]["Item"][3]["Value"]
+    assert isinstance(phone, int) and str(phone).startswith("2547")
+
+    redactor = Redactor()
+    assert redactor({"Key": "ReceiverPartyPublicName", "Value": "254708374149 - John Doe"})["Value"] == REDACTED
+    assert redactor.msisdn("254708374149") == redactor.msisdn("254708374149") != Redactor(salt="salt").msisdn(
+        "254708374149")
+    # pseudonyms differ between redactors unless they share a salt.
+    assert Redactor().msisdn("254708374149") != Redactor().msisdn("254708374149")
+    assert Redactor(salt=b"salt").msisdn("254708374149") == Redactor(salt="salt").msisdn("254708374149")
+    assert redactor([True, 1, "0712345678"]) == [True, 1, "0712345678"]
+
+
+def test_traces_are_replayed(load_env_vars, successful_oauth_response, successful_stk_push_response,
+                             successful_b2c_response, successful_stk_push_callback, tmp_path):
+    path = str(tmp_path / "trace.jsonl.gz")
+    record_trace(path, successful_oauth_response, successful_stk_push_response, successful_b2c_response,
+                 successful_stk_push_callback)
+
+    runner = ReplayRunner(speed=None, concurrency=2, trace_allocations=True,
+                          builder_options={"retry": RetryPolicy(backoff=0)})
+    report = runner.run(path)
+    assert (report.events, report.errors) == (5, 0)
+    assert report.throughput > 0 and report.peak_memory > 0 and report.retained_blocks is not None
+    summary = report.as_dict()
+    assert summary["latency"]["STK_PUSH_INITIATION_URL"]["count"] == 3
+    assert set(summary["latency"]) == {"B2C_URL", "STK_PUSH_CALLBACK_URL", "STK_PUSH_INITIATION_URL"}
+    assert summary["latency"]["B2C_URL"]["p99"] == summary["latency"]["B2C_URL"]["max"]
+    json.dumps(summary)
+    # the token is fetched once through the stand-in, not replayed from the trace.
+    assert runner.builder("B2C_URL").token_cache is runner.token_cache
+
+
+def test_replays_keep_the_recorded_pace(load_env_vars, successful_b2c_response):
+    payload = {"Amount": "100"}
+    events = [TraceEvent(at, REQUEST, "B2C_URL", "POST", status=200, latency=0.1, request=payload,
+                         response=successful_b2c_response) for at in (10.0, 10.2, 10.4)]
+    events.append(TraceEvent(10.4, REQUEST, "UNKNOWN_URL", "POST"))
+    events.append(TraceEvent(10.4, CALLBACK, "B2C_CALLBACK_URL", request={"Result": None}))
+
+    report = ReplayRunner(speed=4).run(events)
+    assert (report.events, report.errors) == (4, 1)
+    assert report.elapsed >= 0.1
+    assert min(report.latencies["B2C_URL"]) >= 0.025
+    assert report.peak_memory is None
+
+    assert ReplayRunner(speed=None).run([]).throughput == 0.0
@@ -0,0 +1,75 @@
+# standard imports
+import logging
+
+# local imports
+from mpesa_sdk.daraja.b2c import B2CPaymentResponseParser
+from mpesa_sdk.daraja.enums import ErrorCategory
+from mpesa_sdk.daraja.responses import ResponseShape, extract_response_fields, snake_case_payload
+from mpesa_sdk.daraja.stk import StkPushPaymentResponseParser, StkPushResponseParser
+
+# test imports
+from tests.helpers.http import build_response
+
+
+def test_extract_response_fields_from_accepted_shape(successful_b2c_response):
+    fields = extract_response_fields(successful_b2c_response, ResponseShape(), 200)
+    assert fields.code == 0
+    assert fields.description == successful_b2c_response["ResponseDescription"]
+    assert fields.request_id == successful_b2c_response["OriginatorConversationID"]
+    assert fields.error is None
+    assert fields.success
+
+    # string codes, as returned by the live API, are accepted as well.
+    fields = extract_response_fields({**successful_b2c_response, "ResponseCode": "0"}, ResponseShape(), 200)
+    assert fields.success
+
+
+def test_extract_response_fields_from_error_shape(failed_b2c_response):
+    fields = extract_response_fields(failed_b2c_response, ResponseShape(), 401)
+    assert fields.code == "401.002.01"
+    assert fields.description == failed_b2c_response["errorMessage"]
+    assert fields.request_id == failed_b2c_response["requestId"]
+    assert fields.error.category is ErrorCategory.AUTHENTICATION
+    assert not fields.success
+
+
+def test_extract_response_fields_in_order_of_precedence(successful_stk_push_status_query, failed_stk_push_status_query):
+    fields = extract_response_fields(successful_stk_push_status_query, StkPushResponseParser.SHAPE, 200)
+    assert fields.description == successful_stk_push_status_query["ResultDesc"]
+    assert fields.request_id == successful_stk_push_status_query["MerchantRequestID"]
+    assert fields.success
+
+    fields = extract_response_fields(failed_stk_push_status_query, StkPushResponseParser.SHAPE, 200)
+    assert fields.code == failed_stk_push_status_query["ResultCode"]
+    assert fields.description == failed_stk_push_status_query["ResultDesc"]
+    assert not fields.success
+
+
+def test_extract_response_fields_from_empty_body():
+    fields = extract_response_fields(None, ResponseShape(), 200)
+    assert fields == extract_response_fields([], ResponseShape(), 200)
+    assert fields.code is None and fields.error is None
+    assert not fields.success
+
+    fields = extract_response_fields(None, ResponseShape(), 503)
+    assert fields.error.category is ErrorCategory.SERVER_ERROR
+
+
+def test_snake_case_payload(failed_b2c_response):
+    error = extract_response_fields(failed_b2c_response, ResponseShape(), 401).error
+    assert snake_case_payload(failed_b2c_response, error) == {
+        "request_id": failed_b2c_response["requestId"],
+        "error_code": failed_b2c_response["errorCode"],
+        "error_message": failed_b2c_response["errorMessage"],
+        "error": error.as_dict(),
+    }
+    assert snake_case_payload(None) == {}
+
+
+def test_response_parsers_handle_empty_body(caplog):
+    caplog.set_level(logging.ERROR)
+    assert B2CPaymentResponseParser(build_response(None, "utf-8", "OK", 200)).parse() == {}
+    assert "B2C payment request: None" in caplog.text
+
+    parsed_response = StkPushPaymentResponseParser(build_response(None, "utf-8", "Bad Gateway", 502)).parse()
+    assert parsed_response["error"]["category"] == ErrorCategory.SERVER_ERROR.value
@@ -0,0 +1,125 @@
+# standard imports
+import asyncio
+import os
+
+# external imports
+import pytest
+
+# local imports
+from mpesa_sdk.daraja.auth import AccessTokenCache
+from mpesa_sdk.daraja.b2c import B2CPaymentRequest
+from mpesa_sdk.daraja.enums import CommandID, IdentifierType
+from mpesa_sdk.daraja.transaction_status import TransactionStatusQueryRequest
+from mpesa_sdk.retry import RetryPolicy
+from mpesa_sdk.transport import AsyncTransport, InMemoryTransport, TransportResponse, encode_body
+
+# test imports
+
+
+class ScriptedTransport(InMemoryTransport):
+    """Answers POST requests with the scripted responses in order, raising any scripted exceptions."""
+
+    def __init__(self, *script):
+        super().__init__()
+        self.script = list(script)
+        self.posts = 0
+
+    def request(self, method, url, headers=None, json=None, data=None, timeout=2):
+        if method != "POST":
+            return super().request(method, url, headers=headers, json=json, data=data, timeout=timeout)
+        self.requests.append({"method": method, "url": url, "headers": headers, "json": json, "data": data})
+        self.posts += 1
+        step = self.script.pop(0)
+        if isinstance(step, BaseException):
+            raise step
+        status_code, body = step
+        return TransportResponse(status_code, content=encode_body(body) or b"")
+
+
+class AsyncScriptedTransport(AsyncTransport):
+    def __init__(self, transport):
+        self.transport = transport
+
+    async def request(self, method, url, headers=None, json=None, data=None, timeout=2):
+        return self.transport.request(method, url, headers=headers, json=json, data=data, timeout=timeout)
+
+
+THROTTLED = (500, {"requestId": "1", "errorCode": "500.003.02", "errorMessage": "System is busy"})
+INVALID_TOKEN = (401, {"requestId": "1", "errorCode": "401.002.01", "errorMessage": "Invalid Access Token"})
+INVALID_REQUEST = (400, {"requestId": "1", "errorCode": "400.002.02", "errorMessage": "Bad Request"})
+INTERNAL_ERROR = (500, {"requestId": "1", "errorCode": "500.002.1001", "errorMessage": "Internal Server Error"})
+GATEWAY_TIMEOUT = (504, None)
+
+
+def b2c_request(transport, successful_oauth_response, **kwargs):
+    transport.register("GET", os.getenv("OAUTH_URL"), json=successful_oauth_response)
+    return B2CPaymentRequest(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"), os.getenv("SHORTCODE"),
+                             transport=transport, retry=RetryPolicy(attempts=3, backoff=0), **kwargs)
+
+
+def execute_b2c(request):
+    return request.execute("100", CommandID.BUSINESS_PAYMENT, "test-api", "", "600000", "254712345678", "Remarks")
+
+
+def test_retryable_errors_are_retried(load_env_vars, successful_b2c_response, successful_oauth_response):
+    transport = ScriptedTransport(THROTTLED, THROTTLED, (200, successful_b2c_response))
+    response = execute_b2c(b2c_request(transport, successful_oauth_response))
+    assert (response.status_code, transport.posts) == (200, 3)
+
+    transport = ScriptedTransport(THROTTLED, THROTTLED, THROTTLED, (200, successful_b2c_response))
+    response = execute_b2c(b2c_request(transport, successful_oauth_response))
+    assert (response.status_code, transport.posts) == (500, 3)
+
+
+def test_terminal_errors_are_not_retried(load_env_vars, successful_b2c_response, successful_oauth_response):
+    transport = ScriptedTransport(INVALID_REQUEST)
+    response = execute_b2c(b2c_request(transport, successful_oauth_response))
+    assert (response.status_code, transport.posts) == (400, 1)
+
+    transport = ScriptedTransport(GATEWAY_TIMEOUT)
+    assert execute_b2c(b2c_request(transport, successful_oauth_response)).status_code == 504
+    assert transport.posts == 1
+
+    # an internal error does not tell whether the payment was made, so it is not sent again.
+    transport = ScriptedTransport(INTERNAL_ERROR, (200, successful_b2c_response))
+    assert execute_b2c(b2c_request(transport, successful_oauth_response)).status_code == 500
+    assert transport.posts == 1
+
+    transport = ScriptedTransport(ConnectionError("reset"))
+    with pytest.raises(ConnectionError):
+        execute_b2c(b2c_request(transport, successful_oauth_response))
+    assert transport.posts == 1
+
+
+def test_rejected_token_is_refreshed(load_env_vars, successful_b2c_response, successful_oauth_response):
+    transport = ScriptedTransport(INVALID_TOKEN, (200, successful_b2c_response))
+    token_cache = AccessTokenCache(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"), transport=transport)
+    request = b2c_request(transport, successful_oauth_response, token_cache=token_cache)
+    assert execute_b2c(request).status_code == 200
+    assert [item["method"] for item in transport.requests] == ["GET", "POST", "GET", "POST"]
+
+
+def test_idempotent_requests_retry_server_and_transport_errors(load_env_vars, successful_oauth_response,
+                                                              successful_transaction_status_query_response):
+    transport = ScriptedTransport(GATEWAY_TIMEOUT, TimeoutError("timed out"), INTERNAL_ERROR,
+                                  (200, successful_transaction_status_query_response))
+    transport.register("GET", os.getenv("OAUTH_URL"), json=successful_oauth_response)
+    request = TransactionStatusQueryRequest(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"),
+                                            os.getenv("SHORTCODE"), transport=transport,
+                                            async_transport=AsyncScriptedTransport(transport),
+                                            retry=RetryPolicy(attempts=4, backoff=0))
+    args = (IdentifierType.MSISDN, "test-api", "", "254712345678", "Remarks", "QWEDF4MS007")
+    assert request.execute(*args).status_code == 200
+    assert transport.posts == 4
+
+    transport.script = [GATEWAY_TIMEOUT, (200, successful_transaction_status_query_response)]
+    assert asyncio.run(request.execute_async(*args)).status_code == 200
+    assert transport.posts == 6
+
+
+def test_retry_policy_backoff():
+    policy = RetryPolicy(backoff=1, multiplier=2, max_backoff=3, jitter=0)
+    assert [policy.delay(retry) for retry in (1, 2, 3)] == [1, 2, 3]
+    assert 0.9 <= RetryPolicy(backoff=1, jitter=0.1).delay(1) <= 1.1
+    with pytest.raises(ValueError):
+        RetryPolicy(attempts=0)
@@ -1,6 +1,7 @@
 # standard imports
 import logging
 import os
+from decimal import Decimal
 
 # external imports
 import pytest
@@ -18,8 +19,8 @@ from tests.helpers.http import build_response
 
 
 @pytest.mark.parametrize("amount, initiator, occasion, receiver_party, remarks, transaction_id", [
-    (25.0, "test-api", "Erroneous transfer", "123456", "Test remarks", "QWEDF4MS007"),
-    (25.0, "test-api", "Redemption API error", "654321", "Test remarks", "QWEDF4MS789")
+    (25, "test-api", "Erroneous transfer", "123456", "Test remarks", "QWEDF4MS007"),
+    (Decimal("25.00"), "test-api", "Redemption API error", "654321", "Test remarks", "QWEDF4MS789")
 ])
 def test_reversal_request(amount, initiator, load_env_vars, occasion, receiver_party, remarks,
                           successful_oauth_response, successful_reversal_response, transaction_id):
@@ -33,7 +34,7 @@ def test_reversal_request(amount, initiator, load_env_vars, occasion, receiver_p
         "SecurityCredential": os.getenv("SECURITY_CREDENTIAL", "your-security-credential"),
         "CommandID": CommandID.TRANSACTION_REVERSAL.value,
         "TransactionID": transaction_id,
-        "Amount": amount,
+        "Amount": "25",
         "ReceiverParty": receiver_party,
         "ReceiverIdentifierType": "11",
         "ResultURL": os.getenv("REVERSAL_CALLBACK_URL"),
@@ -65,7 +66,9 @@ def test_reversal_response_parser(caplog, failed_reversal_response, successful_r
     error_message = parsed_response.get("error_message")
     request_id = parsed_response.get("request_id")
     assert f"Reversal request: {request_id}, initiation failed with description: {error_message}." in caplog.text
-    assert parsed_response == {camel_to_snake(key): value for key, value in failed_reversal_response.items()}
+    assert parsed_response == {
+        **{camel_to_snake(key): value for key, value in failed_reversal_response.items()},
+        "error": {"code": "400.002.02", "category": "invalid_request", "retryable": False}}
 
     caplog.set_level(logging.INFO)
     successful_response = build_response(successful_reversal_response, "utf-8", "OK", 200)
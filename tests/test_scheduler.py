@@ -0,0 +1,148 @@
+# standard imports
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# external imports
+import pytest
+
+# local imports
+from mpesa_sdk.daraja.auth import AccessTokenCache
+from mpesa_sdk.daraja.b2c import B2CPaymentRequest
+from mpesa_sdk.daraja.enums import CommandID, RequestPriority
+from mpesa_sdk.daraja.stk import StkPushPaymentRequest
+from mpesa_sdk.scheduler import RequestScheduler
+from mpesa_sdk.transport import InMemoryTransport
+
+# test imports
+
+
+class ConcurrencyTransport(InMemoryTransport):
+    """Answers POST requests after a delay and records the most requests it served at once."""
+
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+
+    def request(self, method, url, headers=None, json=None, data=None, timeout=2):
+        if method == "POST":
+            with self.lock:
+                self.in_flight += 1
+                self.peak = max(self.peak, self.in_flight)
+            time.sleep(self.delay)
+            with self.lock:
+                self.in_flight -= 1
+        return super().request(method, url, headers=headers, json=json, data=data, timeout=timeout)
+
+
+async def served_order(scheduler, waiters):
+    """Queues the waiters behind a held slot and returns the order they are served in."""
+    order = []
+
+    async def wait(name, priority, tenant):
+        async with scheduler.slot_async(priority, tenant):
+            order.append(name)
+
+    await scheduler.acquire_async(RequestPriority.BULK)
+    tasks = [asyncio.ensure_future(wait(*waiter)) for waiter in waiters]
+    await asyncio.sleep(0)
+    scheduler.release(RequestPriority.BULK)
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_urgent_classes_are_served_first():
+    scheduler = RequestScheduler(concurrency=1)
+    waiters = [("salary-1", RequestPriority.BULK, "600000"), ("salary-2", RequestPriority.BULK, "600000"),
+               ("status", RequestPriority.STATUS_QUERY, "600000"), ("reversal", RequestPriority.REVERSAL, "600000"),
+               ("stk", RequestPriority.INTERACTIVE, "600000")]
+    assert asyncio.run(served_order(scheduler, waiters)) == ["stk", "reversal", "status", "salary-1", "salary-2"]
+    assert scheduler.active == 0
+
+
+def test_tenants_are_served_by_weight():
+    scheduler = RequestScheduler(concurrency=1, tenant_weights={"600000": 2})
+    waiters = [(f"a{index}", RequestPriority.BULK, "600000") for index in range(6)]
+    waiters += [(f"b{index}", RequestPriority.BULK, "600001") for index in range(3)]
+    order = asyncio.run(served_order(scheduler, waiters))
+    assert order == ["a0", "a1", "b0", "a2", "a3", "b1", "a4", "a5", "b2"]
+
+
+def test_class_limits():
+    scheduler = RequestScheduler(concurrency=3, class_limits={RequestPriority.BULK: 1})
+    assert scheduler.acquire(RequestPriority.BULK)
+    assert not scheduler.acquire(RequestPriority.BULK, timeout=0.01)
+    # the other classes may use the slots bulk traffic cannot.
+    assert scheduler.acquire(RequestPriority.INTERACTIVE, timeout=0.01)
+    assert scheduler.acquire(RequestPriority.REVERSAL, timeout=0.01)
+    assert not scheduler.acquire(RequestPriority.INTERACTIVE, timeout=0.01)
+    assert scheduler.queued() == 0
+    scheduler.release(RequestPriority.BULK)
+    assert scheduler.acquire(RequestPriority.BULK, timeout=0.01)
+    assert scheduler.active == 3
+
+    with pytest.raises(ValueError):
+        RequestScheduler(concurrency=0)
+
+
+def test_try_acquire_takes_only_a_free_slot():
+    scheduler = RequestScheduler(concurrency=2, class_limits={RequestPriority.BULK: 1})
+    assert scheduler.try_acquire(RequestPriority.BULK)
+    assert not scheduler.try_acquire(RequestPriority.BULK)
+    assert scheduler.try_acquire(RequestPriority.STATUS_QUERY)
+    assert not scheduler.try_acquire(RequestPriority.INTERACTIVE)
+    scheduler.release(RequestPriority.STATUS_QUERY)
+    scheduler.release(RequestPriority.BULK)
+    assert scheduler.active == 0
+
+
+def test_cancelled_async_waiter_gives_up_its_place():
+    scheduler = RequestScheduler(concurrency=1)
+
+    async def run():
+        await scheduler.acquire_async(RequestPriority.BULK)
+        waiter = asyncio.ensure_future(scheduler.acquire_async(RequestPriority.INTERACTIVE))
+        await asyncio.sleep(0)
+        assert scheduler.queued(RequestPriority.INTERACTIVE) == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert scheduler.queued() == 0
+        scheduler.release(RequestPriority.BULK)
+        return await scheduler.run_async(lambda: asyncio.sleep(0, "sent"), RequestPriority.BULK)
+
+    assert asyncio.run(run()) == "sent"
+    assert scheduler.active == 0
+
+
+def test_builders_are_scheduled_in_a_thread_pool(load_env_vars, successful_oauth_response, successful_b2c_response,
+                                                 successful_stk_push_response):
+    transport = ConcurrencyTransport(delay=0.02)
+    transport.register("GET", os.getenv("OAUTH_URL"), json=successful_oauth_response)
+    transport.register("POST", os.getenv("B2C_URL"), json=successful_b2c_response)
+    transport.register("POST", os.getenv("STK_PUSH_INITIATION_URL"), json=successful_stk_push_response)
+    scheduler = RequestScheduler(concurrency=2, class_limits={RequestPriority.BULK: 1})
+    token_cache = AccessTokenCache("key", "secret", transport=transport)
+    b2c = B2CPaymentRequest(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"), os.getenv("SHORTCODE"),
+                            transport=transport, token_cache=token_cache, scheduler=scheduler)
+    stk = StkPushPaymentRequest(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"), os.getenv("PASSKEY"),
+                                os.getenv("SHORTCODE"), transport=transport, token_cache=token_cache,
+                                scheduler=scheduler)
+    assert (b2c.priority, stk.priority, stk.tenant) == (RequestPriority.BULK, RequestPriority.INTERACTIVE,
+                                                        os.getenv("SHORTCODE"))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        payouts = [executor.submit(b2c.execute, "100", CommandID.SALARY_PAYMENT, "test-api", "", "600000",
+                                   "254712345678", "Salary") for _ in range(6)]
+        pushes = [executor.submit(stk.execute, f"ref-{index}", "10", "254712345678", "Airtime")
+                  for index in range(4)]
+        responses = [future.result() for future in payouts + pushes]
+
+    assert all(response.status_code == 200 for response in responses)
+    assert transport.peak <= 2
+    assert scheduler.active == 0
@@ -0,0 +1,230 @@
+# standard imports
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# external imports
+import pytest
+
+# local imports
+from mpesa_sdk.daraja.auth import AccessTokenCache
+from mpesa_sdk.daraja.stk import StkPushPaymentRequest
+from mpesa_sdk.singleflight import SingleFlight
+from mpesa_sdk.transport import AsyncTransport, InMemoryTransport
+
+# test imports
+
+
+class SlowTransport(InMemoryTransport):
+    """Answers every request after a delay, so that concurrent requests overlap."""
+
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    def request(self, method, url, headers=None, json=None, data=None, timeout=2):
+        time.sleep(self.delay)
+        return super().request(method, url, headers=headers, json=json, data=data, timeout=timeout)
+
+
+class AsyncSlowTransport(AsyncTransport):
+    def __init__(self, transport):
+        self.transport = transport
+
+    async def request(self, method, url, headers=None, json=None, data=None, timeout=2):
+        await asyncio.sleep(self.transport.delay)
+        return self.transport.responses[(method, url)]
+
+
+def stk_push_request(transport, successful_oauth_response, response, status_code=200, **kwargs):
+    transport.register("GET", os.getenv("OAUTH_URL"), json=successful_oauth_response)
+    transport.register("POST", os.getenv("STK_PUSH_INITIATION_URL"), json=response, status_code=status_code)
+    return StkPushPaymentRequest(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"), os.getenv("PASSKEY"),
+                                 os.getenv("SHORTCODE"), transport=transport,
+                                 token_cache=AccessTokenCache("key", "secret", transport=transport), **kwargs)
+
+
+def posts(transport):
+    return [request for request in transport.requests if request["method"] == "POST"]
+
+
+def test_concurrent_calls_share_one_operation():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def operation():
+        calls.append(1)
+        release.wait(5)
+        return {"checkout_request_id": "ws_CO_1"}
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(flight.do, "key", operation) for _ in range(4)]
+        while not flight.in_flight("key"):
+            pass
+        time.sleep(0.05)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert not flight.in_flight("key")
+    # a call made after the shared call finished runs the operation again.
+    flight.do("key", operation)
+    assert len(calls) == 2
+
+
+def test_concurrent_calls_share_the_exception():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def operation():
+        started.set()
+        release.wait(5)
+        raise OSError("connection reset")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(flight.do, "key", operation)
+        started.wait(5)
+        follower = executor.submit(flight.do, "key", lambda: "unused")
+        # give the follower time to join the in-flight call before it fails.
+        time.sleep(0.05)
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(OSError):
+                future.result()
+
+
+def test_async_calls_share_one_operation():
+    flight = SingleFlight()
+    calls = []
+
+    async def operation(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key
+
+    async def run():
+        return await asyncio.gather(*(flight.do_async(key, lambda key=key: operation(key))
+                                      for key in ("key",) * 5 + ("other",)))
+
+    assert asyncio.run(run()) == ["key"] * 5 + ["other"]
+    assert calls == ["key", "other"]
+    assert not flight.in_flight("key")
+
+
+def test_async_cancelled_waiter_does_not_cancel_shared_call():
+    flight = SingleFlight()
+
+    async def operation():
+        await asyncio.sleep(0.02)
+        return "result"
+
+    async def run():
+        leader = asyncio.ensure_future(flight.do_async("key", operation))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do_async("key", operation))
+        await asyncio.sleep(0)
+        follower.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        return await leader
+
+    assert asyncio.run(run()) == "result"
+
+
+def test_async_calls_share_the_exception():
+    flight = SingleFlight()
+
+    async def operation():
+        await asyncio.sleep(0.01)
+        raise OSError("connection reset")
+
+    async def run():
+        return await asyncio.gather(flight.do_async("key", operation), flight.do_async("key", operation),
+                                    return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, OSError) for result in results)
+
+
+def test_completed_results_are_retained_for_the_ttl():
+    flight = SingleFlight(ttl=60)
+    calls = []
+
+    def operation():
+        calls.append(1)
+        return len(calls)
+
+    assert flight.do("key", operation) == 1
+    assert flight.do("key", operation) == 1
+    flight.forget("key")
+    assert flight.do("key", operation) == 2
+    # results rejected by the retain predicate are not shared with later callers.
+    assert flight.do("other", operation, retain=lambda result: False) == 3
+    assert flight.do("other", operation) == 4
+    assert asyncio.run(flight.do_async("other", asyncio.sleep)) == 4
+    flight.forget()
+    assert asyncio.run(flight.do_async("other", lambda: asyncio.sleep(0, "async"))) == "async"
+
+    flight.ttl = 0.01
+    flight.do("expiring", operation)
+    time.sleep(0.02)
+    assert flight.do("expiring", operation) == 6
+
+
+def test_identical_stk_pushes_are_coalesced(load_env_vars, successful_oauth_response, successful_stk_push_response):
+    transport = SlowTransport(delay=0.05)
+    request = stk_push_request(transport, successful_oauth_response, successful_stk_push_response,
+                               single_flight=SingleFlight(ttl=1))
+    push = ("some-ref", "100", "254712345678", "Airtime purchase")
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        responses = list(executor.map(lambda _: request.execute(*push), range(4)))
+    assert len(posts(transport)) == 1
+    assert all(response is responses[0] for response in responses)
+
+    # an upstream retry shortly after the push was accepted gets the same response.
+    assert request.execute(*push) is responses[0]
+    assert len(posts(transport)) == 1
+    # a push for a different amount is sent.
+    request.execute("some-ref", "200", "254712345678", "Airtime purchase")
+    assert len(posts(transport)) == 2
+
+
+def test_coalescing_with_a_custom_key(load_env_vars, successful_oauth_response, successful_stk_push_response):
+    transport = SlowTransport(delay=0)
+    request = stk_push_request(transport, successful_oauth_response, successful_stk_push_response,
+                               single_flight=SingleFlight(ttl=1),
+                               coalesce_key=lambda payload: (payload["PhoneNumber"], payload["Amount"]))
+    request.execute("some-ref", "100", "254712345678", "Airtime purchase")
+    request.execute("other-ref", "100", "254712345678", "Data bundle purchase")
+    assert len(posts(transport)) == 1
+
+
+def test_rejected_requests_are_not_retained(load_env_vars, successful_oauth_response, failed_stk_push_response):
+    transport = SlowTransport(delay=0)
+    request = stk_push_request(transport, successful_oauth_response, failed_stk_push_response, status_code=500,
+                               single_flight=SingleFlight(ttl=1))
+    push = ("some-ref", "100", "254712345678", "Airtime purchase")
+    request.execute(*push)
+    request.execute(*push)
+    assert len(posts(transport)) == 2
+
+
+def test_identical_async_stk_pushes_are_coalesced(load_env_vars, successful_oauth_response,
+                                                  successful_stk_push_response):
+    transport = SlowTransport(delay=0.02)
+    request = stk_push_request(transport, successful_oauth_response, successful_stk_push_response,
+                               async_transport=AsyncSlowTransport(transport), single_flight=SingleFlight())
+    request.token_cache = AccessTokenCache("key", "secret", async_transport=request.async_transport)
+    push = ("some-ref", "100", "254712345678", "Airtime purchase")
+
+    async def run():
+        return await asyncio.gather(*(request.execute_async(*push) for _ in range(5)))
+
+    responses = asyncio.run(run())
+    assert all(response is responses[0] for response in responses)
+    assert responses[0].json()["CheckoutRequestID"] == "ws_CO_191220191020363925"
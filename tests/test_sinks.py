@@ -0,0 +1,128 @@
+# standard imports
+import time
+
+# external imports
+import pytest
+
+# local imports
+from mpesa_sdk.daraja.sinks import (CsvResultSink, JsonlResultSink, ParquetResultSink, PayoutResult, SQLiteResultSink,
+                                    result_sink)
+
+# test imports
+
+
+def results(start, stop, shard=0):
+    return [PayoutResult(line_number, shard, 200, {"ResponseCode": "0", "ConversationID": f"AG_{line_number}"})
+            if line_number % 3 else PayoutResult(line_number, shard, error="Connection reset\nby peer")
+            for line_number in range(start, stop)]
+
+
+@pytest.mark.parametrize("name", ["results.jsonl", "results.csv", "results.db", "results"])
+def test_sinks_round_trip_and_resume(name, tmp_path):
+    if name == "results":
+        pytest.importorskip("pyarrow")
+    path = str(tmp_path / name)
+    with result_sink(path, batch_size=4) as sink:
+        sink.extend(results(1, 11))
+        assert sink.written == 8
+    assert sink.written == 10
+    assert list(sink.read()) == results(1, 11)
+
+    # a resumed run appends to the results of the previous one, and skips the transport errors on lines 3, 6 and 9
+    # since their payouts may have been made.
+    with result_sink(path, batch_size=4) as resumed:
+        assert resumed.completed() == set(range(1, 11))
+        resumed.extend(results(11, 15, shard=1))
+    assert list(resumed.read()) == results(1, 11) + results(11, 15, shard=1)
+    assert not results(3, 4)[0].success and results(4, 5)[0].success
+
+
+def test_results_are_buffered_until_the_batch_is_full(tmp_path):
+    path = tmp_path / "results.jsonl"
+    sink = JsonlResultSink(str(path), batch_size=3, flush_interval=60)
+    sink.extend(results(1, 3))
+    assert not path.exists() and list(sink.read()) == []
+    sink.write(results(3, 4)[0])
+    assert len(path.read_text().splitlines()) == 3
+
+    sink.flush_interval = 0.05
+    sink.write(results(4, 5)[0])
+    time.sleep(0.06)
+    sink.write(results(5, 6)[0])
+    assert len(path.read_text().splitlines()) == 5
+    sink.close()
+
+    with pytest.raises(ValueError):
+        JsonlResultSink(str(path), batch_size=0)
+
+
+@pytest.mark.parametrize("sink_class, name", [(JsonlResultSink, "results.jsonl"), (CsvResultSink, "results.csv")])
+@pytest.mark.parametrize("cut", [12, -5])
+def test_incomplete_results_left_by_a_crash_are_discarded(sink_class, name, cut, tmp_path):
+    path = tmp_path / name
+    with sink_class(str(path)) as sink:
+        sink.extend(results(1, 5))
+    complete = path.read_bytes()
+    # the last result is cut short before, or within, its response.
+    path.write_bytes(complete + complete.splitlines(keepends=True)[-1][:cut])
+
+    sink = sink_class(str(path))
+    assert sink.completed() == {1, 2, 3, 4}
+    sink.write(results(5, 6)[0])
+    sink.close()
+    assert path.read_bytes().startswith(complete)
+    assert list(sink.read()) == results(1, 6)
+
+
+@pytest.mark.parametrize("name", ["results.jsonl", "results.db"])
+def test_definitely_rejected_payouts_are_resent_on_resume(name, tmp_path):
+    rejected = PayoutResult(1, 0, 400, {"errorCode": "400.002.02", "errorMessage": "Bad Request - Invalid Amount"})
+    throttled = PayoutResult(2, 0, 500, {"errorCode": "500.003.02", "errorMessage": "System is busy"})
+    internal_error = PayoutResult(3, 0, 500, {"errorCode": "500.002.1001", "errorMessage": "Internal Server Error"})
+    gateway_timeout = PayoutResult(4, 0, 504)
+    unreachable = PayoutResult(5, 0, error="Connection reset by peer")
+    accepted = PayoutResult(6, 0, 200, {"ResponseCode": "0"})
+    assert [result.resendable for result in (rejected, throttled, internal_error, gateway_timeout, unreachable,
+                                              accepted)] == [True, True, False, False, False, False]
+
+    with result_sink(str(tmp_path / name)) as sink:
+        sink.extend([rejected, throttled, internal_error, gateway_timeout, unreachable, accepted])
+    assert sink.attempted() == {1, 2, 3, 4, 5, 6}
+    assert sink.completed() == {3, 4, 5, 6}
+    assert sink.succeeded() == {6}
+
+    # the latest result of a payout that was sent again decides.
+    with result_sink(str(tmp_path / name)) as sink:
+        sink.write(PayoutResult(1, 1, 200, {"ResponseCode": "0"}))
+    assert sink.completed() == {1, 3, 4, 5, 6}
+    assert sink.succeeded() == {1, 6}
+
+
+def test_sqlite_sink_replaces_repeated_results(tmp_path):
+    with SQLiteResultSink(str(tmp_path / "results.db"), table="run_1") as sink:
+        sink.extend(results(1, 4))
+        sink.write(PayoutResult(3, 1, 200, {"ResponseCode": "0"}))
+    assert [result.shard for result in sink.read()] == [0, 0, 1]
+    assert sink.completed() == {1, 2, 3}
+
+    with pytest.raises(ValueError):
+        SQLiteResultSink(str(tmp_path / "results.db"), table="run 1")
+
+
+def test_parquet_sink_skips_files_left_open_by_a_crash(tmp_path):
+    pytest.importorskip("pyarrow")
+    sink = ParquetResultSink(str(tmp_path), batch_size=2)
+    sink.extend(results(1, 5))
+    assert list(sink.read()) == []
+
+    sink.close()
+    (tmp_path / "results-00001.parquet").write_bytes(b"PAR1")
+    assert sink.completed() == {1, 2, 3, 4}
+    sink.write(results(5, 6)[0])
+    sink.close()
+    assert [path.rsplit("/", 1)[1] for path in sink.paths] == [
+        "results-00000.parquet", "results-00001.parquet", "results-00002.parquet"]
+    assert list(sink.read()) == results(1, 6)
+
+    with pytest.raises(ValueError):
+        result_sink(str(tmp_path / "results.txt"))
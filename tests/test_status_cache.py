@@ -0,0 +1,225 @@
+# standard imports
+import asyncio
+import copy
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# external imports
+import pytest
+
+# local imports
+from mpesa_sdk.daraja.enums import IdentifierType
+from mpesa_sdk.daraja.status_cache import MemoryStatusStore, SQLiteStatusStore, TransactionStatusCache, is_final
+from mpesa_sdk.daraja.transaction_status import TransactionStatusCallbackParser, TransactionStatusQueryRequest
+from mpesa_sdk.transport import AsyncTransport, InMemoryTransport
+
+# test imports
+
+TRANSACTION_ID = "MBN31H462N"
+QUERY = (IdentifierType.ORGANIZATION_SHORT_CODE, "test-api", "", "600000", "Status check", TRANSACTION_ID)
+
+
+class AsyncInMemoryTransport(AsyncTransport):
+    def __init__(self, transport):
+        self.transport = transport
+
+    async def request(self, method, url, headers=None, json=None, data=None, timeout=2):
+        return self.transport.request(method, url, headers=headers, json=json, data=data, timeout=timeout)
+
+
+def status_request(transport, successful_oauth_response, response, status_code=200, **kwargs):
+    transport.register("GET", os.getenv("OAUTH_URL"), json=successful_oauth_response)
+    transport.register("POST", os.getenv("TRANSACTION_STATUS_URL"), json=response, status_code=status_code)
+    return TransactionStatusQueryRequest(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"),
+                                         os.getenv("SHORTCODE"), transport=transport, **kwargs)
+
+
+def posts(transport):
+    return [request for request in transport.requests if request["method"] == "POST"]
+
+
+def result_callback(successful_transaction_status_query_callback, response, status="Completed"):
+    callback = copy.deepcopy(successful_transaction_status_query_callback)
+    callback["Result"]["ConversationID"] = response["ConversationID"]
+    callback["Result"]["OriginatorConversationID"] = response["OriginatorConversationID"]
+    for parameter in callback["Result"]["ResultParameters"]["ResultParameter"]:
+        if parameter["Key"] == "TransactionStatus":
+            parameter["Value"] = status
+    return TransactionStatusCallbackParser(callback)
+
+
+def test_is_final():
+    assert is_final({"success": True, "data": {"transaction_status": "Completed"}})
+    assert not is_final({"success": True, "data": {"transaction_status": "Pending"}})
+    assert not is_final({"success": True, "data": {}})
+    assert not is_final({"success": False, "error": {"code": "2001", "retryable": False}})
+    assert not is_final({"success": False, "error": {"code": "400.002.02", "retryable": False}})
+    assert not is_final({"success": False, "error": {"code": "26", "retryable": True}})
+
+
+@pytest.mark.parametrize("store", ["memory", "sqlite"])
+def test_store_expiry_and_eviction(store, tmp_path):
+    store = MemoryStatusStore(maxsize=2) if store == "memory" else SQLiteStatusStore(str(tmp_path / "status.db"),
+                                                                                     maxsize=2)
+    store.set(("600000", "A"), {"success": True}, ttl=60)
+    store.set(("600000", "B"), {"success": True}, ttl=60)
+    assert store.get(("600000", "A")) == {"success": True}
+    # B is now the least recently used result and makes room for C.
+    store.set(("600000", "C"), {"success": True}, ttl=60)
+    assert store.get(("600000", "B")) is None
+    assert len(store) == 2
+
+    store.set(("600000", "D"), {"success": True}, ttl=0)
+    assert store.get(("600000", "D")) is None
+
+    store.expect("AG_1", ("600000", "A"), ttl=60)
+    assert store.resolve("AG_1") == ("600000", "A")
+    assert store.resolve("AG_1") is None
+    store.expect("AG_2", ("600000", "A"), ttl=0)
+    assert store.resolve("AG_2") is None
+
+    store.hold("AG_3", {"success": True}, ttl=60)
+    assert store.claim("AG_3") == {"success": True}
+    assert store.claim("AG_3") is None
+    store.hold("AG_4", {"success": True}, ttl=0)
+    assert store.claim("AG_4") is None
+
+    store.delete(("600000", "A"))
+    assert store.get(("600000", "A")) is None
+    store.delete()
+    assert len(store) == 0
+    store.close()
+
+
+def test_sqlite_store_is_shared_between_connections(tmp_path):
+    path = str(tmp_path / "status.db")
+    writer, reader = SQLiteStatusStore(path), SQLiteStatusStore(path)
+    writer.expect("AG_1", ("600000", TRANSACTION_ID), ttl=60)
+    writer.set(("600000", TRANSACTION_ID), {"success": True, "data": {"amount": 300}}, ttl=60)
+    assert reader.get(("600000", TRANSACTION_ID)) == {"success": True, "data": {"amount": 300}}
+    assert reader.resolve("AG_1") == ("600000", TRANSACTION_ID)
+    writer.close()
+    reader.close()
+
+
+def test_fetch_result_serves_repeat_queries_from_cache(load_env_vars, successful_oauth_response,
+                                                       successful_transaction_status_query_callback,
+                                                       successful_transaction_status_query_response):
+    transport = InMemoryTransport()
+    cache = TransactionStatusCache()
+    request = status_request(transport, successful_oauth_response, successful_transaction_status_query_response,
+                             status_cache=cache)
+    callback = result_callback(successful_transaction_status_query_callback,
+                               successful_transaction_status_query_response)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(request.fetch_result, *QUERY, timeout=5) for _ in range(4)]
+        # the callback handler records the result once Daraja delivers it, possibly before the query is registered.
+        cache.record(callback)
+        results = [future.result() for future in futures]
+
+    assert len(posts(transport)) == 1
+    assert results[0]["data"]["transaction_status"] == "Completed"
+    assert all(result == results[0] for result in results)
+
+    assert request.fetch_result(*QUERY) == results[0]
+    assert len(posts(transport)) == 1
+
+    cache.invalidate(request.shortcode, TRANSACTION_ID)
+    assert cache.get(request.shortcode, TRANSACTION_ID) is None
+
+
+def test_fetch_result_does_not_cache_pending_or_rejected_queries(load_env_vars, successful_oauth_response,
+                                                                 failed_transaction_status_query_response,
+                                                                 successful_transaction_status_query_callback,
+                                                                 successful_transaction_status_query_response):
+    transport = InMemoryTransport()
+    cache = TransactionStatusCache(poll_interval=0.01)
+    request = status_request(transport, successful_oauth_response, successful_transaction_status_query_response,
+                             status_cache=cache)
+    assert request.fetch_result(*QUERY, timeout=0.02) is None
+    pending = result_callback(successful_transaction_status_query_callback,
+                              successful_transaction_status_query_response, status="Pending")
+    assert not cache.record(pending)
+    assert cache.get(request.shortcode, TRANSACTION_ID) is None
+
+    request = status_request(transport, successful_oauth_response, failed_transaction_status_query_response,
+                             status_code=400, status_cache=cache)
+    result = request.fetch_result(*QUERY)
+    assert result["error"]["code"] == "400.002.02"
+    assert cache.get(request.shortcode, TRANSACTION_ID) is None
+
+    with pytest.raises(ValueError):
+        status_request(transport, successful_oauth_response, None).fetch_result(*QUERY)
+
+
+def test_fetch_result_matches_a_result_recorded_before_the_query(load_env_vars, successful_oauth_response,
+                                                                 successful_transaction_status_query_callback,
+                                                                 successful_transaction_status_query_response):
+    transport = InMemoryTransport()
+    cache = TransactionStatusCache()
+    request = status_request(transport, successful_oauth_response, successful_transaction_status_query_response,
+                             status_cache=cache)
+    # Daraja may deliver the result before execute returns the acknowledgement the query is registered with.
+    assert not cache.record(result_callback(successful_transaction_status_query_callback,
+                                            successful_transaction_status_query_response))
+    assert cache.get(request.shortcode, TRANSACTION_ID) is None
+
+    result = request.fetch_result(*QUERY, timeout=0)
+    assert result["data"]["transaction_status"] == "Completed"
+    assert len(posts(transport)) == 1
+
+
+def test_failed_query_result_is_handed_to_the_waiting_caller_only(successful_transaction_status_query_callback):
+    cache = TransactionStatusCache()
+    cache.expect("600000", TRANSACTION_ID, "AG_1")
+    callback = copy.deepcopy(successful_transaction_status_query_callback)
+    callback["Result"].update(ConversationID="AG_1", ResultCode=2001,
+                              ResultDesc="The initiator information is invalid.")
+    assert not cache.record(TransactionStatusCallbackParser(callback))
+    assert cache.get("600000", TRANSACTION_ID) is None
+
+    result = cache.wait("600000", TRANSACTION_ID, timeout=0)
+    assert result["error"]["code"] == "2001"
+    assert cache.wait("600000", TRANSACTION_ID, timeout=0) is None
+
+
+def test_fetch_result_across_processes(load_env_vars, successful_oauth_response, tmp_path,
+                                       successful_transaction_status_query_callback,
+                                       successful_transaction_status_query_response):
+    path = str(tmp_path / "status.db")
+    transport = InMemoryTransport()
+    request = status_request(transport, successful_oauth_response, successful_transaction_status_query_response,
+                             status_cache=TransactionStatusCache(SQLiteStatusStore(path), poll_interval=0.01))
+    # the callback receiver runs with its own cache over the same database.
+    receiver_cache = TransactionStatusCache(SQLiteStatusStore(path))
+    callback = result_callback(successful_transaction_status_query_callback,
+                               successful_transaction_status_query_response)
+
+    thread = threading.Thread(target=receiver_cache.record, args=(callback,))
+    thread.start()
+    result = request.fetch_result(*QUERY, timeout=5)
+    thread.join()
+    assert result["data"]["receipt_no"] == TRANSACTION_ID
+
+
+def test_fetch_result_async(load_env_vars, successful_oauth_response, successful_transaction_status_query_callback,
+                            successful_transaction_status_query_response):
+    transport = InMemoryTransport()
+    cache = TransactionStatusCache(poll_interval=0.01)
+    request = status_request(transport, successful_oauth_response, successful_transaction_status_query_response,
+                             async_transport=AsyncInMemoryTransport(transport), status_cache=cache)
+    callback = result_callback(successful_transaction_status_query_callback,
+                               successful_transaction_status_query_response)
+
+    async def run():
+        queries = asyncio.gather(*(request.fetch_result_async(*QUERY, timeout=5) for _ in range(3)))
+        cache.record(callback)
+        return await queries
+
+    results = asyncio.run(run())
+    assert len(posts(transport)) == 1
+    assert all(result["success"] for result in results)
+    assert asyncio.run(request.fetch_result_async(*QUERY)) == results[0]
+    assert asyncio.run(cache.wait_async("600000", "UNKNOWN", timeout=0.02)) is None
@@ -16,6 +16,7 @@ from mpesa_sdk.daraja.stk import (StkPushRequestInterface,
                        StkPushStatusQueryResponseParser,
                        StkPushPaymentResponseParser,
                        StkPushCallbackRequestParser)
+from mpesa_sdk.exceptions import TransactionCancelledError
 from mpesa_sdk.utils import camel_to_snake, timestamp
 
 # test imports
@@ -122,6 +123,7 @@ def test_stk_response_parser(caplog, failed_stk_push_response, successful_stk_pu
     request_id = successful_stk_push_response.get("MerchantRequestID")
     assert expected_parsed_response == parsed_response
     assert f"STK push payment request: {request_id}, initiated. {response_description}." in caplog.text
+    assert stk_push_response_parser.result_code == stk_push_response_parser.response_code == 0
 
     caplog.set_level(logging.ERROR)
     failed_response = build_response(failed_stk_push_response, "utf-8", "Server error", 500)
@@ -169,6 +171,7 @@ def test_stk_push_callback_request_parser(caplog, failed_stk_push_callback, succ
 
     parsed_result = {
         "description": description,
+        "error": {"code": "1032", "category": "cancelled", "retryable": False},
         "success": result_code == 0,
         "transaction_id": transaction_id
     }
@@ -188,7 +191,11 @@ def test_stk_push_status_query_response_parser(caplog, failed_stk_push_status_qu
     description = failed_stk_push_status_query.get("ResultDesc")
 
     assert f"STK push status query request: {request_id} failed. {description}." in caplog.text
-    assert parsed_response == {camel_to_snake(key): value for key, value in failed_stk_push_status_query.items()}
+    assert parsed_response == {
+        **{camel_to_snake(key): value for key, value in failed_stk_push_status_query.items()},
+        "error": {"code": "1032", "category": "cancelled", "retryable": False}}
+    with pytest.raises(TransactionCancelledError, match="1032: Request cancelled by user"):
+        stk_push_status_query_response_parser.raise_for_error()
 
     caplog.set_level(logging.INFO)
     successful_response = build_response(successful_stk_push_status_query, "utf-8", "OK", 200)
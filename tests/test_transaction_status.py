@@ -72,8 +72,9 @@ def test_transaction_status_query_response_parser(caplog, failed_transaction_sta
     request_id = failed_transaction_status_query_response.get("requestId")
 
     assert f"Transaction status query: {request_id}, failed. {description}." in caplog.text
-    assert parsed_response == {camel_to_snake(key): value for key, value in
-                               failed_transaction_status_query_response.items()}
+    assert parsed_response == {
+        **{camel_to_snake(key): value for key, value in failed_transaction_status_query_response.items()},
+        "error": {"code": "400.002.02", "category": "invalid_request", "retryable": False}}
 
     caplog.set_level(logging.INFO)
     successful_response = build_response(successful_transaction_status_query_response, "utf-8", "OK", 200)
@@ -0,0 +1,128 @@
+# standard imports
+import asyncio
+import os
+
+# external imports
+import pytest
+
+# local imports
+from mpesa_sdk.daraja.auth import AccessTokenCache
+from mpesa_sdk.daraja.b2c import B2CPaymentRequest, B2CPaymentResponseParser
+from mpesa_sdk.daraja.enums import CommandID
+from mpesa_sdk.daraja.stk import StkPushPaymentRequest, StkPushPaymentResponseParser
+from mpesa_sdk.transport import (AsyncHttpxTransport,
+                                 Http2Transport,
+                                 HttpxTransport,
+                                 InMemoryTransport,
+                                 RequestsTransport,
+                                 TransportResponse,
+                                 Urllib3Transport,
+                                 encode_body,
+                                 get_default_transport,
+                                 set_default_transport)
+
+# test imports
+from tests.helpers.h2 import h2_stub_server
+from tests.helpers.http import stub_server
+
+
+def test_transport_response():
+    response = TransportResponse(200, "OK", content=b'{"foo": "bar"}')
+    assert response.json() == {"foo": "bar"}
+    assert response.text == '{"foo": "bar"}'
+    assert TransportResponse(204).json() is None
+    assert encode_body(data="foo=bar") == b"foo=bar"
+
+
+@pytest.mark.parametrize("transport_class", [RequestsTransport, Urllib3Transport, HttpxTransport])
+def test_sync_transports(successful_b2c_response, successful_oauth_response, transport_class):
+    responses = {"GET": (successful_oauth_response, 200), "POST": (successful_b2c_response, 200)}
+    transport = transport_class()
+    with stub_server(responses) as (server, url):
+        response = transport.request("GET", f"{url}/oauth", headers={"Authorization": "Basic foo"})
+        assert (response.status_code, response.reason) == (200, "OK")
+        assert response.json() == successful_oauth_response
+
+        response = transport.request("POST", f"{url}/b2c", json={"Amount": "10"})
+        assert response.json() == successful_b2c_response
+        assert server.received[-1] == ("POST", "/b2c", {"Amount": "10"})
+    transport.close()
+
+
+def test_async_httpx_transport(successful_b2c_response, successful_oauth_response):
+    responses = {"GET": (successful_oauth_response, 200), "POST": (successful_b2c_response, 200)}
+
+    async def post(url):
+        transport = AsyncHttpxTransport()
+        try:
+            return await transport.request("POST", f"{url}/b2c", json={"Amount": "10"})
+        finally:
+            await transport.close()
+
+    with stub_server(responses) as (server, url):
+        response = asyncio.run(post(url))
+    assert response.json() == successful_b2c_response
+    assert server.received == [("POST", "/b2c", {"Amount": "10"})]
+
+
+def test_in_memory_transport(load_env_vars, successful_b2c_response, successful_oauth_response):
+    transport = InMemoryTransport()
+    transport.register("GET", os.getenv("OAUTH_URL"), json=successful_oauth_response)
+    transport.register("POST", os.getenv("B2C_URL"), json=successful_b2c_response)
+
+    b2c_payment_request = B2CPaymentRequest(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"),
+                                            os.getenv("SHORTCODE"), transport=transport)
+    response = b2c_payment_request.execute("10", CommandID.BUSINESS_PAYMENT, "test-api", "", "600000",
+                                           "254712345678", "Test remarks")
+    assert B2CPaymentResponseParser(response).parse()["response_code"] == 0
+    assert transport.requests[0]["headers"]["Authorization"].startswith("Basic ")
+    assert transport.requests[1]["headers"]["Authorization"] == \
+        f"Bearer {successful_oauth_response['access_token']}"
+    assert transport.requests[1]["json"]["Amount"] == "10"
+    assert transport.request("GET", "http://unregistered.example").status_code == 404
+
+    set_default_transport(transport)
+    try:
+        assert get_default_transport() is transport
+    finally:
+        set_default_transport(None)
+    assert isinstance(get_default_transport(), RequestsTransport)
+
+
+def test_http2_transport_multiplexes_stk_push_burst(load_env_vars, successful_oauth_response,
+                                                    successful_stk_push_response, monkeypatch):
+    responses = {"GET": (successful_oauth_response, 200), "POST": (successful_stk_push_response, 200)}
+
+    async def burst(size):
+        transport = Http2Transport(max_connections=1, max_concurrent_streams=20, prior_knowledge=True)
+        stk_push_payment_request = StkPushPaymentRequest(
+            os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"), os.getenv("PASSKEY"), os.getenv("SHORTCODE"),
+            token_cache=AccessTokenCache(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"),
+                                         async_transport=transport),
+            async_transport=transport)
+        try:
+            return await asyncio.gather(*(
+                stk_push_payment_request.execute_async("ref", str(index + 1), "254712345678", "Flash sale")
+                for index in range(size)))
+        finally:
+            await transport.close()
+
+    with h2_stub_server(responses, delay=0.01) as (server, url):
+        monkeypatch.setenv("OAUTH_URL", f"{url}/oauth")
+        monkeypatch.setenv("STK_PUSH_INITIATION_URL", f"{url}/stkpush")
+        results = asyncio.run(burst(50))
+
+    assert [StkPushPaymentResponseParser(response).parse()["result_code"] for response in results] == [0] * 50
+    assert server.connections == 1
+    assert [method for method, _, _ in server.received].count("GET") == 1
+    assert sorted(int(body["Amount"]) for method, _, body in server.received if body) == list(range(1, 51))
+
+
+def test_execute_async_requires_async_transport(load_env_vars):
+    b2c_payment_request = B2CPaymentRequest(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"),
+                                            os.getenv("SHORTCODE"))
+    with pytest.raises(ValueError):
+        asyncio.run(b2c_payment_request.execute_async("10", CommandID.BUSINESS_PAYMENT, "test-api", "", "600000",
+                                                      "254712345678", "Test remarks"))
+    with pytest.raises(ValueError):
+        asyncio.run(AccessTokenCache(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET")).get_async())
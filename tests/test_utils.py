@@ -1,5 +1,6 @@
 # standard imports
 import logging
+from datetime import datetime, timezone
 
 # external imports
 import pytest
@@ -8,7 +9,9 @@ from mpesa_sdk.exceptions import UnsupportedMethodError
 from requests import Response
 
 # local imports
-from mpesa_sdk.utils import make_request, preprocess_http_response
+from mpesa_sdk.transport import RequestsTransport
+from mpesa_sdk.utils import (EAST_AFRICA_TIME, get_timezone, make_request, preprocess_http_response, set_clock,
+                             timestamp)
 
 # test imports
 from tests.helpers.http import build_response
@@ -26,6 +29,13 @@ def test_make_request(caplog):
         make_request("PUT", sample_url, data=sample_data)
     assert f'Putting to: {sample_url} with: {sample_data}.' in caplog.text
 
+    # keyword arguments are passed through to requests.
+    with requests_mock.Mocker(real_http=False) as mock_request:
+        mock_request.request("GET", sample_url)
+        make_request("GET", sample_url, transport=RequestsTransport(), verify=False, params={"page": 2})
+    assert mock_request.last_request.verify is False
+    assert mock_request.last_request.qs == {"page": ["2"]}
+
 
 def reason_status_code(response: Response) -> tuple:
     return response.reason, response.status_code
@@ -67,3 +77,22 @@ def test_preprocess_http_response(caplog):
     assert f'Server Error: {status_code}, reason: {reason}.' in caplog.text
     assert data is None
 
+
+
+def test_timestamp(monkeypatch):
+    frozen = datetime(2019, 12, 19, 7, 21, 15, tzinfo=timezone.utc)
+    clock = frozen.astimezone
+    assert timestamp(clock) == "20191219102115"
+
+    monkeypatch.delenv("TIMEZONE", raising=False)
+    assert get_timezone() is EAST_AFRICA_TIME
+    assert timestamp(clock) == "20191219102115"
+
+    monkeypatch.setenv("TIMEZONE", "Europe/London")
+    assert get_timezone("Europe/London") is get_timezone("Europe/London")
+    set_clock(clock)
+    try:
+        assert timestamp() == "20191219072115"
+    finally:
+        set_clock(None)
+    assert len(timestamp()) == 14
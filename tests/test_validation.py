@@ -0,0 +1,87 @@
+# standard imports
+import os
+
+# external imports
+import pytest
+from requests_mock import Mocker
+
+# local imports
+from mpesa_sdk.daraja.b2c import B2CPaymentRequest
+from mpesa_sdk.daraja.enums import CommandID, IdentifierType
+from mpesa_sdk.daraja.reverse import ReversalRequest
+from mpesa_sdk.daraja.stk import StkPushPaymentRequest, StkPushStatusQueryRequest
+from mpesa_sdk.daraja.transaction_status import TransactionStatusQueryRequest
+from mpesa_sdk.daraja.validation import (Field,
+                                         compile_fields,
+                                         payload_validation_enabled,
+                                         payload_validator,
+                                         set_payload_validation,
+                                         validate_payload)
+from mpesa_sdk.exceptions import PayloadValidationError
+
+# test imports
+
+
+def test_compile_fields():
+    validate = compile_fields([
+        Field("CommandID", choices=CommandID),
+        Field("Remarks", max_length=5),
+        Field("Occasion", required=False, min_length=0),
+        Field("PartyA", pattern=r"\d{6}"),
+    ])
+    assert validate({"CommandID": "SalaryPayment", "Remarks": "June", "PartyA": 600000}) == []
+    assert validate({"CommandID": "Salary", "Remarks": "", "PartyA": "60000", "Occasion": None}) == [
+        "CommandID has an unsupported value: 'Salary'.", "Remarks is required.", "PartyA is malformed: '60000'."]
+    assert validate({"Remarks": "Salary for June"}) == [
+        "CommandID is required.", "Remarks exceeds 5 characters.", "PartyA is required."]
+
+
+def test_builders_compile_validators_once(load_env_vars):
+    assert payload_validator(B2CPaymentRequest) is payload_validator(B2CPaymentRequest)
+    assert payload_validator(ReversalRequest) is not payload_validator(TransactionStatusQueryRequest)
+
+    request = TransactionStatusQueryRequest(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"),
+                                            os.getenv("SHORTCODE"))
+    payload = request.build(IdentifierType.MSISDN, "test-api", "", "254712345678", "Remarks", "QWEDF4MS007")
+    assert validate_payload(TransactionStatusQueryRequest, payload) is payload
+
+    del payload["Occasion"]
+    payload.update(IdentifierType="3", Remarks="x" * 101)
+    with pytest.raises(PayloadValidationError) as error:
+        request.prepare(payload)
+    assert error.value.builder == "TransactionStatusQueryRequest"
+    assert error.value.errors == [
+        "IdentifierType has an unsupported value: '3'.", "Remarks exceeds 100 characters.", "Occasion is required."]
+
+    status_query = StkPushStatusQueryRequest(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"),
+                                             os.getenv("PASSKEY"), os.getenv("SHORTCODE"))
+    assert status_query.prepare(status_query.build("ws_CO_191220191020363925"))
+
+
+def test_invalid_payloads_are_rejected_before_sending(load_env_vars, successful_oauth_response,
+                                                     successful_stk_push_response):
+    request = StkPushPaymentRequest(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"), os.getenv("PASSKEY"),
+                                    os.getenv("SHORTCODE"))
+    unchecked = StkPushPaymentRequest(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"), os.getenv("PASSKEY"),
+                                      os.getenv("SHORTCODE"), validate_payloads=False)
+    with Mocker(real_http=False) as requests_mocker:
+        requests_mocker.register_uri("GET", os.getenv("OAUTH_URL"), json=successful_oauth_response)
+        requests_mocker.register_uri("POST", os.getenv("STK_PUSH_INITIATION_URL"), json=successful_stk_push_response)
+        with pytest.raises(PayloadValidationError, match="AccountReference exceeds 12 characters"):
+            request.execute("invoice-2019-12-19", "1", "254712345678", "Airtime")
+        assert requests_mocker.call_count == 0
+
+        assert unchecked.execute("invoice-2019-12-19", "1", "254712345678", "Airtime").status_code == 200
+
+
+def test_payload_validation_toggle(load_env_vars):
+    request = B2CPaymentRequest(os.getenv("CONSUMER_KEY"), os.getenv("CONSUMER_SECRET"), os.getenv("SHORTCODE"))
+    payload = request.build("100", CommandID.SALARY_PAYMENT, "test-api", "", "600000", "0712345678", "Remarks")
+    try:
+        set_payload_validation(False)
+        assert not payload_validation_enabled()
+        assert request.prepare(payload) is payload
+    finally:
+        set_payload_validation(True)
+    with pytest.raises(PayloadValidationError, match="PartyB is malformed"):
+        request.prepare(payload)